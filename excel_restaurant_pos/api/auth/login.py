@@ -3,7 +3,7 @@ from frappe import _
 from frappe.utils import cint
 from frappe.twofactor import should_run_2fa, authenticate_for_2factor, confirm_otp_token, get_cached_user_pass
 from frappe.sessions import clear_sessions
-from excel_restaurant_pos.utils.jwt_auth import generate_access_token, generate_refresh_token, revoke_all_user_tokens, add_user_session
+from excel_restaurant_pos.utils.jwt_auth import generate_access_token, generate_refresh_token, revoke_all_user_tokens, add_user_session, new_session_id
 from excel_restaurant_pos.utils.error_handler import throw_error, ErrorCode, success_response
 from excel_restaurant_pos.shared.arcpos_settings.system_settings import default_system_settings
 
@@ -65,8 +65,9 @@ def login(user, pwd):
 	user_permissions = frappe.get_roles(user)
 
 	# Generate secure JWT tokens
-	access_token = generate_access_token(user, expires_in_hours=int(default_system_settings().access_token_expiry or 1))
-	refresh_token = generate_refresh_token(user, expires_in_days=int(default_system_settings().refresh_token_expiry or 7))
+	session_id = new_session_id()
+	access_token = generate_access_token(user, expires_in_hours=int(default_system_settings().access_token_expiry or 1), session_id=session_id)
+	refresh_token = generate_refresh_token(user, expires_in_days=int(default_system_settings().refresh_token_expiry or 7), session_id=session_id)
 
 	# Check if System Settings has deny_multiple_sessions enabled
 	deny_multiple = cint(frappe.db.get_single_value("System Settings", "deny_multiple_sessions"))
@@ -80,15 +81,10 @@ def login(user, pwd):
 
 		# If user has a session limit set (> 0), enforce it
 		if simultaneous_sessions > 0:
-			# Get token's issued-at timestamp
-			import jwt as jwt_lib
-			token_payload = jwt_lib.decode(access_token, options={"verify_signature": False})
-			token_iat = token_payload.get("iat")
-
-			frappe.logger().info(f"Login - Calling add_user_session for {user} with token_iat: {token_iat}, limit: {simultaneous_sessions}")
+			frappe.logger().info(f"Login - Calling add_user_session for {user} with session_id: {session_id}, limit: {simultaneous_sessions}")
 
 			# Track session and automatically revoke oldest sessions if limit exceeded
-			revoked = add_user_session(user, token_iat, max_sessions=simultaneous_sessions)
+			revoked = add_user_session(user, session_id, max_sessions=simultaneous_sessions)
 
 			if revoked:
 				frappe.logger().info(f"Revoked {len(revoked)} old session(s) for user {user} due to simultaneous session limit")
@@ -216,8 +212,9 @@ def verify_2fa_and_login(otp, tmp_id):
 	user_permissions = frappe.get_roles(user)
 
 	# Generate secure JWT tokens
-	access_token = generate_access_token(user, expires_in_hours=int(default_system_settings().access_token_expiry or 1))
-	refresh_token = generate_refresh_token(user, expires_in_days=int(default_system_settings().refresh_token_expiry or 7))
+	session_id = new_session_id()
+	access_token = generate_access_token(user, expires_in_hours=int(default_system_settings().access_token_expiry or 1), session_id=session_id)
+	refresh_token = generate_refresh_token(user, expires_in_days=int(default_system_settings().refresh_token_expiry or 7), session_id=session_id)
 
 	# Check if System Settings has deny_multiple_sessions enabled
 	deny_multiple = cint(frappe.db.get_single_value("System Settings", "deny_multiple_sessions"))
@@ -231,15 +228,10 @@ def verify_2fa_and_login(otp, tmp_id):
 
 		# If user has a session limit set (> 0), enforce it
 		if simultaneous_sessions > 0:
-			# Get token's issued-at timestamp
-			import jwt as jwt_lib
-			token_payload = jwt_lib.decode(access_token, options={"verify_signature": False})
-			token_iat = token_payload.get("iat")
-
-			frappe.logger().info(f"Login - Calling add_user_session for {user} with token_iat: {token_iat}, limit: {simultaneous_sessions}")
+			frappe.logger().info(f"Login - Calling add_user_session for {user} with session_id: {session_id}, limit: {simultaneous_sessions}")
 
 			# Track session and automatically revoke oldest sessions if limit exceeded
-			revoked = add_user_session(user, token_iat, max_sessions=simultaneous_sessions)
+			revoked = add_user_session(user, session_id, max_sessions=simultaneous_sessions)
 
 			if revoked:
 				frappe.logger().info(f"Revoked {len(revoked)} old session(s) for user {user} due to simultaneous session limit")
@@ -4,6 +4,7 @@ from excel_restaurant_pos.utils.jwt_auth import (
     verify_token,
     generate_access_token,
     generate_refresh_token,
+    get_session_id,
     remove_user_session,
     revoke_specific_sessions
 )
@@ -50,11 +51,14 @@ def refresh(refresh_token):
                 http_status_code=403
             )
 
+        # New tokens stay in the login's session, so revoking it still rejects them
+        session_id = get_session_id(payload)
+
         # Generate new access token
-        new_access_token = generate_access_token(user)
+        new_access_token = generate_access_token(user, session_id=session_id)
 
         # Optionally generate new refresh token (recommended for security)
-        new_refresh_token = generate_refresh_token(user)
+        new_refresh_token = generate_refresh_token(user, session_id=session_id)
 
         return success_response(
             message=_("Token refreshed successfully"),
@@ -94,12 +98,12 @@ def revoke(refresh_token, access_token=None):
         dict: Success status
     """
     try:
-        # Decode tokens without full verification to get user and iat
+        # Decode tokens without full verification to get user and session
         # This allows logout even with expired tokens
         try:
             refresh_payload = jwt.decode(refresh_token, options={"verify_signature": False})
             user = refresh_payload.get("user")
-            refresh_iat = refresh_payload.get("iat")
+            session_ids = {get_session_id(refresh_payload)}
         except:
             # If we can't even decode the token, still return success
             return success_response(message=_("Logged out successfully"))
@@ -109,22 +113,23 @@ def revoke(refresh_token, access_token=None):
 
         frappe.logger().info(f"Logout - Revoking tokens for user: {user}")
 
-        # Revoke the specific session from active sessions tracking
+        # Both tokens of a login share the session, tokens of older logins may not
         if access_token:
             try:
                 access_payload = jwt.decode(access_token, options={"verify_signature": False})
-                access_iat = access_payload.get("iat")
-
-                if access_iat:
-                    # Remove from active sessions list
-                    remove_user_session(user, access_iat)
-
-                    # Add to revoked sessions list
-                    revoke_specific_sessions(user, [access_iat])
-
-                    frappe.logger().info(f"Logout - Revoked access token session: {access_iat}")
+                session_ids.add(get_session_id(access_payload))
             except Exception as e:
-                frappe.logger().warning(f"Failed to revoke access token session: {str(e)}")
+                frappe.logger().warning(f"Failed to decode access token on logout: {str(e)}")
+
+        # Revoke the sessions, which rejects the refresh and the access token
+        session_ids.discard(None)
+        for session_id in session_ids:
+            # Remove from active sessions list
+            remove_user_session(user, session_id)
+        if session_ids:
+            # Add to revoked sessions list
+            revoke_specific_sessions(user, list(session_ids))
+            frappe.logger().info(f"Logout - Revoked sessions: {session_ids}")
 
         return success_response(
             message=_("Logged out successfully")
@@ -16,4 +16,5 @@ item_api_routes = {
     "api.items.list": "excel_restaurant_pos.api.item.get_item_list",
     "api.items.details": "excel_restaurant_pos.api.item.get_item_details",
     "api.items.most_sold": "excel_restaurant_pos.api.item.get_most_sold_item",
+    "api.items.kitchen_feed": "excel_restaurant_pos.shared.kitchen_feed.get_kitchen_feed",
 }
@@ -2,6 +2,15 @@ from frappe.utils import get_url, nowdate, add_days
 import datetime
 import frappe
 from frappe import _
+from excel_restaurant_pos.shared.arcpos_settings import restaurant_settings
+
+from excel_restaurant_pos.shared.sales_rollup import (
+    get_daily_sales,
+    get_top_seller_by_periods,
+    get_top_sellers,
+)
+
+from .order_loader import ORDER_LIST_FIELDS, attach_order_items, get_order_page
 
 
 @frappe.whitelist(allow_guest=True)
@@ -264,7 +273,7 @@ def create_order(data):
     try:
         # Parse incoming data
         order_data = frappe.parse_json(data)
-        settings = frappe.get_doc("Restaurant Settings")
+        settings = restaurant_settings()
 
         existing_order_name = ""
         # Check for existing order
@@ -379,13 +388,11 @@ def create_order(data):
 def get_running_order_list():
     order_list = frappe.get_all(
         "Table Order",
-        fields=["*"],
+        fields=ORDER_LIST_FIELDS,
         filters=[["status", "!=", "Completed"], ["status", "!=", "Canceled"]],
         order_by="creation desc",
     )
-    for order in order_list:
-        order["item_list"] = get_order_item_list(order.name)
-    return order_list
+    return attach_order_items(order_list)
 
 
 @frappe.whitelist(allow_guest=True)
@@ -393,59 +400,50 @@ def get_running_order_item_list(table_id):
     print("table_id", table_id)
     if not table_id:
         return []
-    order_list = frappe.get_all(
+    # only the latest running order of the table is used
+    order_name = frappe.get_all(
         "Table Order",
-        fields=["*"],
         filters=[
             ["status", "!=", "Completed"],
             ["status", "!=", "Canceled"],
             ["table", "=", table_id],
         ],
         order_by="creation desc",
+        limit_page_length=1,
+        pluck="name",
     )
-    for order in order_list:
-        order["item_list"] = get_order_item_list(order.name)
-    if len(order_list) > 0:
-        return order_list[0].item_list
+    if order_name:
+        return get_order_item_list(order_name[0])
     else:
         return []
 
 
 @frappe.whitelist(allow_guest=True)
 def get_tax_rate():
-    settings = frappe.get_doc("Restaurant Settings")
-    return int(settings.tax_rate) / 100
+    return int(restaurant_settings().tax_rate) / 100
 
 
 @frappe.whitelist()
-def get_order_list(status=None, page=1, page_size=10):
+def get_order_list(status=None, page=1, page_size=10, cursor=None):
     try:
         # Calculate offset
         page = int(page) if page else 1
         page_size = int(page_size) if page_size else 10
         start = (page - 1) * page_size
 
-        # Apply filters and fetch data
+        # Apply filters and fetch data (keyset paging when a cursor is given)
         filters = [["status", "in", [status]]] if status else []
-        order_list = frappe.get_all(
-            "Table Order",
-            fields=["*"],
-            filters=filters,
-            order_by="modified desc",
-            limit_start=start,
-            limit_page_length=page_size,
+        order_list, next_cursor = get_order_page(
+            filters, page_size=page_size, cursor=cursor, start=start
         )
 
         # Get total count for pagination metadata
         total_count = frappe.db.count("Table Order", filters=filters)
 
-        # Add item list to each order
-        for order in order_list:
-            order["item_list"] = get_order_item_list(order.name)
-
         # Prepare response
         response = {
             "data": order_list,
+            "nextCursor": next_cursor,
             "currentPage": page,
             "totalPages": (total_count + page_size - 1)
             // page_size,  # Ceiling division
@@ -459,28 +457,19 @@ def get_order_list(status=None, page=1, page_size=10):
 
 
 @frappe.whitelist()
-def get_chef_order_list(page=1, page_size=10):
+def get_chef_order_list(page=1, page_size=10, cursor=None):
     try:
         # Convert page and page_size to integers
         page = int(page) if page else 1
         page_size = int(page_size) if page_size else 10
         start = (page - 1) * page_size
 
-        # Define filters with OR conditions
-        or_filters = [
-            ["status", "=", "Work in progress"],
-            ["status", "=", "Preparing"],
-            ["status", "=", "Ready to Serve"],
-        ]
-
-        # Fetch the orders with pagination
-        order_list = frappe.get_all(
-            "Table Order",
-            fields=["*"],
-            or_filters=or_filters,
-            order_by="modified desc",
-            limit_start=start,
-            limit_page_length=page_size,
+        # Kitchen statuses
+        filters = [["status", "in", ["Work in progress", "Preparing", "Ready to Serve"]]]
+
+        # Fetch the orders with their items (keyset paging when a cursor is given)
+        order_list, next_cursor = get_order_page(
+            filters, page_size=page_size, cursor=cursor, start=start
         )
 
         # Get total count for pagination
@@ -492,13 +481,11 @@ def get_chef_order_list(page=1, page_size=10):
         """,
             ("Work in progress", "Ready to Serve"),
         )[0][0]
-        # Add item list to each order
-        for order in order_list:
-            order["item_list"] = get_order_item_list(order.name)
 
         # Prepare response
         response = {
             "data": order_list,
+            "nextCursor": next_cursor,
             "currentPage": page,
             "totalPages": (total_count + page_size - 1)
             // page_size,  # Ceiling division
@@ -598,7 +585,7 @@ def check_coupon_code(data):
 @frappe.whitelist(allow_guest=True)
 def get_logo_and_title():
     hostname = get_url()
-    settings = frappe.get_doc("Restaurant Settings")
+    settings = restaurant_settings()
     return {"logo": f"{settings.logo}", "title": settings.title}
 
 
@@ -621,27 +608,10 @@ def get_last_seven_days_sales():
     # We'll query from 6 days ago up to today (total 7 days, including the present)
     start_date = today - datetime.timedelta(days=6)
 
-    # Fetch actual sales from the database
-    query_results = frappe.db.sql(
-        """
-        SELECT 
-            DATE(posting_date) AS posting_date,
-            SUM(grand_total) AS total_sales
-        FROM `tabPOS Invoice`
-        WHERE 
-            docstatus = 1
-            AND posting_date BETWEEN %s AND %s
-        GROUP BY DATE(posting_date)
-        ORDER BY posting_date
-    """,
-        (start_date, today),
-        as_dict=True,
-    )
-
-    # Update our map with actual totals
-    for row in query_results:
-        if row.posting_date in daily_sales_map:
-            daily_sales_map[row.posting_date] = row.total_sales or 0.0
+    # Update our map with the totals of the sales rollup
+    for posting_date, total_sales in get_daily_sales(start_date, today).items():
+        if posting_date in daily_sales_map:
+            daily_sales_map[posting_date] = total_sales
 
     # Convert map to a sorted list of dicts
     output = []
@@ -661,7 +631,7 @@ def get_last_seven_days_sales():
 def get_top_items_by_sales_period(period="weekly", item_count=5):
     """
     Fetch the Top N Items (default 5) by total sales amount
-    from POS Invoices for a given period ("weekly", "monthly", "yearly", etc.).
+    from the sales rollup for a given period ("weekly", "monthly", "yearly", etc.).
 
     Returns a list of dicts with:
         - item_code
@@ -672,30 +642,10 @@ def get_top_items_by_sales_period(period="weekly", item_count=5):
     item_count = int(item_count) if item_count else 5
 
     start_date = get_start_date_for_period(period)
+    data = get_top_sellers("item_code", start_date, item_count)
 
-    # Use f-string for dynamic LIMIT
-    query = f"""
-        SELECT 
-            pii.item_code AS item_code,
-            SUM(pii.amount) AS total_sales
-        FROM `tabPOS Invoice Item` pii
-        JOIN `tabPOS Invoice` pi ON pi.name = pii.parent
-        WHERE 
-            pi.docstatus = 1
-            AND pi.posting_date >= %s
-        GROUP BY pii.item_code
-        ORDER BY total_sales DESC
-        LIMIT {item_count}
-    """
-
-    data = frappe.db.sql(query, (start_date,), as_dict=True)
-
-    # Fetch item_name for readability
     for row in data:
-        row["item_name"] = (
-            frappe.db.get_value("Item", row["item_code"], "item_name")
-            or row["item_code"]
-        )
+        row["item_name"] = row.get("item_name") or row["item_code"]
 
     return data
 
@@ -704,7 +654,7 @@ def get_top_items_by_sales_period(period="weekly", item_count=5):
 def get_top_item_groups_by_sales_period(period="weekly", group_count=5):
     """
     Fetch the Top N Item Groups (default 5) by total sales amount
-    from POS Invoices for a given period ("weekly", "monthly", "yearly", etc.).
+    from the sales rollup for a given period ("weekly", "monthly", "yearly", etc.).
 
     Returns a list of dicts with:
         - item_group
@@ -713,27 +663,7 @@ def get_top_item_groups_by_sales_period(period="weekly", group_count=5):
     group_count = int(group_count) if group_count else 5
 
     start_date = get_start_date_for_period(period)
-
-    # Build a query grouped by item_group
-    query = f"""
-        SELECT 
-            i.item_group AS item_group,
-            SUM(pii.amount) AS total_sales
-        FROM `tabPOS Invoice Item` pii
-        JOIN `tabPOS Invoice` pi ON pi.name = pii.parent
-        JOIN `tabItem` i ON pii.item_code = i.item_code
-        WHERE 
-            pi.docstatus = 1
-            AND pi.posting_date >= %s
-        GROUP BY 
-            i.item_group
-        ORDER BY 
-            total_sales DESC
-        LIMIT {group_count}
-    """
-
-    data = frappe.db.sql(query, (start_date,), as_dict=True)
-    return data
+    return get_top_sellers("item_group", start_date, group_count)
 
 
 def get_start_date_for_period(period):
@@ -788,29 +718,23 @@ def dashboard_data():
         """,
         ("Work in progress", "Ready to Serve", "Order Placed"),
     )[0][0]
-    top_monthly_items = get_top_items_by_sales_period(period="monthly", item_count=1)[0]
-    top_weekly_items = get_top_items_by_sales_period(period="weekly", item_count=1)[0]
-    top_yearly_items = get_top_items_by_sales_period(period="yearly", item_count=1)[0]
-    top_monthly_item_groups = get_top_item_groups_by_sales_period(
-        period="monthly", group_count=1
-    )[0]
-    top_weekly_item_groups = get_top_item_groups_by_sales_period(
-        period="weekly", group_count=1
-    )[0]
-
-    top_yearly_item_groups = get_top_item_groups_by_sales_period(
-        period="yearly", group_count=1
-    )[0]
+    # top item / category of every period in one rollup query each
+    period_start_dates = {
+        period: get_start_date_for_period(period)
+        for period in ("weekly", "monthly", "yearly")
+    }
+    top_items = get_top_seller_by_periods("item_code", period_start_dates)
+    top_item_groups = get_top_seller_by_periods("item_group", period_start_dates)
 
     return {
         "chef_orders_count": chef_orders_count,
         "total_orders_count": paid_orders_count,
         "canceled_orders_count": canceled_orders_count,
         "unpaid_orders_count": unpaid_orders_count,
-        "top_monthly_item": top_monthly_items.get("item_code"),
-        "top_weekly_item": top_weekly_items.get("item_code"),
-        "top_yearly_item": top_yearly_items.get("item_code"),
-        "top_monthly_category": top_monthly_item_groups.get("item_group"),
-        "top_weekly_category": top_weekly_item_groups.get("item_group"),
-        "top_yearly_category": top_yearly_item_groups.get("item_group"),
+        "top_monthly_item": top_items["monthly"],
+        "top_weekly_item": top_items["weekly"],
+        "top_yearly_item": top_items["yearly"],
+        "top_monthly_category": top_item_groups["monthly"],
+        "top_weekly_category": top_item_groups["weekly"],
+        "top_yearly_category": top_item_groups["yearly"],
     }
@@ -0,0 +1,118 @@
+"""
+Batched loading of Table Orders with their items.
+
+Orders of a page are fetched with the columns the order screens use and all of
+their Table Order Item rows are loaded with a single `parent IN (...)` query.
+Pages can be walked with a (modified, name) keyset cursor instead of offsets.
+"""
+
+import base64
+import json
+
+import frappe
+
+ORDER_LIST_FIELDS = [
+    "name",
+    "status",
+    "table",
+    "floor",
+    "customer",
+    "customer_name",
+    "remarks",
+    "amount",
+    "tax",
+    "discount",
+    "discount_type",
+    "total_amount",
+    "is_paid",
+    "credit_sales",
+    "sales_invoice",
+    "creation",
+    "modified",
+]
+
+ORDER_ITEM_FIELDS = [
+    "item",
+    "qty",
+    "amount",
+    "rate",
+    "is_parcel",
+    "is_ready",
+    "name",
+    "parent",
+    "remarks",
+    "is_accepted",
+    "is_create_recipe",
+    "is_recipe_item",
+]
+
+
+def attach_order_items(orders):
+    """Load the items of all orders in one query and set them as `item_list`."""
+    if not orders:
+        return orders
+
+    rows = frappe.get_all(
+        "Table Order Item",
+        filters={"parent": ["in", [order.name for order in orders]], "parenttype": "Table Order"},
+        fields=ORDER_ITEM_FIELDS,
+        order_by="creation desc",
+    )
+
+    items_by_order = {}
+    for row in rows:
+        items_by_order.setdefault(row.parent, []).append(row)
+
+    for order in orders:
+        order["item_list"] = items_by_order.get(order.name, [])
+    return orders
+
+
+def encode_cursor(order):
+    """Build the keyset cursor pointing after the given order."""
+    raw = json.dumps([str(order.modified), order.name])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a keyset cursor into (modified, name)."""
+    try:
+        modified, name = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        frappe.throw("Invalid cursor")
+    return modified, name
+
+
+def get_order_page(filters=None, page_size=10, cursor=None, start=0):
+    """
+    Get one page of Table Orders with their items.
+    Args:
+        filters: Table Order filters
+        page_size: Number of orders per page
+        cursor: Keyset cursor from the previous page; when given `start` is ignored
+        start: Offset for clients still paging by page number
+    Returns:
+        tuple: (orders, next cursor or None on the last page)
+    """
+    filters = list(filters or [])
+    or_filters = None
+    if cursor:
+        modified, name = decode_cursor(cursor)
+        # modified <= m AND (modified < m OR name < n) == (modified, name) < (m, n)
+        filters.append(["modified", "<=", modified])
+        or_filters = [["modified", "<", modified], ["name", "<", name]]
+        start = 0
+
+    orders = frappe.get_all(
+        "Table Order",
+        fields=ORDER_LIST_FIELDS,
+        filters=filters,
+        or_filters=or_filters,
+        order_by="modified desc, name desc",
+        limit_start=start,
+        limit_page_length=page_size,
+    )
+    attach_order_items(orders)
+
+    next_cursor = encode_cursor(orders[-1]) if len(orders) == page_size else None
+    return orders, next_cursor
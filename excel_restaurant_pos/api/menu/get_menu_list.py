@@ -1,5 +1,8 @@
 import frappe
 from datetime import datetime
+from werkzeug.wrappers import Response
+
+from excel_restaurant_pos.shared.menu import get_available_menus
 
 
 @frappe.whitelist(allow_guest=True)
@@ -11,7 +14,33 @@ def get_menu_list():
         - parent_menu: parent menu name
         - is_active: 1 (active menu)
         - is_deleted: 0 (exclude deleted menus)
+
+    Without custom filters/fields the list is served from the cached menu
+    snapshot with an ETag; a matching If-None-Match gets an empty 304.
     """
+    # pop cmd
+    if frappe.form_dict.get("cmd"):
+        frappe.form_dict.pop("cmd")
+
+    if frappe.form_dict.get("filters") or frappe.form_dict.get("fields"):
+        return _get_menu_list_from_db()
+
+    etag, menus = get_available_menus()
+    etag = f'"{etag}"'
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if frappe.get_request_header("If-None-Match") == etag:
+        return Response(status=304, headers=headers)
+
+    return Response(
+        frappe.as_json({"message": menus}),
+        content_type="application/json",
+        headers=headers,
+    )
+
+
+def _get_menu_list_from_db():
+    """Query menus directly, applying the client supplied filters and fields."""
     # date calculations
     today_date = datetime.now().date()
     day_name = datetime.now().strftime("%A")
@@ -23,10 +52,6 @@ def get_menu_list():
     menu_list = frappe.get_all("Item", filters=item_filters, pluck="custom_menu")
     menu_list = list(set(menu_list))
 
-    # pop cmd
-    if frappe.form_dict.get("cmd"):
-        frappe.form_dict.pop("cmd")
-
     # prepare filters
     filters = frappe.form_dict.get("filters")
     default_filters = [["parent", "in", menu_list]]
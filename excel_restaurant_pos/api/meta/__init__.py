@@ -20,6 +20,13 @@ from .catalog import (
 from .catalog_helpers.create_catalog_item import create_catalog_item
 from .catalog_helpers.update_catalog_item import update_catalog_item
 from .catalog_helpers.delete_catalog_item import delete_catalog_item
+from .catalog_helpers.catalog_sync import (
+    queue_catalog_sync,
+    queue_item_price_sync,
+    flush_catalog_sync,
+    reconcile_catalog,
+    reconcile_catalog_api,
+)
 
 __all__ = [
     "track_view_content",
@@ -37,6 +44,11 @@ __all__ = [
     "create_catalog_item_api",
     "update_catalog_item_api",
     "delete_catalog_item_api",
+    "queue_catalog_sync",
+    "queue_item_price_sync",
+    "flush_catalog_sync",
+    "reconcile_catalog",
+    "reconcile_catalog_api",
 ]
 
 meta_api_routes = {
@@ -52,4 +64,5 @@ meta_api_routes = {
     "api.meta.create_catalog_item": "excel_restaurant_pos.api.meta.create_catalog_item_api",
     "api.meta.update_catalog_item": "excel_restaurant_pos.api.meta.update_catalog_item_api",
     "api.meta.delete_catalog_item": "excel_restaurant_pos.api.meta.delete_catalog_item_api",
+    "api.meta.reconcile_catalog": "excel_restaurant_pos.api.meta.reconcile_catalog_api",
 }
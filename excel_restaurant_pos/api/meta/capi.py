@@ -2,7 +2,8 @@
 Meta Conversions API (CAPI) Implementation for tracking e-commerce events.
 
 This module provides endpoints to send server-side events to Meta (Facebook)
-for better tracking and attribution of e-commerce activities.
+for better tracking and attribution of e-commerce activities. Events are
+queued and delivered in batches by a background job.
 
 Events supported:
 - AddToCart: When a user adds an item to cart
@@ -17,8 +18,10 @@ import frappe
 from frappe import _
 import hashlib
 import time
-import requests
-import json
+
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
+from excel_restaurant_pos.shared.meta_capi import queue_capi_event
+from excel_restaurant_pos.utils import rate_limit_guest
 
 
 def get_meta_settings():
@@ -26,13 +29,10 @@ def get_meta_settings():
     Get Meta CAPI settings from ArcPOS Settings.
     Returns pixel_id and access_token.
     """
-    if not frappe.db.exists("ArcPOS Settings", "ArcPOS Settings"):
-        return None, None
-
-    settings = frappe.get_doc("ArcPOS Settings", "ArcPOS Settings")
+    settings = arcpos_settings()
 
-    pixel_id = settings.get("pixel_id")
-    access_token = settings.get("capi_access_token")
+    pixel_id = settings.pixel_id
+    access_token = settings.capi_access_token
 
     return pixel_id, access_token
 
@@ -125,7 +125,10 @@ def build_user_data(email=None, phone=None, first_name=None, last_name=None,
 def send_event_to_meta(event_name, event_data, user_data, custom_data=None,
                        event_source_url=None, event_id=None, test_event_code=None):
     """
-    Send an event to Meta Conversions API.
+    Queue an event for the Meta Conversions API.
+
+    The event is sent by the background outbox drain in batches, see
+    `excel_restaurant_pos.shared.meta_capi`.
 
     Args:
         event_name: Name of the event (e.g., "AddToCart", "Purchase")
@@ -137,7 +140,8 @@ def send_event_to_meta(event_name, event_data, user_data, custom_data=None,
         test_event_code: Test event code for testing (from Events Manager)
 
     Returns:
-        dict: Response from Meta API
+        dict: success, whether the event was queued (False for a duplicate
+            event_id) and its event_id
     """
     pixel_id, access_token = get_meta_settings()
 
@@ -164,61 +168,18 @@ def send_event_to_meta(event_name, event_data, user_data, custom_data=None,
     if event_id:
         event["event_id"] = event_id
 
-    # Build request payload
-    payload = {
-        "data": [event],
-        "access_token": access_token,
-    }
-
-    if test_event_code:
-        payload["test_event_code"] = test_event_code
-
-    # Send to Meta API
-    url = f"https://graph.facebook.com/v18.0/{pixel_id}/events"
-
     try:
-        response = requests.post(
-            url,
-            json=payload,
-            timeout=30
-        )
-
-        result = response.json()
-
-        if response.status_code == 200:
-            # Log successful event
-            frappe.logger("meta_capi").info(
-                f"Meta CAPI Event sent: {event_name}, Response: {result}"
-            )
-            return {
-                "success": True,
-                "event_name": event_name,
-                "events_received": result.get("events_received", 0),
-                "messages": result.get("messages", []),
-                "fbtrace_id": result.get("fbtrace_id")
-            }
-        else:
-            # Log error
-            frappe.log_error(
-                message=f"Event: {event_name}\nPayload: {json.dumps(event)}\nResponse: {json.dumps(result)}",
-                title="Meta CAPI Error"
-            )
-            return {
-                "success": False,
-                "error": result.get("error", {}).get("message", "Unknown error"),
-                "error_code": result.get("error", {}).get("code")
-            }
-
-    except requests.exceptions.Timeout:
-        frappe.log_error(
-            message=f"Timeout sending {event_name} event to Meta CAPI",
-            title="Meta CAPI Timeout"
-        )
-        return {"success": False, "error": "Request timeout"}
+        result = queue_capi_event(event, test_event_code=test_event_code)
+        return {
+            "success": True,
+            "queued": result["queued"],
+            "event_name": event_name,
+            "event_id": result["event_id"],
+        }
 
     except Exception as e:
         frappe.log_error(
-            message=f"Error sending {event_name} event: {str(e)}",
+            message=f"Error queueing {event_name} event: {str(e)}",
             title="Meta CAPI Error"
         )
         return {"success": False, "error": str(e)}
@@ -247,6 +208,8 @@ def track_view_content():
     - event_id: Unique event ID for deduplication
     - test_event_code: Test event code for testing
     """
+    rate_limit_guest("track_view_content", limit=120)
+
     # Get parameters
     content_id = frappe.form_dict.get("content_id")
     content_name = frappe.form_dict.get("content_name")
@@ -336,6 +299,8 @@ def track_add_to_cart():
     - event_id: Unique event ID for deduplication
     - test_event_code: Test event code for testing
     """
+    rate_limit_guest("track_add_to_cart", limit=120)
+
     # Get parameters
     content_id = frappe.form_dict.get("content_id")
     content_name = frappe.form_dict.get("content_name")
@@ -433,6 +398,8 @@ def track_search():
     - event_id: Unique event ID for deduplication
     - test_event_code: Test event code for testing
     """
+    rate_limit_guest("track_search", limit=120)
+
     # Get parameters
     search_string = frappe.form_dict.get("search_string")
     content_ids = frappe.form_dict.get("content_ids")
@@ -523,6 +490,8 @@ def track_purchase():
     - event_id: Unique event ID for deduplication
     - test_event_code: Test event code for testing
     """
+    rate_limit_guest("track_purchase", limit=120)
+
     # Get parameters
     value = frappe.form_dict.get("value")
     currency = frappe.form_dict.get("currency")
@@ -636,6 +605,8 @@ def track_initiate_checkout():
     - event_id: Unique event ID for deduplication
     - test_event_code: Test event code for testing
     """
+    rate_limit_guest("track_initiate_checkout", limit=120)
+
     # Get parameters
     value = frappe.form_dict.get("value")
     currency = frappe.form_dict.get("currency")
@@ -727,6 +698,8 @@ def track_add_payment_info():
     - event_id: Unique event ID for deduplication
     - test_event_code: Test event code for testing
     """
+    rate_limit_guest("track_add_payment_info", limit=120)
+
     # Get parameters
     value = frappe.form_dict.get("value")
     currency = frappe.form_dict.get("currency")
@@ -811,6 +784,8 @@ def track_add_to_wishlist():
     - event_id: Unique event ID for deduplication
     - test_event_code: Test event code for testing
     """
+    rate_limit_guest("track_add_to_wishlist", limit=120)
+
     # Get parameters
     content_id = frappe.form_dict.get("content_id")
     content_name = frappe.form_dict.get("content_name")
@@ -896,6 +871,8 @@ def track_find_location():
     - event_id: Unique event ID for deduplication
     - test_event_code: Test event code for testing
     """
+    rate_limit_guest("track_find_location", limit=120)
+
     # Get parameters
     search_string = frappe.form_dict.get("search_string")
     search_city = frappe.form_dict.get("city")
@@ -971,6 +948,8 @@ def track_custom_event():
     - event_id: Unique event ID for deduplication
     - test_event_code: Test event code for testing
     """
+    rate_limit_guest("track_custom_event", limit=120)
+
     # Get parameters
     event_name = frappe.form_dict.get("event_name")
     custom_data = frappe.form_dict.get("custom_data")
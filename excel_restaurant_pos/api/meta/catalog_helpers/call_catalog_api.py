@@ -3,6 +3,20 @@ import frappe
 
 from .get_catalog_config import get_catalog_config
 
+GRAPH_API_URL = "https://graph.facebook.com/v24.0"
+REQUEST_TIMEOUT = 60
+
+_session = None
+
+
+def get_catalog_session():
+    """Get the process wide HTTP session so its connections stay open."""
+    global _session
+
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
 
 def call_catalog_api(method="POST", data=None):
     """
@@ -15,7 +29,7 @@ def call_catalog_api(method="POST", data=None):
     catalog_token = catalog_config["catalog_token"]
 
     # build the url
-    meta_graph_url = f"https://graph.facebook.com/v24.0/{catalog_id}/items_batch"
+    meta_graph_url = f"{GRAPH_API_URL}/{catalog_id}/items_batch"
 
     # build the header
     headers = {
@@ -27,5 +41,7 @@ def call_catalog_api(method="POST", data=None):
     payload = {"requests": data, "item_type": "PRODUCT_ITEM"}
 
     # make the request
-    response = requests.request(method, meta_graph_url, headers=headers, json=payload)
+    response = get_catalog_session().request(
+        method, meta_graph_url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT
+    )
     return response.json()
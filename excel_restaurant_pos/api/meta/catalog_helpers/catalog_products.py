@@ -1,4 +1,16 @@
+import frappe
+from frappe.utils.background_jobs import get_redis_conn
+
 from .call_products_api import call_products_api
+from .call_catalog_api import GRAPH_API_URL, REQUEST_TIMEOUT, get_catalog_session
+from .get_catalog_config import get_catalog_config
+
+PAGE_SIZE = 500
+
+
+def catalog_ids_key():
+    return f"{frappe.local.site}:meta_catalog:product_ids"
+
 
 def get_catalog_product_by_retailer_id(retailer_id: str):
     """
@@ -12,4 +24,80 @@ def get_catalog_product_by_retailer_id(retailer_id: str):
     response = call_products_api(method="GET", filter=filter)
 
     # return the response
-    return response.get("data", [])[0]
\ No newline at end of file
+    return response.get("data", [])[0]
+
+
+def refresh_catalog_product_ids():
+    """
+    Load the retailer_id -> catalog product id map of the whole catalog
+    (one paged products listing) and store it in Redis.
+    Returns:
+        dict: retailer_id -> catalog product id
+    """
+    catalog_config = get_catalog_config()
+    url = f"{GRAPH_API_URL}/{catalog_config['catalog_id']}/products"
+    params = {"fields": "id,retailer_id", "limit": PAGE_SIZE}
+    headers = {"Authorization": f"Bearer {catalog_config['catalog_token']}"}
+
+    product_ids = {}
+    while url:
+        response = get_catalog_session().get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
+        result = response.json()
+        if "error" in result:
+            frappe.throw(f"Failed to list catalog products: {result['error'].get('message')}")
+
+        for product in result.get("data", []):
+            if product.get("retailer_id"):
+                product_ids[product["retailer_id"]] = product["id"]
+
+        # the next page url carries the query parameters
+        url, params = (result.get("paging") or {}).get("next"), None
+
+    conn = get_redis_conn()
+    pipe = conn.pipeline()
+    pipe.delete(catalog_ids_key())
+    if product_ids:
+        pipe.hset(catalog_ids_key(), mapping=product_ids)
+    pipe.execute()
+    return product_ids
+
+
+def get_catalog_product_ids(retailer_ids, refresh_missing=True):
+    """
+    Get the catalog product ids of retailer ids from the local map.
+    The map is reloaded once when one of them is missing.
+    Returns:
+        dict: retailer_id -> catalog product id, unknown ids are left out
+    """
+    retailer_ids = list(retailer_ids)
+    if not retailer_ids:
+        return {}
+
+    values = get_redis_conn().hmget(catalog_ids_key(), retailer_ids)
+    product_ids = {
+        retailer_id: frappe.safe_decode(value)
+        for retailer_id, value in zip(retailer_ids, values)
+        if value
+    }
+
+    if refresh_missing and len(product_ids) < len(retailer_ids):
+        catalog = refresh_catalog_product_ids()
+        product_ids = {
+            retailer_id: catalog[retailer_id]
+            for retailer_id in retailer_ids
+            if retailer_id in catalog
+        }
+
+    return product_ids
+
+
+def get_catalog_product_id(retailer_id: str):
+    """Get the catalog product id of one retailer id, None if not in the catalog."""
+    return get_catalog_product_ids([retailer_id]).get(retailer_id)
+
+
+def forget_catalog_product_ids(retailer_ids):
+    """Drop retailer ids from the local map, e.g. after a delete."""
+    retailer_ids = list(retailer_ids)
+    if retailer_ids:
+        get_redis_conn().hdel(catalog_ids_key(), *retailer_ids)
@@ -0,0 +1,269 @@
+"""
+Batched Meta catalog sync.
+
+Item saves and deletes (and Item Price changes) only record the item code in a
+Redis hash of pending changes, the last change of an item wins. A flush job is
+scheduled DEBOUNCE_SECONDS after the first change, so a bulk edit of hundreds
+of items ends up in a few `items_batch` requests instead of one job and two
+Graph calls per item.
+
+The flush prepares all pending items with two queries, resolves catalog
+product ids from a local retailer_id -> id map (reloaded with one paged
+products listing when an id is missing) and sends up to GRAPH_BATCH_LIMIT
+requests per call. Items whose prepared payload hash did not change since
+the last successful sync are skipped.
+
+`reconcile_catalog` runs the same diff over every Item.
+"""
+
+import hashlib
+import json
+
+import frappe
+from frappe.utils.background_jobs import get_redis_conn
+
+from excel_restaurant_pos.utils.delayed_jobs import schedule_job
+
+from .call_catalog_api import call_catalog_api
+from .catalog_products import (
+    forget_catalog_product_ids,
+    get_catalog_product_ids,
+    refresh_catalog_product_ids,
+)
+from .prepare_item import prepare_items
+
+DEBOUNCE_SECONDS = 60
+# items_batch accepts up to 5000 requests per call
+GRAPH_BATCH_LIMIT = 5000
+FLUSH_JOB_ID = "meta_catalog_sync_flush"
+
+UPSERT = "UPSERT"
+DELETE = "DELETE"
+
+
+def pending_key():
+    return f"{frappe.local.site}:meta_catalog:pending"
+
+
+def payload_hashes_key():
+    return f"{frappe.local.site}:meta_catalog:payload_hashes"
+
+
+def payload_hash(catalog_item):
+    return hashlib.sha1(json.dumps(catalog_item, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def queue_catalog_sync(item_code, action=UPSERT):
+    """
+    Record a catalog change of an item and schedule the flush.
+
+    Args:
+        item_code: Item code (the catalog retailer_id)
+        action: UPSERT or DELETE
+    """
+    try:
+        get_redis_conn().hset(pending_key(), item_code, action)
+        schedule_job(flush_catalog_sync, DEBOUNCE_SECONDS, job_id=FLUSH_JOB_ID, queue="long")
+    except Exception as e:
+        frappe.log_error(f"Failed to queue catalog sync of {item_code}: {str(e)}", "Meta Catalog Sync Error")
+
+
+def queue_item_price_sync(doc, method=None):
+    """Item Price doc event: the selling price is part of the catalog item."""
+    if doc.selling and doc.item_code:
+        queue_catalog_sync(doc.item_code)
+
+
+def _take_pending(conn):
+    """Atomically take every pending change."""
+    pipe = conn.pipeline()
+    pipe.hgetall(pending_key())
+    pipe.delete(pending_key())
+    pending, _ = pipe.execute()
+    return {frappe.safe_decode(code): frappe.safe_decode(action) for code, action in pending.items()}
+
+
+def _requeue(conn, changes):
+    """Put changes back unless the item changed again in the meantime."""
+    pipe = conn.pipeline()
+    for item_code, action in changes.items():
+        pipe.hsetnx(pending_key(), item_code, action)
+    pipe.execute()
+    schedule_job(flush_catalog_sync, DEBOUNCE_SECONDS, job_id=FLUSH_JOB_ID, queue="long")
+
+
+def _build_requests(changes, force=False, refresh_missing=True):
+    """
+    Build the items_batch requests of a set of changes.
+    Returns:
+        tuple: ([(item code, request)], {item code: new payload hash, None for a delete})
+    """
+    conn = get_redis_conn()
+    upserts = [code for code, action in changes.items() if action == UPSERT]
+    deletes = [code for code, action in changes.items() if action == DELETE]
+
+    catalog_items = prepare_items(upserts)
+    # items deleted before the flush are removed from the catalog
+    deletes += [code for code in upserts if code not in catalog_items]
+
+    known_hashes = {}
+    if catalog_items and not force:
+        codes = list(catalog_items)
+        known_hashes = dict(zip(codes, conn.hmget(payload_hashes_key(), codes)))
+
+    changed = {}
+    for code, catalog_item in catalog_items.items():
+        new_hash = payload_hash(catalog_item)
+        if frappe.safe_decode(known_hashes.get(code) or "") != new_hash:
+            changed[code] = (catalog_item, new_hash)
+
+    product_ids = get_catalog_product_ids(list(changed) + deletes, refresh_missing=refresh_missing)
+
+    entries, hashes = [], {}
+    for code, (catalog_item, new_hash) in changed.items():
+        if code in product_ids:
+            catalog_item = {**catalog_item, "retailer_id": code, "id": product_ids[code]}
+            entries.append((code, {"method": "UPDATE", "data": catalog_item}))
+        else:
+            entries.append((code, {"method": "CREATE", "data": catalog_item}))
+        hashes[code] = new_hash
+
+    for code in deletes:
+        # not in the catalog, nothing to delete
+        if code in product_ids:
+            entries.append((code, {"method": "DELETE", "data": {"id": product_ids[code]}}))
+        hashes[code] = None
+
+    return entries, hashes
+
+
+def _mark_synced(conn, hashes):
+    """Store the payload hashes of delivered upserts and forget deleted items."""
+    delivered = {code: value for code, value in hashes.items() if value}
+    deleted = [code for code, value in hashes.items() if not value]
+    if delivered:
+        conn.hset(payload_hashes_key(), mapping=delivered)
+    if deleted:
+        conn.hdel(payload_hashes_key(), *deleted)
+        forget_catalog_product_ids(deleted)
+
+
+def _send(changes, force=False, refresh_missing=True):
+    """
+    Send a set of changes in items_batch calls of up to GRAPH_BATCH_LIMIT.
+    Returns:
+        dict: sent requests, unchanged items and the changes that failed
+    """
+    conn = get_redis_conn()
+    entries, hashes = _build_requests(changes, force=force, refresh_missing=refresh_missing)
+
+    # deletes of items that are not in the catalog are done already
+    requested = {code for code, _request in entries}
+    _mark_synced(conn, {code: value for code, value in hashes.items() if code not in requested})
+
+    sent, failed = 0, {}
+    for start in range(0, len(entries), GRAPH_BATCH_LIMIT):
+        chunk = entries[start:start + GRAPH_BATCH_LIMIT]
+        try:
+            response = call_catalog_api(method="POST", data=[request for _code, request in chunk])
+            if "error" in response:
+                raise Exception(response["error"].get("message") or response["error"])
+        except Exception as e:
+            frappe.log_error(f"Catalog batch of {len(chunk)} requests failed: {str(e)}", "Meta Catalog Sync Error")
+            failed.update({code: UPSERT if hashes[code] else DELETE for code, _request in chunk})
+            continue
+
+        if response.get("validation_status"):
+            frappe.log_error(
+                f"Catalog batch validation: {json.dumps(response['validation_status'])[:5000]}",
+                "Meta Catalog Sync Validation",
+            )
+
+        sent += len(chunk)
+        # the ids of created items are only known once Meta processed them,
+        # the local map reloads when one is missing
+        _mark_synced(conn, {code: hashes[code] for code, _request in chunk})
+
+    return {
+        "requests_sent": sent,
+        "unchanged": len(changes) - len(hashes),
+        "failed": failed,
+    }
+
+
+def flush_catalog_sync():
+    """
+    Send every pending catalog change. Scheduled by queue_catalog_sync.
+    """
+    conn = get_redis_conn()
+    changes = _take_pending(conn)
+    if not changes:
+        return
+
+    try:
+        result = _send(changes)
+    except Exception as e:
+        frappe.log_error(f"Catalog sync failed: {str(e)}", "Meta Catalog Sync Error")
+        _requeue(conn, changes)
+        return
+
+    if result["failed"]:
+        _requeue(conn, result["failed"])
+
+    frappe.logger().info(
+        f"Meta catalog sync: {len(changes)} changes, {result['requests_sent']} requests sent, "
+        f"{result['unchanged']} unchanged, {len(result['failed'])} failed"
+    )
+
+
+def reconcile_catalog(force=False, delete_missing=False):
+    """
+    Diff every Item against the last synced payloads and send the changes.
+
+    Run with:
+        bench --site <site> execute excel_restaurant_pos.api.meta.catalog_helpers.catalog_sync.reconcile_catalog
+
+    Args:
+        force: Send every item, also the unchanged ones
+        delete_missing: Delete catalog products whose retailer_id is no Item
+
+    Returns:
+        dict: totals of the run
+    """
+    force, delete_missing = frappe.utils.cint(force), frappe.utils.cint(delete_missing)
+    catalog = refresh_catalog_product_ids()
+    item_codes = frappe.get_all("Item", pluck="name")
+
+    totals = {"items": len(item_codes), "requests_sent": 0, "unchanged": 0, "failed": 0}
+    changes = {code: UPSERT for code in item_codes}
+    if delete_missing:
+        existing = set(item_codes)
+        changes.update({code: DELETE for code in catalog if code not in existing})
+
+    codes = list(changes)
+    for start in range(0, len(codes), GRAPH_BATCH_LIMIT):
+        chunk = {code: changes[code] for code in codes[start:start + GRAPH_BATCH_LIMIT]}
+        # the map was loaded above, missing items are new ones
+        result = _send(chunk, force=force, refresh_missing=False)
+        totals["requests_sent"] += result["requests_sent"]
+        totals["unchanged"] += result["unchanged"]
+        totals["failed"] += len(result["failed"])
+
+    frappe.logger().info(f"Meta catalog reconcile: {totals}")
+    return totals
+
+
+@frappe.whitelist()
+def reconcile_catalog_api(force=0, delete_missing=0):
+    """Start a full catalog reconcile in the background."""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        reconcile_catalog,
+        queue="long",
+        timeout=3600,
+        job_id="meta_catalog_reconcile",
+        deduplicate=True,
+        force=force,
+        delete_missing=delete_missing,
+    )
+    return {"queued": True}
@@ -1,15 +1,16 @@
 import frappe
 
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
+
 
 def get_catalog_config():
     """
     Get the catalog id and token for the current user
     """
 
-    catalog_id = frappe.db.get_single_value("ArcPOS Settings", "catalog_id")
-    catalog_token = frappe.db.get_single_value(
-        "ArcPOS Settings", "catalog_access_token"
-    )
+    settings = arcpos_settings()
+    catalog_id = settings.catalog_id
+    catalog_token = settings.catalog_access_token
 
     if not catalog_id or not catalog_token:
         frappe.log_error("No catalog id or access token found in ArcPOS Settings")
@@ -1,29 +1,8 @@
 import frappe
 
 
-def prepare_item(item_code: str):
-    """
-    Prepare the item for the catalog API
-    """
-
-    # get the item
-    item = frappe.get_doc("Item", item_code)
-    if not item:
-        frappe.throw(f"Item {item_code} not found")
-
-    # prepare item as like meta catalog item
-    selling_prices = frappe.get_all(
-        "Item Price",
-        filters={"item_code": item_code, "selling": 1},
-        fields=["price_list", "price_list_rate"],
-    )
-
-    # price map
-    price_map = {
-        price["price_list"]: f"{price['price_list_rate']} CAD"
-        for price in selling_prices
-    }
-
+def _build_catalog_item(item, price_map):
+    """Build the Meta catalog item of an Item row and its selling price map."""
     # catalog item
     description = (
         frappe.utils.strip_html(item.description or "") if item.description else ""
@@ -32,9 +11,9 @@ def prepare_item(item_code: str):
 
     # Get standard selling price or default to 0 if not set
     standard_price = price_map.get("Standard Selling", "0 CAD")
-    
+
     catalog_item = {
-        "id": item_code,
+        "id": item.name,
         "title": item.item_name,
         "description": description,
         "image": [{"url": img_url}],
@@ -50,3 +29,49 @@ def prepare_item(item_code: str):
         catalog_item["sale_price"] = price_map["Offer Price"]
 
     return catalog_item
+
+
+def prepare_item(item_code: str):
+    """
+    Prepare the item for the catalog API
+    """
+    items = prepare_items([item_code])
+    if item_code not in items:
+        frappe.throw(f"Item {item_code} not found")
+
+    return items[item_code]
+
+
+def prepare_items(item_codes: list[str]):
+    """
+    Prepare several items for the catalog API with two queries
+    Returns:
+        dict: item code -> catalog item, missing items are left out
+    """
+    if not item_codes:
+        return {}
+
+    items = frappe.get_all(
+        "Item",
+        filters={"name": ["in", list(item_codes)]},
+        fields=["name", "item_name", "description", "image"],
+    )
+
+    # prepare item as like meta catalog item
+    selling_prices = frappe.get_all(
+        "Item Price",
+        filters={"item_code": ["in", list(item_codes)], "selling": 1},
+        fields=["item_code", "price_list", "price_list_rate"],
+    )
+
+    # price map per item
+    price_maps = {}
+    for price in selling_prices:
+        price_maps.setdefault(price["item_code"], {})[price["price_list"]] = (
+            f"{price['price_list_rate']} CAD"
+        )
+
+    return {
+        item.name: _build_catalog_item(item, price_maps.get(item.name, {}))
+        for item in items
+    }
@@ -2,7 +2,7 @@ import frappe
 
 from .prepare_item import prepare_item
 from .call_catalog_api import call_catalog_api
-from .catalog_products import get_catalog_product_by_retailer_id
+from .catalog_products import get_catalog_product_id
 
 
 def update_catalog_item(item_code: str):
@@ -12,13 +12,15 @@ def update_catalog_item(item_code: str):
     # prepare the item
     item = prepare_item(item_code)
 
-    # get the catalog product by retailer id
-    catalog_product = get_catalog_product_by_retailer_id(item_code)
-    frappe.logger().info(f"Catalog Product: {catalog_product}")
+    # get the catalog product id from the local retailer id map
+    catalog_product_id = get_catalog_product_id(item_code)
+    frappe.logger().info(f"Catalog Product: {catalog_product_id}")
+    if not catalog_product_id:
+        frappe.throw(f"Item {item_code} is not in the catalog")
 
     # update the item with the catalog product id
     item["retailer_id"] = item.get("id")
-    item["id"] = catalog_product["id"]
+    item["id"] = catalog_product_id
 
     # prepare the payload
     payload = [{"method": "UPDATE", "data": item}]
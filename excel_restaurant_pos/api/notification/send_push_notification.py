@@ -1,11 +1,14 @@
 import frappe
 from frappe import _
 
+from excel_restaurant_pos.shared.push_notification import get_push_tokens, queue_push
+
 
 @frappe.whitelist()
 def send_push_notification():
     """
     Send push notifications to users based on their roles using Expo Push Notifications
+    The pushes are queued on the push outbox and delivered by the push worker.
     Also saves the notification to system notification log for all users
 
     Required parameters:
@@ -21,19 +24,6 @@ def send_push_notification():
     - document_type: Related document type (for system notification)
     - document_name: Related document name (for system notification)
     """
-    try:
-        from exponent_server_sdk import (
-            DeviceNotRegisteredError,
-            PushClient,
-            PushMessage,
-            PushServerError,
-            PushTicketError,
-        )
-    except ImportError:
-        frappe.throw(
-            "Expo Server SDK not installed. Please install using: pip install exponent_server_sdk"
-        )
-
     current_user = frappe.session.user
 
     if not current_user:
@@ -77,10 +67,11 @@ def send_push_notification():
     # Find all users with the specified roles
     users = frappe.db.sql(
         """
-        SELECT DISTINCT user
+        SELECT DISTINCT parent as user
         FROM `tabHas Role`
         WHERE role IN %(roles)s
-        AND user NOT IN ('Administrator', 'Guest')
+        AND parenttype = 'User'
+        AND parent NOT IN ('Administrator', 'Guest')
         """,
         {"roles": roles},
         as_dict=True
@@ -92,98 +83,26 @@ def send_push_notification():
     user_emails = [user.user for user in users]
 
     # Get Expo tokens for the users from ArcPOS Notification Token
-    tokens = frappe.get_all(
-        "ArcPOS Notification Token",
-        filters={"user": ["in", user_emails]},
-        fields=["user", "token"]
-    )
+    tokens = get_push_tokens(user_emails)
 
     if not tokens:
         frappe.throw("No Expo tokens found for users with the specified roles")
 
-    # Prepare push notification messages
-    push_messages = []
-    token_to_user_map = {}
-
-    for token_doc in tokens:
-        if token_doc.token:
-            # Validate Expo push token format
-            if not PushClient.is_exponent_push_token(token_doc.token):
-                frappe.log_error(
-                    f"Invalid Expo token for user {token_doc.user}: {token_doc.token}",
-                    "Invalid Expo Token"
-                )
-                continue
-
-            # Create push message
-            push_message = PushMessage(
-                to=token_doc.token,
-                title=title,
-                body=body,
-                data=data or {},
-                sound=sound,
-                priority=priority
-            )
-
-            if badge:
-                push_message.badge = int(badge)
-
-            push_messages.append(push_message)
-            token_to_user_map[token_doc.token] = token_doc.user
+    # Queue push notifications, the push worker sends them in batches
+    queued_count = queue_push(
+        tokens,
+        title,
+        body,
+        data=data,
+        sound=sound,
+        priority=priority,
+        badge=int(badge) if badge else None,
+        source="send_push_notification",
+    )
 
-    if not push_messages:
+    if not queued_count:
         frappe.throw("No valid Expo tokens found for the specified users")
 
-    # Send push notifications
-    push_client = PushClient()
-    sent_count = 0
-    failed_notifications = []
-    invalid_tokens = []
-
-    try:
-        # Send notifications in chunks (Expo recommends max 100 per request)
-        chunk_size = 100
-        for i in range(0, len(push_messages), chunk_size):
-            chunk = push_messages[i:i + chunk_size]
-
-            try:
-                responses = push_client.publish_multiple(chunk)
-
-                # Process responses
-                for response, message in zip(responses, chunk):
-                    try:
-                        response.validate_response()
-                        sent_count += 1
-                    except DeviceNotRegisteredError:
-                        # Token is no longer valid, mark for removal
-                        invalid_tokens.append({
-                            "user": token_to_user_map.get(message.to),
-                            "token": message.to,
-                            "reason": "Device not registered"
-                        })
-                    except PushTicketError as exc:
-                        failed_notifications.append({
-                            "user": token_to_user_map.get(message.to),
-                            "token": message.to,
-                            "reason": exc.message
-                        })
-            except PushServerError as exc:
-                frappe.log_error(
-                    f"Push server error: {str(exc)}",
-                    "Expo Push Notification Error"
-                )
-                failed_notifications.append({
-                    "chunk": i // chunk_size + 1,
-                    "reason": str(exc)
-                })
-
-    except Exception as exc:
-        frappe.log_error(
-            f"Error sending push notifications: {str(exc)}",
-            "Expo Push Notification Error"
-        )
-        frappe.throw(f"Error sending push notifications: {str(exc)}")
-
     # Save system notifications for all users
     notification_names = []
     for user_email in user_emails:
@@ -207,22 +126,20 @@ def send_push_notification():
                 "System Notification Error"
             )
 
-    # Clean up invalid tokens (optional - uncomment if you want to auto-remove)
-    # for invalid in invalid_tokens:
-    #     if invalid.get("user"):
-    #         frappe.db.delete("ArcPOS Notification Token", {"user": invalid["user"]})
-
+    # delivery happens in the push worker: sent_count counts queued messages,
+    # failures and unregistered devices are logged and pruned by the worker
     return {
         "success": True,
-        "message": f"Push notifications sent to {sent_count} out of {len(push_messages)} devices",
+        "message": f"Push notifications queued for {queued_count} out of {len(tokens)} devices",
         "total_users": len(user_emails),
         "total_tokens": len(tokens),
-        "valid_tokens": len(push_messages),
-        "sent_count": sent_count,
-        "failed_count": len(failed_notifications),
-        "invalid_tokens_count": len(invalid_tokens),
-        "failed_notifications": failed_notifications,
-        "invalid_tokens": invalid_tokens,
+        "valid_tokens": queued_count,
+        "queued_count": queued_count,
+        "sent_count": queued_count,
+        "failed_count": 0,
+        "invalid_tokens_count": 0,
+        "failed_notifications": [],
+        "invalid_tokens": [],
         "system_notifications_created": len(notification_names),
         "notification_names": notification_names
     }
@@ -3,9 +3,52 @@ Helper function to check receipt status from payment gateway.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+
 import frappe
 from .get_payment_config import get_payment_config
 
+RECEIPT_TIMEOUT = 30
+POOL_SIZE = 8
+
+_session = None
+
+
+def get_receipt_session():
+    """Get the process wide gateway session so its connections stay open."""
+    global _session
+
+    if _session is None:
+        _session = requests.Session()
+        _session.mount("https://", HTTPAdapter(pool_maxsize=POOL_SIZE))
+        _session.mount("http://", HTTPAdapter(pool_maxsize=POOL_SIZE))
+    return _session
+
+
+def post_receipt_request(ticket, payment_config, timeout=RECEIPT_TIMEOUT):
+    """
+    Send the receipt request of a ticket to the payment gateway.
+
+    Does not touch frappe.local, so it can run in worker threads.
+
+    Args:
+        ticket: The payment ticket string
+        payment_config: Payment config from get_payment_config
+        timeout: Request timeout in seconds
+
+    Returns:
+        requests.Response: Gateway response
+    """
+    payload = {
+        "store_id": payment_config.get("store_id"),
+        "api_token": payment_config.get("api_token"),
+        "checkout_id": payment_config.get("checkout_id"),
+        "ticket": ticket,
+        "environment": payment_config.get("environment"),
+        "action": "receipt",
+    }
+    return get_receipt_session().post(payment_config["ticket_url"], json=payload, timeout=timeout)
+
 
 def check_receipt(ticket: str) -> bool:
     """
@@ -30,19 +73,9 @@ def check_receipt(ticket: str) -> bool:
 
     payment_config = get_payment_config()
 
-    # Prepare payload
-    payload = {
-        "store_id": payment_config.get("store_id"),
-        "api_token": payment_config.get("api_token"),
-        "checkout_id": payment_config.get("checkout_id"),
-        "ticket": ticket,
-        "environment": payment_config.get("environment"),
-        "action": "receipt",
-    }
-
     # Send request to payment gateway
     try:
-        response = requests.post(payment_config["ticket_url"], json=payload, timeout=30)
+        response = post_receipt_request(ticket, payment_config)
     except requests.exceptions.RequestException as e:
         frappe.log_error(
             f"Receipt status check request failed: {str(e)}", "Receipt Status Error"
@@ -2,26 +2,26 @@ import frappe
 from frappe import _
 from frappe.utils import flt, now_datetime
 
+from excel_restaurant_pos.shared.cash_position import get_cash_position, get_default_cash_account
+
+
+@frappe.whitelist()
+def get_expected_cash(counter_name=None):
+    """
+    Get the cash expected in the company cash account.
+    Args:
+        counter_name: Also return the cash posted through this counter
+    Returns:
+        dict: expected_cash (and counter_expected_cash)
+    """
+    cash_account = get_default_cash_account()
 
-@frappe.whitelist(allow_guest=True)
-def get_expected_cash():
-    company = frappe.db.get_single_value("ArcPOS Settings", "company")
-    if not company:
-        frappe.throw("Default Company is not set in ArcPOS Settings")
-
-    default_cash_account = frappe.db.get_value("Company", company, "default_cash_account")
-    if not default_cash_account:
-        frappe.throw(f"Default Cash Account is not set for Company {company}")
-
-    expected_cash = frappe.db.sql("""
-        SELECT COALESCE(SUM(debit - credit), 0) AS expected_cash
-        FROM `tabGL Entry`
-        WHERE is_cancelled = 0
-        AND account = %s
-    """, (default_cash_account,), as_dict=True)
     result = {
-      "expected_cash" : expected_cash[0].expected_cash
+      "expected_cash" : get_cash_position(cash_account)
     }
+    if counter_name:
+        result["counter_name"] = counter_name
+        result["counter_expected_cash"] = get_cash_position(cash_account, counter_name)
 
     return result
 
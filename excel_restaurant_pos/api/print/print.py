@@ -1,5 +1,7 @@
 import frappe
 from frappe import _
+
+from excel_restaurant_pos.shared.arcpos_settings import restaurant_settings
 @frappe.whitelist()
 def get_sales_invoice_print_url(sales_invoice_name):
     """
@@ -66,8 +68,7 @@ def get_table_order_print_url(table_order_name):
         
 @frappe.whitelist()
 def get_print_format_sales_invoice():
-    restaurant_settings = frappe.get_doc("Restaurant Settings")
-    sales_invoice_print_format = restaurant_settings.print_format_for_order
+    sales_invoice_print_format = restaurant_settings().print_format_for_order
     if not sales_invoice_print_format:
         sales_invoice_print_format = "Standard"
     return sales_invoice_print_format
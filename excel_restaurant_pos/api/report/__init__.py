@@ -1,11 +1,21 @@
 from .get_sales_summery import get_sales_summery
 from .get_item_sales_summery import get_item_sales_summery
 from .get_sales_by_service_type import get_sales_by_service_type
+from .payment_overview import get_payment_overview
+from .export_report import export_report
 
-__all__ = ["get_sales_summery", "get_item_sales_summery", "get_sales_by_service_type"]
+__all__ = [
+    "get_sales_summery",
+    "get_item_sales_summery",
+    "get_sales_by_service_type",
+    "get_payment_overview",
+    "export_report",
+]
 
 report_api_routes = {
     "api.reports.get_sales_summery": "excel_restaurant_pos.api.report.get_sales_summery.get_sales_summery",
     "api.reports.get_item_sales_summery": "excel_restaurant_pos.api.report.get_item_sales_summery.get_item_sales_summery",
     "api.reports.sales_by_service": "excel_restaurant_pos.api.report.get_sales_by_service_type.get_sales_by_service_type",
+    "api.reports.payment_overview": "excel_restaurant_pos.api.report.payment_overview.get_payment_overview",
+    "api.reports.export": "excel_restaurant_pos.api.report.export_report.export_report",
 }
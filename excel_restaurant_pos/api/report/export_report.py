@@ -0,0 +1,32 @@
+import frappe
+
+from .get_item_sales_summery import get_item_sales_export_query
+from .report_engine import stream_report
+
+# report name -> builder returning (query, values) from the request arguments
+EXPORTABLE_REPORTS = {
+    "item_sales_summery": get_item_sales_export_query,
+}
+
+
+@frappe.whitelist()
+def export_report(report=None, format="csv"):
+    """
+    Stream all rows of a report as CSV or NDJSON.
+
+    Args:
+        report: Report name (e.g. item_sales_summery)
+        format: csv or ndjson
+        Other request arguments are the filters of the report.
+    """
+    build_query = EXPORTABLE_REPORTS.get(report)
+    if not build_query:
+        frappe.throw(
+            frappe._("Invalid report: {0}. Allowed reports: {1}").format(
+                report, ", ".join(EXPORTABLE_REPORTS)
+            ),
+            frappe.ValidationError,
+        )
+
+    query, values = build_query(frappe.form_dict or {})
+    return stream_report(report, query, values, fmt=(format or "csv").lower())
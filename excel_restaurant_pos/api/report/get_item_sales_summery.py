@@ -5,6 +5,7 @@ from .report_helper import (
     validate_required_yyyy_mm_dd,
     validate_start_end_date,
 )
+from .report_engine import run_report
 
 
 def parse_order_by(order_by_value, default_order_by="amount DESC"):
@@ -79,6 +80,73 @@ def parse_order_by(order_by_value, default_order_by="amount DESC"):
     
     return ", ".join(order_clauses)
 
+def build_item_sales_filters(data):
+    """
+    Validate the request arguments and build the WHERE clause of the
+    item sales queries.
+    Returns:
+        tuple: (where_sql, values, start_date, end_date)
+    """
+    start_date = data.get("start_date") or data.get("from_date")
+    end_date = data.get("end_date") or data.get("to_date")
+    start_date = validate_required_yyyy_mm_dd("Start Date", start_date)
+    end_date = validate_required_yyyy_mm_dd("End Date", end_date)
+    validate_start_end_date(start_date, end_date)
+
+    item_group = normalize_optional_string(data.get("item_group"))
+    item_name = normalize_optional_string(data.get("item_name"))
+
+    where_clauses = [
+        "TSII.`docstatus` = 1",
+        "TI.`docstatus` = 1",
+        "TI.`posting_date` >= %(start_date)s",
+        "TI.`posting_date` <= %(end_date)s",
+    ]
+
+    values = {
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+
+    if item_group:
+        where_clauses.append("TSII.`item_group` = %(item_group)s")
+        values["item_group"] = item_group
+
+    if item_name:
+        # partial match search
+        where_clauses.append("TSII.`item_name` LIKE %(item_name)s")
+        values["item_name"] = f"%{item_name}%"
+
+    return " AND ".join(where_clauses), values, start_date, end_date
+
+
+def build_item_sales_rows_query(where_sql, order_by):
+    """Grouped item rows of the item sales summary."""
+    return f"""
+        SELECT
+            TSII.`item_name`,
+            TSII.`item_group`,
+            SUM(COALESCE(TSII.`qty`, 0)) AS `sold_qty`,
+            SUM(COALESCE(TSII.`amount`, 0)) AS `amount`
+        FROM `tabSales Invoice Item` TSII
+        INNER JOIN `tabSales Invoice` TI ON TSII.`parent` = TI.`name`
+        WHERE {where_sql}
+        GROUP BY TSII.`item_name`, TSII.`item_group`
+        ORDER BY {order_by}
+    """
+
+
+def get_item_sales_export_query(data):
+    """
+    Query of all item rows for the streamed export.
+    Returns:
+        tuple: (query, values)
+    """
+    where_sql, values, _, _ = build_item_sales_filters(data)
+    order_by = parse_order_by(data.get("order_by"), default_order_by="SUM(COALESCE(TSII.`amount`, 0)) DESC")
+    return build_item_sales_rows_query(where_sql, order_by), values
+
+
 @frappe.whitelist()
 def get_item_sales_summery():
     """
@@ -97,15 +165,8 @@ def get_item_sales_summery():
     """
     data = frappe.form_dict or {}
 
-    start_date = data.get("start_date") or data.get("from_date")
-    end_date = data.get("end_date") or data.get("to_date")
-    start_date = validate_required_yyyy_mm_dd("Start Date", start_date)
-    end_date = validate_required_yyyy_mm_dd("End Date", end_date)
-    validate_start_end_date(start_date, end_date)
+    where_sql, values, start_date, end_date = build_item_sales_filters(data)
 
-    item_group = normalize_optional_string(data.get("item_group"))
-    item_name = normalize_optional_string(data.get("item_name"))
-    
     # Parse and validate order_by
     order_by = parse_order_by(data.get("order_by"), default_order_by="SUM(COALESCE(TSII.`amount`, 0)) DESC")
 
@@ -124,32 +185,9 @@ def get_item_sales_summery():
     # Guardrail against accidental huge payloads
     limit_page_length = min(limit_page_length, 500)
 
-    where_clauses = [
-        "TSII.`docstatus` = 1",
-        "TI.`docstatus` = 1",
-        "TI.`posting_date` >= %(start_date)s",
-        "TI.`posting_date` <= %(end_date)s",
-    ]
-
-    values = {
-        "start_date": start_date,
-        "end_date": end_date,
-        "limit_start": limit_start,
-        "limit_page_length": limit_page_length,
-    }
+    values.update({"limit_start": limit_start, "limit_page_length": limit_page_length})
 
-    if item_group:
-        where_clauses.append("TSII.`item_group` = %(item_group)s")
-        values["item_group"] = item_group
-
-    if item_name:
-        # partial match search
-        where_clauses.append("TSII.`item_name` LIKE %(item_name)s")
-        values["item_name"] = f"%{item_name}%"
-
-    where_sql = " AND ".join(where_clauses)
-
-    try:
+    def compute():
         # Total number of grouped rows (for pagination)
         total = frappe.db.sql(
             f"""
@@ -180,19 +218,8 @@ def get_item_sales_summery():
         )[0]
 
         rows = frappe.db.sql(
-            f"""
-            SELECT
-                TSII.`item_name`,
-                TSII.`item_group`,
-                SUM(COALESCE(TSII.`qty`, 0)) AS `sold_qty`,
-                SUM(COALESCE(TSII.`amount`, 0)) AS `amount`
-            FROM `tabSales Invoice Item` TSII
-            INNER JOIN `tabSales Invoice` TI ON TSII.`parent` = TI.`name`
-            WHERE {where_sql}
-            GROUP BY TSII.`item_name`, TSII.`item_group`
-            ORDER BY {order_by}
-            LIMIT %(limit_start)s, %(limit_page_length)s
-            """,
+            build_item_sales_rows_query(where_sql, order_by)
+            + " LIMIT %(limit_start)s, %(limit_page_length)s",
             values=values,
             as_dict=True,
         )
@@ -205,6 +232,15 @@ def get_item_sales_summery():
             "limit_start": limit_start,
             "limit": limit_page_length,
         }
+
+    try:
+        return run_report(
+            "item_sales_summery",
+            {**values, "order_by": order_by},
+            compute,
+            start_date=start_date,
+            end_date=end_date,
+        )
     except Exception:
         frappe.log_error(
             title="get_item_sales_summery failed",
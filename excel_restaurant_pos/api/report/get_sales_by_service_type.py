@@ -1,22 +1,46 @@
-import pymysql.cursors
-
 import frappe
+from frappe.utils import add_days, flt
+
+from .report_engine import run_report
 
 
 @frappe.whitelist(allow_guest=True)
 def get_sales_by_service_type(from_date, to_date):
-    # Use dedicated connection for procedure call to avoid PyMySQL packet sequence errors
-    conn = pymysql.connect(
-        **frappe.db.get_connection_settings(),
-        cursorclass=pymysql.cursors.DictCursor,
+    """
+    Get net sales per service type (same output as the `GetNetSalesByServiceType`
+    procedure), run on the request connection.
+
+    Args:
+        from_date: First posting date (YYYY-MM-DD)
+        to_date: End posting date (YYYY-MM-DD), exclusive
+    """
+    values = {"from_date": from_date, "to_date": to_date}
+
+    def compute():
+        rows = frappe.db.sql(
+            """
+            SELECT
+                custom_service_type,
+                SUM(COALESCE(net_total, 0)) AS NetSales
+            FROM `tabSales Invoice`
+            WHERE docstatus = 1
+            AND posting_date >= %(from_date)s
+            AND posting_date < %(to_date)s
+            GROUP BY custom_service_type
+            """,
+            values=values,
+            as_dict=True,
+        )
+
+        total = sum(flt(row.NetSales) for row in rows)
+        for row in rows:
+            row["Percentage"] = flt(flt(row.NetSales) / total * 100, 2) if total else None
+        return rows
+
+    return run_report(
+        "sales_by_service_type",
+        values,
+        compute,
+        start_date=from_date,
+        end_date=add_days(to_date, -1),
     )
-    try:
-        with conn.cursor() as cursor:
-            cursor.callproc("GetNetSalesByServiceType", (from_date, to_date))
-            result = cursor.fetchall()
-            # Consume remaining result sets to avoid packet sequence corruption
-            while cursor.nextset():
-                pass
-            return result
-    finally:
-        conn.close()
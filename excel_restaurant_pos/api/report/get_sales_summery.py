@@ -4,6 +4,7 @@ from .report_helper import (
     validate_required_yyyy_mm_dd,
     validate_start_end_date,
 )
+from .report_engine import LEDGER_SOURCE, run_report
 
 
 @frappe.whitelist(allow_guest=True)
@@ -28,7 +29,7 @@ def get_sales_summery():
     end_date_for_query = add_days(end_date, 1)
     values = {"start_date": start_date, "end_date": end_date_for_query}
 
-    try:
+    def compute():
         # SQL function-style call (often returns JSON text)
         rows = frappe.db.sql(
             "SELECT `get_Sales Summary`(%(start_date)s, %(end_date)s) AS `data`",
@@ -45,6 +46,17 @@ def get_sales_summery():
             return frappe.parse_json(data)
 
         return data
+
+    try:
+        # the summary also depends on payments (amount collected)
+        return run_report(
+            "sales_summery",
+            values,
+            compute,
+            start_date=start_date,
+            end_date=end_date,
+            sources=("Sales Invoice", "Payment Entry", "Journal Entry", LEDGER_SOURCE),
+        )
     except Exception:
         frappe.log_error(
             title="get_sales_summery failed",
@@ -6,6 +6,8 @@ from .report_helper import (
     validate_start_end_date,
     normalize_optional_string,
 )
+from excel_restaurant_pos.shared.gl_balance import get_account_balances
+from .report_engine import LEDGER_SOURCE, run_report
 
 
 def format_date_ordinal(date_str: str) -> str:
@@ -37,10 +39,15 @@ def get_payment_overview(start_date=None, end_date=None, mode_of_payment=None):
     end_date = validate_required_yyyy_mm_dd("End Date", end_date)
     validate_start_end_date(start_date, end_date)
 
-    try:
+    def compute():
         # Get Mode of Payment → Account mapping from Payment Entry (docstatus = 1)
         payment_methods = get_payment_methods(mode_of_payment)
 
+        # opening balance and period totals of all accounts in one ledger pass
+        balances = get_account_balances(
+            [method.get("paid_to") for method in payment_methods], start_date, end_date
+        )
+
         report_data = []
         total_closing_balance = 0
         total_earned = 0
@@ -48,14 +55,14 @@ def get_payment_overview(start_date=None, end_date=None, mode_of_payment=None):
         for method in payment_methods:
             method_name = method.get("mode_of_payment")
             account = method.get("paid_to")
+            balance = balances.get(account) or {}
 
-            # Calculate Opening Balance (from ERP start to before start_date)
-            opening_balance = get_opening_balance(account, start_date)
+            # Opening Balance (from ERP start to before start_date)
+            opening_balance = flt(balance.get("opening_balance", 0))
 
-            # Calculate Debit and Credit for the date range
-            period_totals = get_period_totals(account, start_date, end_date)
-            debit = flt(period_totals.get("debit", 0), 2)
-            credit = flt(period_totals.get("credit", 0), 2)
+            # Debit and Credit for the date range
+            debit = flt(balance.get("debit", 0), 2)
+            credit = flt(balance.get("credit", 0), 2)
 
             # Current Balance = Opening Balance + Debit - Credit
             current_balance = flt(opening_balance + debit - credit, 2)
@@ -85,6 +92,15 @@ def get_payment_overview(start_date=None, end_date=None, mode_of_payment=None):
             "total_earned": flt(total_earned, 2),
         }
 
+    try:
+        # opening balances depend on every posting up to the end date
+        return run_report(
+            "payment_overview",
+            {"start_date": start_date, "end_date": end_date, "mode_of_payment": mode_of_payment},
+            compute,
+            end_date=end_date,
+            sources=("Sales Invoice", "Payment Entry", "Journal Entry", LEDGER_SOURCE),
+        )
     except Exception:
         frappe.log_error(
             title="get_payment_overview failed",
@@ -120,58 +136,3 @@ def get_payment_methods(mode_of_payment=None):
         {"mode_of_payment": mode_of_payment} if mode_of_payment else {},
         as_dict=True,
     )
-
-
-def get_opening_balance(account: str, start_date: str) -> float:
-    """
-    Calculate opening balance for an account.
-    Opening Balance = SUM(debit) - SUM(credit) from ERP start to before start_date.
-    Filters GL Entry by:
-    - is_cancelled = 0
-    - account (derived from Payment Entry's paid_to)
-    No voucher_type filter — captures all transactions (Payment Entry, Journal Entry, etc.)
-    """
-    result = frappe.db.sql(
-        """
-        SELECT
-            COALESCE(SUM(gl.debit), 0) - COALESCE(SUM(gl.credit), 0) AS balance
-        FROM `tabGL Entry` gl
-        WHERE gl.is_cancelled = 0
-        AND gl.account = %(account)s
-        AND gl.posting_date < %(start_date)s
-        """,
-        {"account": account, "start_date": start_date},
-        as_dict=True,
-    )
-
-    return flt(result[0].get("balance", 0) if result else 0)
-
-
-def get_period_totals(account: str, start_date: str, end_date: str) -> dict:
-    """
-    Calculate debit and credit totals for an account within date range.
-    Filters GL Entry by:
-    - is_cancelled = 0
-    - account (derived from Payment Entry's paid_to)
-    No voucher_type filter — captures all transactions (Payment Entry, Journal Entry, etc.)
-    """
-    result = frappe.db.sql(
-        """
-        SELECT
-            COALESCE(SUM(gl.debit), 0) AS debit,
-            COALESCE(SUM(gl.credit), 0) AS credit
-        FROM `tabGL Entry` gl
-        WHERE gl.is_cancelled = 0
-        AND gl.account = %(account)s
-        AND gl.posting_date >= %(start_date)s
-        AND gl.posting_date <= %(end_date)s
-        """,
-        {
-            "account": account,
-            "start_date": start_date,
-            "end_date": end_date,
-        },
-        as_dict=True,
-    )
-
-    return result[0] if result else {"debit": 0, "credit": 0}
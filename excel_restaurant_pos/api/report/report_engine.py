@@ -0,0 +1,248 @@
+"""
+Shared execution path of the report endpoints.
+
+Reports run parameterized SQL on the request connection (frappe.db) through
+`run_report`, which caches the result keyed by the report name and its
+normalized parameters. A cached result is dropped when a source document
+(e.g. a Sales Invoice) posted inside the report date range is submitted or
+cancelled, see `invalidate_report_cache`. Reports that read the ledger list
+LEDGER_SOURCE in their sources; they are also dropped when any GL Entry is
+posted inside their range, or any voucher there is cancelled, whatever its
+voucher type, see `invalidate_ledger_reports`. Ranges that include today also
+expire after a short TTL, since today keeps changing through other documents.
+
+`stream_report` sends large result sets as chunked CSV or NDJSON instead of
+building the whole list in memory.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import time
+from functools import partial
+
+import frappe
+from frappe.utils import getdate, today
+from werkzeug.wrappers import Response
+
+CACHE_PREFIX = "report_cache"
+INDEX_KEY = "report_cache:index"
+CLOSED_RANGE_TTL = 24 * 60 * 60
+OPEN_RANGE_TTL = 60
+STREAM_CHUNK_ROWS = 1000
+LEDGER_SOURCE = "GL Entry"
+STREAM_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def normalize_params(params):
+    """Drop empty values and strip strings so equal requests share a cache key."""
+    normalized = {}
+    for key, value in (params or {}).items():
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            continue
+        normalized[key] = value
+    return normalized
+
+
+def report_cache_key(report, params):
+    raw = json.dumps(normalize_params(params), sort_keys=True, default=str)
+    return f"{CACHE_PREFIX}:{report}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def run_report(report, params, compute, start_date=None, end_date=None, sources=("Sales Invoice",)):
+    """
+    Run a report through the result cache.
+
+    Args:
+        report: Report name, part of the cache key
+        params: Parameters that identify the result
+        compute: Callable that runs the report queries and returns the result
+        start_date: First posting date the result depends on; None when
+            everything before end_date matters (e.g. opening balances)
+        end_date: Last posting date the result depends on
+        sources: Doctypes whose submit / cancel inside the range invalidates the result
+
+    Returns:
+        The (possibly cached) report result
+    """
+    cache = frappe.cache()
+    key = report_cache_key(report, params)
+
+    cached = cache.get_value(key)
+    if cached is not None:
+        return cached["result"]
+
+    result = compute()
+
+    end_date = getdate(end_date or today())
+    ttl = CLOSED_RANGE_TTL if end_date < getdate(today()) else OPEN_RANGE_TTL
+    cache.set_value(key, {"result": result}, expires_in_sec=ttl)
+    cache.hset(
+        INDEX_KEY,
+        key,
+        {
+            "start_date": str(getdate(start_date)) if start_date else None,
+            "end_date": str(end_date),
+            "sources": list(sources),
+            "expires_at": time.time() + ttl,
+        },
+    )
+    return result
+
+
+def invalidate_report_cache(doc, method=None):
+    """
+    Drop the cached reports whose date range contains the document posting date.
+    Called on submit / cancel of the report source documents; the cache is
+    cleared once the transaction commits so no request re-caches old figures.
+    """
+    _add_pending_invalidation(doc.doctype, doc.get("posting_date"))
+
+
+def invalidate_ledger_reports(doc, method=None):
+    """
+    Drop the cached ledger reports covering the document posting date.
+    Called on GL Entry submit and on cancel of any document, so vouchers of
+    every type (Purchase Invoice, stock entries, ...) reach the ledger reports.
+    """
+    _add_pending_invalidation(LEDGER_SOURCE, doc.get("posting_date"))
+
+
+def _add_pending_invalidation(source, posting_date):
+    # a voucher submits many GL Entries, the index is scanned once per commit
+    if not posting_date:
+        return
+
+    pending = getattr(frappe.local, "report_cache_pending", None)
+    if pending is None:
+        pending = frappe.local.report_cache_pending = set()
+        frappe.db.after_commit.add(_drop_pending_reports)
+        frappe.db.after_rollback.add(_discard_pending_reports)
+    pending.add((source, str(getdate(posting_date))))
+
+
+def _drop_pending_reports():
+    pending = getattr(frappe.local, "report_cache_pending", None) or set()
+    frappe.local.report_cache_pending = None
+    if pending:
+        _drop_reports(pending)
+
+
+def _discard_pending_reports():
+    frappe.local.report_cache_pending = None
+
+
+def drop_cached_reports(doctype, posting_date):
+    """Delete the cached results of `doctype` sources covering the posting date."""
+    _drop_reports({(doctype, posting_date)})
+
+
+def _drop_reports(changes):
+    """
+    Delete the cached results affected by any of the changes.
+    Args:
+        changes: set of (source doctype, posting date string)
+    """
+    now = time.time()
+    cache = frappe.cache()
+
+    stale_keys = []
+    for key, entry in (cache.hgetall(INDEX_KEY) or {}).items():
+        key = frappe.safe_decode(key)
+        if entry.get("expires_at", 0) < now:
+            stale_keys.append(key)
+            continue
+        sources = entry.get("sources", [])
+        for doctype, posting_date in changes:
+            if doctype not in sources:
+                continue
+            if (entry.get("start_date") or posting_date) <= posting_date <= entry["end_date"]:
+                stale_keys.append(key)
+                break
+
+    if stale_keys:
+        cache.delete_value(stale_keys)
+        cache.hdel(INDEX_KEY, *stale_keys)
+
+
+def stream_report(report, query, values=None, fmt="csv"):
+    """
+    Stream the rows of a report query as CSV or NDJSON.
+
+    The rows are read with an unbuffered cursor after the request has
+    returned, so the generator opens its own connection for the site.
+
+    Args:
+        report: Report name, used for the file name
+        query: Parameterized SQL
+        values: Query parameters
+        fmt: "csv" or "ndjson"
+
+    Returns:
+        Response: Chunked response streaming the rows
+    """
+    if fmt not in STREAM_FORMATS:
+        frappe.throw(
+            frappe._("Invalid export format: {0}. Allowed formats: {1}").format(
+                fmt, ", ".join(STREAM_FORMATS)
+            ),
+            frappe.ValidationError,
+        )
+
+    response = Response(
+        _iter_report_rows(
+            frappe.local.site,
+            frappe.local.sites_path,
+            frappe.session.user,
+            query,
+            values or {},
+            fmt,
+        ),
+        mimetype=STREAM_FORMATS[fmt],
+        direct_passthrough=True,
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="{report}_{today()}.{fmt}"'
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def _iter_report_rows(site, sites_path, user, query, values, fmt):
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    try:
+        frappe.set_user(user)
+        buffer = io.StringIO()
+        writer = None
+        rows_in_chunk = 0
+
+        with frappe.db.unbuffered_cursor():
+            for row in frappe.db.sql(query, values, as_dict=True, as_iterator=True):
+                if fmt == "csv":
+                    if writer is None:
+                        writer = csv.DictWriter(buffer, fieldnames=list(row.keys()))
+                        writer.writeheader()
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(row, default=str))
+                    buffer.write("\n")
+
+                rows_in_chunk += 1
+                if rows_in_chunk >= STREAM_CHUNK_ROWS:
+                    yield buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+                    rows_in_chunk = 0
+
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    except Exception:
+        frappe.log_error(title="Report export failed", message=frappe.get_traceback())
+        raise
+    finally:
+        frappe.destroy()
@@ -6,6 +6,8 @@ import frappe
 from frappe import _
 import json
 
+from excel_restaurant_pos.utils import rate_limit_guest
+
 
 @frappe.whitelist(allow_guest=True)
 def create_reservation():
@@ -146,6 +148,8 @@ def get_available_slots():
     Returns:
         dict: Available time slots
     """
+    rate_limit_guest("get_available_slots", limit=60)
+
     try:
         reservation_date = frappe.form_dict.get("reservation_date")
 
@@ -5,7 +5,7 @@ import json
 import frappe
 from frappe.utils import flt, now_datetime, get_time
 from .handlers.update_sales_invoice import update_sales_invoice
-from excel_restaurant_pos.utils import iso_to_frappe_datetime
+from excel_restaurant_pos.utils import iso_to_frappe_datetime, rate_limit_guest
 
 
 # parse json fields if present
@@ -108,6 +108,13 @@ def _set_optional_fields(sales_invoice, data):
             setattr(sales_invoice, field, data.get(field))
 
 
+# set pos counter
+def _set_pos_counter(sales_invoice, data):
+    """Set the counter whose cash drawer takes the payment, staff sessions only."""
+    if frappe.session.user != "Guest" and data.get("custom_pos_counter"):
+        sales_invoice.custom_pos_counter = data.get("custom_pos_counter")
+
+
 # add items
 def _add_items(sales_invoice, items):
     """Add items to sales invoice."""
@@ -208,6 +215,10 @@ def add_or_update_invoice():
     Uses default Frappe creation method with validation
     Allows guest access by using ignore_permissions=True
     """
+    # staff tablets share the restaurant IP, only website guests are limited
+    if frappe.session.user == "Guest":
+        rate_limit_guest("add_or_update_invoice", limit=30)
+
     data = frappe.form_dict
     _parse_json_fields(data)
 
@@ -224,6 +235,7 @@ def add_or_update_invoice():
     sales_invoice = frappe.new_doc("Sales Invoice")
     _set_main_fields(sales_invoice, data)
     _set_optional_fields(sales_invoice, data)
+    _set_pos_counter(sales_invoice, data)
     _add_items(sales_invoice, items)
     _add_custom_quotes(sales_invoice, data.get("custom_quotes"))
     
@@ -15,4 +15,5 @@ settings_api_routes = {
     "api.settings.get": "excel_restaurant_pos.api.settings.get_settings",
     "api.settings.get_system": "excel_restaurant_pos.api.settings.get_system_settings",
     "api.settings.system_settings": "excel_restaurant_pos.api.settings.system_settings",
+    "api.settings.notified_roles": "excel_restaurant_pos.doc_event.sales_invoice.handlers.notification_rule_matcher.get_notified_roles",
 }
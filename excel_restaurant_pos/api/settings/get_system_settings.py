@@ -1,10 +1,12 @@
 import frappe
 
+from excel_restaurant_pos.shared.arcpos_settings import get_settings_doc
+
 
 @frappe.whitelist(allow_guest=True)
 def get_system_settings():
     """
     Get system settings
     """
-    settings = frappe.get_single("ArcPOS System Settings")
+    settings = get_settings_doc("ArcPOS System Settings")
     return settings.as_dict()
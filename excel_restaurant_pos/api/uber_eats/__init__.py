@@ -1,4 +1,14 @@
 from .uber_eats import webhook
+from .uber_eats_inbox import consume_uber_eats_inbox, get_uber_eats_inbox_status
+from .uber_eats_client import get_uber_eats_api_metrics
+from .uber_eats_reconcile import reconcile_uber_eats_orders
+from .uber_eats_invoices import sync_open_uber_invoices_api
+from .uber_eats_report import (
+    create_report,
+    get_report_results,
+    retry_report_download,
+    get_report_reconciliation,
+)
 from .uber_eats_orders import (
     get_orders,
     get_order,
@@ -19,6 +29,15 @@ from .uber_eats_store import (
 
 __all__ = [
     "webhook",
+    "consume_uber_eats_inbox",
+    "get_uber_eats_inbox_status",
+    "get_uber_eats_api_metrics",
+    "reconcile_uber_eats_orders",
+    "sync_open_uber_invoices_api",
+    "create_report",
+    "get_report_results",
+    "retry_report_download",
+    "get_report_reconciliation",
     "get_orders",
     "get_order",
     "cancel_uber_eats_order",
@@ -41,6 +60,8 @@ _base = "excel_restaurant_pos.api.uber_eats"
 uber_eats_api_routes = {
     # Webhook
     "api.uber_eats.webhook": f"{_base}.uber_eats.webhook",
+    "api.uber_eats.inbox_status": f"{_base}.uber_eats_inbox.get_uber_eats_inbox_status",
+    "api.uber_eats.api_metrics": f"{_base}.uber_eats_client.get_uber_eats_api_metrics",
     # Orders
     "api.uber_eats.orders": f"{_base}.uber_eats_orders.get_orders",
     "api.uber_eats.order": f"{_base}.uber_eats_orders.get_order",
@@ -48,10 +69,16 @@ uber_eats_api_routes = {
     "api.uber_eats.accept_order": f"{_base}.uber_eats_orders.accept_uber_eats_order",
     "api.uber_eats.deny_order": f"{_base}.uber_eats_orders.deny_uber_eats_order",
     "api.uber_eats.update_order_status": f"{_base}.uber_eats_orders.update_uber_eats_order_status",
+    "api.uber_eats.sync_open_invoices": f"{_base}.uber_eats_invoices.sync_open_uber_invoices_api",
     # Menu
     "api.uber_eats.menu": f"{_base}.uber_eats_menu.get_uber_eats_menu",
     "api.uber_eats.upload_menu": f"{_base}.uber_eats_menu.upload_menu",
     "api.uber_eats.update_item": f"{_base}.uber_eats_menu.update_item",
+    # Reports
+    "api.uber_eats.create_report": f"{_base}.uber_eats_report.create_report",
+    "api.uber_eats.report_results": f"{_base}.uber_eats_report.get_report_results",
+    "api.uber_eats.retry_report_download": f"{_base}.uber_eats_report.retry_report_download",
+    "api.uber_eats.report_reconciliation": f"{_base}.uber_eats_report.get_report_reconciliation",
     # Store
     "api.uber_eats.stores": f"{_base}.uber_eats_store.get_stores",
     "api.uber_eats.store": f"{_base}.uber_eats_store.get_store",
@@ -5,35 +5,31 @@ auto-accepts orders, and handles cancellation / store events.
 """
 
 import json
-from html import unescape
-
-import requests
 
 import frappe
-from frappe.utils import now_datetime
-from datetime import datetime as _dt, timezone as _tz
 
-from .uber_eats_api import (
-    verify_webhook_signature,
-    _api_headers,
-)
+from excel_restaurant_pos.shared.push_notification import queue_push_to_users
+from excel_restaurant_pos.shared.arcpos_settings import get_settings_doc
+
+from .uber_eats_api import verify_webhook_signature
+from .uber_eats_channel_orders import map_uber_order
+from .uber_eats_client import get_uber_client
+from .uber_eats_inbox import ORDER_NOTIFICATION_EVENTS, ingest_event
+from .uber_eats_report import save_report_event
 
 
 @frappe.whitelist(allow_guest=True)
 def webhook():
     """Receive Uber Eats webhook notifications.
 
-    Supported event types:
-    - orders.notification: New order placed
-    - orders.scheduled.notification: Scheduled order placed
-    - orders.cancel: Order cancelled by customer/Uber
-    - store.provisioned: Store linked to this app
-    - store.deprovisioned: Store unlinked from this app
+    Only verifies the signature and stores the event in the inbox, so Uber
+    gets its 200 within a few milliseconds. Duplicate deliveries of an
+    event_id (or of a new order notification for the same order) are
+    answered without being stored again. The events are processed by
+    consume_uber_eats_inbox, see _process_inbox_event.
     """
     raw_body = frappe.request.get_data()
 
-    print("\n\n order_payload: ", raw_body, "\n\n")
-
     # Verify signature
     signature = frappe.request.headers.get("X-Uber-Signature", "")
     if not verify_webhook_signature(raw_body, signature):
@@ -53,18 +49,45 @@ def webhook():
 
     event_type = data.get("event_type")
     event_id = data.get("event_id")
-    resource_href = data.get("resource_href", "")
-    print("\n\n resource_href :",resource_href, "\n\n")
+
+    if not ingest_event(raw_body, data):
+        frappe.logger().info(f"Duplicate Uber Eats webhook event {event_type} ({event_id}), skipping")
+        return {"status": "duplicate"}
 
     frappe.logger().info(f"Uber Eats webhook received: {event_type} ({event_id})")
+    return {"status": "received"}
+
+
+def _process_inbox_event(data, first_delivery=True):
+    """Process one webhook event from the inbox.
+
+    Supported event types:
+    - orders.notification: New order placed
+    - orders.scheduled.notification: Scheduled order placed
+    - orders.cancel: Order cancelled by customer/Uber
+    - store.provisioned: Store linked to this app
+    - store.deprovisioned: Store unlinked from this app
+    - eats.report.success: Report ready for download
+
+    Args:
+        data: Parsed webhook event
+        first_delivery: False when the inbox retries the event
+
+    Returns:
+        bool: True when the event is done, False to retry it later
+    """
+    event_type = data.get("event_type")
+    event_id = data.get("event_id")
+    resource_href = data.get("resource_href", "")
 
     meta = data.get("meta", {})
     order_id = meta.get("resource_id")
     store_id = meta.get("user_id")
 
-    if event_type in ("orders.notification", "orders.scheduled.notification"):
-        print("\n\n Order is Created \n\n")
-        _handle_order_notification(event_type, event_id, order_id, resource_href)
+    if event_type in ORDER_NOTIFICATION_EVENTS:
+        return _handle_order_notification(
+            event_type, event_id, order_id, resource_href, notify_staff=first_delivery
+        )
 
     elif event_type == "orders.cancel":
         _handle_order_cancel(order_id)
@@ -86,44 +109,48 @@ def webhook():
     else:
         frappe.logger().info(f"Uber Eats webhook event '{event_type}' not handled")
 
-    return {"status": "received"}
+    return True
 
 
-def _handle_order_notification(event_type, event_id, order_id, resource_href):
+def _handle_order_notification(event_type, event_id, order_id, resource_href, notify_staff=True):
     """Handle orders.notification and orders.scheduled.notification.
 
     Workflow:
-    1. Enqueue staff notifications immediately (email + push + notification log)
-    2. Enqueue order detail fetch (via resource_href) and Channel Order creation
+    1. Enqueue staff notifications immediately (push + notification log)
+    2. Fetch order details (via resource_href) and create the Channel Order
+
+    Returns:
+        bool: True when the order exists or the event cannot be processed,
+        False when creating the Channel Order failed and should be retried
     """
     if not order_id:
         frappe.log_error("Uber Eats Webhook", "Missing resource_id in webhook")
-        return
+        return True
 
     # Idempotency — skip if already processed
     if frappe.db.exists("Channel Order", {"order_id": order_id}):
         frappe.logger().info(f"Duplicate webhook event {event_id} for order {order_id}, skipping")
-        return
+        return True
 
     is_scheduled = event_type == "orders.scheduled.notification"
 
-    # Step 1: Notify staff immediately (non-blocking, short queue)
-    frappe.enqueue(
-        "excel_restaurant_pos.api.uber_eats.uber_eats._notify_staff_new_order",
-        queue="short",
-        order_id=order_id,
-        is_scheduled=is_scheduled,
-    )
+    # Step 1: Notify staff immediately (non-blocking, short queue), once per order
+    if notify_staff:
+        frappe.enqueue(
+            "excel_restaurant_pos.api.uber_eats.uber_eats._notify_staff_new_order",
+            queue="short",
+            order_id=order_id,
+            is_scheduled=is_scheduled,
+        )
 
     # Step 2: Fetch full order details and create Channel Order
-    frappe.enqueue(
-        "excel_restaurant_pos.api.uber_eats.uber_eats.process_uber_eats_order",
-        queue="default",
+    channel_order = process_uber_eats_order(
         resource_href=resource_href,
         order_id=order_id,
         event_id=event_id,
         is_scheduled=is_scheduled,
     )
+    return channel_order is not None
 
 
 def _handle_order_cancel(order_id):
@@ -132,15 +159,11 @@ def _handle_order_cancel(order_id):
         frappe.log_error("Uber Eats Webhook", "Missing resource_id in cancel event")
         return
 
-    frappe.enqueue(
-        "excel_restaurant_pos.api.uber_eats.uber_eats._process_order_cancel",
-        queue="default",
-        order_id=order_id,
-    )
+    _process_order_cancel(order_id)
 
 
 def _process_order_cancel(order_id):
-    """Background job: Mark the Channel Order as cancelled when Uber cancels."""
+    """Mark the Channel Order as cancelled when Uber cancels."""
     try:
         channel_order_name = frappe.db.get_value(
             "Channel Order",
@@ -170,37 +193,12 @@ def _process_order_cancel(order_id):
 
 
 def _handle_report_success(data):
-    """Handle eats.report.success - report is ready for download."""
-    report_type = data.get("report_type", "")
-    workflow_id = data.get("job_id", "") or data.get("workflow_id", "")
-    metadata = data.get("report_metadata", {})
-    sections = metadata.get("sections", [])
-
-    download_urls = []
-    for section in sections:
-        url = section.get("download_url", "")
-        if url:
-            download_urls.append(unescape(url))
-
+    """Handle eats.report.success - store the report and queue its download."""
+    workflow_id = save_report_event(data)
     frappe.logger().info(
-        f"Uber Eats report ready: type={report_type}, "
-        f"workflow={workflow_id}, downloads={len(download_urls)}"
+        f"Uber Eats report ready: type={data.get('report_type', '')}, workflow={workflow_id}"
     )
 
-    doc = frappe.new_doc("Comment")
-    doc.comment_type = "Info"
-    doc.reference_doctype = "ArcPOS Settings"
-    doc.reference_name = "ArcPOS Settings"
-    doc.content = json.dumps({
-        "event": "eats.report.success",
-        "report_type": report_type,
-        "workflow_id": workflow_id,
-        "download_urls": download_urls,
-        "raw": data,
-    })
-    doc.save(ignore_permissions=True)
-    frappe.db.commit()
-
 
 # ---------------------------------------------------------------------------
 # Step 1 — Notify staff immediately on webhook receipt
@@ -274,68 +272,22 @@ def _notify_staff_new_order(order_id, is_scheduled=False):
 
         frappe.db.commit()
 
-        # 3. Send Expo push notifications (if SDK available)
+        # 3. Queue Expo push notifications for the push worker
         try:
-            from exponent_server_sdk import (
-                PushClient, PushMessage, PushServerError,
-                PushTicketError, DeviceNotRegisteredError,
+            queued = queue_push_to_users(
+                user_emails,
+                title,
+                body,
+                data={
+                    "order_id": order_id,
+                    "notification_type": "new_uber_eats_order",
+                    "is_scheduled": is_scheduled,
+                },
+                source="Uber Eats",
             )
-
-            token_docs = frappe.get_all(
-                "ArcPOS Notification Token",
-                filters={"user": ["in", user_emails]},
-                fields=["name", "user"],
+            frappe.logger().info(
+                f"Expo push notifications queued for order {order_id} ({queued} token(s))"
             )
-
-            push_messages = []
-            for token_doc_ref in token_docs:
-                token_doc = frappe.get_doc("ArcPOS Notification Token", token_doc_ref.name)
-                for token_row in (token_doc.token_list or []):
-                    if token_row.token and PushClient.is_exponent_push_token(token_row.token):
-                        push_messages.append(
-                            PushMessage(
-                                to=token_row.token,
-                                title=title,
-                                body=body,
-                                data={
-                                    "order_id": order_id,
-                                    "notification_type": "new_uber_eats_order",
-                                    "is_scheduled": is_scheduled,
-                                },
-                                sound="default",
-                                priority="high",
-                            )
-                        )
-
-            if push_messages:
-                push_client = PushClient()
-                chunk_size = 100
-                for i in range(0, len(push_messages), chunk_size):
-                    chunk = push_messages[i:i + chunk_size]
-                    try:
-                        responses = push_client.publish_multiple(chunk)
-                        for response, msg in zip(responses, chunk):
-                            try:
-                                response.validate_response()
-                            except DeviceNotRegisteredError:
-                                pass
-                            except PushTicketError as exc:
-                                frappe.log_error(
-                                    f"Push ticket error for token {msg.to}: {exc}",
-                                    "Uber Eats - Push Ticket Error",
-                                )
-                    except PushServerError as exc:
-                        frappe.log_error(
-                            f"Expo push server error for order {order_id}: {exc}",
-                            "Uber Eats - Push Server Error",
-                        )
-
-                frappe.logger().info(
-                    f"Expo push notifications sent for order {order_id} ({len(push_messages)} token(s))"
-                )
-
-        except ImportError:
-            frappe.logger().info("Expo SDK not available — skipping push notifications")
         except Exception as e:
             frappe.log_error(
                 f"Error sending push notifications for order {order_id}: {e}",
@@ -365,7 +317,7 @@ def _send_new_order_email(channel_order, order_id, is_scheduled=False):
         is_scheduled: True if this is a scheduled order
     """
     try:
-        settings = frappe.get_single("ArcPOS Settings")
+        settings = get_settings_doc("ArcPOS Settings")
         roles = ["Restaurant Chef", "Restaurant Manager"]
 
         user_emails = list(set(frappe.get_all(
@@ -428,29 +380,35 @@ def _send_new_order_email(channel_order, order_id, is_scheduled=False):
 # ---------------------------------------------------------------------------
 
 def process_uber_eats_order(resource_href, order_id, event_id, is_scheduled=False):
-    """Background job: Fetch full order via resource_href, create Channel Order, accept.
+    """Fetch full order via resource_href and create the Channel Order.
 
     Args:
         resource_href: Direct URL to the order from the webhook payload
         order_id: Uber Eats order UUID
         event_id: Webhook event UUID for idempotency
         is_scheduled: True if this is a scheduled order
+
+    Returns:
+        Channel Order document, None if processing failed
     """
     try:
         # Fetch full order details using the resource_href from the webhook
         order = _fetch_order_from_href(resource_href, order_id)
 
-        print("Order Details ", order)
-
         if not isinstance(order, dict):
             frappe.log_error(
                 "Uber Eats Order Processing Error",
                 f"Order {order_id}: unexpected response type {type(order).__name__}: {str(order)[:300]}",
             )
-            return
+            return None
 
         # Create Channel Order record (state stays CREATED until staff acts)
-        channel_order = _create_channel_order(order, event_id, is_scheduled=is_scheduled)
+        try:
+            channel_order = _create_channel_order(order, event_id, is_scheduled=is_scheduled)
+        except frappe.UniqueValidationError:
+            # order_id is unique: a concurrent delivery created it first
+            frappe.db.rollback()
+            return frappe.get_doc("Channel Order", {"order_id": order_id})
 
         # Send template email now that the Channel Order doc exists (doc.name, doc.store_name etc.)
         _send_new_order_email(channel_order, order_id, is_scheduled)
@@ -458,12 +416,15 @@ def process_uber_eats_order(resource_href, order_id, event_id, is_scheduled=Fals
         frappe.logger().info(
             f"Uber Eats order {order_id} -> Channel Order {channel_order.name}"
         )
+        return channel_order
 
     except Exception as e:
+        frappe.db.rollback()
         frappe.log_error(
             "Uber Eats Order Processing Error",
             f"Order {order_id}: {e}",
         )
+        return None
 
 
 def _fetch_order_from_href(resource_href, order_id):
@@ -481,22 +442,16 @@ def _fetch_order_from_href(resource_href, order_id):
     """
     import json as _json
 
+    client = get_uber_client()
+
     # In sandbox mode the webhook payload contains production URLs (https://api.uber.com).
     # Swap to the sandbox base so the sandbox token is accepted.
-    settings = frappe.get_single("ArcPOS Settings")
-    if (settings.uber_eats_environment or "Sandbox") == "Sandbox":
+    if client.environment == "Sandbox":
         resource_href = resource_href.replace(
             "https://api.uber.com", "https://test-api.uber.com"
         )
 
-    response = requests.get(resource_href, headers=_api_headers(), timeout=30)
-
-    # frappe.log_error(
-    #     "Uber Eats Fetch Order - Debug",
-    #     f"Order: {order_id}\nURL: {resource_href}\nStatus: {response.status_code}\n"
-    #     f"Content-Type: {response.headers.get('Content-Type', '')}\nBody: {response.text[:500]}",
-    # )
-    # frappe.db.commit()  # Persist debug log immediately regardless of subsequent outcome
+    response = client.get(resource_href, "get_order_details")
 
     if response.status_code != 200:
         frappe.log_error(
@@ -521,99 +476,18 @@ def _create_channel_order(order, event_id, is_scheduled=False):
 
     Args:
         order: Full order details dict from Uber Eats API
-        event_id: Webhook event ID stored in raw_payload for reference
+        event_id: Webhook event ID stored in the compressed raw_payload
         is_scheduled: True if this is a scheduled order
 
     Returns:
         Saved Channel Order document
     """
-    import json as _json
-
-    eater = order.get("eater", {}) or {}
-    cart = order.get("cart", {}) or {}
-    items = cart.get("items", []) or []
-    payment = order.get("payment", {}) or {}
-    charges = payment.get("charges", {}) or {}
-    store = order.get("store", {}) or {}
-
-    # Payment totals — Uber uses minor currency units (cents)
-    sub_total_info = charges.get("sub_total", {}) or {}
-    total_info = charges.get("total", {}) or {}
-    subtotal = int(sub_total_info.get("amount", 0)) / 100.0
-    total = int(total_info.get("amount", 0)) / 100.0
-    currency = sub_total_info.get("currency_code", "") or total_info.get("currency_code", "")
-
-    # Special instructions from the cart
-    special_instructions = cart.get("special_instructions", "") or ""
-
-    # Phone can be a plain string or a dict {"number": "..."} depending on Uber API version
-    phone_raw = eater.get("phone", "")
-    eater_phone = phone_raw if isinstance(phone_raw, str) else (phone_raw or {}).get("number", "")
-
-    
+    values, items = map_uber_order(order, event_id=event_id, is_scheduled=is_scheduled)
 
     co = frappe.new_doc("Channel Order")
-    co.order_from = "Uber Eats"
-    co.order_id = order.get("id", "")
-    co.display_id = order.get("display_id", "")
-    co.current_state = order.get("current_state", "CREATED")
-    co.order_type = order.get("type", "")
-    # Both placed_at and estimated_ready_for_pickup_at are ISO-8601 with timezone.
-    # MySQL requires naive UTC strings "YYYY-MM-DD HH:MM:SS".
-    placed_at_raw = order.get("placed_at", "")
-    try:
-        dt = _dt.fromisoformat(placed_at_raw) if placed_at_raw else None
-        if dt and dt.tzinfo is not None:
-            dt = dt.astimezone(_tz.utc).replace(tzinfo=None)
-        co.placed_at = dt.strftime("%Y-%m-%d %H:%M:%S") if dt else now_datetime()
-    except Exception:
-        co.placed_at = now_datetime()
-
-    est_ready_raw = order.get("estimated_ready_for_pickup_at", "")
-    try:
-        dt = _dt.fromisoformat(est_ready_raw) if est_ready_raw else None
-        if dt and dt.tzinfo is not None:
-            dt = dt.astimezone(_tz.utc).replace(tzinfo=None)
-        co.estimated_ready_for_pickup_at = dt.strftime("%Y-%m-%d %H:%M:%S") if dt else None
-    except Exception:
-        co.estimated_ready_for_pickup_at = None
-    co.store_id = store.get("id", "")
-    co.store_name = store.get("name", "")
-    co.eater_first_name = eater.get("first_name", "")
-    co.eater_last_name = eater.get("last_name", "")
-    co.eater_phone = eater_phone
-    co.special_instructions = special_instructions
-    co.subtotal = subtotal
-    co.total = total
-    co.currency = currency
-    co.raw_payload = _json.dumps({"order": order, "event_id": event_id, "is_scheduled": is_scheduled})
-
-    # Add cart items
-    for uber_item in items:
-        price_info = uber_item.get("price", {}) or {}
-        unit_price_info = price_info.get("unit_price", {}) or {}
-        total_price_info = price_info.get("total_price", {}) or {}
-
-        unit_price = int(unit_price_info.get("amount", 0)) / 100.0
-        item_total = int(total_price_info.get("amount", 0)) / 100.0
-
-        modifier_parts = []
-        for mg in (uber_item.get("selected_modifier_groups") or []):
-            for mod in (mg.get("selected_items") or []):
-                mod_title = mod.get("title", "")
-                mod_qty = mod.get("quantity", 1)
-                if mod_title:
-                    modifier_parts.append(f"{mod_title} x{mod_qty}")
-
-        co.append("items", {
-            "item_id": uber_item.get("id", ""),
-            "title": uber_item.get("title", "Uber Eats Item"),
-            "quantity": uber_item.get("quantity", 1),
-            "unit_price": unit_price,
-            "total_price": item_total,
-            "modifiers": ", ".join(modifier_parts),
-            "special_instructions": uber_item.get("special_instructions", ""),
-        })
+    co.update(values)
+    for item in items:
+        co.append("items", item)
 
     co.save(ignore_permissions=True)
     frappe.db.commit()
@@ -5,34 +5,29 @@ Handles OAuth token management and API calls for:
 - Menu management (get, upsert, update item)
 - Store management (list, details, status, holiday hours)
 - Reporting (create report jobs, check status)
+
+Requests go through the pooled, retrying client in uber_eats_client.
 """
 
 import hmac
 import hashlib
-import requests
 
 import frappe
 from frappe import cache
 
-# API endpoints by environment
-ENDPOINTS = {
-    "Sandbox": {
-        "auth": "https://sandbox-login.uber.com/oauth/v2/token",
-        "api": "https://test-api.uber.com",
-    },
-    "Production": {
-        "auth": "https://auth.uber.com/oauth/v2/token",
-        "api": "https://api.uber.com",
-    },
-}
+from excel_restaurant_pos.shared.arcpos_settings import get_settings_doc
 
-CACHE_KEY = "uber_eats_access_token"
-TOKEN_TTL = 86400 * 25  # 25 days (token lasts 30 days, refresh early)
+from .uber_eats_client import (  # noqa: F401 - re-exported for existing imports
+    CACHE_KEY,
+    ENDPOINTS,
+    TOKEN_TTL,
+    get_uber_client,
+)
 
 
 def get_settings():
     """Get Uber Eats settings from ArcPOS Settings."""
-    settings = frappe.get_single("ArcPOS Settings")
+    settings = get_settings_doc("ArcPOS Settings")
     if not settings.uber_eats_enabled:
         frappe.throw("Uber Eats integration is not enabled")
     return settings
@@ -44,52 +39,18 @@ def clear_token_cache():
 
 
 def get_access_token():
-    """Get cached or fresh OAuth access token."""
-    cached = cache().get_value(CACHE_KEY)
-    if cached:
-        return cached
-
-    settings = get_settings()
-    env = settings.uber_eats_environment or "Sandbox"
-    auth_url = ENDPOINTS[env]["auth"]
-
-    response = requests.post(
-        auth_url,
-        data={
-            "client_id": settings.uber_eats_client_id,
-            "client_secret": settings.get_password("uber_eats_client_secret"),
-            "grant_type": "client_credentials",
-            "scope": "eats.store eats.order eats.store.orders.read eats.store.orders.cancel eats.store.status.write eats.report eats.store.orders.restaurantdelivery.status",
-        },
-        timeout=30,
-    )
-
-    if response.status_code != 200:
-        frappe.log_error(
-            "Uber Eats Auth Error",
-            f"Status: {response.status_code}, Body: {response.text}",
-        )
-        frappe.throw(f"Failed to get Uber Eats access token: {response.status_code} - {response.text}")
-
-    data = response.json()
-    token = data["access_token"]
-    cache().set_value(CACHE_KEY, token, expires_in_sec=TOKEN_TTL)
-    return token
+    """Get cached or fresh OAuth access token (refreshed by one worker at a time)."""
+    return get_uber_client().get_access_token()
 
 
 def _get_api_base():
     """Get the API base URL based on environment setting."""
-    settings = get_settings()
-    env = settings.uber_eats_environment or "Sandbox"
-    return ENDPOINTS[env]["api"]
+    return get_uber_client().api_base
 
 
 def _api_headers():
     """Get headers with Bearer token for API calls."""
-    return {
-        "Authorization": f"Bearer {get_access_token()}",
-        "Content-Type": "application/json",
-    }
+    return get_uber_client().headers()
 
 
 def verify_webhook_signature(raw_body, signature):
@@ -105,7 +66,7 @@ def verify_webhook_signature(raw_body, signature):
     if not signature:
         return False
 
-    settings = frappe.get_single("ArcPOS Settings")
+    settings = get_settings_doc("ArcPOS Settings")
     secret = settings.get_password("uber_eats_signing_key")
     expected = hmac.new(
         secret.encode("utf-8"),
@@ -127,10 +88,9 @@ def get_order_details(order_id):
     """
     import json as _json
 
-    base = _get_api_base()
-    url = f"{base}/v2/eats/order/{order_id}"
+    path = f"/v2/eats/order/{order_id}"
 
-    response = requests.get(url, headers=_api_headers(), timeout=30)
+    response = get_uber_client().get(path, "get_order_details")
 
     if response.status_code != 200:
         frappe.log_error(
@@ -162,8 +122,7 @@ def accept_order(order_id, external_reference_id=None, estimated_ready_for_picku
             This is the only opportunity to set the prep time — Uber Eats has no
             separate update-prep-time endpoint.
     """
-    base = _get_api_base()
-    url = f"{base}/v1/eats/orders/{order_id}/accept_pos_order"
+    path = f"/v1/eats/orders/{order_id}/accept_pos_order"
 
     payload = {
         "reason": "Accepted by ArcPOS",
@@ -173,16 +132,9 @@ def accept_order(order_id, external_reference_id=None, estimated_ready_for_picku
     if estimated_ready_for_pickup_at:
         payload["estimated_ready_for_pickup_at"] = estimated_ready_for_pickup_at
 
-    print("Accept Payload : ",str(payload))
-
-    response = requests.post(
-        url, json=payload, headers=_api_headers(), timeout=30
-    )
-
-    print("\n\nAccept Order Response : ", str(response))
+    response = get_uber_client().post(path, "accept_order", json=payload)
 
     if response.status_code not in (200, 204):
-        print(f"Order: {order_id}, Status: {response.status_code}, Body: {response.text}")
         frappe.log_error(
             "Uber Eats Accept Order Error",
             f"Order: {order_id}, Status: {response.status_code}, Body: {response.text}",
@@ -202,8 +154,7 @@ def deny_order(order_id, reason_code="OTHER", explanation="Order denied by resta
                      PRICING, CAPACITY, ADDRESS, SPECIAL_INSTRUCTIONS, OTHER
         explanation: Human-readable denial reason
     """
-    base = _get_api_base()
-    url = f"{base}/v1/eats/orders/{order_id}/deny_pos_order"
+    path = f"/v1/eats/orders/{order_id}/deny_pos_order"
 
     payload = {
         "reason": {
@@ -212,11 +163,7 @@ def deny_order(order_id, reason_code="OTHER", explanation="Order denied by resta
         }
     }
 
-    response = requests.post(
-        url, json=payload, headers=_api_headers(), timeout=30
-    )
-
-    print("\n\n Rejected Order : ", str(response))
+    response = get_uber_client().post(path, "deny_order", json=payload)
 
     if response.status_code not in (200, 204):
         frappe.log_error(
@@ -253,10 +200,9 @@ def get_active_orders(store_id=None):
         List of created order summaries
     """
     store_id = _default_store_id(store_id)
-    base = _get_api_base()
-    url = f"{base}/v1/eats/stores/{store_id}/created-orders"
+    path = f"/v1/eats/stores/{store_id}/created-orders"
 
-    response = requests.get(url, headers=_api_headers(), timeout=30)
+    response = get_uber_client().get(path, "get_active_orders")
 
     if response.status_code != 200:
         frappe.log_error(
@@ -278,10 +224,9 @@ def get_canceled_orders(store_id=None):
         List of canceled order summaries
     """
     store_id = _default_store_id(store_id)
-    base = _get_api_base()
-    url = f"{base}/v1/eats/stores/{store_id}/canceled-orders"
+    path = f"/v1/eats/stores/{store_id}/canceled-orders"
 
-    response = requests.get(url, headers=_api_headers(), timeout=30)
+    response = get_uber_client().get(path, "get_canceled_orders")
 
     if response.status_code != 200:
         frappe.log_error(
@@ -301,16 +246,13 @@ def cancel_order(order_id, reason="OTHER", details=""):
         reason: Cancel reason code
         details: Human-readable explanation
     """
-    base = _get_api_base()
-    url = f"{base}/v1/eats/orders/{order_id}/cancel"
+    path = f"/v1/eats/orders/{order_id}/cancel"
 
     payload = {"reason": reason}
     if details:
         payload["details"] = details
 
-    response = requests.post(
-        url, json=payload, headers=_api_headers(), timeout=30
-    )
+    response = get_uber_client().post(path, "cancel_order", json=payload)
 
     if response.status_code not in (200, 204):
         frappe.log_error(
@@ -329,14 +271,11 @@ def update_delivery_status(order_id, status="READY_FOR_PICKUP"):
         order_id: Uber Eats order UUID
         status: One of PREPARING, READY_FOR_PICKUP, PICKED_UP
     """
-    base = _get_api_base()
-    url = f"{base}/v1/eats/orders/{order_id}/restaurantdelivery/status"
+    path = f"/v1/eats/orders/{order_id}/restaurantdelivery/status"
 
     payload = {"status": status}
 
-    response = requests.post(
-        url, json=payload, headers=_api_headers(), timeout=30
-    )
+    response = get_uber_client().post(path, "update_delivery_status", json=payload)
 
     if response.status_code not in (200, 204):
         frappe.log_error(
@@ -362,10 +301,9 @@ def get_menu(store_id=None):
         Menu data dict
     """
     store_id = _default_store_id(store_id)
-    base = _get_api_base()
-    url = f"{base}/v2/eats/stores/{store_id}/menus"
+    path = f"/v2/eats/stores/{store_id}/menus"
 
-    response = requests.get(url, headers=_api_headers(), timeout=30)
+    response = get_uber_client().get(path, "get_menu")
 
     if response.status_code != 200:
         frappe.log_error(
@@ -388,12 +326,9 @@ def upsert_menu(menu_data, store_id=None):
         API response dict
     """
     store_id = _default_store_id(store_id)
-    base = _get_api_base()
-    url = f"{base}/v2/eats/stores/{store_id}/menus"
+    path = f"/v2/eats/stores/{store_id}/menus"
 
-    response = requests.put(
-        url, json=menu_data, headers=_api_headers(), timeout=60
-    )
+    response = get_uber_client().put(path, "upsert_menu", json=menu_data, timeout=(5, 60))
 
     if response.status_code not in (200, 204):
         frappe.log_error(
@@ -418,12 +353,9 @@ def update_menu_item(item_id, item_data, store_id=None):
         API response dict
     """
     store_id = _default_store_id(store_id)
-    base = _get_api_base()
-    url = f"{base}/v2/eats/stores/{store_id}/menus/items/{item_id}"
+    path = f"/v2/eats/stores/{store_id}/menus/items/{item_id}"
 
-    response = requests.post(
-        url, json=item_data, headers=_api_headers(), timeout=30
-    )
+    response = get_uber_client().post(path, "update_menu_item", json=item_data)
 
     if response.status_code not in (200, 204):
         frappe.log_error(
@@ -446,10 +378,9 @@ def get_stores():
     Returns:
         List of store summaries
     """
-    base = _get_api_base()
-    url = f"{base}/v1/eats/stores"
+    path = f"/v1/eats/stores"
 
-    response = requests.get(url, headers=_api_headers(), timeout=30)
+    response = get_uber_client().get(path, "get_stores")
 
     if response.status_code != 200:
         frappe.log_error(
@@ -471,10 +402,9 @@ def get_store_details(store_id=None):
         Store details dict
     """
     store_id = _default_store_id(store_id)
-    base = _get_api_base()
-    url = f"{base}/v1/eats/stores/{store_id}"
+    path = f"/v1/eats/stores/{store_id}"
 
-    response = requests.get(url, headers=_api_headers(), timeout=30)
+    response = get_uber_client().get(path, "get_store_details")
 
     if response.status_code != 200:
         frappe.log_error(
@@ -496,10 +426,9 @@ def get_store_status(store_id=None):
         Store status dict
     """
     store_id = _default_store_id(store_id)
-    base = _get_api_base()
-    url = f"{base}/v1/eats/store/{store_id}/status"
+    path = f"/v1/eats/store/{store_id}/status"
 
-    response = requests.get(url, headers=_api_headers(), timeout=30)
+    response = get_uber_client().get(path, "get_store_status")
 
     if response.status_code != 200:
         frappe.log_error(
@@ -519,14 +448,11 @@ def set_store_status(status, store_id=None):
         store_id: Uber Eats store UUID (defaults to settings)
     """
     store_id = _default_store_id(store_id)
-    base = _get_api_base()
-    url = f"{base}/v1/eats/store/{store_id}/status"
+    path = f"/v1/eats/store/{store_id}/status"
 
     payload = {"status": status}
 
-    response = requests.post(
-        url, json=payload, headers=_api_headers(), timeout=30
-    )
+    response = get_uber_client().post(path, "set_store_status", json=payload)
 
     if response.status_code not in (200, 204):
         frappe.log_error(
@@ -548,10 +474,9 @@ def get_holiday_hours(store_id=None):
         Holiday hours dict
     """
     store_id = _default_store_id(store_id)
-    base = _get_api_base()
-    url = f"{base}/v1/eats/stores/{store_id}/holiday-hours"
+    path = f"/v1/eats/stores/{store_id}/holiday-hours"
 
-    response = requests.get(url, headers=_api_headers(), timeout=30)
+    response = get_uber_client().get(path, "get_holiday_hours")
 
     if response.status_code != 200:
         frappe.log_error(
@@ -571,12 +496,9 @@ def set_holiday_hours(holiday_hours, store_id=None):
         store_id: Uber Eats store UUID (defaults to settings)
     """
     store_id = _default_store_id(store_id)
-    base = _get_api_base()
-    url = f"{base}/v1/eats/stores/{store_id}/holiday-hours"
+    path = f"/v1/eats/stores/{store_id}/holiday-hours"
 
-    response = requests.post(
-        url, json=holiday_hours, headers=_api_headers(), timeout=30
-    )
+    response = get_uber_client().post(path, "set_holiday_hours", json=holiday_hours)
 
     if response.status_code not in (200, 204):
         frappe.log_error(
@@ -618,8 +540,7 @@ def create_report(report_type, store_ids, start_date, end_date):
     Returns:
         Job info dict with job_id and status
     """
-    base = _get_api_base()
-    url = f"{base}/v1/eats/report"
+    path = f"/v1/eats/report"
 
     payload = {
         "report_type": report_type,
@@ -628,9 +549,7 @@ def create_report(report_type, store_ids, start_date, end_date):
         "end_date": end_date,
     }
 
-    response = requests.post(
-        url, json=payload, headers=_api_headers(), timeout=30
-    )
+    response = get_uber_client().post(path, "create_report", json=payload)
 
     if response.status_code not in (200, 201, 204):
         frappe.log_error(
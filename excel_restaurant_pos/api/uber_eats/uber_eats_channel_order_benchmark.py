@@ -0,0 +1,105 @@
+"""
+Throughput benchmark of Channel Order creation.
+
+Run with:
+    bench --site <site> execute excel_restaurant_pos.api.uber_eats.uber_eats_channel_order_benchmark.benchmark_channel_orders \
+        --kwargs "{'orders': 1000}"
+
+Builds orders from the `make_uber_order` sample of uber_eats_fixtures.py
+and inserts them once through `_create_channel_order` (one Document save and
+commit per order) and once through `bulk_insert_channel_orders` in batches.
+Reports orders per second, database queries per order and the raw_payload
+size. The benchmark Channel Orders are deleted afterwards.
+"""
+
+import json
+import time
+
+import frappe
+
+from excel_restaurant_pos.utils.query_counter import QueryCounter
+
+from .uber_eats import _create_channel_order
+from .uber_eats_channel_orders import bulk_insert_channel_orders
+from .uber_eats_fixtures import make_uber_order
+
+BENCH_ORDER_PREFIX = "bench-order-"
+
+
+def _orders(label, count, items_per_order):
+    orders = []
+    for i in range(count):
+        order = make_uber_order(id=f"{BENCH_ORDER_PREFIX}{label}-{i}", display_id=f"B{i}")
+        item = order["cart"]["items"][0]
+        item["selected_modifier_groups"] = [
+            {"selected_items": [{"title": "Extra Cheese", "quantity": 1}, {"title": "Bacon", "quantity": 2}]}
+        ]
+        order["cart"]["items"] = [{**item, "id": f"item-{n}"} for n in range(items_per_order)]
+        orders.append(order)
+    return orders
+
+
+def _report(label, count, elapsed, queries):
+    result = {
+        "orders": count,
+        "orders_per_second": round(count / elapsed, 1),
+        "db_queries_per_order": round(queries / count, 2),
+    }
+    print(
+        f"{label:<9} {result['orders_per_second']:>9} orders/s  "
+        f"db queries/order {result['db_queries_per_order']}"
+    )
+    return result
+
+
+def _cleanup():
+    names = frappe.get_all(
+        "Channel Order", filters={"order_id": ["like", f"{BENCH_ORDER_PREFIX}%"]}, pluck="name"
+    )
+    if names:
+        frappe.db.delete("Channel Order Item", {"parent": ["in", names]})
+        frappe.db.delete("Channel Order", {"name": ["in", names]})
+    frappe.db.commit()
+
+
+def benchmark_channel_orders(orders=1000, items_per_order=3, batch_size=500):
+    """
+    Compare per-order Document inserts with the bulk insert.
+
+    Args:
+        orders: Orders per variant
+        items_per_order: Cart items per order
+        batch_size: Orders per bulk insert
+
+    Returns:
+        dict: throughput of both variants and the raw_payload sizes
+    """
+    count, items_per_order, batch_size = int(orders), int(items_per_order), int(batch_size)
+    _cleanup()
+
+    try:
+        documents = _orders("doc", count, items_per_order)
+        with QueryCounter() as queries:
+            start = time.perf_counter()
+            for order in documents:
+                _create_channel_order(order, event_id="bench")
+            single = _report("document", count, time.perf_counter() - start, queries.count)
+
+        batched = _orders("bulk", count, items_per_order)
+        with QueryCounter() as queries:
+            start = time.perf_counter()
+            for offset in range(0, count, batch_size):
+                bulk_insert_channel_orders(batched[offset:offset + batch_size], event_id="bench")
+            bulk = _report("bulk", count, time.perf_counter() - start, queries.count)
+
+        payload = frappe.db.get_value(
+            "Channel Order", {"order_id": f"{BENCH_ORDER_PREFIX}bulk-0"}, "raw_payload"
+        )
+        sizes = {
+            "raw_payload_bytes": len(payload or ""),
+            "json_bytes": len(json.dumps({"order": batched[0], "event_id": "bench", "is_scheduled": False})),
+        }
+        print(f"raw_payload {sizes['raw_payload_bytes']} bytes, plain JSON {sizes['json_bytes']} bytes")
+        return {"document": single, "bulk": bulk, **sizes}
+    finally:
+        _cleanup()
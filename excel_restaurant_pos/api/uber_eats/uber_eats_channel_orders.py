@@ -0,0 +1,270 @@
+"""Mapping of Uber Eats orders to Channel Order rows.
+
+`map_uber_order` turns one order dict into Channel Order values and Channel
+Order Item rows; `_create_channel_order` builds a Document from it for the
+webhook path. `bulk_insert_channel_orders` maps N orders for replays and
+backfills and writes them with two bulk INSERTs in one transaction, without
+Document validation: names are taken from the CO-{YYYY}- series in one
+block and orders whose order_id exists already are skipped.
+
+raw_payload is stored zlib compressed and base64 encoded with a "zlib:"
+prefix, read it with `load_raw_payload`.
+"""
+
+import base64
+import json
+import zlib
+from datetime import datetime, timezone
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+from .uber_eats_api import get_active_orders, get_order_details
+
+PAYLOAD_PREFIX = "zlib:"
+
+CHANNEL_ORDER_FIELDS = (
+    "order_from",
+    "order_id",
+    "display_id",
+    "current_state",
+    "order_type",
+    "placed_at",
+    "estimated_ready_for_pickup_at",
+    "store_id",
+    "store_name",
+    "eater_first_name",
+    "eater_last_name",
+    "eater_phone",
+    "special_instructions",
+    "subtotal",
+    "total",
+    "currency",
+    "raw_payload",
+)
+
+CHANNEL_ORDER_ITEM_FIELDS = (
+    "item_id",
+    "title",
+    "quantity",
+    "unit_price",
+    "total_price",
+    "modifiers",
+    "special_instructions",
+)
+
+
+def compress_payload(data):
+    """Serialize and compress a raw payload for a Long Text field."""
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    return PAYLOAD_PREFIX + base64.b64encode(zlib.compress(raw, 6)).decode()
+
+
+def load_raw_payload(value):
+    """
+    Read a Channel Order raw_payload, compressed or plain JSON.
+    Returns:
+        dict: The stored payload, empty if there is none
+    """
+    if not value:
+        return {}
+    if value.startswith(PAYLOAD_PREFIX):
+        value = zlib.decompress(base64.b64decode(value[len(PAYLOAD_PREFIX):]))
+    return json.loads(value)
+
+
+def _utc_naive(value):
+    """ISO-8601 timestamp -> naive UTC "YYYY-MM-DD HH:MM:SS", None if missing or invalid."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _amount(money):
+    """Uber uses minor currency units (cents)."""
+    return int((money or {}).get("amount", 0)) / 100.0
+
+
+def map_uber_order(order, event_id=None, is_scheduled=False):
+    """
+    Map an Uber Eats order to Channel Order values and item rows.
+
+    Args:
+        order: Full order details dict from Uber Eats API
+        event_id: Webhook event ID stored in raw_payload for reference
+        is_scheduled: True if this is a scheduled order
+
+    Returns:
+        tuple: (Channel Order values, [Channel Order Item values])
+    """
+    eater = order.get("eater") or {}
+    cart = order.get("cart") or {}
+    store = order.get("store") or {}
+    charges = (order.get("payment") or {}).get("charges") or {}
+    sub_total_info = charges.get("sub_total") or {}
+    total_info = charges.get("total") or {}
+
+    # Phone can be a plain string or a dict {"number": "..."} depending on Uber API version
+    phone_raw = eater.get("phone", "")
+    eater_phone = phone_raw if isinstance(phone_raw, str) else (phone_raw or {}).get("number", "")
+
+    values = {
+        "order_from": "Uber Eats",
+        "order_id": order.get("id", ""),
+        "display_id": order.get("display_id", ""),
+        "current_state": order.get("current_state", "CREATED"),
+        "order_type": order.get("type", ""),
+        # MySQL requires naive UTC strings
+        "placed_at": _utc_naive(order.get("placed_at")) or now_datetime(),
+        "estimated_ready_for_pickup_at": _utc_naive(order.get("estimated_ready_for_pickup_at")),
+        "store_id": store.get("id", ""),
+        "store_name": store.get("name", ""),
+        "eater_first_name": eater.get("first_name", ""),
+        "eater_last_name": eater.get("last_name", ""),
+        "eater_phone": eater_phone,
+        "special_instructions": cart.get("special_instructions") or "",
+        "subtotal": _amount(sub_total_info),
+        "total": _amount(total_info),
+        "currency": sub_total_info.get("currency_code", "") or total_info.get("currency_code", ""),
+        "raw_payload": compress_payload({"order": order, "event_id": event_id, "is_scheduled": is_scheduled}),
+    }
+
+    items = []
+    for uber_item in cart.get("items") or []:
+        price_info = uber_item.get("price") or {}
+        modifiers = [
+            f"{mod.get('title')} x{mod.get('quantity', 1)}"
+            for group in uber_item.get("selected_modifier_groups") or []
+            for mod in group.get("selected_items") or []
+            if mod.get("title")
+        ]
+        items.append({
+            "item_id": uber_item.get("id", ""),
+            "title": uber_item.get("title", "Uber Eats Item"),
+            "quantity": uber_item.get("quantity", 1),
+            "unit_price": _amount(price_info.get("unit_price")),
+            "total_price": _amount(price_info.get("total_price")),
+            "modifiers": ", ".join(modifiers),
+            "special_instructions": uber_item.get("special_instructions", ""),
+        })
+
+    return values, items
+
+
+def _reserve_names(count):
+    """Take `count` consecutive names of the CO-{YYYY}-{#####} series."""
+    prefix = f"CO-{now_datetime().year}-"
+    current = frappe.db.sql(
+        "SELECT `current` FROM `tabSeries` WHERE `name` = %s FOR UPDATE", (prefix,)
+    )
+    if current and current[0][0] is not None:
+        start = cint(current[0][0])
+        frappe.db.sql(
+            "UPDATE `tabSeries` SET `current` = `current` + %s WHERE `name` = %s", (count, prefix)
+        )
+    else:
+        start = 0
+        frappe.db.sql("INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)", (prefix, count))
+
+    return [f"{prefix}{number:05d}" for number in range(start + 1, start + count + 1)]
+
+
+def bulk_insert_channel_orders(orders, event_id=None, is_scheduled=False, commit=True):
+    """
+    Insert many Uber Eats orders as Channel Orders in one transaction.
+
+    Args:
+        orders: Full order details dicts from Uber Eats API
+        event_id: Reference stored in raw_payload (e.g. "replay")
+        is_scheduled: Stored in raw_payload
+        commit: Commit the transaction
+
+    Returns:
+        dict: inserted Channel Order names by order_id, skipped order_ids
+    """
+    order_ids = [order.get("id") for order in orders if order.get("id")]
+    existing = set(
+        frappe.get_all("Channel Order", filters={"order_id": ["in", order_ids]}, pluck="order_id")
+    ) if order_ids else set()
+
+    mapped, skipped = [], []
+    for order in orders:
+        order_id = order.get("id")
+        if not order_id or order_id in existing:
+            skipped.append(order_id)
+            continue
+        existing.add(order_id)
+        mapped.append(map_uber_order(order, event_id=event_id, is_scheduled=is_scheduled))
+
+    if not mapped:
+        return {"inserted": {}, "skipped": skipped}
+
+    now, user = now_datetime(), frappe.session.user
+    standard = {"creation": now, "modified": now, "owner": user, "modified_by": user, "docstatus": 0}
+
+    parents, children, inserted = [], [], {}
+    for name, (values, items) in zip(_reserve_names(len(mapped)), mapped):
+        inserted[values["order_id"]] = name
+        parents.append(
+            (name, *standard.values(), *(values[field] for field in CHANNEL_ORDER_FIELDS))
+        )
+        for idx, item in enumerate(items, start=1):
+            children.append((
+                frappe.generate_hash(length=10),
+                *standard.values(),
+                name,
+                "Channel Order",
+                "items",
+                idx,
+                *(item[field] for field in CHANNEL_ORDER_ITEM_FIELDS),
+            ))
+
+    frappe.db.bulk_insert(
+        "Channel Order",
+        fields=["name", *standard, *CHANNEL_ORDER_FIELDS],
+        values=parents,
+    )
+    if children:
+        frappe.db.bulk_insert(
+            "Channel Order Item",
+            fields=["name", *standard, "parent", "parenttype", "parentfield", "idx", *CHANNEL_ORDER_ITEM_FIELDS],
+            values=children,
+        )
+
+    if commit:
+        frappe.db.commit()
+    return {"inserted": inserted, "skipped": skipped}
+
+
+def replay_active_orders(store_id=None):
+    """
+    Import the created orders of a store that have no Channel Order yet.
+
+    Run with:
+        bench --site <site> execute excel_restaurant_pos.api.uber_eats.uber_eats_channel_orders.replay_active_orders
+
+    Args:
+        store_id: Uber Eats store UUID (defaults to settings)
+
+    Returns:
+        dict: inserted and skipped order_ids
+    """
+    summaries = get_active_orders(store_id=store_id) or {}
+    order_ids = [order.get("id") for order in summaries.get("orders") or [] if order.get("id")]
+    existing = set(
+        frappe.get_all("Channel Order", filters={"order_id": ["in", order_ids]}, pluck="order_id")
+    ) if order_ids else set()
+
+    orders = [get_order_details(order_id) for order_id in order_ids if order_id not in existing]
+    result = bulk_insert_channel_orders(orders, event_id="replay")
+    frappe.logger().info(
+        f"Uber Eats replay: {len(result['inserted'])} Channel Orders inserted, "
+        f"{len(existing) + len(result['skipped'])} already present"
+    )
+    return result
@@ -0,0 +1,435 @@
+"""Pooled HTTP client of the Uber Eats Marketplace API.
+
+One UberEatsClient per site and worker process keeps a keep-alive session, so
+consecutive calls reuse their TLS connections. Every call goes through
+`UberEatsClient.request`:
+
+- 429, 502, 503 and 504 answers (500 and read timeouts for GET/PUT only) are
+  retried up to MAX_RETRIES times with full-jitter exponential backoff; a
+  Retry-After header is honoured up to MAX_RETRY_AFTER seconds;
+- inside a web request the retries wait MAX_IN_REQUEST_WAIT seconds in total,
+  a longer wait raises UberEatsRetryLaterError so the caller can hand the call
+  to a background job instead of holding the web worker;
+- a 401 refreshes the OAuth token once and repeats the call;
+- after FAILURE_THRESHOLD consecutive failed calls the circuit opens and calls
+  fail right away with UberEatsUnavailableError for COOLDOWN_SECONDS, then a
+  single trial call decides whether it closes again.
+
+The OAuth token is shared through the cache. A refresh runs under a Redis
+lock, so one worker fetches a new token while the others wait and reuse it.
+
+Latencies are recorded per endpoint in Redis histograms, see
+get_uber_eats_api_metrics.
+"""
+
+import math
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import frappe
+import requests
+from frappe.utils.background_jobs import get_redis_conn
+from requests.adapters import HTTPAdapter
+
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
+
+# API endpoints by environment
+ENDPOINTS = {
+    "Sandbox": {
+        "auth": "https://sandbox-login.uber.com/oauth/v2/token",
+        "api": "https://test-api.uber.com",
+    },
+    "Production": {
+        "auth": "https://auth.uber.com/oauth/v2/token",
+        "api": "https://api.uber.com",
+    },
+}
+
+OAUTH_SCOPES = (
+    "eats.store eats.order eats.store.orders.read eats.store.orders.cancel "
+    "eats.store.status.write eats.report eats.store.orders.restaurantdelivery.status"
+)
+
+CACHE_KEY = "uber_eats_access_token"
+TOKEN_TTL = 86400 * 25  # 25 days (token lasts 30 days, refresh early)
+TOKEN_LOCK_KEY = "uber_eats_access_token_refresh"
+TOKEN_LOCK_TIMEOUT = 30
+
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+POOL_SIZE = 10
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+MAX_BACKOFF = 8
+MAX_RETRY_AFTER = 30
+MAX_IN_REQUEST_WAIT = 3
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# an answered POST may have been applied, only these methods retry a 500
+IDEMPOTENT_METHODS = frozenset({"GET", "PUT", "DELETE"})
+
+FAILURE_THRESHOLD = 5
+COOLDOWN_SECONDS = 30
+
+# upper bounds in ms, the last bucket is everything slower
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# site -> UberEatsClient
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class UberEatsUnavailableError(frappe.ValidationError):
+    http_status_code = 503
+
+
+class UberEatsRetryLaterError(UberEatsUnavailableError):
+    """The API asked for a longer wait than a web request may block for."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive failure counter of one worker process."""
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """Whether a call may go out; lets one trial call through after the cooldown."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            # the trial call holds the circuit open for the others
+            self.opened_at = time.monotonic()
+            return True
+
+    def retry_in(self):
+        if self.opened_at is None:
+            return 0
+        return max(0, round(self.cooldown - (time.monotonic() - self.opened_at)))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class UberEatsClient:
+    """Keep-alive session, retries, circuit breaker and token handling."""
+
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.breaker = CircuitBreaker()
+        self.settings_modified = None
+        self.environment = None
+        self.api_base = None
+        self.auth_url = None
+
+    def configure(self, settings):
+        """Take the environment from the cached ArcPOS Settings."""
+        self.environment = settings.get("uber_eats_environment", "Sandbox")
+        self.api_base = ENDPOINTS[self.environment]["api"]
+        self.auth_url = ENDPOINTS[self.environment]["auth"]
+        self.settings_modified = settings.modified
+
+    # ------------------------------------------------------------------
+    # OAuth token
+    # ------------------------------------------------------------------
+
+    def get_access_token(self):
+        """Get the cached token, or refresh it."""
+        return frappe.cache().get_value(CACHE_KEY) or self.refresh_token()
+
+    def refresh_token(self, stale_token=None):
+        """
+        Fetch a new token unless another worker did while we waited for the lock.
+
+        Args:
+            stale_token: Token the API rejected, a cached token equal to it is replaced
+
+        Returns:
+            str: Access token
+        """
+        cache = frappe.cache()
+        lock = cache.lock(
+            cache.make_key(TOKEN_LOCK_KEY),
+            timeout=TOKEN_LOCK_TIMEOUT,
+            blocking_timeout=TOKEN_LOCK_TIMEOUT + 5,
+        )
+        with lock:
+            token = cache.get_value(CACHE_KEY)
+            if token and token != stale_token:
+                return token
+
+            token = self._fetch_token()
+            cache.set_value(CACHE_KEY, token, expires_in_sec=TOKEN_TTL)
+            return token
+
+    def _fetch_token(self):
+        settings = arcpos_settings()
+        start = time.perf_counter()
+        response = self.session.post(
+            self.auth_url,
+            data={
+                "client_id": settings.get("uber_eats_client_id"),
+                "client_secret": settings.doc.get_password("uber_eats_client_secret"),
+                "grant_type": "client_credentials",
+                "scope": OAUTH_SCOPES,
+            },
+            timeout=DEFAULT_TIMEOUT,
+        )
+        _observe("oauth_token", start, response.status_code != 200)
+
+        if response.status_code != 200:
+            frappe.log_error(
+                "Uber Eats Auth Error",
+                f"Status: {response.status_code}, Body: {response.text}",
+            )
+            frappe.throw(f"Failed to get Uber Eats access token: {response.status_code} - {response.text}")
+
+        return response.json()["access_token"]
+
+    def headers(self, token=None):
+        return {
+            "Authorization": f"Bearer {token or self.get_access_token()}",
+            "Content-Type": "application/json",
+        }
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    def request(self, method, path, endpoint, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """
+        Call the API with retries and the circuit breaker.
+
+        Args:
+            method: HTTP method
+            path: Path below the API base, or a full URL
+            endpoint: Name the latency is recorded under
+            timeout: Request timeout, seconds or (connect, read)
+            **kwargs: Passed to requests (json, data, params)
+
+        Returns:
+            requests.Response: The final answer, the caller checks its status
+
+        Raises:
+            UberEatsRetryLaterError: In a web request, when the next retry would
+                exceed MAX_IN_REQUEST_WAIT seconds of waiting
+        """
+        method = method.upper()
+        url = path if path.startswith("http") else f"{self.api_base}{path}"
+
+        if not self.breaker.allow():
+            frappe.throw(
+                f"Uber Eats API is unavailable after repeated failures, retry in {self.breaker.retry_in()} s",
+                UberEatsUnavailableError,
+            )
+
+        # background jobs may wait for the full backoff, web workers may not
+        max_wait = MAX_IN_REQUEST_WAIT if getattr(frappe.local, "request", None) else None
+        waited = 0.0
+
+        token = self.get_access_token()
+        token_refreshed = False
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method, url, headers=self.headers(token), timeout=timeout, **kwargs
+                )
+            except requests.exceptions.RequestException as e:
+                _observe(endpoint, start, True)
+                if attempt < MAX_RETRIES and _retryable_error(method, e):
+                    delay = _retry_delay(attempt)
+                    if max_wait is None or waited + delay <= max_wait:
+                        time.sleep(delay)
+                        waited += delay
+                        attempt += 1
+                        continue
+                self.breaker.record_failure()
+                raise
+
+            status = response.status_code
+            _observe(endpoint, start, status >= 400)
+
+            if status == 401 and not token_refreshed:
+                token = self.refresh_token(stale_token=token)
+                token_refreshed = True
+                continue
+
+            retryable = status in RETRY_STATUSES or (status == 500 and method in IDEMPOTENT_METHODS)
+            if retryable and attempt < MAX_RETRIES:
+                delay = _retry_delay(attempt, response.headers.get("Retry-After"))
+                if max_wait is not None and waited + delay > max_wait:
+                    self.breaker.record_failure()
+                    raise UberEatsRetryLaterError(
+                        f"Uber Eats API is busy (HTTP {status}), retry in {math.ceil(delay)} s", delay
+                    )
+                time.sleep(delay)
+                waited += delay
+                attempt += 1
+                continue
+
+            if status >= 500 or status == 429:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+
+    def get(self, path, endpoint, **kwargs):
+        return self.request("GET", path, endpoint, **kwargs)
+
+    def post(self, path, endpoint, **kwargs):
+        return self.request("POST", path, endpoint, **kwargs)
+
+    def put(self, path, endpoint, **kwargs):
+        return self.request("PUT", path, endpoint, **kwargs)
+
+
+def get_uber_client():
+    """
+    Get the client of the current site, reconfigured when ArcPOS Settings change.
+    Returns:
+        UberEatsClient: Shared client of this worker process
+    """
+    settings = arcpos_settings()
+    if not settings.get("uber_eats_enabled"):
+        frappe.throw("Uber Eats integration is not enabled")
+
+    client = _clients.get(frappe.local.site)
+    if client is None:
+        with _clients_lock:
+            client = _clients.setdefault(frappe.local.site, UberEatsClient())
+
+    if client.settings_modified != settings.modified:
+        client.configure(settings)
+    return client
+
+
+def _retryable_error(method, error):
+    """Connection errors are retried; a read timeout only for idempotent methods."""
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return True
+    return isinstance(error, requests.exceptions.ReadTimeout) and method in IDEMPOTENT_METHODS
+
+
+def _retry_after_seconds(value):
+    """Parse a Retry-After header, seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, at least the Retry-After the server asked for."""
+    delay = random.uniform(0, min(MAX_BACKOFF, BACKOFF_BASE * 2 ** attempt))
+    wait = _retry_after_seconds(retry_after)
+    if wait is not None:
+        delay = max(delay, min(wait, MAX_RETRY_AFTER))
+    return delay
+
+
+# ---------------------------------------------------------------------------
+# Latency histograms
+# ---------------------------------------------------------------------------
+
+def _histogram_key(endpoint):
+    return f"{frappe.local.site}:uber_eats:latency:{endpoint}"
+
+
+def _endpoints_key():
+    return f"{frappe.local.site}:uber_eats:latency_endpoints"
+
+
+def _observe(endpoint, start, error=False):
+    """Add one call to the latency histogram of an endpoint."""
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    bucket = next((f"le_{bound}" for bound in LATENCY_BUCKETS_MS if elapsed_ms <= bound), "le_inf")
+    try:
+        pipe = get_redis_conn().pipeline(transaction=False)
+        pipe.sadd(_endpoints_key(), endpoint)
+        pipe.hincrby(_histogram_key(endpoint), bucket, 1)
+        pipe.hincrby(_histogram_key(endpoint), "count", 1)
+        pipe.hincrbyfloat(_histogram_key(endpoint), "sum_ms", round(elapsed_ms, 3))
+        if error:
+            pipe.hincrby(_histogram_key(endpoint), "errors", 1)
+        pipe.execute()
+    except Exception:
+        # metrics must never fail a call
+        pass
+
+
+@frappe.whitelist()
+def get_uber_eats_api_metrics(reset=0):
+    """
+    Get the per-endpoint latency histograms and the circuit state of this worker.
+
+    Args:
+        reset: Clear the histograms after reading them
+
+    Returns:
+        dict: endpoints with cumulative buckets (calls <= bound ms), count,
+        errors and mean latency
+    """
+    frappe.only_for("System Manager")
+
+    conn = get_redis_conn()
+    endpoints = sorted(frappe.safe_decode(name) for name in conn.smembers(_endpoints_key()))
+    result = {}
+    for endpoint in endpoints:
+        raw = {frappe.safe_decode(k): float(v) for k, v in conn.hgetall(_histogram_key(endpoint)).items()}
+        count = int(raw.get("count", 0))
+        cumulative, buckets = 0, {}
+        for bound in LATENCY_BUCKETS_MS:
+            cumulative += int(raw.get(f"le_{bound}", 0))
+            buckets[str(bound)] = cumulative
+        buckets["inf"] = cumulative + int(raw.get("le_inf", 0))
+        result[endpoint] = {
+            "count": count,
+            "errors": int(raw.get("errors", 0)),
+            "mean_ms": round(raw.get("sum_ms", 0) / count, 3) if count else None,
+            "buckets": buckets,
+        }
+
+    if frappe.utils.cint(reset):
+        conn.delete(_endpoints_key(), *[_histogram_key(endpoint) for endpoint in endpoints])
+
+    client = _clients.get(frappe.local.site)
+    return {
+        "endpoints": result,
+        "circuit": client.breaker.state if client else "closed",
+    }
@@ -0,0 +1,42 @@
+"""Sample Uber Eats payloads shared by the tests and the benchmarks."""
+
+
+def make_uber_order(**kwargs):
+    """Return a minimal Uber Eats order dict suitable for _create_channel_order."""
+    base = {
+        "id": "test-order-uuid-0001",
+        "display_id": "ABCD1",
+        "current_state": "CREATED",
+        "type": "DELIVERY_BY_UBER",
+        "placed_at": "2026-02-19T08:05:04Z",
+        "store": {"id": "store-uuid-001", "name": "Test Store"},
+        "eater": {
+            "first_name": "John",
+            "last_name": "Doe",
+            "phone": "+1 647-555-0100",
+        },
+        "cart": {
+            "items": [
+                {
+                    "id": "item-001",
+                    "title": "Burger",
+                    "quantity": 2,
+                    "price": {
+                        "unit_price": {"amount": 500, "currency_code": "CAD"},
+                        "total_price": {"amount": 1000, "currency_code": "CAD"},
+                    },
+                    "selected_modifier_groups": None,
+                    "special_instructions": "",
+                }
+            ],
+            "special_instructions": "",
+        },
+        "payment": {
+            "charges": {
+                "sub_total": {"amount": 1000, "currency_code": "CAD"},
+                "total": {"amount": 1000, "currency_code": "CAD"},
+            }
+        },
+    }
+    base.update(kwargs)
+    return base
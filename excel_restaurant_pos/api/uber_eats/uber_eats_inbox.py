@@ -0,0 +1,232 @@
+"""Uber Eats webhook inbox.
+
+The webhook only verifies the signature and hands the raw event to
+`ingest_event`. One Lua script claims the event_id (and, for new order
+notifications, the order_id) with SET NX and appends the event to a Redis
+stream, so duplicate deliveries racing each other are dropped atomically and
+an event is never claimed without being stored.
+
+`consume_uber_eats_inbox` reads the stream through a consumer group with
+at-least-once semantics: an event is acknowledged only after it was
+processed. Events left unacknowledged by a crashed consumer are claimed again
+after CLAIM_IDLE_MS, events that fail MAX_DELIVERIES times go to a dead-letter
+list. Processing has to be idempotent; Channel Order.order_id is unique.
+
+Dead-lettering an order notification releases its order claim, so the
+reconciler (or a later webhook) can still pick the order up.
+"""
+
+import json
+import os
+import socket
+import time
+
+import frappe
+from frappe.utils.background_jobs import get_redis_conn
+
+ORDER_NOTIFICATION_EVENTS = ("orders.notification", "orders.scheduled.notification")
+
+GROUP = "arcpos"
+BATCH_SIZE = 50
+MAX_BATCHES_PER_RUN = 20
+MAX_DELIVERIES = 5
+CLAIM_IDLE_MS = 5 * 60 * 1000
+DEDUP_SECONDS = 3 * 24 * 60 * 60
+DEAD_LETTER_MAX = 1000
+
+# KEYS: idempotency keys..., inbox stream. ARGV: ttl, raw event, received at.
+# Returns 0 when one of the keys was already claimed.
+INGEST_SCRIPT = """
+local inbox = KEYS[#KEYS]
+for i = 1, #KEYS - 1 do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        return 0
+    end
+end
+for i = 1, #KEYS - 1 do
+    redis.call('SET', KEYS[i], 1, 'EX', ARGV[1])
+end
+redis.call('XADD', inbox, '*', 'event', ARGV[2], 'received_at', ARGV[3])
+return 1
+"""
+
+# site -> redis Script
+_ingest_scripts = {}
+
+
+def inbox_key():
+    return f"{frappe.local.site}:uber_eats:inbox"
+
+
+def dead_letter_key():
+    return f"{frappe.local.site}:uber_eats:inbox_dead"
+
+
+def _claim_key(kind, value):
+    return f"{frappe.local.site}:uber_eats:{kind}:{value}"
+
+
+def _order_claim_key(data):
+    """Claim key of the order of a new order notification, None for other events."""
+    order_id = (data.get("meta") or {}).get("resource_id")
+    if data.get("event_type") in ORDER_NOTIFICATION_EVENTS and order_id:
+        return _claim_key("order", order_id)
+    return None
+
+
+def ingest_event(raw_body, data):
+    """
+    Store a verified webhook event in the inbox unless it was seen before.
+
+    Args:
+        raw_body: Raw request body
+        data: Parsed event
+
+    Returns:
+        bool: True if the event was stored, False for a duplicate
+    """
+    event_id = data.get("event_id") or frappe.generate_hash(frappe.safe_decode(raw_body), 20)
+
+    keys = [_claim_key("event", event_id)]
+    order_claim_key = _order_claim_key(data)
+    if order_claim_key:
+        keys.append(order_claim_key)
+    keys.append(inbox_key())
+
+    conn = get_redis_conn()
+    script = _ingest_scripts.get(frappe.local.site)
+    if script is None:
+        script = _ingest_scripts[frappe.local.site] = conn.register_script(INGEST_SCRIPT)
+
+    stored = script(keys=keys, args=[DEDUP_SECONDS, frappe.safe_decode(raw_body), time.time()])
+    if stored:
+        _enqueue_consumer()
+    return bool(stored)
+
+
+def _enqueue_consumer():
+    """Start the consumer job unless one is already queued."""
+    frappe.enqueue(
+        consume_uber_eats_inbox,
+        queue="default",
+        job_id="uber_eats_inbox_consumer",
+        deduplicate=True,
+    )
+
+
+def _ensure_group(conn):
+    try:
+        # id 0: events stored before the group existed are read too
+        conn.xgroup_create(inbox_key(), GROUP, id="0", mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def _claim_stale(conn, consumer):
+    """Claim events another consumer read but never acknowledged."""
+    pending = conn.xpending_range(inbox_key(), GROUP, min="-", max="+", count=BATCH_SIZE)
+    stale = {
+        entry["message_id"]: entry["times_delivered"]
+        for entry in pending
+        if entry["time_since_delivered"] >= CLAIM_IDLE_MS
+    }
+    if not stale:
+        return []
+
+    claimed = conn.xclaim(inbox_key(), GROUP, consumer, CLAIM_IDLE_MS, list(stale))
+    return [
+        (message_id, fields, stale.get(message_id, 0) + 1)
+        for message_id, fields in claimed
+        if fields
+    ]
+
+
+def _acknowledge(conn, message_id):
+    pipe = conn.pipeline()
+    pipe.xack(inbox_key(), GROUP, message_id)
+    pipe.xdel(inbox_key(), message_id)
+    pipe.execute()
+
+
+def _dead_letter(conn, message_id, raw_event, error):
+    try:
+        order_claim_key = _order_claim_key(json.loads(raw_event))
+    except ValueError:
+        order_claim_key = None
+
+    pipe = conn.pipeline()
+    if order_claim_key:
+        # the order was never created, do not keep the reconciler from it
+        pipe.delete(order_claim_key)
+    pipe.lpush(
+        dead_letter_key(),
+        json.dumps({"event": raw_event, "error": error, "failed_at": time.time()}),
+    )
+    pipe.ltrim(dead_letter_key(), 0, DEAD_LETTER_MAX - 1)
+    pipe.xack(inbox_key(), GROUP, message_id)
+    pipe.xdel(inbox_key(), message_id)
+    pipe.execute()
+    frappe.log_error(
+        f"Uber Eats event {message_id} failed {MAX_DELIVERIES} times: {error}\n{raw_event[:2000]}",
+        "Uber Eats Inbox Dead Letter",
+    )
+
+
+def _process_entries(conn, entries):
+    """Process inbox entries, acknowledging the ones that succeeded."""
+    from .uber_eats import _process_inbox_event
+
+    for message_id, fields, delivery in entries:
+        raw_event = frappe.safe_decode(fields.get(b"event") or fields.get("event") or "")
+        error = None
+        try:
+            if _process_inbox_event(json.loads(raw_event), first_delivery=delivery == 1):
+                _acknowledge(conn, message_id)
+                continue
+            error = "processing did not complete"
+        except Exception as e:
+            frappe.db.rollback()
+            error = str(e)
+
+        # left pending, claimed again after CLAIM_IDLE_MS
+        if delivery >= MAX_DELIVERIES:
+            _dead_letter(conn, message_id, raw_event, error)
+
+
+def consume_uber_eats_inbox():
+    """
+    Process the webhook inbox until it is empty.
+    Runs as a background job after each webhook and every minute from the scheduler.
+    """
+    conn = get_redis_conn()
+    _ensure_group(conn)
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+    _process_entries(conn, _claim_stale(conn, consumer))
+
+    for _ in range(MAX_BATCHES_PER_RUN):
+        response = conn.xreadgroup(GROUP, consumer, {inbox_key(): ">"}, count=BATCH_SIZE)
+        if not response:
+            break
+        entries = [(message_id, fields, 1) for message_id, fields in response[0][1]]
+        _process_entries(conn, entries)
+
+
+@frappe.whitelist()
+def get_uber_eats_inbox_status():
+    """
+    Get the inbox backlog for monitoring.
+    Returns:
+        dict: stored, pending (read, not acknowledged) and dead-lettered events
+    """
+    frappe.only_for("System Manager")
+
+    conn = get_redis_conn()
+    _ensure_group(conn)
+    pending = conn.xpending(inbox_key(), GROUP)
+    return {
+        "stored": conn.xlen(inbox_key()),
+        "pending": pending.get("pending", 0) if isinstance(pending, dict) else pending[0],
+        "dead_letters": conn.llen(dead_letter_key()),
+    }
@@ -0,0 +1,140 @@
+"""Mapping between Uber Eats Sales Invoices and Channel Orders.
+
+Sales Invoice.custom_channel_order and Channel Order.sales_invoice are indexed
+links kept in both directions, so the Uber order of an invoice is one primary
+key lookup and the invoice of an order one indexed lookup. Invoices still
+carrying only the legacy "uber_eats_order_id:<uuid>" remark are linked on
+insert (and by the backfill patch) from that remark.
+"""
+
+import re
+
+import frappe
+
+UBER_EATS_ORDER_FROM = "UberEats"
+ORDER_ID_PATTERN = re.compile(r"uber_eats_order_id:([a-f0-9-]+)")
+
+# invoice custom_order_status -> Channel Order current_state once Uber was told
+SYNCED_STATES = {
+    "rejected": "REJECTED",
+}
+
+
+def is_uber_eats_invoice(doc):
+    return (doc.get("custom_order_from") or "").lower() == UBER_EATS_ORDER_FROM.lower()
+
+
+def extract_uber_eats_order_id(remarks):
+    """Extract the Uber Eats order ID from legacy invoice remarks."""
+    if not remarks:
+        return None
+    match = ORDER_ID_PATTERN.search(remarks)
+    return match.group(1) if match else None
+
+
+def link_invoice(doc, method=None):
+    """Sales Invoice before_insert: resolve the Channel Order from the remarks."""
+    if not is_uber_eats_invoice(doc) or doc.get("custom_channel_order"):
+        return
+
+    order_id = extract_uber_eats_order_id(doc.remarks)
+    if order_id:
+        doc.custom_channel_order = frappe.db.get_value("Channel Order", {"order_id": order_id}, "name")
+
+
+def link_channel_order(doc, method=None):
+    """Sales Invoice after_insert: point the Channel Order back at the invoice."""
+    if doc.get("custom_channel_order"):
+        frappe.db.set_value(
+            "Channel Order", doc.custom_channel_order, "sales_invoice", doc.name, update_modified=False
+        )
+
+
+def link_order_to_invoice(order_id, invoice_name):
+    """
+    Link a Channel Order and a Sales Invoice both ways.
+    Returns:
+        str: Channel Order name, None if the order is unknown
+    """
+    channel_order = frappe.db.get_value("Channel Order", {"order_id": order_id}, "name")
+    if not channel_order or not frappe.db.exists("Sales Invoice", invoice_name):
+        return None
+
+    frappe.db.set_value("Channel Order", channel_order, "sales_invoice", invoice_name, update_modified=False)
+    frappe.db.set_value(
+        "Sales Invoice", invoice_name, "custom_channel_order", channel_order, update_modified=False
+    )
+    return channel_order
+
+
+def get_invoice_uber_order_id(invoice):
+    """
+    Get the Uber Eats order of an invoice.
+    Args:
+        invoice: Sales Invoice document
+    Returns:
+        str: Uber Eats order UUID or None
+    """
+    if invoice.get("custom_channel_order"):
+        return frappe.db.get_value("Channel Order", invoice.custom_channel_order, "order_id")
+    # not linked (yet), e.g. the Channel Order was created after the invoice
+    return extract_uber_eats_order_id(invoice.remarks)
+
+
+def get_unsynced_invoices():
+    """
+    Open Uber Eats invoices whose status was not pushed to Uber yet, in one query.
+    Returns:
+        list: rows with the invoice name, custom_order_status, order_id and current_state
+    """
+    return frappe.db.sql(
+        """
+        SELECT si.name, si.custom_order_status, co.order_id, co.current_state
+        FROM `tabSales Invoice` si
+        INNER JOIN `tabChannel Order` co ON co.name = si.custom_channel_order
+        WHERE si.custom_order_from = %(order_from)s
+            AND si.docstatus < 2
+            AND si.custom_order_status IN %(statuses)s
+            AND co.current_state NOT IN %(done)s
+        """,
+        {
+            "order_from": UBER_EATS_ORDER_FROM,
+            "statuses": [status.title() for status in SYNCED_STATES],
+            "done": list(set(SYNCED_STATES.values())) + ["CANCELLED"],
+        },
+        as_dict=True,
+    )
+
+
+def sync_open_uber_invoices():
+    """
+    Push the status of every open Uber Eats invoice Uber does not know yet.
+    Returns:
+        dict: synced and failed invoice names
+    """
+    from excel_restaurant_pos.doc_event.sales_invoice.handlers.uber_eats_status_handler import (
+        sync_invoice_status,
+    )
+
+    synced, failed = [], []
+    for row in get_unsynced_invoices():
+        if sync_invoice_status(row.name, row.order_id, row.custom_order_status):
+            synced.append(row.name)
+        else:
+            failed.append(row.name)
+
+    frappe.logger().info(f"Uber Eats invoice sync: {len(synced)} synced, {len(failed)} failed")
+    return {"synced": synced, "failed": failed}
+
+
+@frappe.whitelist()
+def sync_open_uber_invoices_api():
+    """Start the sync of all open Uber Eats invoices in the background."""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        sync_open_uber_invoices,
+        queue="default",
+        job_id="uber_eats_invoice_sync",
+        deduplicate=True,
+    )
+    return {"queued": True}
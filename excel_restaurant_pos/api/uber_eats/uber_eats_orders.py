@@ -1,8 +1,36 @@
-"""Whitelisted API endpoints for Uber Eats order management."""
+"""Whitelisted API endpoints for Uber Eats order management.
+
+Order actions the API asks to retry later than a web request may wait are
+handed to a delayed background job and answered with status "queued".
+"""
+
+import math
 
 import frappe
 
 
+def _retry_later(method, error, order_id, **kwargs):
+    """Run an order action again from a background job once the API allows it.
+
+    Args:
+        method: Whitelisted endpoint to call again
+        error: UberEatsRetryLaterError raised by the client
+        order_id: Uber Eats order UUID
+        **kwargs: Remaining endpoint arguments
+    """
+    from excel_restaurant_pos.utils.delayed_jobs import schedule_job
+
+    retry_after = math.ceil(error.retry_after)
+    schedule_job(
+        method,
+        retry_after,
+        job_id=f"uber_eats:{method.__name__}:{order_id}",
+        order_id=order_id,
+        **kwargs,
+    )
+    return {"status": "queued", "order_id": order_id, "retry_after": retry_after}
+
+
 @frappe.whitelist()
 def get_orders(store_id=None):
     """Get active (CREATED) orders from Uber Eats.
@@ -64,8 +92,12 @@ def cancel_uber_eats_order(order_id, reason="OTHER", details=""):
     reason = reason.upper() if reason else "OTHER"
 
     from .uber_eats_api import cancel_order
+    from .uber_eats_client import UberEatsRetryLaterError
 
-    cancel_order(order_id, reason=reason, details=details)
+    try:
+        cancel_order(order_id, reason=reason, details=details)
+    except UberEatsRetryLaterError as e:
+        return _retry_later(cancel_uber_eats_order, e, order_id, reason=reason, details=details)
     return {"status": "cancelled", "order_id": order_id}
 
 
@@ -86,6 +118,7 @@ def accept_uber_eats_order(order_id, external_reference_id=None, estimated_ready
 
     from datetime import datetime as _dt, timezone as _tz
     from .uber_eats_api import accept_order
+    from .uber_eats_client import UberEatsRetryLaterError
 
     iso_utc = None
     naive_utc = None
@@ -101,14 +134,29 @@ def accept_uber_eats_order(order_id, external_reference_id=None, estimated_ready
                 "Use ISO 8601, e.g. '2026-02-22T15:00:00Z'."
             )
 
-    accept_order(order_id, external_reference_id=external_reference_id, estimated_ready_for_pickup_at=iso_utc)
+    try:
+        accept_order(order_id, external_reference_id=external_reference_id, estimated_ready_for_pickup_at=iso_utc)
+    except UberEatsRetryLaterError as e:
+        return _retry_later(
+            accept_uber_eats_order,
+            e,
+            order_id,
+            external_reference_id=external_reference_id,
+            estimated_ready_for_pickup_at=estimated_ready_for_pickup_at,
+        )
 
-    # Sync estimated ready time to the local Channel Order if provided
+    # Sync estimated ready time to the local Channel Order if provided (order_id is unique)
     if naive_utc:
-        channel_order_name = frappe.db.get_value("Channel Order", {"order_id": order_id}, "name")
-        if channel_order_name:
-            frappe.db.set_value("Channel Order", channel_order_name, "estimated_ready_for_pickup_at", naive_utc)
-            frappe.db.commit()
+        frappe.db.set_value("Channel Order", {"order_id": order_id}, "estimated_ready_for_pickup_at", naive_utc)
+
+    # Link the POS invoice and the Channel Order both ways
+    if external_reference_id:
+        from .uber_eats_invoices import link_order_to_invoice
+
+        link_order_to_invoice(order_id, external_reference_id)
+
+    if naive_utc or external_reference_id:
+        frappe.db.commit()
 
     return {"status": "accepted", "order_id": order_id}
 
@@ -128,8 +176,12 @@ def deny_uber_eats_order(order_id, reason_code="OTHER", explanation="Order denie
         frappe.throw("order_id is required")
 
     from .uber_eats_api import deny_order
+    from .uber_eats_client import UberEatsRetryLaterError
 
-    deny_order(order_id, reason_code=reason_code, explanation=explanation)
+    try:
+        deny_order(order_id, reason_code=reason_code, explanation=explanation)
+    except UberEatsRetryLaterError as e:
+        return _retry_later(deny_uber_eats_order, e, order_id, reason_code=reason_code, explanation=explanation)
     return {"status": "denied", "order_id": order_id}
 
 
@@ -195,6 +247,10 @@ def update_uber_eats_order_status(order_id, status):
         frappe.throw("status is required")
 
     from .uber_eats_api import update_delivery_status
+    from .uber_eats_client import UberEatsRetryLaterError
 
-    update_delivery_status(order_id, status=status)
+    try:
+        update_delivery_status(order_id, status=status)
+    except UberEatsRetryLaterError as e:
+        return _retry_later(update_uber_eats_order_status, e, order_id, status=status)
     return {"status": status, "order_id": order_id}
@@ -0,0 +1,188 @@
+"""Reconciliation of Uber Eats orders missed by the webhook.
+
+`reconcile_uber_eats_orders` runs every minute from the scheduler but only
+polls when it is due. Each poll lists the created and canceled orders of every
+store linked to the app, looks the order_ids up in Channel Order with one
+query and feeds
+
+- created orders without a Channel Order through process_uber_eats_order,
+- canceled orders whose Channel Order is not cancelled through
+  _process_order_cancel.
+
+The poll interval is MIN_INTERVAL during PEAK_HOURS and while stores have
+open orders, otherwise it doubles after each quiet poll up to MAX_INTERVAL.
+"""
+
+import time
+
+import frappe
+from frappe.utils import now_datetime
+from frappe.utils.background_jobs import get_redis_conn
+
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
+
+from .uber_eats import _process_order_cancel, process_uber_eats_order
+from .uber_eats_api import get_active_orders, get_canceled_orders, get_stores
+from .uber_eats_client import get_uber_client
+from .uber_eats_inbox import DEDUP_SECONDS, _claim_key
+
+MIN_INTERVAL = 60
+MAX_INTERVAL = 15 * 60
+# local hours [start, end) with lunch and dinner traffic
+PEAK_HOURS = ((11, 14), (17, 21))
+STORES_CACHE_SECONDS = 60 * 60
+MAX_ORDERS_PER_RUN = 50
+
+
+def _state_key():
+    return f"{frappe.local.site}:uber_eats:reconcile"
+
+
+def _stores_key():
+    return f"{frappe.local.site}:uber_eats:reconcile_stores"
+
+
+def _is_peak(now=None):
+    hour = (now or now_datetime()).hour
+    return any(start <= hour < end for start, end in PEAK_HOURS)
+
+
+def _store_ids():
+    """Stores linked to the app, the list is cached for STORES_CACHE_SECONDS."""
+    conn = get_redis_conn()
+    cached = conn.smembers(_stores_key())
+    if cached:
+        return sorted(frappe.safe_decode(store_id) for store_id in cached)
+
+    store_ids = set()
+    try:
+        for store in (get_stores() or {}).get("stores") or []:
+            store_id = store.get("store_id") or store.get("id")
+            if store_id:
+                store_ids.add(store_id)
+    except Exception as e:
+        frappe.log_error(f"Failed to list Uber Eats stores: {str(e)}", "Uber Eats Reconcile Error")
+
+    configured = arcpos_settings().get("uber_eats_store_id")
+    if configured:
+        store_ids.add(configured)
+
+    if store_ids:
+        pipe = conn.pipeline()
+        pipe.sadd(_stores_key(), *store_ids)
+        pipe.expire(_stores_key(), STORES_CACHE_SECONDS)
+        pipe.execute()
+    return sorted(store_ids)
+
+
+def _order_ids(response):
+    return [order.get("id") for order in (response or {}).get("orders") or [] if order.get("id")]
+
+
+def _fetch_store_orders(store_ids):
+    """
+    List the created and canceled orders of the stores.
+    Returns:
+        tuple: (created order_ids, canceled order_ids)
+    """
+    created, canceled = [], []
+    for store_id in store_ids:
+        try:
+            created += _order_ids(get_active_orders(store_id=store_id))
+            canceled += _order_ids(get_canceled_orders(store_id=store_id))
+        except Exception as e:
+            frappe.log_error(f"Store {store_id}: {str(e)}", "Uber Eats Reconcile Error")
+    return created, canceled
+
+
+def _recover_order(order_id, api_base):
+    """Create a Channel Order for a created order the webhook never delivered."""
+    # the webhook inbox claims the same key; it is handling the order already
+    if not get_redis_conn().set(_claim_key("order", order_id), 1, nx=True, ex=DEDUP_SECONDS):
+        return False
+
+    channel_order = process_uber_eats_order(
+        resource_href=f"{api_base}/v2/eats/order/{order_id}",
+        order_id=order_id,
+        event_id="reconcile",
+    )
+    if channel_order is None:
+        # let the next poll try again
+        get_redis_conn().delete(_claim_key("order", order_id))
+        return False
+
+    # only once the order exists, a failed attempt must not alert staff again
+    frappe.enqueue(
+        "excel_restaurant_pos.api.uber_eats.uber_eats._notify_staff_new_order",
+        queue="short",
+        order_id=order_id,
+    )
+    return True
+
+
+def reconcile_now():
+    """
+    Poll every store once and recover missed orders and cancellations.
+    Returns:
+        dict: open orders seen and what was recovered
+    """
+    created, canceled = _fetch_store_orders(_store_ids())
+    order_ids = list(dict.fromkeys(created + canceled))
+
+    known = {}
+    if order_ids:
+        known = {
+            row.order_id: row.current_state
+            for row in frappe.get_all(
+                "Channel Order",
+                filters={"order_id": ["in", order_ids]},
+                fields=["order_id", "current_state"],
+            )
+        }
+
+    missing = [order_id for order_id in dict.fromkeys(created) if order_id not in known]
+    not_cancelled = [
+        order_id for order_id in dict.fromkeys(canceled)
+        if order_id in known and known[order_id] != "CANCELLED"
+    ]
+
+    api_base = get_uber_client().api_base
+    recovered = [order_id for order_id in missing[:MAX_ORDERS_PER_RUN] if _recover_order(order_id, api_base)]
+    for order_id in not_cancelled:
+        _process_order_cancel(order_id)
+
+    if recovered or not_cancelled:
+        frappe.logger().info(
+            f"Uber Eats reconcile: recovered orders {recovered}, cancellations {not_cancelled}"
+        )
+    return {
+        "open_orders": len(set(created)),
+        "recovered": recovered,
+        "cancelled": not_cancelled,
+    }
+
+
+def _next_interval(previous, open_orders):
+    if open_orders or _is_peak():
+        return MIN_INTERVAL
+    return min(MAX_INTERVAL, max(MIN_INTERVAL, previous * 2))
+
+
+def reconcile_uber_eats_orders():
+    """
+    Scheduler entry point, runs every minute and polls when the interval passed.
+    """
+    if not arcpos_settings().get("uber_eats_enabled"):
+        return
+
+    conn = get_redis_conn()
+    state = {frappe.safe_decode(k): float(v) for k, v in (conn.hgetall(_state_key()) or {}).items()}
+    now = time.time()
+    # peak hours start polling right away, not after the idle interval
+    if now < state.get("next_run", 0) and not (_is_peak() and state.get("interval", 0) > MIN_INTERVAL):
+        return
+
+    result = reconcile_now()
+    interval = _next_interval(state.get("interval", MIN_INTERVAL), result["open_orders"])
+    # a few seconds early so the per-minute scheduler does not skip a beat
+    conn.hset(_state_key(), mapping={"next_run": now + interval - 5, "interval": interval})
@@ -1,11 +1,49 @@
-"""Whitelisted API endpoints for Uber Eats reporting."""
+"""Whitelisted API endpoints for Uber Eats reporting.
 
+Every eats.report.success webhook is stored as an Uber Eats Report keyed by
+its workflow_id. `download_uber_eats_report` then downloads the CSV sections
+once, streamed in chunks to a private File, and parses them row by row into
+Uber Eats Report Line, so the reports can be queried and reconciled against
+Channel Orders and Sales Invoices in SQL instead of re-downloading the CSV.
+"""
+
+import csv
 import json
+import os
 from html import unescape
 
 import requests
 
 import frappe
+from frappe.utils import cint, flt, getdate, now_datetime
+
+REPORT_DOCTYPE = "Uber Eats Report"
+LINE_DOCTYPE = "Uber Eats Report Line"
+DOWNLOAD_TIMEOUT = (5, 120)
+CHUNK_BYTES = 64 * 1024
+LINE_BATCH_SIZE = 1000
+# automatic downloads per report, retry_report_download is not limited
+MAX_DOWNLOAD_ATTEMPTS = 3
+
+# Report Line field -> CSV headers it is read from (lowercase), first match wins
+COLUMN_ALIASES = {
+    "order_id": ("workflow id", "workflow uuid", "order uuid", "order workflow id"),
+    "display_id": ("order id", "display id"),
+    "order_date": ("order date", "date ordered", "order accept time", "date"),
+    "order_status": ("order status", "status"),
+    "store_name": ("store name", "restaurant", "store"),
+    "item_name": ("item name", "item"),
+    "quantity": ("quantity", "item quantity"),
+    "amount": (
+        "total sales after adjustments (incl tax)",
+        "sales (incl tax)",
+        "total payout",
+        "item price",
+        "price",
+        "total",
+    ),
+}
+LINE_FIELDS = ["line_no", *COLUMN_ALIASES, "data"]
 
 
 @frappe.whitelist()
@@ -52,67 +90,330 @@ def create_report(report_type, store_ids, start_date, end_date):
     )
 
 
+def save_report_event(data):
+    """
+    Store an eats.report.success event and queue the download of its CSV.
+    Args:
+        data: Webhook payload
+    Returns:
+        str: Uber Eats Report name, None without a workflow_id
+    """
+    workflow_id = data.get("job_id") or data.get("workflow_id")
+    if not workflow_id:
+        frappe.log_error("Uber Eats Report", f"Report event without workflow_id: {data}")
+        return None
+
+    metadata = data.get("report_metadata") or {}
+    download_urls = [
+        unescape(section["download_url"])
+        for section in metadata.get("sections") or []
+        if section.get("download_url")
+    ]
+
+    values = {
+        "report_type": (data.get("report_type") or "").upper(),
+        "download_urls": json.dumps(download_urls),
+        "report_metadata": json.dumps(metadata),
+    }
+    existing = frappe.db.get_value(
+        REPORT_DOCTYPE, workflow_id, ["status", "download_attempts"], as_dict=True
+    )
+    if existing:
+        # redelivered event, keep the parsed lines unless the download failed
+        if existing.status != "Failed" or cint(existing.download_attempts) >= MAX_DOWNLOAD_ATTEMPTS:
+            return workflow_id
+        frappe.db.set_value(REPORT_DOCTYPE, workflow_id, {**values, "status": "Pending", "error": None})
+    else:
+        frappe.get_doc({
+            "doctype": REPORT_DOCTYPE,
+            "workflow_id": workflow_id,
+            "status": "Pending",
+            "received_at": now_datetime(),
+            **values,
+        }).insert(ignore_permissions=True)
+    frappe.db.commit()
+
+    enqueue_report_download(workflow_id)
+    return workflow_id
+
+
+def enqueue_report_download(workflow_id):
+    frappe.enqueue(
+        "excel_restaurant_pos.api.uber_eats.uber_eats_report.download_uber_eats_report",
+        queue="long",
+        job_id=f"uber_eats_report_download::{workflow_id}",
+        deduplicate=True,
+        workflow_id=workflow_id,
+    )
+
+
+def _stream_to_file(url, path):
+    """Download url to path in CHUNK_BYTES chunks, never holding the body in memory."""
+    with requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_BYTES):
+                f.write(chunk)
+
+
+def _attach_file(workflow_id, file_name):
+    file_url = f"/private/files/{file_name}"
+    if not frappe.db.exists("File", {"file_url": file_url, "attached_to_name": workflow_id}):
+        frappe.get_doc({
+            "doctype": "File",
+            "file_name": file_name,
+            "file_url": file_url,
+            "is_private": 1,
+            "attached_to_doctype": REPORT_DOCTYPE,
+            "attached_to_name": workflow_id,
+        }).insert(ignore_permissions=True)
+    return file_url
+
+
+def _column_map(header):
+    """
+    Resolve the CSV header to column indexes of the Report Line fields.
+    Returns:
+        dict: Report Line fieldname -> column index
+    """
+    positions = {name.strip().lower(): i for i, name in enumerate(header)}
+    columns = {}
+    for fieldname, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in positions:
+                columns[fieldname] = positions[alias]
+                break
+    return columns
+
+
+def _parse_date(value):
+    try:
+        return getdate(value) if value else None
+    except Exception:
+        return None
+
+
+def _line_row(standard, report, line_no, header, row, columns):
+    def cell(fieldname):
+        index = columns.get(fieldname)
+        return row[index].strip() if index is not None and index < len(row) else None
+
+    def number(fieldname):
+        return flt((cell(fieldname) or "").replace("$", "").replace(",", ""))
+
+    return (
+        frappe.generate_hash(length=10),
+        *standard,
+        report,
+        line_no,
+        cell("order_id"),
+        cell("display_id"),
+        _parse_date(cell("order_date")),
+        cell("order_status"),
+        cell("store_name"),
+        cell("item_name"),
+        number("quantity"),
+        number("amount"),
+        json.dumps(dict(zip(header, row))),
+    )
+
+
+def _parse_into_lines(workflow_id, path, first_line_no):
+    """
+    Parse one CSV section into Report Lines, LINE_BATCH_SIZE rows per insert.
+    Returns:
+        int: rows inserted
+    """
+    now, user = now_datetime(), frappe.session.user
+    standard = (now, now, user, user)
+    fields = ["name", "creation", "modified", "owner", "modified_by", "report", *LINE_FIELDS]
+    line_no = first_line_no
+    batch = []
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return 0
+        columns = _column_map(header)
+
+        for row in reader:
+            if not any(row):
+                continue
+            batch.append(_line_row(standard, workflow_id, line_no, header, row, columns))
+            line_no += 1
+            if len(batch) >= LINE_BATCH_SIZE:
+                frappe.db.bulk_insert(LINE_DOCTYPE, fields, batch)
+                batch = []
+
+    if batch:
+        frappe.db.bulk_insert(LINE_DOCTYPE, fields, batch)
+    return line_no - first_line_no
+
+
+def download_uber_eats_report(workflow_id):
+    """
+    Background job: download the CSV sections of a report and parse them.
+    Args:
+        workflow_id: Uber Eats Report name
+    """
+    report = frappe.db.get_value(
+        REPORT_DOCTYPE,
+        workflow_id,
+        ["status", "download_urls", "report_type", "download_attempts"],
+        as_dict=True,
+    )
+    if not report or report.status == "Parsed":
+        return
+
+    frappe.db.set_value(
+        REPORT_DOCTYPE,
+        workflow_id,
+        {"status": "Downloading", "download_attempts": cint(report.download_attempts) + 1},
+    )
+    frappe.db.commit()
+
+    try:
+        download_urls = json.loads(report.download_urls or "[]")
+        if not download_urls:
+            frappe.throw("No download URL found for this report")
+
+        # a retried job starts from scratch
+        frappe.db.delete(LINE_DOCTYPE, {"report": workflow_id})
+
+        row_count, file_urls = 0, []
+        for section, url in enumerate(download_urls):
+            file_name = f"{(report.report_type or 'report').lower()}_{workflow_id}_{section}.csv"
+            path = frappe.get_site_path("private", "files", file_name)
+            _stream_to_file(url, path)
+            file_urls.append(_attach_file(workflow_id, file_name))
+            row_count += _parse_into_lines(workflow_id, path, row_count + 1)
+
+        frappe.db.set_value(
+            REPORT_DOCTYPE,
+            workflow_id,
+            {"status": "Parsed", "row_count": row_count, "report_file": file_urls[0], "error": None},
+        )
+        frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.db.set_value(REPORT_DOCTYPE, workflow_id, {"status": "Failed", "error": str(e)[:1000]})
+        frappe.db.commit()
+        frappe.log_error(f"Report {workflow_id}: {str(e)}", "Uber Eats Report Download Error")
+
+
 @frappe.whitelist()
-def get_report_results(workflow_id=None, report_type=None):
-    """Get completed report results received via webhook.
+def get_report_results(workflow_id=None, report_type=None, limit=20):
+    """Get report results received via webhook.
 
-    If workflow_id is provided, fetches the CSV report and returns it as a
-    file download. Otherwise returns a list of all report results.
+    If workflow_id is provided and the report is parsed, returns its CSV
+    file as a download. Otherwise returns the stored reports.
 
     Args:
         workflow_id: Optional workflow_id — if provided, returns the CSV file
         report_type: Optional report_type to filter by
+        limit: Maximum number of reports listed
     """
-    filters = {
-        "reference_doctype": "ArcPOS Settings",
-        "reference_name": "ArcPOS Settings",
-        "comment_type": "Info",
-        "content": ["like", "%eats.report.success%"],
-    }
+    # get_all and the file read below bypass the doctype and File permissions
+    frappe.has_permission(REPORT_DOCTYPE, "read", throw=True)
+
+    if workflow_id:
+        report = frappe.db.get_value(
+            REPORT_DOCTYPE,
+            workflow_id,
+            ["workflow_id", "report_type", "status", "report_file", "row_count", "error"],
+            as_dict=True,
+        )
+        if not report:
+            frappe.throw(f"Report {workflow_id} not found", frappe.DoesNotExistError)
+        frappe.has_permission(REPORT_DOCTYPE, "read", doc=workflow_id, throw=True)
 
-    comments = frappe.get_all(
-        "Comment",
+        if report.status != "Parsed" or not report.report_file:
+            return report
+
+        file_path = frappe.get_site_path(report.report_file.lstrip("/"))
+        if not os.path.exists(file_path):
+            frappe.throw(f"Report file {report.report_file} is missing")
+
+        with open(file_path, "rb") as f:
+            frappe.local.response.filecontent = f.read()
+        frappe.local.response.filename = os.path.basename(file_path)
+        frappe.local.response.type = "download"
+        return
+
+    filters = {}
+    if report_type:
+        filters["report_type"] = report_type.upper()
+    return frappe.get_all(
+        REPORT_DOCTYPE,
         filters=filters,
-        fields=["content", "creation"],
-        order_by="creation desc",
-        limit=20,
+        fields=["workflow_id", "report_type", "status", "row_count", "received_at", "error"],
+        order_by="received_at desc",
+        limit=cint(limit) or 20,
     )
 
-    results = []
-    for c in comments:
-        try:
-            data = json.loads(c.content)
-        except (json.JSONDecodeError, TypeError):
-            continue
 
-        if workflow_id and data.get("workflow_id") != workflow_id:
-            continue
-        if report_type and data.get("report_type") != report_type.upper():
-            continue
+@frappe.whitelist()
+def retry_report_download(workflow_id):
+    """
+    Download a failed report again, e.g. after Uber redelivered fresh URLs.
+    Args:
+        workflow_id: Uber Eats Report name
+    """
+    frappe.only_for(["System Manager", "Accounts Manager"])
+    status = frappe.db.get_value(REPORT_DOCTYPE, workflow_id, "status")
+    if not status:
+        frappe.throw(f"Report {workflow_id} not found", frappe.DoesNotExistError)
+    if status != "Failed":
+        frappe.throw(f"Report {workflow_id} is {status}, only failed reports can be retried")
 
-        data["received_at"] = str(c.creation)
-        results.append(data)
+    frappe.db.set_value(REPORT_DOCTYPE, workflow_id, {"status": "Pending", "error": None})
+    frappe.db.commit()
+    enqueue_report_download(workflow_id)
+    return {"queued": True}
 
-    # If workflow_id provided and we found a match, return the CSV file
-    if workflow_id and results:
-        download_urls = results[0].get("download_urls", [])
-        if not download_urls:
-            frappe.throw("No download URL found for this report")
 
-        url = unescape(download_urls[0])
-        response = requests.get(url, timeout=60)
+@frappe.whitelist()
+def get_report_reconciliation(workflow_id, mismatches_only=0):
+    """
+    Reconcile the orders of a parsed report with Channel Orders and Sales Invoices.
+    Args:
+        workflow_id: Uber Eats Report name
+        mismatches_only: Only return orders without invoice or with a different total
+    Returns:
+        list: one row per report order with the report amount, Channel Order and invoice
+    """
+    # the query reads the report lines and invoice totals without permission checks
+    frappe.has_permission(REPORT_DOCTYPE, "read", doc=workflow_id, throw=True)
+    frappe.has_permission("Sales Invoice", "read", throw=True)
 
-        if response.status_code != 200:
-            frappe.throw(
-                f"Failed to download report: {response.status_code} - {response.text}"
-            )
+    rows = frappe.db.sql(
+        """
+        SELECT
+            l.order_id,
+            MAX(l.display_id) AS display_id,
+            SUM(l.amount) AS report_amount,
+            co.name AS channel_order,
+            co.current_state,
+            si.name AS sales_invoice,
+            si.grand_total,
+            si.docstatus
+        FROM `tabUber Eats Report Line` l
+        LEFT JOIN `tabChannel Order` co ON co.order_id = l.order_id
+        LEFT JOIN `tabSales Invoice` si ON si.name = co.sales_invoice
+        WHERE l.report = %s
+            AND IFNULL(l.order_id, '') != ''
+        GROUP BY l.order_id, co.name, co.current_state, si.name, si.grand_total, si.docstatus
+        ORDER BY l.order_id
+        """,
+        (workflow_id,),
+        as_dict=True,
+    )
 
-        frappe.response["type"] = "csv"
-        frappe.response["doctype"] = "Uber Eats Report"
-        frappe.response["result"] = response.text
-        frappe.response["filename"] = (
-            f"{results[0].get('report_type', 'report')}_{workflow_id}.csv"
-        )
-        return
+    for row in rows:
+        row.difference = flt(row.report_amount) - flt(row.grand_total)
+        row.matched = bool(row.sales_invoice) and abs(row.difference) < 0.01
 
-    return results
+    if cint(mismatches_only):
+        return [row for row in rows if not row.matched]
+    return rows
@@ -28,23 +28,8 @@ def validate():
     token = parts[1]
 
     try:
-        # Import here to avoid circular imports
-        from excel_restaurant_pos.utils.jwt_auth import verify_token
-
-        # Verify token and get user
-        payload = verify_token(token, token_type="access")
-        user = payload.get("user")
-
-        if not user:
-            raise frappe.AuthenticationError(_("Invalid token payload"))
-
-        # Validate user exists and is enabled
-        if not frappe.db.exists("User", user):
-            raise frappe.AuthenticationError(_("User does not exist"))
-
-        user_doc = frappe.get_cached_doc("User", user)
-        if user_doc.enabled == 0:
-            raise frappe.AuthenticationError(_("User is disabled"))
+        user_doc = authenticate_token(token)
+        user = user_doc.name
 
         # Set user directly in session without calling frappe.set_user()
         # frappe.set_user() clears form_dict, which would remove query parameters
@@ -65,3 +50,34 @@ def validate():
         frappe.log_error(f"JWT validation error: {str(e)}", "JWT Auth Error")
         # Let Frappe's default auth handle it
         pass
+
+
+def authenticate_token(token):
+    """
+    Verify a bearer access token and get its enabled user.
+    Uses only the JWT secret, Redis and the document cache, no database query.
+
+    Returns:
+        User document (cached)
+    """
+    # Import here to avoid circular imports
+    from excel_restaurant_pos.utils.jwt_auth import verify_token
+
+    # Verify token and get user
+    payload = verify_token(token, token_type="access")
+    user = payload.get("user")
+
+    if not user:
+        raise frappe.AuthenticationError(_("Invalid token payload"))
+
+    # Validate user exists and is enabled (from the document cache)
+    try:
+        user_doc = frappe.get_cached_doc("User", user)
+    except frappe.DoesNotExistError:
+        frappe.clear_last_message()
+        raise frappe.AuthenticationError(_("User does not exist"))
+
+    if user_doc.enabled == 0:
+        raise frappe.AuthenticationError(_("User is disabled"))
+
+    return user_doc
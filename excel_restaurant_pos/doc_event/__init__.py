@@ -18,14 +18,76 @@ __all__ = [
 custom_doc_events = {
     "Sales Invoice": {
         "on_submit": "excel_restaurant_pos.doc_event.sales_invoice.submit_sales_invoice",
+        "on_cancel": "excel_restaurant_pos.doc_event.sales_invoice.cancel_sales_invoice",
         "on_trash": "excel_restaurant_pos.doc_event.sales_invoice.on_trash_sales_invoice",
         "on_change": "excel_restaurant_pos.doc_event.sales_invoice.change_sales_invoice",
         "on_update": "excel_restaurant_pos.doc_event.sales_invoice.on_update_sales_invoice",
         "on_update_after_submit": "excel_restaurant_pos.doc_event.sales_invoice.on_update_sales_invoice",
-        "after_insert": "excel_restaurant_pos.doc_event.sales_invoice.after_save_sales_invoice",
-        "before_insert": "excel_restaurant_pos.doc_event.sales_invoice.before_insert_sales_invoice",
+        "after_insert": [
+            "excel_restaurant_pos.doc_event.sales_invoice.after_save_sales_invoice",
+            "excel_restaurant_pos.api.uber_eats.uber_eats_invoices.link_channel_order",
+        ],
+        "before_insert": [
+            "excel_restaurant_pos.doc_event.sales_invoice.before_insert_sales_invoice",
+            "excel_restaurant_pos.api.uber_eats.uber_eats_invoices.link_invoice",
+        ],
+    },
+    "POS Invoice": {
+        "on_submit": "excel_restaurant_pos.doc_event.pos_invoice.submit_pos_invoice",
+        "on_cancel": "excel_restaurant_pos.doc_event.pos_invoice.cancel_pos_invoice",
+    },
+    "Payment Entry": {
+        "on_submit": "excel_restaurant_pos.api.report.report_engine.invalidate_report_cache",
+        "on_cancel": "excel_restaurant_pos.api.report.report_engine.invalidate_report_cache",
+    },
+    "Journal Entry": {
+        "on_submit": "excel_restaurant_pos.api.report.report_engine.invalidate_report_cache",
+        "on_cancel": "excel_restaurant_pos.api.report.report_engine.invalidate_report_cache",
+    },
+    "GL Entry": {
+        "on_submit": [
+            "excel_restaurant_pos.shared.gl_balance.invalidate_gl_balance_checkpoints",
+            "excel_restaurant_pos.shared.cash_position.update_cash_position",
+            "excel_restaurant_pos.api.report.report_engine.invalidate_ledger_reports",
+        ],
+    },
+    "*": {
+        # cancelling marks the original GL Entries is_cancelled without a doc event
+        "on_cancel": "excel_restaurant_pos.api.report.report_engine.invalidate_ledger_reports",
+    },
+    "ArcPOS Settings": {
+        "on_update": [
+            "excel_restaurant_pos.shared.arcpos_settings.invalidate_settings_cache",
+            "excel_restaurant_pos.shared.arcpos_settings.invalidate_settings_bootstrap",
+        ],
+    },
+    "ArcPOS System Settings": {
+        "on_update": "excel_restaurant_pos.shared.arcpos_settings.invalidate_settings_cache",
+    },
+    "Restaurant Settings": {
+        "on_update": "excel_restaurant_pos.shared.arcpos_settings.invalidate_settings_cache",
     },
     "Sales Taxes and Charges Template": {
-        "on_update": "excel_restaurant_pos.doc_event.on_doctype_update",
+        "on_update": [
+            "excel_restaurant_pos.doc_event.on_doctype_update",
+            "excel_restaurant_pos.shared.arcpos_settings.invalidate_settings_bootstrap",
+        ],
+    },
+    "Customer": {
+        "on_update": "excel_restaurant_pos.shared.arcpos_settings.invalidate_settings_bootstrap",
+    },
+    "Company": {
+        "on_update": "excel_restaurant_pos.shared.arcpos_settings.invalidate_settings_bootstrap",
+    },
+    "Currency": {
+        "on_update": "excel_restaurant_pos.shared.arcpos_settings.invalidate_settings_bootstrap",
+    },
+    "Menus": {
+        "on_update": "excel_restaurant_pos.doc_event.menus.on_update_menus",
+        "after_delete": "excel_restaurant_pos.doc_event.menus.after_delete_menus",
+    },
+    "Item Price": {
+        "on_update": "excel_restaurant_pos.api.meta.queue_item_price_sync",
+        "on_trash": "excel_restaurant_pos.api.meta.queue_item_price_sync",
     },
 }
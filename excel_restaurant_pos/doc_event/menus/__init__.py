@@ -0,0 +1,3 @@
+from .menus import on_update_menus, after_delete_menus
+
+__all__ = ["on_update_menus", "after_delete_menus"]
@@ -0,0 +1,25 @@
+"""Document event handlers for Menus."""
+
+from excel_restaurant_pos.shared.menu import refresh_menu_entry
+
+
+def on_update_menus(doc, method: str):
+    """
+    Refresh the cached menu snapshot entry of the saved menu.
+    Menu Availability rows are saved with their parent, so this also covers
+    availability changes.
+    Args:
+        doc: The Menus document.
+        method: The method being called.
+    """
+    refresh_menu_entry(doc.name)
+
+
+def after_delete_menus(doc, method: str):
+    """
+    Drop the deleted menu from the cached menu snapshot.
+    Args:
+        doc: The Menus document.
+        method: The method being called.
+    """
+    refresh_menu_entry(doc.name)
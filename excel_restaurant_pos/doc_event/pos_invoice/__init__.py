@@ -1,3 +1,4 @@
 from .pos_invoice import create_pos_invoice
+from .pos_invoice_rollup import submit_pos_invoice, cancel_pos_invoice
 
-__all__ = ["create_pos_invoice"]
+__all__ = ["create_pos_invoice", "submit_pos_invoice", "cancel_pos_invoice"]
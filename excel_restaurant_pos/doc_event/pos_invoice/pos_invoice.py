@@ -1,5 +1,7 @@
 import frappe
 
+from excel_restaurant_pos.shared.arcpos_settings import restaurant_settings
+
 
 @frappe.whitelist(allow_guest=True)
 def create_pos_invoice(data, method=None):
@@ -10,8 +12,7 @@ def create_pos_invoice(data, method=None):
         # Parse the incoming data
         if isinstance(data, str):
             data = frappe.parse_json(data)  # Ensure data is a dictionary
-        get_restaurant_settings = frappe.get_doc("Restaurant Settings")
-        tax_template_name = get_restaurant_settings.taxes_and_charges_template
+        tax_template_name = restaurant_settings().taxes_and_charges_template
         tax_template = frappe.get_doc(
             "Sales Taxes and Charges Template", tax_template_name
         )
@@ -0,0 +1,13 @@
+"""Sales rollup updates for POS Invoice submission and cancellation."""
+
+from excel_restaurant_pos.shared.sales_rollup import update_sales_rollup
+
+
+def submit_pos_invoice(doc, method: str):
+    """Add the submitted POS Invoice to the sales rollup."""
+    update_sales_rollup(doc)
+
+
+def cancel_pos_invoice(doc, method: str):
+    """Remove the cancelled POS Invoice from the sales rollup."""
+    update_sales_rollup(doc, sign=-1)
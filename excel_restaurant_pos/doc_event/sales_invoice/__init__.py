@@ -1,4 +1,5 @@
 from .submit_sales_invoice import submit_sales_invoice
+from .cancel_sales_invoice import cancel_sales_invoice
 from .change_sales_invoice import change_sales_invoice
 from .after_save_sales_invoice import after_save_sales_invoice
 from .on_trash_sales_invoice import on_trash_sales_invoice
@@ -8,6 +9,7 @@ from .on_update_sales_invoice import on_update_sales_invoice
 
 __all__ = [
     "submit_sales_invoice",
+    "cancel_sales_invoice",
     "change_sales_invoice",
     "after_save_sales_invoice",
     "on_trash_sales_invoice",
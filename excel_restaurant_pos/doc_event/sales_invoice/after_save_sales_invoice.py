@@ -4,6 +4,7 @@ import frappe
 from frappe.utils import flt
 
 from excel_restaurant_pos.doc_event.shared import handle_table_occupy
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
 from excel_restaurant_pos.shared.delivery_charge import get_delivery_charge
 
 
@@ -26,7 +27,7 @@ def check_delivery_and_charges_fraudulency(doc, method: str):
     """
 
     s_type = doc.get("custom_service_type", "")
-    allow_delivery_charge = frappe.db.get_single_value("ArcPOS Settings", "allow_delivery_charge")
+    allow_delivery_charge = arcpos_settings().allow_delivery_charge
 
     # if service type is not delivery, return
     if s_type != "Delivery":
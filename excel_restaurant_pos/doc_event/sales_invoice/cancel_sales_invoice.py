@@ -0,0 +1,18 @@
+"""Document event handlers for Sales Invoice cancellation."""
+
+from excel_restaurant_pos.api.report.report_engine import invalidate_report_cache
+from excel_restaurant_pos.shared.sales_rollup import update_sales_rollup
+
+
+def cancel_sales_invoice(doc, method: str):
+    """
+    Cancel Sales Invoice
+    Args:
+        doc: The Sales Invoice document.
+        method: The method being called.
+    tasks:
+        Remove the invoice from the sales rollup
+        Drop cached reports covering the posting date
+    """
+    update_sales_rollup(doc, sign=-1)
+    invalidate_report_cache(doc)
@@ -14,6 +14,7 @@ from .handlers.change_delete_handler import change_delete_handler
 from .handlers.delayed_order_status_handler import delayed_order_status_handler
 from .handlers.create_promotion_journal import create_promotion_journal
 from .handlers.uber_eats_status_handler import uber_eats_status_handler
+from excel_restaurant_pos.shared.kitchen_feed import publish_sales_invoice_update
 
 
 def change_sales_invoice(doc, method: str):
@@ -56,6 +57,9 @@ def change_sales_invoice(doc, method: str):
     if doc.has_value_changed("custom_is_deleted") and is_deleted:
         frappe.enqueue(change_delete_handler, queue="short", invoice_name=doc.name)
 
+    # kitchen display feed
+    publish_sales_invoice_update(doc)
+
     # Uber Eats status sync
     order_from = (doc.get("custom_order_from") or "").lower()
     if doc.has_value_changed("custom_order_status") and order_from == "ubereats":
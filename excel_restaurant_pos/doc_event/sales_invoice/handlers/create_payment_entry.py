@@ -40,6 +40,8 @@ def create_payment_entry(sales_invoice, payments=None):
         payment_entry.party_type = "Customer"
         payment_entry.party = doc.customer
         payment_entry.company = doc.company
+        # the cash moves through the drawer of the counter that took the order
+        payment_entry.custom_pos_counter = doc.get("custom_pos_counter")
 
         payment_entry.paid_from = receivable_account
         payment_entry.paid_to = account
@@ -1,6 +1,8 @@
 import frappe
 from frappe.utils import nowdate
 
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
+
 
 def create_promotion_journal(invoice_name: str) -> str:
     """
@@ -45,22 +47,24 @@ def create_promotion_journal(invoice_name: str) -> str:
         frappe.log_error("Charge amount isn't less than actual delivery amount", msg)
         return
 
+    settings = arcpos_settings()
+
     # default dc account
-    dc_account = frappe.db.get_single_value("ArcPOS Settings", "default_dc_account")
+    dc_account = settings.default_dc_account
     if not dc_account:
         msg = f"Default DC account not found in ArcPOS Settings"
         frappe.log_error("Default DC account not found", msg)
         return
 
     # dc against account
-    dc_against = frappe.db.get_single_value("ArcPOS Settings", "dc_against_account")
+    dc_against = settings.dc_against_account
     if not dc_against:
         msg = f"DC against account not found in ArcPOS Settings"
         frappe.log_error("DC against account not found", msg)
         return
 
     # get default company
-    company = frappe.db.get_single_value("ArcPOS Settings", "company")
+    company = settings.company
     if not company:
         msg = f"Company not found in ArcPOS Settings"
         frappe.log_error("Company not found", msg)
@@ -2,6 +2,7 @@
 
 # pylint: disable=invalid-name
 import frappe
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
 from excel_restaurant_pos.excel_restaurant_pos.notification.utils import (
     get_customer_primary_email,
 )
@@ -13,10 +14,9 @@ def customer_change_handler(doc):
     Args:
         context: Dictionary containing the document context
     """
-    default_customer = frappe.db.get_single_value("ArcPOS Settings", "customer")
-    d_web_customer = frappe.db.get_single_value(
-        "ArcPOS Settings", "default_customer_website"
-    )
+    settings = arcpos_settings()
+    default_customer = settings.customer
+    d_web_customer = settings.default_customer_website
 
     # define the primary email
     primary_email = None
@@ -0,0 +1,165 @@
+"""
+Compiled matcher for the ArcPOS Settings role_wise_permission rules.
+
+The comma separated rule conditions are parsed once into frozensets and the
+compiled rules are cached per process for each ArcPOS Settings `modified`, so
+matching an invoice against every rule is a single pass of set lookups.
+"""
+
+from typing import NamedTuple
+
+import frappe
+
+from excel_restaurant_pos.shared.arcpos_settings import get_settings_doc
+
+# rule condition field -> Sales Invoice field
+RULE_CONDITIONS = {
+    "if_order_from": "custom_order_from",
+    "if_order_status": "custom_order_status",
+    "if_service_type": "custom_service_type",
+    "if_order_type": "custom_order_type",
+    "if_order_schedule_type": "custom_order_schedule_type",
+}
+
+_compiled_cache = {}
+
+
+class CompiledRule(NamedTuple):
+    """A notification rule with its conditions parsed into sets."""
+
+    role: str
+    # (invoice field, allowed values) for every condition that is set
+    conditions: tuple
+    schedule_types: frozenset
+    new_order_item_only: bool
+
+
+def _split(value):
+    """Parse a comma separated rule value into a frozenset."""
+    return frozenset(x.strip() for x in (value or "").split(",") if x.strip())
+
+
+def compile_rule(rule):
+    """
+    Compile one role_wise_permission row (document or dict).
+    Returns:
+        CompiledRule or None when the rule has no role
+    """
+    role = rule.get("if_role")
+    if not role:
+        return None
+
+    conditions = []
+    for rule_field, doc_field in RULE_CONDITIONS.items():
+        allowed = _split(rule.get(rule_field))
+        if allowed:
+            conditions.append((doc_field, allowed))
+
+    return CompiledRule(
+        role=role,
+        conditions=tuple(conditions),
+        schedule_types=_split(rule.get("if_order_schedule_type")),
+        new_order_item_only=bool(rule.get("item_is_new_order_item")),
+    )
+
+
+def compile_rules(rules):
+    """Compile a list of rules, dropping the ones without a role."""
+    compiled = (compile_rule(rule) for rule in rules or [])
+    return tuple(rule for rule in compiled if rule)
+
+
+def get_compiled_rules(settings=None):
+    """
+    Get the compiled rules of ArcPOS Settings, cached per settings `modified`.
+    Args:
+        settings: Loaded ArcPOS Settings document, fetched when not given
+    """
+    settings = settings or get_settings_doc("ArcPOS Settings")
+
+    cache_key = (frappe.local.site, str(settings.modified))
+    compiled = _compiled_cache.get(cache_key)
+    if compiled is None:
+        compiled = compile_rules(settings.role_wise_permission)
+        _compiled_cache.clear()
+        _compiled_cache[cache_key] = compiled
+    return compiled
+
+
+def _has_new_order_item(doc):
+    """Check whether any invoice item is flagged as newly ordered."""
+    for item in doc.get("items") or []:
+        value = item.get("custom_new_ordered_item") if hasattr(item, "get") else getattr(item, "custom_new_ordered_item", 0)
+        if value == 1 or value is True:
+            return True
+    return False
+
+
+def match_roles(doc, rules):
+    """
+    Match an invoice against all compiled rules in one pass.
+    Args:
+        doc: Sales Invoice document or dict
+        rules: Compiled rules
+    Returns:
+        list: Matched roles in rule order without duplicates
+    """
+    values = {field: doc.get(field) or "" for field in RULE_CONDITIONS.values()}
+    has_new_item = None
+
+    roles = []
+    for rule in rules:
+        if rule.role in roles:
+            continue
+        if any(values[field] not in allowed for field, allowed in rule.conditions):
+            continue
+        if rule.new_order_item_only:
+            if has_new_item is None:
+                has_new_item = _has_new_order_item(doc)
+            if not has_new_item:
+                continue
+        roles.append(rule.role)
+    return roles
+
+
+def match_scheduled_reminder_roles(doc, rules):
+    """
+    Match the rules used for the 30 minute scheduled order reminder.
+    Only rules listing "Scheduled Later" are used and the schedule type and new
+    item conditions are not checked against the invoice.
+    """
+    roles = []
+    for rule in rules:
+        if rule.role in roles or "Scheduled Later" not in rule.schedule_types:
+            continue
+        if any(
+            (doc.get(field) or "") not in allowed
+            for field, allowed in rule.conditions
+            if field != "custom_order_schedule_type"
+        ):
+            continue
+        roles.append(rule.role)
+    return roles
+
+
+@frappe.whitelist()
+def get_notified_roles(
+    order_from=None,
+    order_status=None,
+    service_type=None,
+    order_type=None,
+    order_schedule_type=None,
+    has_new_order_item=0,
+):
+    """
+    Get the roles that would be notified for an order with the given values.
+    """
+    doc = frappe._dict(
+        custom_order_from=order_from,
+        custom_order_status=order_status,
+        custom_service_type=service_type,
+        custom_order_type=order_type,
+        custom_order_schedule_type=order_schedule_type,
+        items=[{"custom_new_ordered_item": 1}] if frappe.utils.cint(has_new_order_item) else [],
+    )
+    return match_roles(doc, get_compiled_rules())
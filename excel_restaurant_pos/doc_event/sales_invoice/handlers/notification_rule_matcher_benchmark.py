@@ -0,0 +1,97 @@
+"""
+Benchmark of the compiled notification rule matcher.
+
+Run with:
+    bench --site <site> execute excel_restaurant_pos.doc_event.sales_invoice.handlers.notification_rule_matcher_benchmark.benchmark_matcher
+
+Matches random invoices against random rules once with the legacy per-rule
+should_send_notification and once with the compiled matcher, and checks that
+both give the same roles.
+"""
+
+import contextlib
+import io
+import random
+import time
+
+import frappe
+
+from .notification_rule_matcher import compile_rules, match_roles
+
+
+def benchmark_matcher(count=10000, seed=42):
+    """
+    Compare the legacy per-rule matcher with the compiled matcher.
+
+    Args:
+        count: Invoices to match
+        seed: Random seed of the rules and invoices
+
+    Returns:
+        dict: timings of both matchers and whether their results match
+    """
+    from excel_restaurant_pos.doc_event.sales_invoice.on_update_sales_invoice import (
+        should_send_notification,
+    )
+
+    rng = random.Random(seed)
+    order_from = ["Website", "Table", "POS", "UberEats", "Kiosk"]
+    statuses = ["Open", "Accepted", "In kitchen", "Ready to Pickup", "Delivered", "Closed"]
+    service_types = ["Dine-in", "Pickup", "Delivery"]
+    order_types = ["Regular", "Catering"]
+    schedule_types = ["Now", "Scheduled Later"]
+
+    def sample(values):
+        return ", ".join(rng.sample(values, rng.randint(0, 2)))
+
+    rules = [
+        frappe._dict(
+            if_role=f"Role {i % 5}",
+            if_order_from=sample(order_from),
+            if_order_status=sample(statuses),
+            if_service_type=sample(service_types),
+            if_order_type=sample(order_types),
+            if_order_schedule_type=sample(schedule_types),
+            item_is_new_order_item=rng.random() < 0.2,
+        )
+        for i in range(12)
+    ]
+    invoices = [
+        frappe._dict(
+            custom_order_from=rng.choice(order_from),
+            custom_order_status=rng.choice(statuses),
+            custom_service_type=rng.choice(service_types),
+            custom_order_type=rng.choice(order_types),
+            custom_order_schedule_type=rng.choice(schedule_types),
+            items=[frappe._dict(item_code=f"ITEM-{j}", custom_new_ordered_item=rng.randint(0, 1)) for j in range(5)],
+        )
+        for _ in range(int(count))
+    ]
+
+    # the legacy matcher prints per condition, keep that out of the timing output
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        legacy = []
+        for invoice in invoices:
+            roles = []
+            for rule in rules:
+                if should_send_notification(invoice, rule) and rule.if_role not in roles:
+                    roles.append(rule.if_role)
+            legacy.append(roles)
+        legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled_rules = compile_rules(rules)
+    compiled = [match_roles(invoice, compiled_rules) for invoice in invoices]
+    compiled_seconds = time.perf_counter() - start
+
+    result = {
+        "invoices": len(invoices),
+        "rules": len(rules),
+        "legacy_seconds": round(legacy_seconds, 4),
+        "compiled_seconds": round(compiled_seconds, 4),
+        "speedup": round(legacy_seconds / compiled_seconds, 1) if compiled_seconds else None,
+        "results_match": legacy == compiled,
+    }
+    print(result)
+    return result
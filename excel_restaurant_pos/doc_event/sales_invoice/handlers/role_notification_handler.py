@@ -0,0 +1,127 @@
+"""
+Role fan-out for Sales Invoice notifications.
+
+Resolves the users of all matched roles at once, writes their Notification
+Logs in the job's transaction and queues the Expo pushes for all of their tokens on
+the push outbox.
+"""
+
+import frappe
+from frappe.utils import add_to_date, now_datetime
+
+from excel_restaurant_pos.shared.push_notification import queue_push_to_users
+
+RECENT_NOTIFICATION_SECONDS = 30
+
+
+def send_notification_to_roles(doc, roles, title, body, push_data, subject_dedup=False):
+    """
+    Send system and push notifications to every user holding one of the roles.
+
+    Args:
+        doc: Sales Invoice document
+        roles: Iterable of role names
+        title: Notification title
+        body: Notification body
+        push_data: Data payload attached to the push messages
+        subject_dedup: Only skip users who got a notification with the same
+            title recently (instead of any notification for the invoice)
+
+    Returns:
+        dict: Counts of users, system notifications and pushes queued
+    """
+    result = {"users": 0, "system": 0, "push": 0}
+
+    users = get_users_for_roles(roles)
+    result["users"] = len(users)
+    if not users:
+        frappe.log_error(
+            f"No users found with roles: {sorted(roles)}",
+            "Push Notification - No Users"
+        )
+        return result
+
+    # skip users notified about this invoice in the last few seconds
+    recent = get_recently_notified_users(doc.name, users, title if subject_dedup else None)
+    users_to_notify = [user for user in users if user not in recent]
+    if not users_to_notify:
+        return result
+
+    insert_notification_logs(doc.name, users_to_notify, title, body)
+    result["system"] = len(users_to_notify)
+
+    for user in users_to_notify:
+        frappe.publish_realtime(
+            "sales_invoice_notification_" + user,
+            data={
+                "title": title,
+                "body": body,
+                "document_type": "Sales Invoice",
+                "document_name": doc.name,
+            },
+            after_commit=True,
+        )
+
+    result["push"] = queue_push_to_users(
+        users_to_notify, title, body, data=push_data, source="Sales Invoice"
+    )
+
+    frappe.logger("push_notification").info(
+        f"Role fan-out for {doc.name}: roles={sorted(roles)}, result={result}"
+    )
+    return result
+
+
+def get_users_for_roles(roles):
+    """Get the distinct users holding any of the roles."""
+    roles = list(set(roles or []))
+    if not roles:
+        return []
+
+    return frappe.db.sql_list(
+        """
+        SELECT DISTINCT hr.parent
+        FROM `tabHas Role` hr
+        WHERE hr.role IN %(roles)s
+        AND hr.parenttype = 'User'
+        AND hr.parent NOT IN ('Administrator', 'Guest')
+        """,
+        {"roles": roles},
+    )
+
+
+def get_recently_notified_users(document_name, users, subject=None):
+    """Get users that already received a notification for the invoice recently."""
+    since = add_to_date(now_datetime(), seconds=-RECENT_NOTIFICATION_SECONDS)
+    filters = {
+        "for_user": ["in", users],
+        "document_type": "Sales Invoice",
+        "document_name": document_name,
+        "creation": [">=", since],
+    }
+    if subject:
+        filters["subject"] = subject
+
+    return set(frappe.get_all("Notification Log", filters=filters, pluck="for_user"))
+
+
+def insert_notification_logs(document_name, users, title, body):
+    """
+    Insert one Notification Log per user.
+
+    Inserted as documents so NotificationLog.after_insert still publishes the
+    realtime notification, marks the bell as unseen and sends the email.
+    """
+    from_user = frappe.session.user or "Administrator"
+    for user in users:
+        frappe.get_doc({
+            "doctype": "Notification Log",
+            "for_user": user,
+            "from_user": from_user,
+            "subject": title,
+            "email_content": body,
+            "document_type": "Sales Invoice",
+            "document_name": document_name,
+            "type": "Alert",
+            "read": 0,
+        }).insert(ignore_permissions=True)
@@ -5,26 +5,56 @@ custom_order_status changed, this handler calls the appropriate
 Uber Eats API endpoint.
 """
 
-import re
-
 import frappe
 from excel_restaurant_pos.api.uber_eats.uber_eats_api import deny_order
+from excel_restaurant_pos.api.uber_eats.uber_eats_invoices import (
+    SYNCED_STATES,
+    get_invoice_uber_order_id,
+    is_uber_eats_invoice,
+)
 
 
-def _extract_uber_eats_order_id(remarks):
-    """Extract Uber Eats order ID from invoice remarks.
+def sync_invoice_status(invoice_name, order_id, custom_order_status):
+    """Push one invoice status to Uber Eats and record it on the Channel Order.
 
     Args:
-        remarks: Sales Invoice remarks field
+        invoice_name: Name of the Sales Invoice
+        order_id: Uber Eats order UUID
+        custom_order_status: Invoice order status
 
     Returns:
-        Uber Eats order UUID or None
+        True if Uber Eats is up to date
     """
-    if not remarks:
-        return None
+    order_status = (custom_order_status or "").lower()
+
+    try:
+        if order_status == "rejected":
+            deny_order(
+                order_id,
+                reason_code="CAPACITY",
+                explanation="Order rejected by restaurant",
+            )
+            frappe.logger().info(
+                f"Uber Eats order {order_id} denied (invoice {invoice_name})"
+            )
+        else:
+            frappe.logger().info(
+                f"Uber Eats status '{order_status}' for order {order_id} - no API action needed"
+            )
+            return True
+
+    except Exception as e:
+        frappe.log_error(
+            "Uber Eats Status Sync Error",
+            f"Order {order_id}, Invoice {invoice_name}, Status {order_status}: {e}",
+        )
+        return False
 
-    match = re.search(r"uber_eats_order_id:([a-f0-9-]+)", remarks)
-    return match.group(1) if match else None
+    frappe.db.set_value(
+        "Channel Order", {"order_id": order_id}, "current_state", SYNCED_STATES[order_status]
+    )
+    frappe.db.commit()
+    return True
 
 
 def uber_eats_status_handler(invoice_name):
@@ -36,13 +66,18 @@ def uber_eats_status_handler(invoice_name):
     Args:
         invoice_name: Name of the Sales Invoice
     """
-    invoice = frappe.get_doc("Sales Invoice", invoice_name)
+    invoice = frappe.db.get_value(
+        "Sales Invoice",
+        invoice_name,
+        ["name", "custom_order_from", "custom_order_status", "custom_channel_order", "remarks"],
+        as_dict=True,
+    )
 
     # Only handle UberEats orders
-    if invoice.custom_order_from != "UberEats":
+    if not invoice or not is_uber_eats_invoice(invoice):
         return
 
-    order_id = _extract_uber_eats_order_id(invoice.remarks)
+    order_id = get_invoice_uber_order_id(invoice)
     if not order_id:
         frappe.log_error(
             "Uber Eats Status Sync",
@@ -50,25 +85,4 @@ def uber_eats_status_handler(invoice_name):
         )
         return
 
-    order_status = (invoice.custom_order_status or "").lower()
-
-    try:
-        if order_status == "rejected":
-            deny_order(
-                order_id,
-                reason_code="CAPACITY",
-                explanation="Order rejected by restaurant",
-            )
-            frappe.logger().info(
-                f"Uber Eats order {order_id} denied (invoice {invoice_name})"
-            )
-        else:
-            frappe.logger().info(
-                f"Uber Eats status '{order_status}' for order {order_id} - no API action needed"
-            )
-
-    except Exception as e:
-        frappe.log_error(
-            "Uber Eats Status Sync Error",
-            f"Order {order_id}, Invoice {invoice_name}, Status {order_status}: {e}",
-        )
+    sync_invoice_status(invoice_name, order_id, invoice.custom_order_status)
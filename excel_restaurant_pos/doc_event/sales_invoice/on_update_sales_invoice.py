@@ -1,8 +1,20 @@
 """Document event handlers for Sales Invoice on_update event."""
 
+from functools import partial
+
 import frappe
 from frappe import _
-from frappe.utils import now_datetime, add_to_date, getdate, get_datetime
+from frappe.utils import now_datetime, getdate, get_datetime
+
+from excel_restaurant_pos.shared.arcpos_settings import get_settings_doc
+from excel_restaurant_pos.utils.delayed_jobs import schedule_job
+
+from .handlers.role_notification_handler import send_notification_to_roles
+from .handlers.notification_rule_matcher import (
+    get_compiled_rules,
+    match_roles,
+    match_scheduled_reminder_roles,
+)
 
 
 def on_update_sales_invoice(doc, method: str):
@@ -18,7 +30,7 @@ def on_update_sales_invoice(doc, method: str):
     try:
         # Send Delivery or Pickup Notification
         # Get ArcPOS Settings
-        settings = frappe.get_doc("ArcPOS Settings", "ArcPOS Settings")
+        settings = get_settings_doc("ArcPOS Settings")
         print("\n\n Duration : ", settings.send_email_after_delivery, "\n\n\n")
         template = settings.delivery_or_pickup_template
 
@@ -42,18 +54,19 @@ def on_update_sales_invoice(doc, method: str):
             print("Order Status ",order_status,"Delay (seconds): ", delay_seconds)
             if should_send:
                 if delay_seconds and delay_seconds > 0:
-                    # Schedule notification with delay (sleep in background worker)
+                    # Park the job in the delayed job set, no worker waits for it
                     print(f"\n\n Scheduling delayed notification ({delay_seconds}s) \n\n")
-                    frappe.enqueue(
-                        send_delivery_pickup_notification,
-                        queue="short",
-                        timeout=max(300, delay_seconds + 120),
-                        enqueue_after_commit=True,
-                        at_front=False,
-                        job_id=f"delivery_pickup_notification_{doc.name}",
-                        sales_invoice_name=doc.name,
-                        template_name=template,
-                        delay_seconds=delay_seconds
+                    frappe.db.after_commit.add(
+                        partial(
+                            schedule_job,
+                            send_delivery_pickup_notification,
+                            delay_seconds=delay_seconds,
+                            job_id=f"delivery_pickup_notification_{doc.name}",
+                            queue="short",
+                            timeout=300,
+                            sales_invoice_name=doc.name,
+                            template_name=template,
+                        )
                     )
                     print(f"Scheduled delivery/pickup notification for {doc.name} after {delay_seconds} seconds")
                 else:
@@ -85,16 +98,7 @@ def on_update_sales_invoice(doc, method: str):
         # Mark as processing with 5 second TTL (short window to catch duplicate hook triggers)
         frappe.cache().set_value(cache_key, True, expires_in_sec=5)
 
-        # Check if ArcPOS Settings exists
         print("\n\n on_update_sales_invoice called \n\n")
-        if not frappe.db.exists("ArcPOS Settings", "ArcPOS Settings"):
-            frappe.log_error(
-                "ArcPOS Settings not found",
-                "Push Notification - Settings Missing"
-            )
-            return
-
-        
 
         # Check if there are any notification rules configured
         if not settings.role_wise_permission:
@@ -111,35 +115,26 @@ def on_update_sales_invoice(doc, method: str):
         print(f"Service Type: {doc.get('custom_service_type')}")
         print(f"Order Type: {doc.get('custom_order_type')}")
 
-        # Process each notification rule
-        matched_rules = 0
-        for rule in settings.role_wise_permission:
-            if should_send_notification(doc, rule):
-                matched_rules += 1
-                print(f"Rule matched for role: {rule.if_role}")
-                # Enqueue notification sending to avoid blocking the save
-                print(f"Enqueueing notification job for {doc.name} role {rule.if_role}...")
-                job = frappe.enqueue(
-                    send_notification_to_role_async,
-                    queue="short",
-                    timeout=300,
-                    sales_invoice_name=doc.name,
-                    rule_data={
-                        "if_role": rule.if_role,
-                        "if_order_from": rule.if_order_from,
-                        "if_order_status": rule.if_order_status,
-                        "if_service_type": rule.if_service_type,
-                        "if_order_type": rule.if_order_type,
-                        "if_order_schedule_type": rule.if_order_schedule_type,
-                        "item_is_new_order_item": rule.item_is_new_order_item,
-                    }
-                )
-                print(f"Job enqueued: {job}")
-                # Log to Error Log for production visibility
-                frappe.log_error(
-                    message=f"Document: {doc.name}\nRole: {rule.if_role}",
-                    title="PN - Job Enqueued"
-                )
+        # Match all rules in one pass, one fan-out job per save
+        matched_roles = match_roles(doc, get_compiled_rules(settings))
+
+        matched_rules = len(matched_roles)
+        if matched_roles:
+            print(f"Rules matched for roles: {matched_roles}")
+            # Enqueue notification sending to avoid blocking the save
+            job = frappe.enqueue(
+                send_notification_to_roles_async,
+                queue="short",
+                timeout=300,
+                sales_invoice_name=doc.name,
+                roles=matched_roles,
+            )
+            print(f"Job enqueued: {job}")
+            # Log to Error Log for production visibility
+            frappe.log_error(
+                message=f"Document: {doc.name}\nRoles: {', '.join(matched_roles)}",
+                title="PN - Job Enqueued"
+            )
 
         if matched_rules == 0:
             print(f"No notification rules matched for Sales Invoice: {doc.name}")
@@ -154,6 +149,8 @@ def on_update_sales_invoice(doc, method: str):
 def should_send_notification(doc, rule):
     """
     Check if the current document matches the notification rule conditions.
+    Legacy per-rule matcher; saves use the compiled matcher in
+    handlers.notification_rule_matcher instead.
 
     Args:
         doc: Sales Invoice document
@@ -243,21 +240,19 @@ def should_send_notification(doc, rule):
     return True
 
 
-def send_notification_to_role_async(sales_invoice_name, rule_data):
+def send_notification_to_roles_async(sales_invoice_name, roles):
     """
-    Async wrapper for sending notifications (called from queue).
+    Async job sending the notifications of all matched roles (called from queue).
 
     Args:
         sales_invoice_name: Name of the Sales Invoice document
-        rule_data: Dictionary containing rule data
+        roles: List of role names whose rules matched
     """
-    # Log immediately when worker picks up the job
-    role = rule_data.get("if_role", "unknown")
     print(f"\n\n=== ASYNC NOTIFICATION START ===")
     print(f"Sales Invoice: {sales_invoice_name}")
-    print(f"Rule: {rule_data}")
+    print(f"Roles: {roles}")
     frappe.log_error(
-        message=f"Document: {sales_invoice_name}\nRole: {role}",
+        message=f"Document: {sales_invoice_name}\nRoles: {', '.join(roles)}",
         title="PN - Worker Started"
     )
 
@@ -268,314 +263,94 @@ def send_notification_to_role_async(sales_invoice_name, rule_data):
         # Deduplication check at async level using cache
         # Include order status so notifications for different status transitions aren't blocked
         order_status_for_key = doc.get("custom_order_status") or ""
-        async_cache_key = f"arcpos_async_notification_{sales_invoice_name}_{role}_{order_status_for_key}"
-        if frappe.cache().get_value(async_cache_key):
-            print(f"Async notification already processed for {sales_invoice_name} role {role} status {order_status_for_key}, skipping")
+        pending_roles = []
+        for role in roles:
+            async_cache_key = f"arcpos_async_notification_{sales_invoice_name}_{role}_{order_status_for_key}"
+            if frappe.cache().get_value(async_cache_key):
+                print(f"Async notification already processed for {sales_invoice_name} role {role} status {order_status_for_key}, skipping")
+                continue
+
+            # Mark as processed with 30 second TTL
+            frappe.cache().set_value(async_cache_key, True, expires_in_sec=30)
+            pending_roles.append(role)
+
+        if not pending_roles:
             frappe.log_error(
-                message=f"Document: {sales_invoice_name}\nRole: {role}\nStatus: {order_status_for_key}",
+                message=f"Document: {sales_invoice_name}\nRoles: {', '.join(roles)}\nStatus: {order_status_for_key}",
                 title="PN - Duplicate Skipped"
             )
             return
 
-        # Mark as processed with 30 second TTL
-        frappe.cache().set_value(async_cache_key, True, expires_in_sec=30)
-        print(f"Document loaded successfully: {doc.name}")
-
         # Send notifications
-        send_notification_to_role(doc, rule_data)
+        send_notification_to_role(doc, pending_roles)
 
         # Commit the transaction
         frappe.db.commit()
         print(f"=== ASYNC NOTIFICATION SUCCESS ===\n\n")
         frappe.log_error(
-            message=f"Document: {sales_invoice_name}\nRole: {role}",
+            message=f"Document: {sales_invoice_name}\nRoles: {', '.join(pending_roles)}",
             title="PN - Success"
         )
     except Exception as e:
-        print(f"!!! ERROR in send_notification_to_role_async: {str(e)}")
+        print(f"!!! ERROR in send_notification_to_roles_async: {str(e)}")
         import traceback
         print(traceback.format_exc())
         frappe.log_error(
-            message=f"Error: {str(e)}\nDocument: {sales_invoice_name}\nRole: {role}\n\n{traceback.format_exc()}",
+            message=f"Error: {str(e)}\nDocument: {sales_invoice_name}\nRoles: {roles}\n\n{traceback.format_exc()}",
             title="PN - Error"
         )
         frappe.db.rollback()
 
 
-def send_notification_to_role(doc, rule):
+def send_notification_to_role_async(sales_invoice_name, rule_data):
     """
-    Send push notification and system notification to users with the specified role.
+    Async wrapper kept for jobs enqueued per rule before the role fan-out.
 
     Args:
-        doc: Sales Invoice document
-        rule: ArcPOS Push Notification child table row or dict
+        sales_invoice_name: Name of the Sales Invoice document
+        rule_data: Dictionary containing rule data
     """
-    # Get rule values (support both dict and object)
-    if_role = rule.get("if_role") if isinstance(rule, dict) else rule.if_role
-    print(f"\n--- Sending notification for role: {if_role} ---")
+    send_notification_to_roles_async(sales_invoice_name, [rule_data.get("if_role")])
 
-    try:
-        # Find all users with the specified role
-        users = frappe.db.sql(
-            """
-            SELECT DISTINCT parent as user
-            FROM `tabHas Role`
-            WHERE role = %(role)s
-            AND parent NOT IN ('Administrator', 'Guest')
-            """,
-            {"role": if_role},
-            as_dict=True
-        )
 
-        if not users:
-            print(f"!!! No users found with role: {if_role}")
-            frappe.log_error(
-                f"No users found with role: {if_role}",
-                "Push Notification - No Users"
-            )
-            return
+def send_notification_to_role(doc, rule):
+    """
+    Send push notification and system notification to users with the specified role(s).
 
-        user_emails = [user.user for user in users]
-        print(f"Found {len(user_emails)} users with role {if_role}: {user_emails}")
+    Args:
+        doc: Sales Invoice document
+        rule: ArcPOS Push Notification child table row or dict, or a list of role names
+    """
+    if isinstance(rule, (list, tuple, set)):
+        roles = list(rule)
+    else:
+        roles = [rule.get("if_role") if isinstance(rule, dict) else rule.if_role]
+    print(f"\n--- Sending notification for roles: {roles} ---")
 
+    try:
         # Prepare notification content
         title = get_notification_title(doc, rule)
         body = get_notification_body(doc, rule)
-        print(f"Notification Title: {title}")
-        print(f"Notification Body: {body}")
-
-        # ALWAYS save system notifications for all users (even if they don't have tokens)
-        # Track users who actually received notifications (for push notification deduplication)
-        users_notified = []
-
-        print(f"\n Sending SYSTEM NOTIFICATIONS to {len(user_emails)} users:")
-        system_notifications_sent = 0
-        for user_email in user_emails:
-            print(f"  → Attempting to send system notification to: {user_email}")
-            try:
-                # Check if notification already exists for this user/document in last 30 seconds
-                thirty_seconds_ago = add_to_date(now_datetime(), seconds=-30)
-
-                existing_notification = frappe.db.exists(
-                    "Notification Log",
-                    {
-                        "for_user": user_email,
-                        "document_type": "Sales Invoice",
-                        "document_name": doc.name,
-                        "creation": [">=", thirty_seconds_ago]
-                    }
-                )
-
-                if existing_notification:
-                    print(f"    ⊘ SKIPPED: Recent notification already exists for: {user_email}")
-                    continue
-
-                notification = frappe.get_doc({
-                    "doctype": "Notification Log",
-                    "for_user": user_email,
-                    "from_user": frappe.session.user,
-                    "subject": title,
-                    "email_content": body,
-                    "document_type": "Sales Invoice",
-                    "document_name": doc.name,
-                    "type": "Alert",
-                    "read": 0
-                })
-                notification.insert(ignore_permissions=True)
-                system_notifications_sent += 1
-                users_notified.append(user_email)  # Track this user for push notifications
-                frappe.publish_realtime('sales_invoice_notification_'+user_email, data = {
-                    'title': title,
-                    'body': body,
-                    'document_type': 'Sales Invoice',
-                    'document_name': doc.name
-                },
-                )
-                print(f"    ✓ SUCCESS: System notification saved for: {user_email}")
-            except Exception as e:
-                print(f"    ✗ FAILED: Error saving system notification for {user_email}: {str(e)}")
-                frappe.log_error(
-                    f"Error saving system notification for user {user_email}: {str(e)}",
-                    "System Notification Error"
-                )
-
-        print(f"\n System notifications sent: {system_notifications_sent}/{len(user_emails)}\n")
-
-        # Skip push notifications if no users received system notifications
-        if not users_notified:
-            print("No users received new system notifications, skipping push notifications")
-            print(f"--- Notification complete (no new notifications) ---\n")
-            return
-
-        # Try to send push notifications if Expo SDK is available
-        try:
-            from exponent_server_sdk import (
-                DeviceNotRegisteredError,
-                PushClient,
-                PushMessage,
-                PushServerError,
-                PushTicketError,
-            )
-            has_expo = True
-        except ImportError:
-            print("Expo Server SDK not installed, skipping push notifications")
-            frappe.log_error(
-                f"Expo Server SDK not installed. Install with: pip install exponent-server-sdk",
-                "Push Notification - SDK Missing"
-            )
-            has_expo = False
-
-        if not has_expo:
-            print(f"--- Notification complete (system only) ---\n")
-            return
-
-        # Get Expo tokens only for users who received new system notifications
-        token_docs = frappe.get_all(
-            "ArcPOS Notification Token",
-            filters={"user": ["in", users_notified]},
-            fields=["name", "user"]
-        )
-
-        print(f"Found {len(token_docs)} users with notification token documents")
-        # Log for production debugging
-        frappe.logger("push_notification").info(
-            f"Push notification for {doc.name}: users_notified={users_notified}, token_docs_count={len(token_docs)}"
-        )
-
-        if not token_docs:
-            print("  No users with notification tokens found, skipping push notifications")
-            frappe.log_error(
-                f"No push tokens found for users: {users_notified}. Document: {doc.name}",
-                "Push Notification - No Tokens"
-            )
-            print(f"--- Notification complete (system only) ---\n")
-            return
-
-        # Prepare push notification messages
-        print(f"\n Preparing PUSH NOTIFICATIONS:")
-        push_messages = []
-        token_to_user_map = {}
-
-        for token_doc in token_docs:
-            print(f"  → Processing tokens for user: {token_doc.user}")
-
-            # Get all tokens from the token_list child table
-            user_tokens = frappe.get_all(
-                "Push Token List",
-                filters={"parent": token_doc.name, "parenttype": "ArcPOS Notification Token"},
-                fields=["token"]
-            )
-
-            if not user_tokens:
-                print(f"    ✗ No tokens found in token_list for: {token_doc.user}")
-                continue
 
-            for token_row in user_tokens:
-                if token_row.token:
-                    # Validate Expo push token format
-                    if not PushClient.is_exponent_push_token(token_row.token):
-                        print(f"    ✗ INVALID token format for: {token_doc.user}")
-                        frappe.log_error(
-                            f"Invalid Expo token for user {token_doc.user}: {token_row.token}",
-                            "Invalid Expo Token"
-                        )
-                        continue
-
-                    # Create push message
-                    push_message = PushMessage(
-                        to=token_row.token,
-                        title=title,
-                        body=body,
-                        data={
-                            "document_type": "Sales Invoice",
-                            "document_name": doc.name,
-                            "order_status": doc.get("custom_order_status") or "",
-                            "order_from": doc.get("custom_order_from") or "",
-                            "service_type": doc.get("custom_service_type") or "",
-                            "order_type": doc.get("custom_order_type") or "",
-                        },
-                        sound="default",
-                        priority="high"
-                    )
-
-                    push_messages.append(push_message)
-                    token_to_user_map[token_row.token] = token_doc.user
-                    print(f"    ✓ Push message prepared for: {token_doc.user}")
-
-        print(f"\n Total push messages to send: {len(push_messages)}")
-        # Log for production debugging
-        frappe.logger("push_notification").info(
-            f"Push messages prepared for {doc.name}: count={len(push_messages)}, users={list(token_to_user_map.values())}"
+        result = send_notification_to_roles(
+            doc,
+            roles,
+            title,
+            body,
+            push_data={
+                "document_type": "Sales Invoice",
+                "document_name": doc.name,
+                "order_status": doc.get("custom_order_status") or "",
+                "order_from": doc.get("custom_order_from") or "",
+                "service_type": doc.get("custom_service_type") or "",
+                "order_type": doc.get("custom_order_type") or "",
+            },
         )
-
-        # Send push notifications if tokens are available
-        if push_messages:
-            push_client = PushClient()
-            push_sent_count = 0
-
-            print(f"\n Sending push notifications via Expo...")
-            frappe.logger("push_notification").info(f"Starting Expo push for {doc.name}")
-            try:
-                # Send notifications in chunks (Expo recommends max 100 per request)
-                chunk_size = 100
-                for i in range(0, len(push_messages), chunk_size):
-                    chunk = push_messages[i:i + chunk_size]
-                    print(f"  → Sending chunk {i//chunk_size + 1} ({len(chunk)} messages)...")
-
-                    try:
-                        responses = push_client.publish_multiple(chunk)
-
-                        # Process responses
-                        for response, message in zip(responses, chunk):
-                            user = token_to_user_map.get(message.to)
-                            try:
-                                response.validate_response()
-                                push_sent_count += 1
-                                print(f"      ✓ Push notification SENT to: {user}")
-                            except DeviceNotRegisteredError:
-                                # Token is no longer valid
-                                print(f"      ✗ Device not registered: {user}")
-                                frappe.log_error(
-                                    f"Device not registered: {user}",
-                                    "Push Notification - Invalid Token"
-                                )
-                            except PushTicketError as exc:
-                                print(f"      ✗ Push ticket error for {user}: {exc.message}")
-                                frappe.log_error(
-                                    f"Push ticket error for {user}: {exc.message}",
-                                    "Push Notification Error"
-                                )
-                    except PushServerError as exc:
-                        print(f"      ✗ Push server error: {str(exc)}")
-                        frappe.log_error(
-                            f"Push server error: {str(exc)}",
-                            "Expo Push Notification Error"
-                        )
-            except Exception as exc:
-                print(f"  ✗ Error sending push notifications: {str(exc)}")
-                frappe.log_error(
-                    f"Error sending push notifications: {str(exc)}",
-                    "Expo Push Notification Error"
-                )
-
-            print(f"\n Push notifications sent: {push_sent_count}/{len(push_messages)}")
-            # Log result for production debugging
-            frappe.logger("push_notification").info(
-                f"Push result for {doc.name}: sent={push_sent_count}/{len(push_messages)}"
-            )
-        else:
-            print("  No valid push messages to send")
-            frappe.log_error(
-                f"No valid push messages to send for {doc.name}. Token docs: {token_docs}",
-                "Push Notification - No Messages"
-            )
-
-        print(f"\n=== Notification complete (system + push) ===\n")
+        print(f"\n=== Notification complete: {result} ===\n")
 
     except Exception as e:
-        rule_dict = rule if isinstance(rule, dict) else rule.as_dict()
         frappe.log_error(
-            f"Error in send_notification_to_role: {str(e)}\nDocument: {doc.name}\nRule: {rule_dict}",
+            f"Error in send_notification_to_role: {str(e)}\nDocument: {doc.name}\nRoles: {roles}",
             "Push Notification Error"
         )
 
@@ -640,16 +415,10 @@ def send_delivery_pickup_notification(sales_invoice_name, template_name, delay_s
     Args:
         sales_invoice_name: Name of the Sales Invoice document
         template_name: Name of the Notification Template to use
-        delay_seconds: Number of seconds to wait before sending (Duration field value)
+        delay_seconds: Unused, the delay is applied by utils.delayed_jobs before the
+            job is enqueued. Kept for jobs queued with it.
     """
     try:
-        # Wait for the specified delay before sending
-        if delay_seconds and delay_seconds > 0:
-            import time
-            print(f"Waiting {delay_seconds} seconds before sending notification for {sales_invoice_name}")
-            time.sleep(delay_seconds)
-            print(f"Delay complete, sending notification for {sales_invoice_name}")
-
         # Get the Sales Invoice document
         doc = frappe.get_doc("Sales Invoice", sales_invoice_name)
 
@@ -792,19 +561,6 @@ def send_scheduled_30min_notification(doc, settings):
         doc: Sales Invoice document
         settings: ArcPOS Settings document
     """
-    try:
-        from exponent_server_sdk import (
-            DeviceNotRegisteredError,
-            PushClient,
-            PushMessage,
-            PushServerError,
-            PushTicketError,
-        )
-        has_expo = True
-    except ImportError:
-        has_expo = False
-        print("Expo Server SDK not installed for 30-min notification")
-
     # Send email notification to customer if template is configured
     if settings.scheduled_order_reminder_template:
         try:
@@ -816,46 +572,7 @@ def send_scheduled_30min_notification(doc, settings):
             )
 
     # Find matching notification rules for scheduled orders
-    matching_roles = set()
-    for rule in settings.role_wise_permission:
-        if not rule.if_role:
-            continue
-
-        # Check Service Type
-        if rule.if_service_type:
-            allowed_service_types = [x.strip() for x in rule.if_service_type.split(",") if x.strip()]
-            if doc.custom_service_type not in allowed_service_types:
-                continue
-
-        # Check Order Schedule Type - must include "Scheduled Later"
-        if rule.if_order_schedule_type:
-            allowed_schedule_types = [x.strip() for x in rule.if_order_schedule_type.split(",") if x.strip()]
-            if "Scheduled Later" not in allowed_schedule_types:
-                continue
-        else:
-            # Skip rules that don't specify schedule type
-            continue
-
-        # Check Order Status (if specified)
-        if rule.if_order_status:
-            allowed_statuses = [x.strip() for x in rule.if_order_status.split(",") if x.strip()]
-            if doc.custom_order_status not in allowed_statuses:
-                continue
-
-        # Check Order From (if specified)
-        if rule.if_order_from:
-            allowed_order_from = [x.strip() for x in rule.if_order_from.split(",") if x.strip()]
-            if doc.custom_order_from not in allowed_order_from:
-                continue
-
-        # Check Order Type (if specified)
-        if rule.if_order_type:
-            allowed_order_types = [x.strip() for x in rule.if_order_type.split(",") if x.strip()]
-            if doc.custom_order_type not in allowed_order_types:
-                continue
-
-        # Rule matches - add role
-        matching_roles.add(rule.if_role)
+    matching_roles = match_scheduled_reminder_roles(doc, get_compiled_rules(settings))
 
     if not matching_roles:
         print(f"No matching notification rules for 30-min reminder: {doc.name}")
@@ -873,149 +590,28 @@ def send_scheduled_30min_notification(doc, settings):
         f"Please prepare the order."
     )
 
-    # Send notifications to each matching role
-    for role in matching_roles:
-        try:
-            # Find all users with the specified role
-            users = frappe.db.sql(
-                """
-                SELECT DISTINCT parent as user
-                FROM `tabHas Role`
-                WHERE role = %(role)s
-                AND parent NOT IN ('Administrator', 'Guest')
-                """,
-                {"role": role},
-                as_dict=True
-            )
-
-            if not users:
-                print(f"No users found with role: {role}")
-                continue
-
-            user_emails = [user.user for user in users]
-            print(f"Sending 30-min reminder to {len(user_emails)} users with role {role}")
-
-            # Send system notifications to all users
-            for user_email in user_emails:
-                try:
-                    # Check if notification already exists to prevent duplicates
-                    thirty_seconds_ago = add_to_date(now_datetime(), seconds=-30)
-                    existing_notification = frappe.db.exists(
-                        "Notification Log",
-                        {
-                            "for_user": user_email,
-                            "document_type": "Sales Invoice",
-                            "document_name": doc.name,
-                            "subject": title,
-                            "creation": [">=", thirty_seconds_ago]
-                        }
-                    )
-
-                    if existing_notification:
-                        continue
-
-                    notification = frappe.get_doc({
-                        "doctype": "Notification Log",
-                        "for_user": user_email,
-                        "from_user": frappe.session.user or "Administrator",
-                        "subject": title,
-                        "email_content": body,
-                        "document_type": "Sales Invoice",
-                        "document_name": doc.name,
-                        "type": "Alert",
-                        "read": 0
-                    })
-                    notification.insert(ignore_permissions=True)
-
-                    # Publish realtime event
-                    frappe.publish_realtime(
-                        'sales_invoice_notification_' + user_email,
-                        data={
-                            'title': title,
-                            'body': body,
-                            'document_type': 'Sales Invoice',
-                            'document_name': doc.name
-                        }
-                    )
-                    print(f"  ✓ System notification sent to: {user_email}")
-
-                except Exception as e:
-                    frappe.log_error(
-                        f"Error sending 30-min system notification to {user_email}: {str(e)}",
-                        "Scheduled 30-Min Notification Error"
-                    )
-
-            # Send push notifications if Expo is available
-            if has_expo:
-                try:
-                    # Get Expo tokens for users
-                    token_docs = frappe.get_all(
-                        "ArcPOS Notification Token",
-                        filters={"user": ["in", user_emails]},
-                        fields=["name", "user"]
-                    )
-
-                    if token_docs:
-                        push_messages = []
-                        for token_doc_name in [t.name for t in token_docs]:
-                            token_doc = frappe.get_doc("ArcPOS Notification Token", token_doc_name)
-
-                            # Get tokens from child table
-                            if token_doc.token_list:
-                                for token_row in token_doc.token_list:
-                                    if token_row.token and PushClient.is_exponent_push_token(token_row.token):
-                                        push_messages.append(
-                                            PushMessage(
-                                                to=token_row.token,
-                                                title=title,
-                                                body=body,
-                                                data={
-                                                    "document_type": "Sales Invoice",
-                                                    "document_name": doc.name,
-                                                    "notification_type": "scheduled_30min_reminder",
-                                                    "order_status": doc.custom_order_status or "",
-                                                    "service_type": doc.custom_service_type or "",
-                                                    "delivery_time": str(doc.custom_delivery_time)
-                                                },
-                                                sound="default",
-                                                priority="high"
-                                            )
-                                        )
-
-                        # Send push notifications in chunks
-                        if push_messages:
-                            push_client = PushClient()
-                            chunk_size = 100
-                            for i in range(0, len(push_messages), chunk_size):
-                                chunk = push_messages[i:i + chunk_size]
-                                try:
-                                    responses = push_client.publish_multiple(chunk)
-                                    for response in responses:
-                                        try:
-                                            response.validate_response()
-                                        except DeviceNotRegisteredError:
-                                            pass  # Token expired, ignore
-                                        except (PushTicketError, PushServerError) as exc:
-                                            print(f"Push notification error: {exc.message}")
-                                except Exception as e:
-                                    frappe.log_error(
-                                        f"Error sending 30-min push notification chunk: {str(e)}",
-                                        "Scheduled 30-Min Push Error"
-                                    )
-
-                            print(f"  ✓ Push notifications sent to role: {role}")
-
-                except Exception as e:
-                    frappe.log_error(
-                        f"Error processing 30-min push notifications for role {role}: {str(e)}",
-                        "Scheduled 30-Min Push Error"
-                    )
-
-        except Exception as e:
-            frappe.log_error(
-                f"Error sending 30-min notification to role {role}: {str(e)}",
-                "Scheduled 30-Min Notification Error"
-            )
+    # Send notifications to all matching roles in one fan-out
+    try:
+        send_notification_to_roles(
+            doc,
+            matching_roles,
+            title,
+            body,
+            push_data={
+                "document_type": "Sales Invoice",
+                "document_name": doc.name,
+                "notification_type": "scheduled_30min_reminder",
+                "order_status": doc.custom_order_status or "",
+                "service_type": doc.custom_service_type or "",
+                "delivery_time": str(doc.custom_delivery_time)
+            },
+            subject_dedup=True,
+        )
+    except Exception as e:
+        frappe.log_error(
+            f"Error sending 30-min notification to roles {matching_roles}: {str(e)}",
+            "Scheduled 30-Min Notification Error"
+        )
 
     # Commit the transaction
     frappe.db.commit()
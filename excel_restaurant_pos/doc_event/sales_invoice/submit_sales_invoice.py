@@ -5,6 +5,8 @@ import frappe
 from .handlers.create_feedback import create_feedback
 from .handlers.create_payment_entry import create_payment_entry
 from .handlers.update_item_sales_count import update_item_sales_count
+from excel_restaurant_pos.api.report.report_engine import invalidate_report_cache
+from excel_restaurant_pos.shared.sales_rollup import update_sales_rollup
 
 
 def submit_sales_invoice(doc, method: str):
@@ -16,7 +18,12 @@ def submit_sales_invoice(doc, method: str):
     tasks:
         Create arcpos feedback doc (in short queue)
         Increase item sales count
+        Add the invoice to the sales rollup (same transaction)
+        Drop cached reports covering the posting date
     """
+    update_sales_rollup(doc)
+    invalidate_report_cache(doc)
+
     # create payment entry based on condition
     if doc.custom_with_arcpos_payment:
         frappe.enqueue(
@@ -0,0 +1,12 @@
+# Copyright (c) 2026, Sohanur Rahman and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+class CashPosition(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Cash Position", ["account", "counter"])
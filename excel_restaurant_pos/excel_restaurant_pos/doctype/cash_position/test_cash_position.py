@@ -0,0 +1,42 @@
+# Copyright (c) 2026, Sohanur Rahman and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from excel_restaurant_pos.doc_event.sales_invoice.handlers.create_payment_entry import create_payment_entry
+from excel_restaurant_pos.shared.cash_position import get_cash_position
+from excel_restaurant_pos.shared.sales_invoice import get_mode_of_payment_account
+
+TEST_COUNTER = "_Test Cash Counter"
+
+
+class TestCashPosition(FrappeTestCase):
+	"""Cash posted through a POS counter is added to the counter's position."""
+
+	def setUp(self):
+		if not frappe.db.exists("ArcPOS Counter", TEST_COUNTER):
+			frappe.get_doc({"doctype": "ArcPOS Counter", "counter_name": TEST_COUNTER}).insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_invoice_payment_through_counter(self):
+		from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+
+		invoice = create_sales_invoice(do_not_submit=True, rate=250)
+		invoice.custom_pos_counter = TEST_COUNTER
+		invoice.submit()
+
+		cash_account = get_mode_of_payment_account("Cash", invoice.company)
+		before = get_cash_position(cash_account, TEST_COUNTER)
+
+		create_payment_entry(invoice.name, payments=[{"mode_of_payment": "Cash", "amount": invoice.grand_total}])
+
+		payment_entry = frappe.get_last_doc("Payment Entry", filters={"party": invoice.customer})
+		self.assertEqual(payment_entry.custom_pos_counter, TEST_COUNTER)
+		self.assertEqual(
+			flt(get_cash_position(cash_account, TEST_COUNTER) - before),
+			flt(invoice.grand_total),
+		)
@@ -8,53 +8,17 @@ import frappe
 from frappe.tests.utils import FrappeTestCase
 from frappe.utils import now_datetime
 
-
-def make_uber_order(**kwargs):
-    """Return a minimal Uber Eats order dict suitable for _create_channel_order."""
-    base = {
-        "id": "test-order-uuid-0001",
-        "display_id": "ABCD1",
-        "current_state": "CREATED",
-        "type": "DELIVERY_BY_UBER",
-        "placed_at": "2026-02-19T08:05:04Z",
-        "store": {"id": "store-uuid-001", "name": "Test Store"},
-        "eater": {
-            "first_name": "John",
-            "last_name": "Doe",
-            "phone": "+1 647-555-0100",
-        },
-        "cart": {
-            "items": [
-                {
-                    "id": "item-001",
-                    "title": "Burger",
-                    "quantity": 2,
-                    "price": {
-                        "unit_price": {"amount": 500, "currency_code": "CAD"},
-                        "total_price": {"amount": 1000, "currency_code": "CAD"},
-                    },
-                    "selected_modifier_groups": None,
-                    "special_instructions": "",
-                }
-            ],
-            "special_instructions": "",
-        },
-        "payment": {
-            "charges": {
-                "sub_total": {"amount": 1000, "currency_code": "CAD"},
-                "total": {"amount": 1000, "currency_code": "CAD"},
-            }
-        },
-    }
-    base.update(kwargs)
-    return base
+from excel_restaurant_pos.api.uber_eats.uber_eats_fixtures import make_uber_order
 
 
 class TestChannelOrder(FrappeTestCase):
     """Tests for Channel Order doctype and Uber Eats order processing."""
 
     def tearDown(self):
-        """Clean up test Channel Orders after each test."""
+        """Clean up test Channel Orders and their items after each test."""
+        test_orders = frappe.get_all("Channel Order", filters={"order_id": ["like", "test-%"]}, pluck="name")
+        if test_orders:
+            frappe.db.delete("Channel Order Item", {"parenttype": "Channel Order", "parent": ["in", test_orders]})
         frappe.db.delete("Channel Order", {"order_id": ["like", "test-%"]})
         frappe.db.commit()
 
@@ -335,6 +299,47 @@ class TestChannelOrder(FrappeTestCase):
             )
             mock_enqueue.assert_not_called()
 
+    # ------------------------------------------------------------------
+    # Bulk insert
+    # ------------------------------------------------------------------
+
+    def test_bulk_insert_creates_orders_and_items(self):
+        """bulk_insert_channel_orders writes parents and child rows, skipping known order_ids."""
+        from excel_restaurant_pos.api.uber_eats.uber_eats_channel_orders import (
+            bulk_insert_channel_orders,
+            load_raw_payload,
+        )
+
+        orders = [make_uber_order(id=f"test-order-bulk-{i}") for i in range(3)]
+        result = bulk_insert_channel_orders(
+            orders + [make_uber_order(id="test-order-bulk-0")], event_id="evt-bulk", commit=False
+        )
+
+        self.assertEqual(len(result["inserted"]), 3)
+        self.assertEqual(result["skipped"], ["test-order-bulk-0"])
+
+        co = frappe.get_doc("Channel Order", result["inserted"]["test-order-bulk-1"])
+        self.assertEqual(co.display_id, "ABCD1")
+        self.assertAlmostEqual(co.total, 10.00)
+        self.assertEqual(len(co.items), 1)
+        self.assertEqual(co.items[0].title, "Burger")
+        self.assertEqual(load_raw_payload(co.raw_payload)["order"]["id"], "test-order-bulk-1")
+
+        again = bulk_insert_channel_orders(orders, commit=False)
+        self.assertEqual(again["inserted"], {})
+
+    def test_raw_payload_compressed(self):
+        """raw_payload is stored compressed and still readable."""
+        from excel_restaurant_pos.api.uber_eats.uber_eats import _create_channel_order
+        from excel_restaurant_pos.api.uber_eats.uber_eats_channel_orders import load_raw_payload
+
+        order = make_uber_order(id="test-order-uuid-0023")
+        co = _create_channel_order(order, event_id="evt-023")
+
+        self.assertTrue(co.raw_payload.startswith("zlib:"))
+        self.assertEqual(load_raw_payload(co.raw_payload)["event_id"], "evt-023")
+        self.assertEqual(load_raw_payload(json.dumps({"event_id": "plain"}))["event_id"], "plain")
+
     # ------------------------------------------------------------------
     # accept / deny API wrappers
     # ------------------------------------------------------------------
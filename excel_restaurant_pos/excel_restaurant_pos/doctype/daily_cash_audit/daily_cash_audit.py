@@ -6,6 +6,8 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import now_datetime, flt
 
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
+
 
 class DailyCashAudit(Document):
     def validate(self):
@@ -26,7 +28,7 @@ class DailyCashAudit(Document):
             self.db_set("journal_entry", je_name)
 
     def validate_counter(self):
-        outlet = frappe.db.get_single_value("ArcPOS Settings", "default_outlet")
+        outlet = arcpos_settings().default_outlet
         if not outlet:
             frappe.throw(_("Default Outlet is not set in ArcPOS Settings"))
 
@@ -114,7 +116,7 @@ class DailyCashAudit(Document):
             )
 
     def create_journal_entry(self):
-        company = frappe.db.get_single_value("ArcPOS Settings", "company")
+        company = arcpos_settings().company
         if not company:
             frappe.throw(_("Default Company is not set in ArcPOS Settings"))
 
@@ -153,6 +155,7 @@ class DailyCashAudit(Document):
         je.user_remark = _("Cash Audit Difference - {0} - {1}").format(
             self.submission_type, self.counter_name
         )
+        je.custom_pos_counter = self.counter_name
 
         je.append("accounts", {
             "account": debit_account,
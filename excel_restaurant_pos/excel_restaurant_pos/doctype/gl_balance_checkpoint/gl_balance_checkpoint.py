@@ -0,0 +1,12 @@
+# Copyright (c) 2026, Sohanur Rahman and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+class GLBalanceCheckpoint(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("GL Balance Checkpoint", ["account", "period_end"])
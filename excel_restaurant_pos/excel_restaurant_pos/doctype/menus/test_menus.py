@@ -1,9 +1,79 @@
 # Copyright (c) 2025, Sohanur Rahman and Contributors
 # See license.txt
 
-# import frappe
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from excel_restaurant_pos.shared.menu import get_available_menus
+
+
+def make_snapshot_entry(name, rows, **kwargs):
+	"""Return a cached menu snapshot entry with availability rows."""
+	entry = frappe._dict(
+		name=name,
+		menu_name=name,
+		image=None,
+		enabled=1,
+		start_date=date(2026, 1, 1),
+		expires_on=date(2026, 12, 31),
+		modified=datetime(2026, 1, 1),
+		items=[frappe._dict(parent=name, **row) for row in rows],
+	)
+	entry.update(kwargs)
+	return entry
+
 
 class TestMenus(FrappeTestCase):
-	pass
+	"""Tests for the cached menu snapshot filtering."""
+
+	# Monday 2026-03-02 12:00
+	now = datetime(2026, 3, 2, 12, 0, 0)
+
+	def get_menus(self, entries, item_menus=None):
+		snapshot = ("v1", {e.name: e for e in entries}, set(item_menus or [e.name for e in entries]))
+		with patch(
+			"excel_restaurant_pos.shared.menu.menu_snapshot.get_menu_snapshot",
+			return_value=snapshot,
+		):
+			return get_available_menus(now=self.now)
+
+	def test_day_and_time_window(self):
+		"""Only availability rows for today within the time window are returned."""
+		lunch = make_snapshot_entry(
+			"Lunch",
+			[
+				{"name": "a", "days": "Monday", "time": timedelta(hours=11), "to_time": timedelta(hours=15)},
+				{"name": "b", "days": "Tuesday", "time": timedelta(hours=11), "to_time": timedelta(hours=15)},
+				{"name": "c", "days": "Everyday", "time": timedelta(hours=18), "to_time": timedelta(hours=22)},
+			],
+		)
+		_, menus = self.get_menus([lunch])
+
+		self.assertEqual(len(menus), 1)
+		self.assertEqual([row.name for row in menus[0]["items"]], ["a"])
+
+	def test_menus_not_linked_to_items_or_disabled_are_hidden(self):
+		"""Disabled, expired and item-less menus are skipped."""
+		row = {"name": "r", "days": "Everyday", "time": timedelta(0), "to_time": timedelta(hours=23)}
+		entries = [
+			make_snapshot_entry("Active", [row]),
+			make_snapshot_entry("Disabled", [dict(row, name="r2")], enabled=0),
+			make_snapshot_entry("Expired", [dict(row, name="r3")], expires_on=date(2026, 1, 31)),
+			make_snapshot_entry("Unused", [dict(row, name="r4")]),
+		]
+		_, menus = self.get_menus(entries, item_menus=["Active", "Disabled", "Expired"])
+
+		self.assertEqual([menu.name for menu in menus], ["Active"])
+
+	def test_etag_changes_with_visible_rows(self):
+		"""The ETag is stable for the same result and changes when rows change."""
+		row = {"name": "r", "days": "Everyday", "time": timedelta(0), "to_time": timedelta(hours=23)}
+		etag_1, _ = self.get_menus([make_snapshot_entry("Menu", [row])])
+		etag_2, _ = self.get_menus([make_snapshot_entry("Menu", [row])])
+		etag_3, _ = self.get_menus([make_snapshot_entry("Menu", [dict(row, name="other")])])
+
+		self.assertEqual(etag_1, etag_2)
+		self.assertNotEqual(etag_1, etag_3)
@@ -4,6 +4,7 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import get_url
 from frappe.utils.file_manager import save_file
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
 
 class RestaurantTable(Document):
     def before_save(self):
@@ -14,7 +15,7 @@ class RestaurantTable(Document):
             return
         host = get_url()
         url = f"{host}?table_id={self.name}"
-        base_url = frappe.db.get_single_value("ArcPOS Settings", "portal_base_url")
+        base_url = arcpos_settings().portal_base_url
         if base_url:
             url = f"{base_url}?table_id={self.name}"
         frappe.msgprint(url)
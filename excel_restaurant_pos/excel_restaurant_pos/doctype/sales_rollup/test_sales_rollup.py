@@ -0,0 +1,55 @@
+# Copyright (c) 2026, Sohanur Rahman and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from excel_restaurant_pos.shared.sales_rollup.sales_rollup import build_rollup_rows, rollup_name
+
+
+def make_invoice(items, grand_total, **kwargs):
+	"""Return a minimal submitted invoice for rollup aggregation."""
+	doc = frappe._dict(
+		doctype="Sales Invoice",
+		posting_date="2026-03-01",
+		posting_time="13:45:10",
+		custom_service_type="Dine-in",
+		territory="Gulshan",
+		grand_total=grand_total,
+		items=[frappe._dict(item_name=row[0], item_group="Food", item_code=row[0], qty=row[1], amount=row[2]) for row in items],
+	)
+	doc.update(kwargs)
+	return doc
+
+
+class TestSalesRollup(FrappeTestCase):
+	"""Tests for the sales rollup row aggregation."""
+
+	def test_lines_of_same_item_are_merged(self):
+		doc = make_invoice([("Burger", 1, 100), ("Burger", 2, 200), ("Coke", 1, 100)], grand_total=460)
+		rows = {row.item_code: row for row in build_rollup_rows(doc)}
+
+		self.assertEqual(rows["Burger"].qty, 3)
+		self.assertEqual(rows["Burger"].amount, 300)
+		self.assertEqual(rows["Burger"].line_count, 2)
+		self.assertEqual(rows["Burger"].posting_hour, 13)
+		# grand total is split over the lines by amount
+		self.assertAlmostEqual(rows["Burger"].grand_total, 345)
+		self.assertAlmostEqual(rows["Coke"].grand_total, 115)
+
+	def test_cancel_rows_negate_submit_rows(self):
+		doc = make_invoice([("Burger", 1, 100)], grand_total=115)
+		submitted = build_rollup_rows(doc)[0]
+		cancelled = build_rollup_rows(doc, sign=-1)[0]
+
+		self.assertEqual(submitted.name, cancelled.name)
+		self.assertEqual(submitted.qty + cancelled.qty, 0)
+		self.assertEqual(submitted.grand_total + cancelled.grand_total, 0)
+		self.assertEqual(submitted.line_count + cancelled.line_count, 0)
+
+	def test_rollup_name_matches_sql_key(self):
+		# SELECT MD5(CONCAT_WS('|', '2026-03-01', 0, 'POS Invoice', 'Coke', '', ''))
+		self.assertEqual(
+			rollup_name("2026-03-01", 0, "POS Invoice", "Coke", "", None),
+			"053a6d9f76efe7546fb9807fbf40ddd3",
+		)
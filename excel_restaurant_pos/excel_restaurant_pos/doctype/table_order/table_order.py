@@ -1,6 +1,8 @@
 import frappe
 from frappe.model.document import Document
 from excel_restaurant_pos.api.bom import run_bom_process
+from excel_restaurant_pos.shared.kitchen_feed import publish_table_order_update
+from excel_restaurant_pos.shared.arcpos_settings import restaurant_settings
 
 class TableOrder(Document):
     def before_save(self):
@@ -48,9 +50,9 @@ class TableOrder(Document):
 
     def get_tax_amount(self):
         # Calculate the tax amount based on settings
-        restaurant_settings = frappe.get_doc("Restaurant Settings")
-        if restaurant_settings.charge_type == 'On Net Total' and restaurant_settings.tax_rate:
-            tax_rate = float(restaurant_settings.tax_rate) / 100
+        settings = restaurant_settings()
+        if settings.charge_type == 'On Net Total' and settings.tax_rate:
+            tax_rate = settings.tax_rate / 100
             discount = float(self.discount) if self.discount else 0.0
             return (self.get_total_amount() - discount) * tax_rate
         return 0.0
@@ -97,6 +99,7 @@ class TableOrder(Document):
 
 
     def on_update(self):
+        publish_table_order_update(self)
         if self.status == 'Completed':
             return
         for item in self.item_list:
@@ -6,6 +6,9 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import now_datetime
 
+from excel_restaurant_pos.shared.push_notification import queue_push_to_users
+from excel_restaurant_pos.shared.arcpos_settings import get_settings_doc
+
 
 class TableReservation(Document):
     def validate(self):
@@ -132,66 +135,21 @@ def _notify_staff_new_reservation(reservation_name):
 
         frappe.db.commit()
 
-        # 2. Expo push notifications
+        # 2. Queue Expo push notifications for the push worker
         try:
-            from exponent_server_sdk import (
-                PushClient, PushMessage, PushServerError,
-                PushTicketError, DeviceNotRegisteredError,
+            queued = queue_push_to_users(
+                user_emails,
+                title,
+                body,
+                data={
+                    "notification_type": "new_table_reservation",
+                    "reservation": doc.name,
+                },
+                source="Table Reservation",
             )
-
-            token_docs = frappe.get_all(
-                "ArcPOS Notification Token",
-                filters={"user": ["in", user_emails]},
-                fields=["name", "user"],
+            frappe.logger().info(
+                f"Expo push queued for reservation {reservation_name} ({queued} token(s))"
             )
-
-            push_messages = []
-            for token_doc_ref in token_docs:
-                token_doc = frappe.get_doc("ArcPOS Notification Token", token_doc_ref.name)
-                for token_row in (token_doc.token_list or []):
-                    if token_row.token and PushClient.is_exponent_push_token(token_row.token):
-                        push_messages.append(
-                            PushMessage(
-                                to=token_row.token,
-                                title=title,
-                                body=body,
-                                data={
-                                    "notification_type": "new_table_reservation",
-                                    "reservation": doc.name,
-                                },
-                                sound="default",
-                                priority="high",
-                            )
-                        )
-
-            if push_messages:
-                push_client = PushClient()
-                for i in range(0, len(push_messages), 100):
-                    chunk = push_messages[i:i + 100]
-                    try:
-                        responses = push_client.publish_multiple(chunk)
-                        for response, msg in zip(responses, chunk):
-                            try:
-                                response.validate_response()
-                            except DeviceNotRegisteredError:
-                                pass
-                            except PushTicketError as exc:
-                                frappe.log_error(
-                                    f"Push ticket error for token {msg.to}: {exc}",
-                                    "Table Reservation - Push Ticket Error",
-                                )
-                    except PushServerError as exc:
-                        frappe.log_error(
-                            f"Expo push server error for {reservation_name}: {exc}",
-                            "Table Reservation - Push Server Error",
-                        )
-
-                frappe.logger().info(
-                    f"Expo push sent for reservation {reservation_name} ({len(push_messages)} token(s))"
-                )
-
-        except ImportError:
-            frappe.logger().info("Expo SDK not available — skipping push notifications")
         except Exception as e:
             frappe.log_error(
                 f"Error sending push notifications for reservation {reservation_name}: {e}",
@@ -222,7 +180,7 @@ def _send_reservation_email(reservation_name, email_type):
     """
     try:
         doc = frappe.get_doc("Table Reservation", reservation_name)
-        settings = frappe.get_single("ArcPOS Settings")
+        settings = get_settings_doc("ArcPOS Settings")
 
         template_field = _EMAIL_TEMPLATES.get(email_type)
         if not template_field or not settings.get(template_field):
@@ -291,7 +249,7 @@ def send_24h_reminder_email(reservation_name):
             return
 
         # Get ArcPOS Settings
-        settings = frappe.get_single("ArcPOS Settings")
+        settings = get_settings_doc("ArcPOS Settings")
 
         # Check if template is configured
         if not settings.reservation_reminder_template:
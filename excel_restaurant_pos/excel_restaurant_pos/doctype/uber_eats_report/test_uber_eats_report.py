@@ -0,0 +1,52 @@
+# Copyright (c) 2026, Excel Technologies Ltd and Contributors
+# See license.txt
+
+import os
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from excel_restaurant_pos.api.uber_eats.uber_eats_report import _parse_into_lines
+
+WORKFLOW_ID = "test-report-workflow-0001"
+CSV = (
+    "﻿Store Name,Order ID,Workflow ID,Order Status,Order Date,Item Name,Quantity,Price\n"
+    "Test Store,ABCD1,order-uuid-1,Completed,2026-02-19,Burger,2,\"$1,012.50\"\n"
+    "\n"
+    "Test Store,ABCD2,order-uuid-2,Canceled,not a date,Fries,1,3.25\n"
+)
+
+
+class TestUberEatsReport(FrappeTestCase):
+    def setUp(self):
+        frappe.db.delete("Uber Eats Report Line", {"report": WORKFLOW_ID})
+        frappe.delete_doc_if_exists("Uber Eats Report", WORKFLOW_ID, force=True)
+        frappe.get_doc({
+            "doctype": "Uber Eats Report",
+            "workflow_id": WORKFLOW_ID,
+            "report_type": "ORDERS_AND_ITEMS_REPORT",
+        }).insert(ignore_permissions=True)
+        self.path = frappe.get_site_path("private", "files", f"{WORKFLOW_ID}.csv")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(CSV)
+
+    def tearDown(self):
+        os.remove(self.path)
+        frappe.db.rollback()
+
+    def test_csv_parsed_into_lines(self):
+        self.assertEqual(_parse_into_lines(WORKFLOW_ID, self.path, 1), 2)
+
+        lines = frappe.get_all(
+            "Uber Eats Report Line",
+            filters={"report": WORKFLOW_ID},
+            fields=["line_no", "order_id", "display_id", "order_date", "quantity", "amount", "data"],
+            order_by="line_no asc",
+        )
+        self.assertEqual([line.order_id for line in lines], ["order-uuid-1", "order-uuid-2"])
+        self.assertEqual(lines[0].display_id, "ABCD1")
+        self.assertEqual(str(lines[0].order_date), "2026-02-19")
+        self.assertIsNone(lines[1].order_date)
+        self.assertEqual(lines[0].quantity, 2)
+        self.assertEqual(lines[0].amount, 1012.5)
+        self.assertIn("Burger", lines[0].data)
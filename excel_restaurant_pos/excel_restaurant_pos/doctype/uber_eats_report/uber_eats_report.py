@@ -0,0 +1,8 @@
+# Copyright (c) 2026, Excel Technologies Ltd and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class UberEatsReport(Document):
+	pass
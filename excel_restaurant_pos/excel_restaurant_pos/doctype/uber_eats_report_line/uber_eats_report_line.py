@@ -0,0 +1,13 @@
+# Copyright (c) 2026, Excel Technologies Ltd and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class UberEatsReportLine(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Uber Eats Report Line", ["report", "order_id"])
@@ -1,6 +1,7 @@
 """Notification context for order closed (dine-in, takeout) emails."""
 
 import frappe
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
 
 from excel_restaurant_pos.excel_restaurant_pos.notification.utils import (
     get_customer_primary_email,
@@ -14,7 +15,7 @@ def get_context(context):
         context: Dictionary containing the document context
     """
     doc = context.get("doc")
-    default_customer = frappe.db.get_single_value("ArcPOS Settings", "customer")
+    default_customer = arcpos_settings().customer
 
     # Get feedback document by sales_invoice_no
     feedback_name = frappe.db.get_value(
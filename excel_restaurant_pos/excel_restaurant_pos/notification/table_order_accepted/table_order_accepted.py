@@ -2,6 +2,7 @@
 
 # pylint: disable=invalid-name
 import frappe
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
 from excel_restaurant_pos.excel_restaurant_pos.notification.utils import (
     get_customer_primary_email,
 )
@@ -14,7 +15,7 @@ def get_context(context):
         context: Dictionary containing the document context
     """
     doc = context.get("doc")
-    default_customer = frappe.db.get_single_value("ArcPOS Settings", "customer")
+    default_customer = arcpos_settings().customer
 
     # define the primary email
     primary_email = None
@@ -173,8 +173,19 @@ doc_events = {
 # ---------------
 
 scheduler_events = {
-    "daily": ["excel_restaurant_pos.utils.jwt_auth.cleanup_expired_blacklist"],
+    "daily": [
+        "excel_restaurant_pos.utils.jwt_auth.cleanup_expired_blacklist",
+        "excel_restaurant_pos.shared.gl_balance.refresh_gl_balance_checkpoints",
+    ],
     "cron": {
+        # Enqueue delayed jobs that are due (delivery/pickup emails, etc.)
+        "* * * * *": [
+            "excel_restaurant_pos.utils.delayed_jobs.dispatch_due_jobs",
+            "excel_restaurant_pos.shared.push_notification.drain_push_outbox",
+            "excel_restaurant_pos.shared.meta_capi.drain_capi_outbox",
+            "excel_restaurant_pos.api.uber_eats.consume_uber_eats_inbox",
+            "excel_restaurant_pos.api.uber_eats.reconcile_uber_eats_orders",
+        ],
         # Delete marked-as-deleted draft invoices at midnight daily
         "0 1 * * *": [
             "excel_restaurant_pos.utils.scheduled_tasks.delete_marked_invoices"
@@ -185,11 +196,14 @@ scheduler_events = {
         ],
         # Check scheduled orders and send 30-min notifications every 5 minutes
         "*/5 * * * *": [
-            "excel_restaurant_pos.utils.scheduled_tasks.check_scheduled_order_notifications"
+            "excel_restaurant_pos.utils.scheduled_tasks.check_scheduled_order_notifications",
+            "excel_restaurant_pos.shared.push_notification.poll_push_receipts",
         ],
         # Send 24-hour reminder emails for table reservations every hour
+        # and correct drifted cash positions
         "0 * * * *": [
-            "excel_restaurant_pos.utils.scheduled_tasks.send_reservation_reminders"
+            "excel_restaurant_pos.utils.scheduled_tasks.send_reservation_reminders",
+            "excel_restaurant_pos.shared.cash_position.reconcile_cash_positions",
         ],
     },
 }
@@ -236,7 +250,10 @@ override_whitelisted_methods = {
 # Request Events
 # ----------------
 # before_request = ["excel_restaurant_pos.utils.before_request"]
-# after_request = ["excel_restaurant_pos.utils.after_request"]
+after_request = [
+    "excel_restaurant_pos.shared.arcpos_settings.add_settings_db_hits_header",
+    "excel_restaurant_pos.utils.add_rate_limit_headers",
+]
 
 # Job Events
 # ----------
@@ -1,8 +1,9 @@
 """Override Item doctype class for custom functionality."""
 
 from erpnext.stock.doctype.item.item import Item
-from excel_restaurant_pos.api.meta import create_catalog_item,update_catalog_item,delete_catalog_item
+from excel_restaurant_pos.api.meta import queue_catalog_sync
 from excel_restaurant_pos.utils import is_new_doc
+from excel_restaurant_pos.shared.menu import refresh_item_menus
 import frappe
 
 
@@ -28,16 +29,22 @@ class OverrideItem(Item):
     def after_insert(self):
         """After insert event."""
         frappe.msgprint(f"After insert event: {self.name}")
-        frappe.enqueue(create_catalog_item, queue="short", item_code=self.name)
+        queue_catalog_sync(self.name)
 
     def on_update(self):
         """On update event."""
+        refresh_item_menus(self)
+
         is_new = is_new_doc(self)
         if not is_new:
             frappe.msgprint(f"On update event: {self.name}")
-            frappe.enqueue(update_catalog_item, queue="short", item_code=self.name)
+            queue_catalog_sync(self.name)
 
     def on_trash(self):
         """On trash event."""
         frappe.msgprint(f"On trash event: {self.name}")
-        frappe.enqueue(delete_catalog_item, queue="short", item_code=self.name)
+        queue_catalog_sync(self.name, "DELETE")
+
+    def after_delete(self):
+        """After delete event."""
+        refresh_item_menus()
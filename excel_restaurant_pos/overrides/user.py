@@ -3,6 +3,7 @@ from frappe import _
 from frappe.utils import random_string, now
 from jinja2 import Template
 import json
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_system_settings
 from excel_restaurant_pos.shared.arcpos_settings.system_settings import default_system_settings
 from excel_restaurant_pos.shared.email_templates.get_template import template_by_name
 
@@ -152,7 +153,7 @@ def verify_otp(verification_key, otp):
         user.insert()
 
         # Set default role from Portal Settings
-        role_name = frappe.db.get_single_value("ArcPOS System Settings", "user_default_role") or "Customer"
+        role_name = arcpos_system_settings().user_default_role
         user.add_roles(role_name, 'Sales User')
         
 
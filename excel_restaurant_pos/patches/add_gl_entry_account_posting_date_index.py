@@ -0,0 +1,6 @@
+import frappe
+
+
+def execute():
+    # payment overview and the balance checkpoints read GL Entry by account and date range
+    frappe.db.add_index("GL Entry", ["account", "posting_date"])
@@ -0,0 +1,9 @@
+import frappe
+
+from excel_restaurant_pos.shared.sales_rollup import rebuild_sales_rollup
+
+
+def execute():
+    # the patch runs before the doctype sync, create the rollup table first
+    frappe.reload_doc("excel_restaurant_pos", "doctype", "sales_rollup")
+    rebuild_sales_rollup()
@@ -0,0 +1,60 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+from excel_restaurant_pos.api.uber_eats.uber_eats_invoices import (
+    UBER_EATS_ORDER_FROM,
+    extract_uber_eats_order_id,
+)
+
+CHUNK_SIZE = 1000
+
+
+def execute():
+    # patches run before the doctype and fixture sync, create both link columns first
+    frappe.reload_doc("excel_restaurant_pos", "doctype", "channel_order")
+    create_custom_field(
+        "Sales Invoice",
+        {
+            "fieldname": "custom_channel_order",
+            "fieldtype": "Link",
+            "label": "Channel Order",
+            "options": "Channel Order",
+            "insert_after": "custom_order_from",
+            "search_index": 1,
+            "read_only": 1,
+            "no_copy": 1,
+            "allow_on_submit": 1,
+        },
+    )
+
+    # Uber Eats invoices only carried the order id in their remarks
+    invoices = frappe.db.sql(
+        """
+        SELECT name, remarks
+        FROM `tabSales Invoice`
+        WHERE custom_order_from = %s
+            AND remarks LIKE %s
+            AND IFNULL(custom_channel_order, '') = ''
+        """,
+        (UBER_EATS_ORDER_FROM, "%uber_eats_order_id:%"),
+        as_dict=True,
+    )
+
+    by_order_id = {}
+    for invoice in invoices:
+        order_id = extract_uber_eats_order_id(invoice.remarks)
+        if order_id:
+            by_order_id[order_id] = invoice.name
+
+    order_ids = list(by_order_id)
+    for start in range(0, len(order_ids), CHUNK_SIZE):
+        chunk = order_ids[start:start + CHUNK_SIZE]
+        for channel_order, order_id in frappe.get_all(
+            "Channel Order", filters={"order_id": ["in", chunk]}, fields=["name", "order_id"], as_list=True
+        ):
+            invoice = by_order_id[order_id]
+            frappe.db.set_value("Channel Order", channel_order, "sales_invoice", invoice, update_modified=False)
+            frappe.db.set_value(
+                "Sales Invoice", invoice, "custom_channel_order", channel_order, update_modified=False
+            )
+        frappe.db.commit()
@@ -0,0 +1,35 @@
+import frappe
+
+from excel_restaurant_pos.utils.jwt_auth import (
+    SESSION_TTL_SECONDS,
+    get_active_sessions_key,
+    revoke_specific_sessions,
+)
+
+
+def _legacy_lists(prefix):
+    """Yield (cache key, user, list of iat timestamps) of the pickled session lists under a prefix."""
+    cache = frappe.cache()
+    for full_key in cache.get_keys(prefix):
+        # keys come back with the site prefix of make_key
+        key = frappe.safe_decode(full_key).split("|", 1)[-1]
+        yield key, key[len(prefix):], cache.get_value(key) or []
+
+
+def execute():
+    # sessions moved from pickled lists to per user sorted sets, carry over
+    # the revoked ones so they stay revoked, and the active ones for the limit
+    cache = frappe.cache()
+
+    for key, user, sessions in _legacy_lists("jwt_revoked_sessions:"):
+        revoke_specific_sessions(user, [session for session in sessions if session])
+        cache.delete_value(key)
+
+    for key, user, sessions in _legacy_lists("jwt_active_sessions:"):
+        # legacy sessions are identified by their iat, which is also their login time
+        sessions = {session: session for session in sessions if isinstance(session, int)}
+        if sessions:
+            active_key = cache.make_key(get_active_sessions_key(user))
+            cache.zadd(active_key, sessions)
+            cache.expire(active_key, SESSION_TTL_SECONDS)
+        cache.delete_value(key)
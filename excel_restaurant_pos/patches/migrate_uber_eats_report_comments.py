@@ -0,0 +1,50 @@
+import json
+
+import frappe
+
+from excel_restaurant_pos.api.uber_eats.uber_eats_report import MAX_DOWNLOAD_ATTEMPTS, REPORT_DOCTYPE
+
+
+def execute():
+    # patches run before the doctype sync
+    frappe.reload_doc("excel_restaurant_pos", "doctype", "uber_eats_report")
+    frappe.reload_doc("excel_restaurant_pos", "doctype", "uber_eats_report_line")
+
+    # reports used to be stored as Comments on ArcPOS Settings
+    comments = frappe.get_all(
+        "Comment",
+        filters={
+            "reference_doctype": "ArcPOS Settings",
+            "reference_name": "ArcPOS Settings",
+            "comment_type": "Info",
+            "content": ["like", "%eats.report.success%"],
+        },
+        fields=["name", "content", "creation"],
+        order_by="creation asc",
+    )
+
+    for comment in comments:
+        try:
+            data = json.loads(comment.content)
+        except (json.JSONDecodeError, TypeError):
+            continue
+
+        workflow_id = data.get("workflow_id")
+        if not workflow_id or frappe.db.exists(REPORT_DOCTYPE, workflow_id):
+            continue
+
+        # the download URLs have expired, the CSV cannot be fetched anymore
+        frappe.get_doc({
+            "doctype": REPORT_DOCTYPE,
+            "workflow_id": workflow_id,
+            "report_type": data.get("report_type"),
+            "status": "Failed",
+            "download_attempts": MAX_DOWNLOAD_ATTEMPTS,
+            "error": "Migrated from a report Comment, download URLs have expired",
+            "received_at": comment.creation,
+            "download_urls": json.dumps(data.get("download_urls") or []),
+            "report_metadata": json.dumps((data.get("raw") or {}).get("report_metadata") or {}),
+        }).insert(ignore_permissions=True)
+        frappe.delete_doc("Comment", comment.name, ignore_permissions=True, force=True)
+
+    frappe.db.commit()
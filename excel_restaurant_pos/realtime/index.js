@@ -129,7 +129,10 @@ subscriber.on("message", function (_channel, message) {
 // Subscribe to Frappe's standard "events" channel (receives all Frappe realtime events)
 subscriber.subscribe("events");
 
-console.log("Redis subscriber connected for 'events' channel");
+// Subscribe to app events published from Python (realtime/utils.py publish_event)
+subscriber.subscribe("excel_restaurant_pos_events");
+
+console.log("Redis subscriber connected for 'events' and 'excel_restaurant_pos_events' channels");
 
 // Start server
 const port = conf.excel_restaurant_pos_socketio_port || conf.socketio_port || 9000; // Default to 9000 (same as Frappe)
@@ -0,0 +1,22 @@
+from .bootstrap import get_settings_bootstrap, invalidate_settings_bootstrap
+from .settings_cache import (
+    arcpos_settings,
+    arcpos_system_settings,
+    restaurant_settings,
+    get_settings_doc,
+    get_settings_db_hits,
+    invalidate_settings_cache,
+    add_settings_db_hits_header,
+)
+
+__all__ = [
+    "get_settings_bootstrap",
+    "invalidate_settings_bootstrap",
+    "arcpos_settings",
+    "arcpos_system_settings",
+    "restaurant_settings",
+    "get_settings_doc",
+    "get_settings_db_hits",
+    "invalidate_settings_cache",
+    "add_settings_db_hits_header",
+]
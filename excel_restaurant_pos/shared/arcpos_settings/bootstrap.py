@@ -0,0 +1,210 @@
+"""
+Precomputed settings bootstrap payload of the `api.settings.get` endpoint.
+
+Apps call the endpoint on every launch. The payload (ArcPOS Settings with the
+default Customer, tax template, Company and Currency resolved) is built once,
+stored in Redis as JSON and gzip bytes with an ETag, and rebuilt after one of
+its source documents changed.
+
+Saves that skip the doc events (`frappe.db.set_single_value`, `db.set_value`)
+are caught too: the payload is tied to the `modified` value of ArcPOS Settings,
+checked with one small query per call, and expires after BOOTSTRAP_TTL seconds
+so changes to the other source documents show up as well.
+
+Server side fields (accounts, email templates, integration credentials, push
+rules, coupon codes) and the standard document fields are left out.
+"""
+
+import gzip
+import hashlib
+
+import frappe
+
+BOOTSTRAP_KEY = "settings_bootstrap:payload"
+BOOTSTRAP_TTL = 600
+
+STANDARD_FIELDS = {
+    "name",
+    "doctype",
+    "owner",
+    "creation",
+    "modified",
+    "modified_by",
+    "docstatus",
+    "idx",
+    "parent",
+    "parentfield",
+    "parenttype",
+}
+SERVER_ONLY_FIELDS = {
+    "role_wise_permission",
+    "code_list",
+    "default_dc_account",
+    "default_sc_account",
+    "default_dc_account_pos",
+    "default_sc_account_pos",
+    "default_tip_account_pos",
+    "default_tip_account_web",
+    "dc_against_account",
+    "capi_access_token",
+    "catalog_id",
+    "catalog_access_token",
+    "delivery_or_pickup_template",
+    "scheduled_order_reminder_template",
+    "reservation_confirmation_template",
+    "reservation_reminder_template",
+    "reservation_rejection_template",
+    "reservation_reschedule_template",
+    "online_order_email_template",
+    "send_email_after_delivery",
+    "send_email_after_pickup",
+}
+SERVER_ONLY_PREFIXES = ("uber_eats_",)
+
+
+def _is_client_field(fieldname):
+    return (
+        fieldname not in STANDARD_FIELDS
+        and fieldname not in SERVER_ONLY_FIELDS
+        and not fieldname.startswith(SERVER_ONLY_PREFIXES)
+    )
+
+
+def _project(values):
+    """Drop standard and server side fields, also from child table rows."""
+    projected = {}
+    for fieldname, value in values.items():
+        if not _is_client_field(fieldname):
+            continue
+        if isinstance(value, list):
+            value = [
+                {key: row_value for key, row_value in row.items() if key not in STANDARD_FIELDS}
+                for row in value
+            ]
+        projected[fieldname] = value
+    return projected
+
+
+def build_settings_bootstrap():
+    """
+    Build the bootstrap payload from the database.
+    Returns:
+        tuple: (payload dict, sources dict of doctype -> document name)
+    """
+    # read from the database, the process copy of another worker may not
+    # have seen the change that dropped the payload yet
+    settings_doc = frappe.get_single("ArcPOS Settings")
+    settings = _project(settings_doc.as_dict(no_default_fields=True))
+    sources = {"ArcPOS Settings": "ArcPOS Settings"}
+
+    # get the customer
+    default_customer_code = settings_doc.customer
+    if default_customer_code:
+        customer = frappe.db.get_value(
+            "Customer", default_customer_code, ["name", "customer_name", "image"], as_dict=True
+        )
+        if customer:
+            settings["customer"] = customer
+            sources["Customer"] = customer.name
+
+    # get tax and charge templates
+    default_tax_template = settings_doc.taxes_and_charges_template
+    if default_tax_template:
+        tax_template = frappe.get_doc("Sales Taxes and Charges Template", default_tax_template)
+        sources["Sales Taxes and Charges Template"] = tax_template.name
+        if tax_template.taxes:
+            settings["taxes_and_charges"] = {
+                "charge_type": tax_template.taxes[0].charge_type,
+                "account_head": tax_template.taxes[0].account_head,
+                "rate": tax_template.taxes[0].rate,
+                "tax_amount": tax_template.taxes[0].tax_amount,
+                "total": tax_template.taxes[0].total,
+            }
+
+    # get default company info
+    default_currency = None
+    if settings_doc.company:
+        company = frappe.db.get_value(
+            "Company",
+            settings_doc.company,
+            ["name", "company_name", "abbr", "default_currency", "country", "domain"],
+            as_dict=True,
+        )
+        if company:
+            default_currency = company.default_currency
+            sources["Company"] = company.name
+            settings["company"] = {
+                "name": company.company_name,
+                "abbr": company.abbr,
+                "currency": company.default_currency,
+                "country": company.country,
+                "domain": company.domain,
+            }
+
+    # get default currency info
+    if default_currency:
+        currency = frappe.get_doc("Currency", default_currency)
+        sources["Currency"] = currency.name
+        settings["currency"] = {
+            "currency_name": currency.get("currency_name") or "",
+            "fraction": currency.get("fraction") or "",
+            "fraction_units": currency.get("fraction_units") or 0,
+            "symbol": currency.get("symbol") or "",
+            "note_variants": [
+                {
+                    "value": row.get("value") or "",
+                    "type": row.get("type") or "",
+                    "symbol": row.get("symbol") or "",
+                    "enabled": row.get("enabled") or 0,
+                }
+                for row in currency.get("custom_notes_variants") or []
+            ],
+        }
+
+    return settings, sources
+
+
+def get_settings_bootstrap():
+    """
+    Get the cached bootstrap, building it when missing.
+    Returns:
+        dict: etag, body (JSON bytes of the API response), gzip (compressed body)
+            and the source documents
+    """
+    cache = frappe.cache()
+    # modified is a standard column, get_single_value only reads DocFields
+    settings_modified = str(frappe.db.get_value("ArcPOS Settings", "ArcPOS Settings", "modified"))
+    bootstrap = cache.get_value(BOOTSTRAP_KEY)
+    if bootstrap and bootstrap.get("settings_modified") == settings_modified:
+        return bootstrap
+
+    settings, sources = build_settings_bootstrap()
+    body = frappe.as_json({"message": settings}, indent=None, separators=(",", ":")).encode()
+    bootstrap = {
+        "etag": f'"{hashlib.md5(body).hexdigest()}"',
+        "body": body,
+        "gzip": gzip.compress(body, compresslevel=6),
+        "sources": sources,
+        "settings_modified": settings_modified,
+    }
+    cache.set_value(BOOTSTRAP_KEY, bootstrap, expires_in_sec=BOOTSTRAP_TTL)
+    return bootstrap
+
+
+def clear_settings_bootstrap():
+    frappe.cache().delete_value(BOOTSTRAP_KEY)
+
+
+def invalidate_settings_bootstrap(doc, method=None):
+    """
+    Doc event of the bootstrap sources: drop the payload after commit when
+    the saved document is part of it.
+    """
+    bootstrap = frappe.cache().get_value(BOOTSTRAP_KEY)
+    if not bootstrap:
+        return
+
+    if bootstrap["sources"].get(doc.doctype) != doc.name and doc.doctype != "ArcPOS Settings":
+        return
+
+    frappe.db.after_commit.add(clear_settings_bootstrap)
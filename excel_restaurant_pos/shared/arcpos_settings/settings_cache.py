@@ -0,0 +1,357 @@
+"""
+Process-level cache of the settings singletons.
+
+ArcPOS Settings, ArcPOS System Settings and Restaurant Settings are read on
+almost every order save and API call. `get_settings_doc` keeps one loaded copy
+per site and doctype in process memory, keyed on the singleton's `modified`:
+
+- within a request the first lookup is reused, so a request sees one version
+  of the settings;
+- saving a singleton publishes its name on a Redis channel after commit; web
+  workers run a listener thread that drops the process copy on that message;
+- a process copy is re-validated against `modified` (one small query) after
+  REVALIDATE_AFTER seconds, or REVALIDATE_AFTER_NO_LISTENER when no listener
+  runs (background jobs, or settings written with `db.set_single_value`).
+
+The cached documents are shared between requests and must not be modified.
+Use `frappe.get_doc` when the settings are saved.
+
+Settings queries made through this module are counted per request and sent in
+the `X-ArcPOS-Settings-DB-Hits` response header.
+"""
+
+import json
+import threading
+import time
+
+import frappe
+from frappe.utils import cint, flt
+from frappe.utils.background_jobs import get_redis_conn
+
+SETTINGS_DOCTYPES = ("ArcPOS Settings", "ArcPOS System Settings", "Restaurant Settings")
+INVALIDATION_CHANNEL = "arcpos_settings:invalidate"
+REVALIDATE_AFTER = 300
+REVALIDATE_AFTER_NO_LISTENER = 10
+DB_HITS_HEADER = "X-ArcPOS-Settings-DB-Hits"
+
+# (site, doctype) -> {"doc", "modified", "checked_at"}
+_process_cache = {}
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _count_db_hit():
+    frappe.local.arcpos_settings_db_hits = get_settings_db_hits() + 1
+
+
+def get_settings_db_hits():
+    """Number of settings queries made in the current request or job."""
+    return getattr(frappe.local, "arcpos_settings_db_hits", 0)
+
+
+def _request_cache():
+    cache = getattr(frappe.local, "arcpos_settings_cache", None)
+    if cache is None:
+        cache = frappe.local.arcpos_settings_cache = {}
+    return cache
+
+
+def _listener_running():
+    return _listener is not None and _listener.is_alive()
+
+
+def _listen_for_invalidation(conn):
+    while True:
+        try:
+            pubsub = conn.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            for message in pubsub.listen():
+                data = json.loads(frappe.safe_decode(message["data"]))
+                _process_cache.pop((data.get("site"), data.get("doctype")), None)
+        except Exception:
+            # the copies are re-validated more often until the listener is back
+            _process_cache.clear()
+            time.sleep(5)
+
+
+def _ensure_listener():
+    """Start the invalidation listener once per web worker process."""
+    global _listener
+    if _listener_running() or not getattr(frappe.local, "request", None):
+        return
+
+    with _listener_lock:
+        if _listener_running():
+            return
+        # the connection is made here, frappe.local is not available in the thread
+        _listener = threading.Thread(
+            target=_listen_for_invalidation,
+            args=(get_redis_conn(),),
+            name="arcpos-settings-invalidation",
+            daemon=True,
+        )
+        _listener.start()
+
+
+def get_settings_doc(doctype):
+    """
+    Get a settings singleton from the request or process cache.
+
+    The returned document is the same object for every request of the
+    process, it is read-only: do not set fields on it or save it. Use
+    `frappe.get_doc(doctype)` for a copy that can be changed.
+
+    Args:
+        doctype: One of SETTINGS_DOCTYPES
+    Returns:
+        Document: Shared, read-only settings document
+    """
+    request_cache = _request_cache()
+    if doctype in request_cache:
+        return request_cache[doctype]
+
+    _ensure_listener()
+    key = (frappe.local.site, doctype)
+    entry = _process_cache.get(key)
+    now = time.monotonic()
+    max_age = REVALIDATE_AFTER if _listener_running() else REVALIDATE_AFTER_NO_LISTENER
+
+    if entry and now - entry["checked_at"] > max_age:
+        _count_db_hit()
+        # modified is a standard column, get_single_value only reads DocFields
+        modified = frappe.db.get_value(doctype, doctype, "modified")
+        if str(modified) == entry["modified"]:
+            entry["checked_at"] = now
+        else:
+            entry = None
+
+    if not entry:
+        _count_db_hit()
+        doc = frappe.get_single(doctype)
+        entry = {"doc": doc, "modified": str(doc.modified), "checked_at": now}
+        _process_cache[key] = entry
+
+    request_cache[doctype] = entry["doc"]
+    return entry["doc"]
+
+
+def clear_settings_cache(doctype=None):
+    """Drop the cached copies of the current site in this process."""
+    for key in list(_process_cache):
+        if key[0] == frappe.local.site and (doctype is None or key[1] == doctype):
+            _process_cache.pop(key, None)
+
+    if doctype:
+        _request_cache().pop(doctype, None)
+    else:
+        _request_cache().clear()
+
+
+def publish_settings_invalidation(doctype):
+    """Tell every process of the site to drop its copy of a singleton."""
+    clear_settings_cache(doctype)
+    try:
+        get_redis_conn().publish(
+            INVALIDATION_CHANNEL, json.dumps({"site": frappe.local.site, "doctype": doctype})
+        )
+    except Exception as e:
+        frappe.log_error(
+            f"Failed to publish settings invalidation for {doctype}: {str(e)}",
+            "Settings Cache Error",
+        )
+
+
+def invalidate_settings_cache(doc, method=None):
+    """Doc event of the settings singletons: invalidate once the save commits."""
+    frappe.db.after_commit.add(lambda: publish_settings_invalidation(doc.doctype))
+
+
+def add_settings_db_hits_header(response=None, request=None):
+    """after_request hook: expose the settings query count of the request."""
+    if response is not None:
+        response.headers[DB_HITS_HEADER] = str(get_settings_db_hits())
+
+
+class CachedSettings:
+    """Typed, read-only view of a cached settings singleton."""
+
+    doctype = None
+
+    def __init__(self):
+        self.doc = get_settings_doc(self.doctype)
+
+    def get(self, fieldname, default=None):
+        value = self.doc.get(fieldname)
+        return default if value in (None, "") else value
+
+    def _str(self, fieldname) -> str | None:
+        return self.doc.get(fieldname) or None
+
+    def _flt(self, fieldname) -> float:
+        return flt(self.doc.get(fieldname))
+
+    def _int(self, fieldname) -> int:
+        return cint(self.doc.get(fieldname))
+
+    def _bool(self, fieldname) -> bool:
+        return bool(cint(self.doc.get(fieldname)))
+
+    @property
+    def modified(self) -> str:
+        return str(self.doc.modified)
+
+
+class ArcPOSSettings(CachedSettings):
+    doctype = "ArcPOS Settings"
+
+    @property
+    def company(self) -> str | None:
+        return self._str("company")
+
+    @property
+    def customer(self) -> str | None:
+        return self._str("customer")
+
+    @property
+    def default_customer_website(self) -> str | None:
+        return self._str("default_customer_website")
+
+    @property
+    def default_outlet(self) -> str | None:
+        return self._str("default_outlet")
+
+    @property
+    def portal_base_url(self) -> str | None:
+        return self._str("portal_base_url")
+
+    @property
+    def allow_delivery_charge(self) -> bool:
+        return self._bool("allow_delivery_charge")
+
+    @property
+    def dc_charge_type_web(self) -> str:
+        return self._str("dc_charge_type_web") or "Actual"
+
+    @property
+    def dca(self) -> float:
+        return self._flt("dca")
+
+    @property
+    def dynamic_dc_criteria_web(self) -> list:
+        return self.doc.get("dynamic_dc_criteria_web") or []
+
+    @property
+    def default_dc_account(self) -> str | None:
+        return self._str("default_dc_account")
+
+    @property
+    def dc_against_account(self) -> str | None:
+        return self._str("dc_against_account")
+
+    @property
+    def delivery_or_pickup_template(self) -> str | None:
+        return self._str("delivery_or_pickup_template")
+
+    @property
+    def send_email_after_delivery(self) -> int:
+        return self._int("send_email_after_delivery")
+
+    @property
+    def send_email_after_pickup(self) -> int:
+        return self._int("send_email_after_pickup")
+
+    @property
+    def scheduled_order_reminder_template(self) -> str | None:
+        return self._str("scheduled_order_reminder_template")
+
+    @property
+    def role_wise_permission(self) -> list:
+        return self.doc.get("role_wise_permission") or []
+
+    @property
+    def catalog_id(self) -> str | None:
+        return self._str("catalog_id")
+
+    @property
+    def catalog_access_token(self) -> str | None:
+        return self._str("catalog_access_token")
+
+    @property
+    def pixel_id(self) -> str | None:
+        return self._str("pixel_id")
+
+    @property
+    def capi_access_token(self) -> str | None:
+        return self._str("capi_access_token")
+
+
+class ArcPOSSystemSettings(CachedSettings):
+    doctype = "ArcPOS System Settings"
+
+    @property
+    def user_default_role(self) -> str:
+        return self._str("user_default_role") or "Customer"
+
+    @property
+    def access_token_expiry(self) -> int:
+        return self._int("access_token_expiry") or 1
+
+    @property
+    def refresh_token_expiry(self) -> int:
+        return self._int("refresh_token_expiry") or 7
+
+    @property
+    def disable_rate_limiting(self) -> bool:
+        return self._bool("disable_rate_limiting")
+
+    @property
+    def rate_limit_policies(self) -> list:
+        return self.doc.get("rate_limit_policies") or []
+
+
+class RestaurantSettings(CachedSettings):
+    doctype = "Restaurant Settings"
+
+    @property
+    def company(self) -> str | None:
+        return self._str("company")
+
+    @property
+    def customer(self) -> str | None:
+        return self._str("customer")
+
+    @property
+    def title(self) -> str | None:
+        return self._str("title")
+
+    @property
+    def logo(self) -> str | None:
+        return self._str("logo")
+
+    @property
+    def tax_rate(self) -> float:
+        return self._flt("tax_rate")
+
+    @property
+    def charge_type(self) -> str | None:
+        return self._str("charge_type")
+
+    @property
+    def taxes_and_charges_template(self) -> str | None:
+        return self._str("taxes_and_charges_template")
+
+    @property
+    def print_format_for_order(self) -> str | None:
+        return self._str("print_format_for_order")
+
+
+def arcpos_settings() -> ArcPOSSettings:
+    return ArcPOSSettings()
+
+
+def arcpos_system_settings() -> ArcPOSSystemSettings:
+    return ArcPOSSystemSettings()
+
+
+def restaurant_settings() -> RestaurantSettings:
+    return RestaurantSettings()
@@ -1,6 +1,6 @@
 
-import frappe
+from .settings_cache import get_settings_doc
 
 
 def default_system_settings():
-    return frappe.get_single("ArcPOS System Settings")
\ No newline at end of file
+    return get_settings_doc("ArcPOS System Settings")
\ No newline at end of file
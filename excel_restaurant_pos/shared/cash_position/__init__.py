@@ -0,0 +1,13 @@
+from .cash_position import (
+    get_cash_position,
+    get_default_cash_account,
+    update_cash_position,
+    reconcile_cash_positions,
+)
+
+__all__ = [
+    "get_cash_position",
+    "get_default_cash_account",
+    "update_cash_position",
+    "reconcile_cash_positions",
+]
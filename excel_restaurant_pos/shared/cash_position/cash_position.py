@@ -0,0 +1,181 @@
+"""
+Running cash balance per account and per POS counter.
+
+A `Cash Position` row holds the balance (debit - credit) of a cash account,
+either for the whole account or for the postings of one counter. The vouchers
+that move cash at a counter carry it in `custom_pos_counter`.
+
+Rows are created on first use from one ledger query and then kept up to date
+by `update_cash_position`, which runs on every GL Entry submit inside the
+posting transaction. Cancelling a voucher submits reversal GL Entries with
+debit and credit swapped, so the same increment also undoes a cancelled
+posting. `reconcile_cash_positions` recomputes every row from the ledger
+hourly and corrects (and logs) any drift, e.g. from postings made while a row
+was being created.
+
+Reading the expected cash is a primary key lookup instead of a scan of every
+GL Entry of the account.
+"""
+
+import hashlib
+
+import frappe
+from frappe.utils import flt, now_datetime
+
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
+
+COUNTER_VOUCHER_TYPES = ("Sales Invoice", "Payment Entry", "Journal Entry")
+TRACKED_ACCOUNTS_CACHE_KEY = "cash_position:tracked_accounts"
+
+
+def cash_position_name(account, counter=None):
+    return hashlib.md5(f"{account}|{counter or ''}".encode()).hexdigest()
+
+
+def get_default_cash_account():
+    company = arcpos_settings().company
+    if not company:
+        frappe.throw("Default Company is not set in ArcPOS Settings")
+
+    cash_account = frappe.get_cached_value("Company", company, "default_cash_account")
+    if not cash_account:
+        frappe.throw(f"Default Cash Account is not set for Company {company}")
+
+    return cash_account
+
+
+def _ledger_balance(account, counter=None):
+    """Balance of an account (or of one counter's postings) from GL Entry."""
+    values = {"account": account, "counter": counter}
+    counter_filter = ""
+    if counter:
+        counter_filter = "AND (" + " OR ".join(
+            f"""(gl.voucher_type = '{voucher_type}' AND gl.voucher_no IN (
+                SELECT name FROM `tab{voucher_type}`
+                WHERE custom_pos_counter = %(counter)s AND docstatus > 0
+            ))"""
+            for voucher_type in COUNTER_VOUCHER_TYPES
+        ) + ")"
+
+    return flt(
+        frappe.db.sql(
+            f"""
+            SELECT COALESCE(SUM(gl.debit - gl.credit), 0)
+            FROM `tabGL Entry` gl
+            WHERE gl.is_cancelled = 0
+            AND gl.account = %(account)s
+            {counter_filter}
+            """,
+            values,
+        )[0][0]
+    )
+
+
+def _get_tracked_accounts():
+    """Accounts that have cash positions, cached until a position is added."""
+    def load():
+        return frappe.db.sql_list("SELECT DISTINCT account FROM `tabCash Position`")
+
+    return set(frappe.cache().get_value(TRACKED_ACCOUNTS_CACHE_KEY, generator=load) or [])
+
+
+def _create_cash_position(account, counter=None):
+    balance = _ledger_balance(account, counter)
+    now = now_datetime()
+    user = frappe.session.user or "Administrator"
+    frappe.db.sql(
+        """
+        INSERT INTO `tabCash Position`
+            (name, creation, modified, owner, modified_by, account, counter, balance, last_reconciled_on, last_drift)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 0)
+        ON DUPLICATE KEY UPDATE name = name
+        """,
+        (cash_position_name(account, counter), now, now, user, user, account, counter, balance, now),
+    )
+    # committed with the caller's request or job; ON DUPLICATE KEY makes a
+    # concurrent first read safe. Other workers see the account once committed.
+    frappe.cache().delete_value(TRACKED_ACCOUNTS_CACHE_KEY)
+    frappe.db.after_commit.add(lambda: frappe.cache().delete_value(TRACKED_ACCOUNTS_CACHE_KEY))
+    return balance
+
+
+def get_cash_position(account, counter=None):
+    """
+    Get the running balance of a cash account, or of one counter's postings.
+    The position is created from the ledger the first time it is requested.
+    """
+    balance = frappe.db.get_value("Cash Position", cash_position_name(account, counter), "balance")
+    if balance is None:
+        return _create_cash_position(account, counter)
+    return flt(balance)
+
+
+def update_cash_position(doc, method=None):
+    """
+    Add a submitted GL Entry to the cash positions of its account.
+    Called on GL Entry submit; entries of accounts without a position only
+    cost a cache read.
+    """
+    if doc.account not in _get_tracked_accounts():
+        return
+
+    names = [cash_position_name(doc.account)]
+    if doc.voucher_type in COUNTER_VOUCHER_TYPES:
+        counter = frappe.db.get_value(doc.voucher_type, doc.voucher_no, "custom_pos_counter")
+        if counter:
+            names.append(cash_position_name(doc.account, counter))
+
+    frappe.db.sql(
+        """
+        UPDATE `tabCash Position`
+        SET balance = balance + %(amount)s, modified = %(now)s
+        WHERE name IN %(names)s
+        """,
+        {"amount": flt(doc.debit) - flt(doc.credit), "now": now_datetime(), "names": names},
+    )
+
+
+def reconcile_cash_positions():
+    """
+    Recompute every cash position from the ledger. Runs hourly.
+
+    Each row is locked before the ledger is read, so postings that commit in
+    between are either in the sum or increment the corrected balance after it.
+    """
+    frappe.db.commit()
+    for name in frappe.get_all("Cash Position", pluck="name"):
+        try:
+            position = frappe.db.sql(
+                "SELECT account, counter, balance FROM `tabCash Position` WHERE name = %s FOR UPDATE",
+                (name,),
+                as_dict=True,
+            )
+            if not position:
+                frappe.db.rollback()
+                continue
+
+            position = position[0]
+            balance = _ledger_balance(position.account, position.counter)
+            drift = flt(balance - flt(position.balance), 9)
+            frappe.db.sql(
+                """
+                UPDATE `tabCash Position`
+                SET balance = %s, last_drift = %s, last_reconciled_on = %s
+                WHERE name = %s
+                """,
+                (balance, drift, now_datetime(), name),
+            )
+            frappe.db.commit()
+
+            if drift:
+                frappe.log_error(
+                    f"Cash position of {position.account} {position.counter or ''} "
+                    f"was off by {drift} and has been corrected",
+                    "Cash Position Drift",
+                )
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(
+                f"Failed to reconcile cash position {name}: {str(e)}",
+                "Cash Position Reconcile Error",
+            )
@@ -1,14 +1,14 @@
 import frappe
 
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
+
 
 def get_delivery_charge(sales_amount, quote_amount):
     """
     Get the delivery charge for a given sales amount and quote amount.
     Charge type: Actual (quote vs sales diff), Dynamic (tiered from criteria), Fixed.
     """
-    d_charge_type = (
-        frappe.db.get_single_value("ArcPOS Settings", "dc_charge_type_web") or "Actual"
-    )
+    d_charge_type = arcpos_settings().dc_charge_type_web
 
     match d_charge_type:
         case "Actual":
@@ -28,8 +28,7 @@ def get_delivery_charge(sales_amount, quote_amount):
 def _get_dynamic_charge(sales_amount):
     """Resolve charge from dynamic_dc_criteria_web (from_amount <= amount <= to_amount)."""
     amount = float(sales_amount or 0)
-    settings = frappe.get_cached_doc("ArcPOS Settings")
-    for row in settings.get("dynamic_dc_criteria_web") or []:
+    for row in arcpos_settings().dynamic_dc_criteria_web:
         from_amt = float(row.from_amount) if row.from_amount is not None else 0
         to_amt = float(row.to_amount) if row.to_amount is not None else float("inf")
         if from_amt <= amount and amount <= to_amt:
@@ -39,7 +38,6 @@ def _get_dynamic_charge(sales_amount):
 
 def _get_fixed_charge():
     """Return fixed delivery charge from settings (fixed_dc_amount_pos used for web)."""
-    val = frappe.db.get_single_value("ArcPOS Settings", "dca")
-    return float(val or 0)
+    return arcpos_settings().dca
 
 
@@ -0,0 +1,13 @@
+from .gl_balance import (
+    get_account_balances,
+    get_latest_checkpoints,
+    refresh_gl_balance_checkpoints,
+    invalidate_gl_balance_checkpoints,
+)
+
+__all__ = [
+    "get_account_balances",
+    "get_latest_checkpoints",
+    "refresh_gl_balance_checkpoints",
+    "invalidate_gl_balance_checkpoints",
+]
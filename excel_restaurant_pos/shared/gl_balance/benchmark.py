@@ -0,0 +1,169 @@
+"""
+Benchmark of the payment overview ledger queries on a synthetic GL.
+
+Run with:
+    bench --site <site> execute excel_restaurant_pos.shared.gl_balance.benchmark.benchmark_payment_overview
+
+Builds a scratch ledger table with the GL Entry columns the report reads and
+the (account, posting_date) index, fills it from the MariaDB sequence engine
+and compares:
+    legacy        two queries per account (opening balance + period totals)
+    single pass   one grouped query over the whole history
+    checkpoints   one grouped query after the month-end checkpoints
+The scratch table and the benchmark checkpoints are removed afterwards.
+"""
+
+import time
+
+import frappe
+from frappe.utils import add_days, flt, today
+
+from .gl_balance import (
+    LATEST_CHECKPOINT_CACHE_KEY,
+    get_account_balances,
+    refresh_gl_balance_checkpoints,
+)
+
+BENCH_TABLE = "tabGL Entry Benchmark"
+BENCH_ACCOUNT_PREFIX = "BENCH-GL-"
+
+
+def _create_bench_ledger(rows, accounts, years):
+    frappe.db.sql_ddl(f"DROP TABLE IF EXISTS `{BENCH_TABLE}`")
+    frappe.db.sql_ddl(
+        f"""
+        CREATE TABLE `{BENCH_TABLE}` (
+            `name` BIGINT NOT NULL PRIMARY KEY,
+            `account` VARCHAR(140),
+            `posting_date` DATE,
+            `debit` DECIMAL(21, 9) NOT NULL DEFAULT 0,
+            `credit` DECIMAL(21, 9) NOT NULL DEFAULT 0,
+            `is_cancelled` INT(1) NOT NULL DEFAULT 0,
+            KEY `account_posting_date` (`account`, `posting_date`)
+        ) ENGINE=InnoDB
+        """
+    )
+    # insert in chunks to keep the undo log small
+    chunk = 500000
+    for offset in range(0, rows, chunk):
+        size = min(chunk, rows - offset)
+        frappe.db.sql(
+            f"""
+            INSERT INTO `{BENCH_TABLE}` (name, account, posting_date, debit, credit, is_cancelled)
+            SELECT
+                seq + %(offset)s,
+                CONCAT(%(prefix)s, (seq + %(offset)s) %% %(accounts)s),
+                DATE_SUB(CURDATE(), INTERVAL (seq + %(offset)s) %% %(days)s DAY),
+                IF(seq %% 2 = 0, ROUND(RAND(seq) * 1000, 2), 0),
+                IF(seq %% 2 = 1, ROUND(RAND(seq) * 1000, 2), 0),
+                IF(seq %% 50 = 0, 1, 0)
+            FROM seq_1_to_{size}
+            """,
+            {"offset": offset, "prefix": BENCH_ACCOUNT_PREFIX, "accounts": accounts, "days": years * 365},
+        )
+        frappe.db.commit()
+
+
+def _legacy_balances(accounts, start_date, end_date):
+    """The previous report path: two ledger queries per account."""
+    balances = {}
+    for account in accounts:
+        opening = frappe.db.sql(
+            f"""
+            SELECT COALESCE(SUM(debit), 0) - COALESCE(SUM(credit), 0)
+            FROM `{BENCH_TABLE}`
+            WHERE is_cancelled = 0 AND account = %s AND posting_date < %s
+            """,
+            (account, start_date),
+        )[0][0]
+        debit, credit = frappe.db.sql(
+            f"""
+            SELECT COALESCE(SUM(debit), 0), COALESCE(SUM(credit), 0)
+            FROM `{BENCH_TABLE}`
+            WHERE is_cancelled = 0 AND account = %s
+            AND posting_date >= %s AND posting_date <= %s
+            """,
+            (account, start_date, end_date),
+        )[0]
+        balances[account] = {"opening_balance": flt(opening), "debit": flt(debit), "credit": flt(credit)}
+    return balances
+
+
+def _timed(label, func, runs):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{label:<14} best of {runs}: {best * 1000:10.1f} ms")
+    return result, best
+
+
+def _same(left, right):
+    return all(
+        abs(flt(left[account][key]) - flt(right[account][key])) < 0.01
+        for account in left
+        for key in ("opening_balance", "debit", "credit")
+    )
+
+
+def benchmark_payment_overview(rows=5000000, accounts=8, years=5, period_days=30, runs=3):
+    """
+    Compare the legacy, single pass and checkpointed ledger queries.
+
+    Args:
+        rows: Synthetic GL rows
+        accounts: Number of payment accounts
+        years: History the rows are spread over
+        period_days: Length of the reported period, ending today
+        runs: Timed runs per variant (best is reported)
+    """
+    rows, accounts, years, runs = int(rows), int(accounts), int(years), int(runs)
+    account_names = [f"{BENCH_ACCOUNT_PREFIX}{i}" for i in range(accounts)]
+    end_date = today()
+    start_date = add_days(end_date, -int(period_days))
+
+    print(f"Building {rows:,} GL rows over {years} years for {accounts} accounts ...")
+    start = time.perf_counter()
+    _create_bench_ledger(rows, accounts, years)
+    print(f"built in {time.perf_counter() - start:.1f} s")
+
+    try:
+        legacy, legacy_seconds = _timed(
+            "legacy", lambda: _legacy_balances(account_names, start_date, end_date), runs
+        )
+        single, single_seconds = _timed(
+            "single pass",
+            lambda: get_account_balances(
+                account_names, start_date, end_date, use_checkpoints=False, gl_table=BENCH_TABLE
+            ),
+            runs,
+        )
+
+        start = time.perf_counter()
+        written = refresh_gl_balance_checkpoints(account_names, gl_table=BENCH_TABLE)
+        print(f"checkpoints    {written} month ends built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        checkpointed, checkpoint_seconds = _timed(
+            "checkpoints",
+            lambda: get_account_balances(account_names, start_date, end_date, gl_table=BENCH_TABLE),
+            runs,
+        )
+
+        matches = _same(legacy, single) and _same(legacy, checkpointed)
+        print(f"results match: {matches}")
+        print(f"speedup single pass: {legacy_seconds / single_seconds:.1f}x")
+        print(f"speedup checkpoints: {legacy_seconds / checkpoint_seconds:.1f}x")
+        return {
+            "legacy_ms": round(legacy_seconds * 1000, 1),
+            "single_pass_ms": round(single_seconds * 1000, 1),
+            "checkpoints_ms": round(checkpoint_seconds * 1000, 1),
+            "results_match": matches,
+        }
+    finally:
+        frappe.db.sql_ddl(f"DROP TABLE IF EXISTS `{BENCH_TABLE}`")
+        frappe.db.delete("GL Balance Checkpoint", {"account": ["like", f"{BENCH_ACCOUNT_PREFIX}%"]})
+        frappe.db.commit()
+        frappe.cache().delete_value(LATEST_CHECKPOINT_CACHE_KEY)
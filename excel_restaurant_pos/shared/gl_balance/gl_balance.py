@@ -0,0 +1,251 @@
+"""
+Account balances from the General Ledger with month-end checkpoints.
+
+`GL Balance Checkpoint` keeps the cumulative debit / credit of an account up to
+a month end. Balances of a date range are computed with one grouped query over
+GL Entry that only reads the postings after the latest checkpoint before the
+range, so opening balances no longer scan the whole ledger history.
+
+Checkpoints are added by `refresh_gl_balance_checkpoints` (daily) up to the
+last closed month. A GL Entry posted on or before a checkpoint of its account
+(back-dated entries, cancellations) deletes the affected checkpoints; the
+query falls back to an older checkpoint until the next refresh rebuilds them.
+"""
+
+import hashlib
+
+import frappe
+from frappe.utils import add_months, flt, get_last_day, getdate, today
+
+GL_TABLE = "tabGL Entry"
+LATEST_CHECKPOINT_CACHE_KEY = "gl_balance_checkpoint:latest_period_end"
+
+
+def checkpoint_name(account, period_end):
+    return hashlib.md5(f"{account}|{period_end}".encode()).hexdigest()
+
+
+def get_latest_checkpoints(accounts, before_date=None):
+    """
+    Get the latest checkpoint of every account, optionally before a date.
+    Returns:
+        dict: account -> checkpoint row (period_end, debit, credit, balance)
+    """
+    if not accounts:
+        return {}
+
+    date_filter = "AND cp.period_end < %(before_date)s" if before_date else ""
+    rows = frappe.db.sql(
+        f"""
+        SELECT cp.account, cp.period_end, cp.debit, cp.credit, cp.balance
+        FROM `tabGL Balance Checkpoint` cp
+        INNER JOIN (
+            SELECT account, MAX(period_end) AS period_end
+            FROM `tabGL Balance Checkpoint`
+            WHERE account IN %(accounts)s
+            {date_filter}
+            GROUP BY account
+        ) latest ON latest.account = cp.account AND latest.period_end = cp.period_end
+        """,
+        {"accounts": list(accounts), "before_date": before_date},
+        as_dict=True,
+    )
+    return {row.account: row for row in rows}
+
+
+def _after_checkpoint_condition(accounts, checkpoints, values, gl_alias="gl"):
+    """
+    SQL condition keeping only the postings after each account's checkpoint.
+    Adds the checkpoint dates to `values`.
+    """
+    if not checkpoints:
+        return ""
+
+    cases = []
+    for i, (account, checkpoint) in enumerate(checkpoints.items()):
+        values[f"cp_account_{i}"] = account
+        values[f"cp_date_{i}"] = checkpoint.period_end
+        cases.append(f"WHEN %(cp_account_{i})s THEN %(cp_date_{i})s")
+
+    condition = (
+        f"AND {gl_alias}.posting_date > CASE {gl_alias}.account "
+        f"{' '.join(cases)} ELSE '1900-01-01' END"
+    )
+    if all(account in checkpoints for account in accounts):
+        # plain lower bound so the (account, posting_date) index range is used
+        values["cp_min_date"] = min(checkpoint.period_end for checkpoint in checkpoints.values())
+        condition += f" AND {gl_alias}.posting_date > %(cp_min_date)s"
+    return condition
+
+
+def get_account_balances(accounts, start_date, end_date, use_checkpoints=True, gl_table=GL_TABLE):
+    """
+    Get opening balance and period debit / credit of accounts in one pass.
+
+    Args:
+        accounts: Account names
+        start_date: First date of the period
+        end_date: Last date of the period
+        use_checkpoints: Start from the month-end checkpoints (False scans all history)
+        gl_table: Ledger table, only changed by the benchmark
+
+    Returns:
+        dict: account -> {"opening_balance", "debit", "credit"}
+    """
+    accounts = list(dict.fromkeys(account for account in accounts or [] if account))
+    if not accounts:
+        return {}
+
+    checkpoints = get_latest_checkpoints(accounts, before_date=start_date) if use_checkpoints else {}
+    values = {"accounts": accounts, "start_date": start_date, "end_date": end_date}
+    after_checkpoint = _after_checkpoint_condition(accounts, checkpoints, values)
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT
+            gl.account,
+            SUM(IF(gl.posting_date < %(start_date)s, gl.debit - gl.credit, 0)) AS opening_delta,
+            SUM(IF(gl.posting_date >= %(start_date)s, gl.debit, 0)) AS debit,
+            SUM(IF(gl.posting_date >= %(start_date)s, gl.credit, 0)) AS credit
+        FROM `{gl_table}` gl
+        WHERE gl.is_cancelled = 0
+        AND gl.account IN %(accounts)s
+        AND gl.posting_date <= %(end_date)s
+        {after_checkpoint}
+        GROUP BY gl.account
+        """,
+        values,
+        as_dict=True,
+    )
+    totals = {row.account: row for row in rows}
+
+    balances = {}
+    for account in accounts:
+        row = totals.get(account) or {}
+        checkpoint = checkpoints.get(account) or {}
+        balances[account] = {
+            "opening_balance": flt(checkpoint.get("balance")) + flt(row.get("opening_delta")),
+            "debit": flt(row.get("debit")),
+            "credit": flt(row.get("credit")),
+        }
+    return balances
+
+
+def get_checkpoint_accounts():
+    """Accounts that get checkpoints: the accounts payments are received into."""
+    return frappe.db.sql_list(
+        """
+        SELECT DISTINCT paid_to
+        FROM `tabPayment Entry`
+        WHERE docstatus = 1
+        AND IFNULL(paid_to, '') != ''
+        """
+    )
+
+
+def refresh_gl_balance_checkpoints(accounts=None, gl_table=GL_TABLE):
+    """
+    Add the missing month-end checkpoints up to the last closed month.
+    Runs daily from the scheduler; the first run backfills the whole history
+    with one grouped query.
+
+    Returns:
+        int: Number of checkpoints written
+    """
+    accounts = accounts or get_checkpoint_accounts()
+    if not accounts:
+        return 0
+
+    last_period_end = get_last_day(add_months(today(), -1))
+    checkpoints = get_latest_checkpoints(accounts)
+    accounts = list(accounts)
+    values = {"accounts": accounts, "last_period_end": last_period_end}
+    after_checkpoint = _after_checkpoint_condition(accounts, checkpoints, values)
+
+    monthly = frappe.db.sql(
+        f"""
+        SELECT
+            gl.account,
+            LAST_DAY(gl.posting_date) AS period_end,
+            SUM(gl.debit) AS debit,
+            SUM(gl.credit) AS credit
+        FROM `{gl_table}` gl
+        WHERE gl.is_cancelled = 0
+        AND gl.account IN %(accounts)s
+        AND gl.posting_date <= %(last_period_end)s
+        {after_checkpoint}
+        GROUP BY gl.account, LAST_DAY(gl.posting_date)
+        ORDER BY gl.account, period_end
+        """,
+        values,
+        as_dict=True,
+    )
+
+    running = {
+        account: [flt(checkpoint.debit), flt(checkpoint.credit)]
+        for account, checkpoint in checkpoints.items()
+    }
+    new_rows = []
+    for row in monthly:
+        debit, credit = running.setdefault(row.account, [0.0, 0.0])
+        debit += flt(row.debit)
+        credit += flt(row.credit)
+        running[row.account] = [debit, credit]
+        new_rows.append((row.account, getdate(row.period_end), debit, credit))
+
+    _upsert_checkpoints(new_rows)
+    frappe.db.commit()
+    frappe.cache().delete_value(LATEST_CHECKPOINT_CACHE_KEY)
+    return len(new_rows)
+
+
+def _upsert_checkpoints(rows):
+    if not rows:
+        return
+
+    now = frappe.utils.now()
+    user = frappe.session.user or "Administrator"
+    values = []
+    for account, period_end, debit, credit in rows:
+        values.extend(
+            [checkpoint_name(account, period_end), now, now, user, user, account, period_end, debit, credit, debit - credit]
+        )
+
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tabGL Balance Checkpoint`
+            (name, creation, modified, owner, modified_by, account, period_end, debit, credit, balance)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            debit = VALUES(debit),
+            credit = VALUES(credit),
+            balance = VALUES(balance),
+            modified = VALUES(modified)
+        """,
+        tuple(values),
+    )
+
+
+def _get_latest_period_end():
+    """Latest checkpoint date of any account, cached until checkpoints change."""
+    def load():
+        return str(frappe.db.get_value("GL Balance Checkpoint", {}, "max(period_end)") or "")
+
+    return frappe.cache().get_value(LATEST_CHECKPOINT_CACHE_KEY, generator=load)
+
+
+def invalidate_gl_balance_checkpoints(doc, method=None):
+    """
+    Delete the checkpoints a GL Entry falls into. Called on GL Entry submit;
+    entries after the latest checkpoint (the normal case) only cost a cache read.
+    """
+    latest_period_end = _get_latest_period_end()
+    if not latest_period_end or str(getdate(doc.posting_date)) > latest_period_end:
+        return
+
+    frappe.db.delete(
+        "GL Balance Checkpoint",
+        {"account": doc.account, "period_end": [">=", getdate(doc.posting_date)]},
+    )
+    frappe.db.after_commit.add(lambda: frappe.cache().delete_value(LATEST_CHECKPOINT_CACHE_KEY))
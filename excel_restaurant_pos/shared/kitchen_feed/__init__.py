@@ -0,0 +1,17 @@
+from .kitchen_feed import (
+    get_kitchen_feed,
+    get_kitchen_outlet,
+    kitchen_room,
+    publish_kitchen_update,
+    publish_sales_invoice_update,
+    publish_table_order_update,
+)
+
+__all__ = [
+    "get_kitchen_feed",
+    "get_kitchen_outlet",
+    "kitchen_room",
+    "publish_kitchen_update",
+    "publish_sales_invoice_update",
+    "publish_table_order_update",
+]
@@ -0,0 +1,247 @@
+"""
+Incremental kitchen display feed.
+
+Changes of Table Orders and kitchen relevant Sales Invoices are reduced to a
+compact diff (order status, changed lines, removed lines, timestamps), appended
+to a per-outlet Redis stream and pushed to the `kitchen:{outlet}` room of the
+realtime server. The stream entry id is the sequence number of the update.
+
+Screens load the full list once, remember the last `seq` they saw and after a
+reconnect call `get_kitchen_feed(outlet, since=seq)` to replay only what they
+missed. When `reset` is returned the gap was trimmed from the stream and the
+screen reloads the full list instead.
+"""
+
+import json
+from functools import partial
+
+import frappe
+from frappe.utils.background_jobs import get_redis_conn
+
+from excel_restaurant_pos.realtime.utils import publish_to_room
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
+
+KITCHEN_EVENT = "kitchen:update"
+# entries kept per outlet, roughly a busy day of order changes
+STREAM_MAXLEN = 5000
+REPLAY_LIMIT = 500
+DEFAULT_OUTLET = "default"
+
+TABLE_ORDER_FIELDS = ["status", "table", "floor", "remarks"]
+TABLE_ORDER_LINE_FIELDS = [
+    "item",
+    "qty",
+    "is_parcel",
+    "is_accepted",
+    "is_ready",
+    "remarks",
+    "order_placed_time",
+    "order_accepted_time",
+    "order_ready_time",
+    "order_confirm_time",
+]
+
+SALES_INVOICE_FIELDS = [
+    "custom_order_status",
+    "custom_service_type",
+    "custom_linked_table",
+    "custom_order_from",
+    "custom_delivery_date",
+    "custom_delivery_time",
+    "custom_is_deleted",
+]
+SALES_INVOICE_LINE_FIELDS = [
+    "item_code",
+    "item_name",
+    "qty",
+    "custom_order_item_status",
+    "custom_serve_type",
+    "custom_kitchen_note",
+    "custom_special_note",
+    "custom_new_ordered_item",
+]
+
+
+def _stream_key(outlet):
+    return f"{frappe.local.site}:kitchen_feed:{outlet}"
+
+
+def kitchen_room(outlet):
+    return f"kitchen:{outlet}"
+
+
+def get_kitchen_outlet(doc=None):
+    """
+    Get the outlet whose kitchen handles the document.
+    Sales Invoices use their territory when it is an outlet, everything else
+    goes to the default outlet of ArcPOS Settings.
+    """
+    territory = doc.get("territory") if doc else None
+    if territory and frappe.get_cached_value("Territory", territory, "custom_is_outlet"):
+        return territory
+
+    return arcpos_settings().default_outlet or DEFAULT_OUTLET
+
+
+def _values(row, fields):
+    return {field: row.get(field) for field in fields}
+
+
+def _diff_lines(doc, table_field, line_fields):
+    """
+    Compare the child rows of a document with the version before the save.
+    Returns:
+        tuple: (changed or added lines, names of removed lines)
+    """
+    before = doc.get_doc_before_save()
+    before_rows = {}
+    if before:
+        before_rows = {row.name: _values(row, line_fields) for row in before.get(table_field) or []}
+
+    changed = []
+    current_names = set()
+    for row in doc.get(table_field) or []:
+        current_names.add(row.name)
+        values = _values(row, line_fields)
+        if before_rows.get(row.name) != values:
+            changed.append({"name": row.name, **values})
+
+    removed = [name for name in before_rows if name not in current_names]
+    return changed, removed
+
+
+def _header_changed(doc, fields):
+    before = doc.get_doc_before_save()
+    if not before:
+        return True
+    return any(before.get(field) != doc.get(field) for field in fields)
+
+
+def build_kitchen_diff(doc, header_fields, table_field, line_fields):
+    """
+    Build the kitchen diff of a saved document.
+    Returns:
+        dict or None: None when nothing the kitchen shows has changed
+    """
+    lines, removed = _diff_lines(doc, table_field, line_fields)
+    header_changed = _header_changed(doc, header_fields)
+    if not (lines or removed or header_changed):
+        return None
+
+    return {
+        "doctype": doc.doctype,
+        "name": doc.name,
+        # without a previous version every line is sent
+        "full": doc.get_doc_before_save() is None,
+        "modified": doc.modified,
+        **_values(doc, header_fields),
+        "lines": lines,
+        "removed": removed,
+    }
+
+
+def publish_table_order_update(doc):
+    """Publish the kitchen diff of a Table Order after the transaction commits."""
+    diff = build_kitchen_diff(doc, TABLE_ORDER_FIELDS, "item_list", TABLE_ORDER_LINE_FIELDS)
+    if diff:
+        frappe.db.after_commit.add(partial(publish_kitchen_update, get_kitchen_outlet(), diff))
+
+
+def publish_sales_invoice_update(doc):
+    """Publish the kitchen diff of a Sales Invoice that is a restaurant order."""
+    if not doc.get("custom_order_status"):
+        return
+
+    diff = build_kitchen_diff(doc, SALES_INVOICE_FIELDS, "items", SALES_INVOICE_LINE_FIELDS)
+    if diff:
+        frappe.db.after_commit.add(partial(publish_kitchen_update, get_kitchen_outlet(doc), diff))
+
+
+def publish_kitchen_update(outlet, diff):
+    """
+    Append a diff to the outlet stream and push it to the kitchen room.
+    Returns:
+        str: Sequence number (stream entry id) of the update
+    """
+    try:
+        data = json.dumps(diff, default=str)
+        seq = frappe.safe_decode(
+            get_redis_conn().xadd(
+                _stream_key(outlet), {"data": data}, maxlen=STREAM_MAXLEN, approximate=True
+            )
+        )
+    except Exception as e:
+        frappe.log_error(
+            f"Failed to append kitchen update for {diff.get('name')}: {str(e)}",
+            "Kitchen Feed Error",
+        )
+        return None
+
+    publish_to_room(
+        kitchen_room(outlet),
+        KITCHEN_EVENT,
+        {"seq": seq, "outlet": outlet, **json.loads(data)},
+        namespace=frappe.local.site,
+    )
+    return seq
+
+
+def _parse_seq(seq):
+    """Split a stream id into a comparable tuple."""
+    ms, _, counter = str(seq).partition("-")
+    return int(ms), int(counter or 0)
+
+
+@frappe.whitelist()
+def get_kitchen_feed(outlet=None, since=None, limit=REPLAY_LIMIT):
+    """
+    Replay the kitchen updates of an outlet after a sequence number.
+    Args:
+        outlet: Outlet (Territory); defaults to the ArcPOS Settings outlet
+        since: Last sequence number the client has seen; omit to only get the
+            current sequence number
+        limit: Maximum number of updates to return
+    Returns:
+        dict: outlet, room, updates after `since`, last_seq and reset flag
+    """
+    outlet = outlet or get_kitchen_outlet()
+    limit = min(int(limit or REPLAY_LIMIT), REPLAY_LIMIT)
+    conn = get_redis_conn()
+    key = _stream_key(outlet)
+
+    result = {
+        "outlet": outlet,
+        "room": kitchen_room(outlet),
+        "updates": [],
+        "last_seq": None,
+        "reset": False,
+    }
+
+    last = conn.xrevrange(key, count=1)
+    if last:
+        result["last_seq"] = frappe.safe_decode(last[0][0])
+    if not since:
+        return result
+
+    try:
+        since_key = _parse_seq(since)
+    except ValueError:
+        frappe.throw("Invalid sequence number")
+
+    first = conn.xrange(key, count=1)
+    if not first or since_key < _parse_seq(frappe.safe_decode(first[0][0])):
+        # updates after `since` were trimmed from the stream
+        result["reset"] = True
+        return result
+
+    for entry_id, fields in conn.xrange(key, min=since, count=limit + 1):
+        seq = frappe.safe_decode(entry_id)
+        if seq == since:
+            continue
+        data = fields.get(b"data") or fields.get("data")
+        result["updates"].append({"seq": seq, "outlet": outlet, **json.loads(data)})
+
+    result["updates"] = result["updates"][:limit]
+    if result["updates"]:
+        result["last_seq"] = result["updates"][-1]["seq"]
+    return result
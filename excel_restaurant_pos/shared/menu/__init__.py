@@ -0,0 +1,15 @@
+from .menu_snapshot import (
+    get_menu_snapshot,
+    get_available_menus,
+    refresh_menu_entry,
+    refresh_item_menus,
+    rebuild_menu_snapshot,
+)
+
+__all__ = [
+    "get_menu_snapshot",
+    "get_available_menus",
+    "refresh_menu_entry",
+    "refresh_item_menus",
+    "rebuild_menu_snapshot",
+]
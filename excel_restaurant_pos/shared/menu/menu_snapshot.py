@@ -0,0 +1,206 @@
+"""
+Precomputed menu snapshot kept in Redis.
+
+The snapshot holds every menu with its availability rows and the set of menus
+referenced by active items. It is refreshed per menu / per item change from the
+document events, so the guest menu endpoint only filters the snapshot by the
+current day and time window in memory.
+"""
+
+import hashlib
+from datetime import datetime, timedelta
+
+import frappe
+
+MENU_ENTRIES_KEY = "menu_snapshot:menus"
+ITEM_MENUS_KEY = "menu_snapshot:item_menus"
+VERSION_KEY = "menu_snapshot:version"
+
+MENU_FIELDS = ["name", "menu_name", "image", "enabled", "start_date", "expires_on", "modified"]
+AVAILABILITY_FIELDS = [
+    "name",
+    "outlet_name",
+    "parent",
+    "days",
+    "time",
+    "to_time",
+    "publish_pos",
+    "publish_website",
+]
+# item fields that decide which menus are visible on the menu endpoint
+ITEM_MENU_FIELDS = ("custom_menu", "disabled", "variant_of")
+
+
+def _bump_version():
+    """Mark the snapshot as changed so clients holding an old ETag refetch."""
+    frappe.cache().set_value(VERSION_KEY, frappe.generate_hash(length=12))
+
+
+def _load_item_menus():
+    """Distinct menus referenced by active, non-variant items."""
+    rows = frappe.db.sql(
+        """
+        SELECT DISTINCT custom_menu
+        FROM `tabItem`
+        WHERE IFNULL(variant_of, '') = '' AND disabled = 0 AND IFNULL(custom_menu, '') != ''
+        """
+    )
+    return [row[0] for row in rows]
+
+
+def _load_menu_entries(menu_names=None):
+    """Load menus with their availability rows, optionally limited to some menus."""
+    filters = {"name": ["in", menu_names]} if menu_names else {}
+    menus = frappe.get_all("Menus", filters=filters, fields=MENU_FIELDS)
+    if not menus:
+        return {}
+
+    entries = {menu.name: menu for menu in menus}
+    for menu in menus:
+        menu["items"] = []
+
+    rows = frappe.get_all(
+        "Menu Availability",
+        filters={"parent": ["in", list(entries)], "parenttype": "Menus"},
+        fields=AVAILABILITY_FIELDS,
+        order_by="idx asc",
+    )
+    for row in rows:
+        entries[row.parent]["items"].append(row)
+
+    return entries
+
+
+def rebuild_menu_snapshot():
+    """
+    Rebuild the whole snapshot from the database.
+    The menus are written into a temporary hash that is renamed over the live
+    one, so readers never see a half filled snapshot.
+    """
+    cache = frappe.cache()
+    entries = _load_menu_entries()
+    if entries:
+        # unique per run so two concurrent rebuilds do not mix their entries
+        temp_key = f"{MENU_ENTRIES_KEY}:rebuild:{frappe.generate_hash(length=8)}"
+        for name, entry in entries.items():
+            cache.hset(temp_key, name, entry)
+        cache.rename(cache.make_key(temp_key), cache.make_key(MENU_ENTRIES_KEY))
+    else:
+        cache.delete_value(MENU_ENTRIES_KEY)
+    cache.set_value(ITEM_MENUS_KEY, _load_item_menus())
+    _bump_version()
+
+
+def refresh_menu_entry(menu_name):
+    """Reload a single menu into the snapshot, or drop it when it was deleted."""
+    cache = frappe.cache()
+    entry = _load_menu_entries([menu_name]).get(menu_name)
+    if entry:
+        cache.hset(MENU_ENTRIES_KEY, menu_name, entry)
+    else:
+        cache.hdel(MENU_ENTRIES_KEY, menu_name)
+    _bump_version()
+
+
+def refresh_item_menus(doc=None):
+    """
+    Recompute the menus referenced by items.
+    Args:
+        doc: Item document; when given, nothing is done unless a menu related
+            field changed.
+    """
+    if doc and not any(doc.has_value_changed(f) for f in ITEM_MENU_FIELDS):
+        return
+
+    frappe.cache().set_value(ITEM_MENUS_KEY, _load_item_menus())
+    _bump_version()
+
+
+def get_menu_snapshot():
+    """
+    Get the cached snapshot, rebuilding it when Redis was flushed.
+    Returns:
+        tuple: (version, menu entries dict, item menus set)
+    """
+    cache = frappe.cache()
+    version = cache.get_value(VERSION_KEY)
+    item_menus = cache.get_value(ITEM_MENUS_KEY)
+
+    if not version or item_menus is None:
+        rebuild_menu_snapshot()
+        version = cache.get_value(VERSION_KEY)
+        item_menus = cache.get_value(ITEM_MENUS_KEY)
+
+    entries = cache.hgetall(MENU_ENTRIES_KEY) or {}
+    return version, entries, set(item_menus or [])
+
+
+def _to_timedelta(value):
+    """Normalize a Time field value (timedelta or 'HH:MM:SS' string)."""
+    if value is None or isinstance(value, timedelta):
+        return value
+    hours, minutes, *seconds = str(value).split(":")
+    return timedelta(
+        hours=int(hours), minutes=int(minutes), seconds=float(seconds[0]) if seconds else 0
+    )
+
+
+def get_available_menus(now=None):
+    """
+    Filter the snapshot by the current day and time window.
+    Args:
+        now: datetime to evaluate against, defaults to the current time
+    Returns:
+        tuple: (etag, list of menus with their available items)
+    """
+    now = now or datetime.now()
+    today = now.date()
+    days = {now.strftime("%A"), "Everyday"}
+    current_time = timedelta(hours=now.hour, minutes=now.minute, seconds=now.second)
+
+    version, entries, item_menus = get_menu_snapshot()
+
+    menus = []
+    for name in item_menus:
+        entry = entries.get(name)
+        if not entry or not entry.get("enabled"):
+            continue
+        if not entry.get("start_date") or not entry.get("expires_on"):
+            continue
+        if not (entry.start_date <= today <= entry.expires_on):
+            continue
+
+        items = []
+        for row in entry["items"]:
+            start, end = _to_timedelta(row.time), _to_timedelta(row.to_time)
+            if row.days not in days or start is None or end is None:
+                continue
+            if start <= current_time <= end:
+                items.append(row)
+
+        if not items:
+            continue
+
+        menu = frappe._dict(
+            name=entry.name,
+            menu_name=entry.menu_name,
+            image=entry.image,
+            start_date=entry.start_date,
+            expires_on=entry.expires_on,
+            modified=entry.modified,
+            items=items,
+        )
+        menus.append(menu)
+
+    # keep the ordering of the old query (latest modified first)
+    menus.sort(key=lambda menu: menu.modified, reverse=True)
+
+    fingerprint = "|".join(
+        [version or ""] + [row.name for menu in menus for row in menu["items"]]
+    )
+    etag = hashlib.md5(fingerprint.encode()).hexdigest()
+
+    for menu in menus:
+        menu.pop("modified")
+
+    return etag, menus
@@ -0,0 +1,13 @@
+from .outbox import (
+    queue_capi_event,
+    drain_capi_outbox,
+    get_capi_outbox_status,
+    requeue_capi_dead_letters,
+)
+
+__all__ = [
+    "queue_capi_event",
+    "drain_capi_outbox",
+    "get_capi_outbox_status",
+    "requeue_capi_dead_letters",
+]
@@ -0,0 +1,410 @@
+"""
+Meta Conversions API delivery through a Redis outbox.
+
+The `track_*` endpoints build the event in the request (hashed user data,
+client IP and user agent, event time) and `queue_capi_event` pushes it to the
+outbox, so the browser gets its answer without waiting for Meta.
+
+`drain_capi_outbox` runs every minute, and right away once a full batch is
+waiting. It sends up to BATCH_SIZE events per Graph API call over one pooled
+HTTP session:
+
+- connection errors, 429 and 5xx answers are retried by the session with
+  exponential backoff, then the batch goes to a retry set and is sent again
+  RETRY_BACKOFF_SECONDS * 2 ** attempt later;
+- a batch Meta rejects as invalid is split in halves until the bad events are
+  found, the rest is still delivered;
+- events that fail MAX_ATTEMPTS times or are invalid go to a dead-letter list.
+
+A popped batch is moved to a processing list in the same step and only removed
+from there once it was handled (acknowledged). Batches of a worker that died
+before that are put back on the outbox after PROCESSING_TIMEOUT_SECONDS, Meta
+drops the events it already received thanks to their event_id.
+
+Events are deduplicated on event_name + event_id for DEDUP_SECONDS (Meta's own
+deduplication window), an id is generated when the caller sends none so
+retried requests cannot count twice at Meta.
+
+Site config `meta_graph_api_url` points the delivery at another server (e.g. a
+local stub), `meta_capi_namespace` changes the Redis key prefix.
+"""
+
+import json
+import time
+
+import frappe
+import requests
+from frappe.utils.background_jobs import get_redis_conn
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
+
+GRAPH_API_URL = "https://graph.facebook.com/v18.0"
+BATCH_SIZE = 1000
+# drain job stops after this many batches, the scheduler picks up the rest
+MAX_BATCHES_PER_RUN = 20
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF_SECONDS = 60
+DEDUP_SECONDS = 48 * 60 * 60
+DEAD_LETTER_MAX = 10000
+# longer than the drain job timeout, a batch still processing is never reclaimed
+PROCESSING_TIMEOUT_SECONDS = 900
+REQUEST_TIMEOUT = 30
+# token and permission errors fail every event, splitting the batch does not help
+AUTH_ERROR_CODES = {10, 102, 190, 200}
+
+_session = None
+
+# KEYS: outbox, processing set, batch list. ARGV: batch size, now, batch id.
+# Takes a batch off the outbox and keeps it in the batch list until acknowledged.
+POP_BATCH_SCRIPT = """
+local messages = redis.call('LRANGE', KEYS[1], 0, ARGV[1] - 1)
+if #messages == 0 then
+    return messages
+end
+redis.call('LTRIM', KEYS[1], ARGV[1], -1)
+redis.call('RPUSH', KEYS[3], unpack(messages))
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[3])
+return messages
+"""
+
+# KEYS: processing set, batch list, outbox. ARGV: batch id.
+# Puts an unacknowledged batch back on the outbox, only one worker gets it.
+RECLAIM_BATCH_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+local messages = redis.call('LRANGE', KEYS[2], 0, -1)
+if #messages > 0 then
+    redis.call('RPUSH', KEYS[3], unpack(messages))
+end
+redis.call('DEL', KEYS[2])
+return #messages
+"""
+
+
+def _namespace():
+    return f"{frappe.local.site}:{frappe.conf.get('meta_capi_namespace') or 'capi'}"
+
+
+def outbox_key():
+    return f"{_namespace()}:outbox"
+
+
+def retry_key():
+    return f"{_namespace()}:retry"
+
+
+def processing_key(batch_id=None):
+    """Set of the batches being processed, or the message list of one batch."""
+    if batch_id:
+        return f"{_namespace()}:processing:{batch_id}"
+    return f"{_namespace()}:processing"
+
+
+def dead_letter_key():
+    return f"{_namespace()}:dead_letter"
+
+
+def metrics_key():
+    return f"{_namespace()}:metrics"
+
+
+def _dedup_key(event):
+    return f"{_namespace()}:event:{event['event_name']}:{event['event_id']}"
+
+
+def get_capi_session():
+    """Get the process wide HTTP session so its connections stay open."""
+    global _session
+
+    if _session is None:
+        retry = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"POST"}),
+            raise_on_status=False,
+        )
+        _session = requests.Session()
+        _session.mount("https://", HTTPAdapter(max_retries=retry, pool_maxsize=4))
+        _session.mount("http://", HTTPAdapter(max_retries=retry, pool_maxsize=4))
+    return _session
+
+
+def _increment(conn, **counters):
+    pipe = conn.pipeline(transaction=False)
+    for counter, amount in counters.items():
+        if amount:
+            pipe.hincrby(metrics_key(), counter, amount)
+    pipe.execute()
+
+
+def queue_capi_event(event, test_event_code=None):
+    """
+    Queue one Conversions API event.
+
+    Args:
+        event: Event dict (event_name, event_time, user_data, ...)
+        test_event_code: Test event code of Events Manager
+
+    Returns:
+        dict: queued (False for a duplicate event_id) and the event_id
+    """
+    if not event.get("event_id"):
+        event["event_id"] = frappe.generate_hash(length=20)
+
+    conn = get_redis_conn()
+    if not conn.set(_dedup_key(event), 1, nx=True, ex=DEDUP_SECONDS):
+        _increment(conn, duplicates=1)
+        return {"queued": False, "event_id": event["event_id"]}
+
+    message = {"event": event, "test_event_code": test_event_code, "attempt": 0}
+    pending = conn.rpush(outbox_key(), json.dumps(message, default=str))
+    _increment(conn, queued=1)
+
+    # a full batch is waiting, do not wait for the scheduler
+    if pending >= BATCH_SIZE:
+        _enqueue_drain()
+
+    return {"queued": True, "event_id": event["event_id"]}
+
+
+def _enqueue_drain():
+    """Start the drain job unless one is already queued."""
+    frappe.enqueue(
+        drain_capi_outbox,
+        queue="short",
+        job_id="capi_outbox_drain",
+        deduplicate=True,
+    )
+
+
+def _move_due_retries(conn):
+    """Move retry messages whose backoff has passed back to the outbox."""
+    for raw in conn.zrangebyscore(retry_key(), "-inf", time.time(), start=0, num=BATCH_SIZE * 5):
+        # only the worker that removed the message re-queues it
+        if conn.zrem(retry_key(), raw):
+            conn.rpush(outbox_key(), raw)
+
+
+def _pop_batch(conn):
+    """
+    Atomically move up to BATCH_SIZE messages from the outbox to a processing list.
+    Returns:
+        tuple: (batch id to acknowledge, list of messages)
+    """
+    batch_id = frappe.generate_hash(length=12)
+    raw_messages = conn.eval(
+        POP_BATCH_SCRIPT,
+        3,
+        outbox_key(),
+        processing_key(),
+        processing_key(batch_id),
+        BATCH_SIZE,
+        time.time(),
+        batch_id,
+    )
+    return batch_id, [json.loads(raw) for raw in raw_messages]
+
+
+def _ack_batch(conn, batch_id):
+    """Drop a handled batch from the processing list."""
+    pipe = conn.pipeline()
+    pipe.delete(processing_key(batch_id))
+    pipe.zrem(processing_key(), batch_id)
+    pipe.execute()
+
+
+def _reclaim_stale_batches(conn, older_than=PROCESSING_TIMEOUT_SECONDS):
+    """Put batches of workers that died before acknowledging them back on the outbox."""
+    reclaimed = 0
+    for batch_id in conn.zrangebyscore(processing_key(), "-inf", time.time() - older_than):
+        batch_id = frappe.safe_decode(batch_id)
+        reclaimed += conn.eval(
+            RECLAIM_BATCH_SCRIPT, 3, processing_key(), processing_key(batch_id), outbox_key(), batch_id
+        )
+    if reclaimed:
+        _increment(conn, reclaimed=reclaimed)
+    return reclaimed
+
+
+def drain_capi_outbox():
+    """
+    Send queued events in batches until the outbox is empty.
+    Runs as a background job and every minute from the scheduler.
+    """
+    settings = arcpos_settings()
+    pixel_id, access_token = settings.pixel_id, settings.capi_access_token
+
+    conn = get_redis_conn()
+    _reclaim_stale_batches(conn)
+    _move_due_retries(conn)
+    if not conn.llen(outbox_key()):
+        return
+
+    if not pixel_id or not access_token:
+        frappe.log_error(
+            "Meta Pixel ID or Access Token not configured in ArcPOS Settings, events stay queued",
+            "Meta CAPI Error",
+        )
+        return
+
+    send_pending_events(conn, pixel_id, access_token)
+
+
+def send_pending_events(conn, pixel_id, access_token, max_batches=MAX_BATCHES_PER_RUN):
+    """Send up to max_batches batches of the outbox with the given credentials."""
+    for _ in range(max_batches):
+        batch_id, batch = _pop_batch(conn)
+        if not batch:
+            break
+
+        # test_event_code is a request level field, one request per code
+        by_code = {}
+        for message in batch:
+            by_code.setdefault(message.get("test_event_code"), []).append(message)
+        for test_event_code, messages in by_code.items():
+            _send_batch(conn, pixel_id, access_token, messages, test_event_code)
+
+        # sent, retried or dead-lettered, the batch is done
+        _ack_batch(conn, batch_id)
+
+
+def _post_events(pixel_id, access_token, events, test_event_code):
+    """
+    Post one batch to the Graph API.
+    Returns:
+        tuple: (status code or None on connection error, response dict)
+    """
+    base_url = (frappe.conf.get("meta_graph_api_url") or GRAPH_API_URL).rstrip("/")
+    payload = {"data": events, "access_token": access_token}
+    if test_event_code:
+        payload["test_event_code"] = test_event_code
+
+    try:
+        response = get_capi_session().post(
+            f"{base_url}/{pixel_id}/events", json=payload, timeout=REQUEST_TIMEOUT
+        )
+    except requests.exceptions.RequestException as e:
+        return None, {"error": {"message": str(e)}}
+
+    try:
+        result = response.json()
+    except ValueError:
+        result = {"error": {"message": response.text[:500]}}
+    return response.status_code, result
+
+
+def _send_batch(conn, pixel_id, access_token, messages, test_event_code):
+    """Deliver one batch; split rejected batches to isolate invalid events."""
+    status, result = _post_events(
+        pixel_id, access_token, [message["event"] for message in messages], test_event_code
+    )
+
+    if status == 200:
+        _increment(conn, sent=len(messages), batches=1)
+        frappe.logger("meta_capi").info(
+            f"Meta CAPI batch sent: {len(messages)} events, received {result.get('events_received')}, "
+            f"fbtrace_id {result.get('fbtrace_id')}"
+        )
+        return
+
+    error = result.get("error") or {}
+    retryable = status is None or status == 429 or status >= 500 or error.get("code") in AUTH_ERROR_CODES
+    if retryable:
+        _schedule_retry(conn, messages, error.get("message") or f"HTTP {status}")
+        return
+
+    if len(messages) > 1:
+        middle = len(messages) // 2
+        _send_batch(conn, pixel_id, access_token, messages[:middle], test_event_code)
+        _send_batch(conn, pixel_id, access_token, messages[middle:], test_event_code)
+        return
+
+    _dead_letter(conn, messages, error.get("error_user_msg") or error.get("message") or f"HTTP {status}")
+
+
+def _schedule_retry(conn, messages, error):
+    """Send failed messages again after an exponential backoff, or dead-letter them."""
+    retry, exhausted = {}, []
+    now = time.time()
+    for message in messages:
+        message["attempt"] = message.get("attempt", 0) + 1
+        if message["attempt"] >= MAX_ATTEMPTS:
+            exhausted.append(message)
+        else:
+            retry[json.dumps(message, default=str)] = now + RETRY_BACKOFF_SECONDS * 2 ** message["attempt"]
+
+    if retry:
+        conn.zadd(retry_key(), retry)
+        _increment(conn, retried=len(retry))
+    if exhausted:
+        _dead_letter(conn, exhausted, error)
+
+
+def _dead_letter(conn, messages, error):
+    entries = [
+        json.dumps({**message, "error": error, "failed_at": time.time()}, default=str)
+        for message in messages
+    ]
+    pipe = conn.pipeline()
+    pipe.lpush(dead_letter_key(), *entries)
+    pipe.ltrim(dead_letter_key(), 0, DEAD_LETTER_MAX - 1)
+    pipe.hincrby(metrics_key(), "dead_lettered", len(entries))
+    pipe.execute()
+    frappe.log_error(
+        f"{len(entries)} Meta CAPI event(s) moved to the dead-letter list: {error}",
+        "Meta CAPI Dead Letter",
+    )
+
+
+@frappe.whitelist()
+def get_capi_outbox_status(dead_letters=20):
+    """
+    Get the delivery counters, backlog and the latest dead-lettered events.
+    Returns:
+        dict: counters, outbox/retry/dead-letter sizes and recent dead letters
+    """
+    frappe.only_for("System Manager")
+
+    conn = get_redis_conn()
+    return {
+        "counters": {
+            frappe.safe_decode(key): int(value)
+            for key, value in (conn.hgetall(metrics_key()) or {}).items()
+        },
+        "outbox_pending": conn.llen(outbox_key()),
+        "retry_pending": conn.zcard(retry_key()),
+        "processing_batches": conn.zcard(processing_key()),
+        "dead_letters": conn.llen(dead_letter_key()),
+        "recent_dead_letters": [
+            json.loads(raw) for raw in conn.lrange(dead_letter_key(), 0, int(dead_letters) - 1)
+        ],
+    }
+
+
+@frappe.whitelist()
+def requeue_capi_dead_letters():
+    """Move every dead-lettered event back to the outbox with a fresh attempt count."""
+    frappe.only_for("System Manager")
+
+    conn = get_redis_conn()
+    pipe = conn.pipeline()
+    pipe.lrange(dead_letter_key(), 0, -1)
+    pipe.delete(dead_letter_key())
+    raw_entries, _ = pipe.execute()
+
+    messages = []
+    for raw in raw_entries:
+        entry = json.loads(raw)
+        messages.append(
+            json.dumps(
+                {"event": entry["event"], "test_event_code": entry.get("test_event_code"), "attempt": 0},
+                default=str,
+            )
+        )
+    if messages:
+        conn.rpush(outbox_key(), *messages)
+    return len(messages)
@@ -0,0 +1,157 @@
+"""
+Conversions API outbox delivered to a local Graph API stub.
+
+The stub answers the first call with a 503 (retried by the HTTP session) and
+rejects events whose event_id starts with "invalid", which exercises the batch
+splitting and the dead-letter list. The outbox runs under its own Redis
+namespace, so events queued by the site are not touched.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils.background_jobs import get_redis_conn
+
+from . import outbox
+
+TEST_NAMESPACE = "capi_test"
+TEST_CREDENTIALS = ("test-pixel", "test-token")
+
+
+class _GraphStub(BaseHTTPRequestHandler):
+    requests_seen = []
+    fail_first = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        events = body.get("data") or []
+        _GraphStub.requests_seen.append(len(events))
+
+        if _GraphStub.fail_first:
+            _GraphStub.fail_first = False
+            return self._answer(503, {"error": {"message": "stub unavailable", "code": 2}})
+
+        if any(str(event.get("event_id", "")).startswith("invalid") for event in events):
+            return self._answer(
+                400, {"error": {"message": "Invalid parameter", "code": 100, "error_user_msg": "invalid event"}}
+            )
+
+        return self._answer(200, {"events_received": len(events), "fbtrace_id": "stub"})
+
+    def _answer(self, status, result):
+        body = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _event(i, event_id=None):
+    return {
+        "event_name": "ViewContent",
+        "event_time": int(time.time()),
+        "action_source": "website",
+        "event_id": event_id or f"test-{i}",
+        "user_data": {"client_ip_address": "127.0.0.1"},
+        "custom_data": {"content_ids": [str(i)], "content_type": "product"},
+    }
+
+
+class TestCapiOutbox(FrappeTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _GraphStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        super().tearDownClass()
+
+    def setUp(self):
+        _GraphStub.requests_seen = []
+        _GraphStub.fail_first = True
+
+        conf = frappe.local.conf
+        self.previous_conf = {key: conf.get(key) for key in ("meta_graph_api_url", "meta_capi_namespace")}
+        conf["meta_graph_api_url"] = f"http://127.0.0.1:{self.server.server_port}"
+        conf["meta_capi_namespace"] = TEST_NAMESPACE
+        self.conn = get_redis_conn()
+
+    def tearDown(self):
+        stale = self.conn.keys(f"{outbox._namespace()}:*")
+        if stale:
+            self.conn.delete(*stale)
+
+        conf = frappe.local.conf
+        for key, value in self.previous_conf.items():
+            if value is None:
+                conf.pop(key, None)
+            else:
+                conf[key] = value
+
+    def _drain(self):
+        outbox._move_due_retries(self.conn)
+        outbox.send_pending_events(self.conn, *TEST_CREDENTIALS, max_batches=10000)
+
+    def _counters(self):
+        return {
+            frappe.safe_decode(key): int(value)
+            for key, value in (self.conn.hgetall(outbox.metrics_key()) or {}).items()
+        }
+
+    def test_events_are_sent_in_batches(self):
+        events, invalid = 2500, 3
+        for i in range(events):
+            self.assertTrue(outbox.queue_capi_event(_event(i))["queued"])
+        for i in range(invalid):
+            self.assertTrue(outbox.queue_capi_event(_event(i, f"invalid-{i}"))["queued"])
+
+        self._drain()
+        # anything scheduled for a later retry is made due and drained again
+        self.conn.zadd(outbox.retry_key(), {raw: 0 for raw in self.conn.zrange(outbox.retry_key(), 0, -1)})
+        self._drain()
+
+        self.assertLessEqual(max(_GraphStub.requests_seen), outbox.BATCH_SIZE)
+        self.assertEqual(self._counters().get("sent"), events)
+        self.assertEqual(self.conn.llen(outbox.dead_letter_key()), invalid)
+        self.assertEqual(self.conn.llen(outbox.outbox_key()), 0)
+        self.assertEqual(self.conn.zcard(outbox.retry_key()), 0)
+        self.assertEqual(self.conn.zcard(outbox.processing_key()), 0)
+
+    def test_duplicate_event_id_is_not_queued(self):
+        self.assertTrue(outbox.queue_capi_event(_event(1))["queued"])
+        self.assertFalse(outbox.queue_capi_event(_event(1))["queued"])
+
+        self.assertEqual(self.conn.llen(outbox.outbox_key()), 1)
+        self.assertEqual(self._counters().get("duplicates"), 1)
+
+    def test_unacknowledged_batch_is_reclaimed(self):
+        for i in range(5):
+            outbox.queue_capi_event(_event(i))
+
+        # the worker takes the batch and dies before acknowledging it
+        batch_id, batch = outbox._pop_batch(self.conn)
+        self.assertEqual(len(batch), 5)
+        self.assertEqual(self.conn.llen(outbox.outbox_key()), 0)
+
+        # still within the timeout, the batch may be processing
+        self.assertEqual(outbox._reclaim_stale_batches(self.conn), 0)
+
+        self.assertEqual(outbox._reclaim_stale_batches(self.conn, older_than=-1), 5)
+        self.assertEqual(self.conn.llen(outbox.outbox_key()), 5)
+        self.assertFalse(self.conn.exists(outbox.processing_key(batch_id)))
+
+        _GraphStub.fail_first = False
+        self._drain()
+        self.assertEqual(self._counters().get("sent"), 5)
+        self.assertEqual(self.conn.zcard(outbox.processing_key()), 0)
@@ -0,0 +1,19 @@
+from .outbox import (
+    queue_push,
+    queue_push_to_users,
+    drain_push_outbox,
+    poll_push_receipts,
+    get_push_tokens,
+    prune_push_tokens,
+)
+from .metrics import get_push_metrics
+
+__all__ = [
+    "queue_push",
+    "queue_push_to_users",
+    "drain_push_outbox",
+    "poll_push_receipts",
+    "get_push_tokens",
+    "prune_push_tokens",
+    "get_push_metrics",
+]
@@ -0,0 +1,74 @@
+"""Counters and batch latencies of the Expo push delivery worker."""
+
+import frappe
+from frappe.utils.background_jobs import get_redis_conn
+
+LATENCY_SAMPLES = 200
+
+
+def _counters_key():
+    return f"{frappe.local.site}:push_metrics:counters"
+
+
+def _latency_key():
+    return f"{frappe.local.site}:push_metrics:batch_latency_ms"
+
+
+def record_batch(latency_ms, messages, ok=0, failed=0, unregistered=0, server_error=False):
+    """Record the outcome of one Expo push request."""
+    conn = get_redis_conn()
+    pipe = conn.pipeline()
+    pipe.hincrby(_counters_key(), "batches", 1)
+    pipe.hincrby(_counters_key(), "messages", messages)
+    pipe.hincrby(_counters_key(), "ok", ok)
+    pipe.hincrby(_counters_key(), "failed", failed)
+    pipe.hincrby(_counters_key(), "device_not_registered", unregistered)
+    if server_error:
+        pipe.hincrby(_counters_key(), "server_errors", 1)
+    pipe.lpush(_latency_key(), int(latency_ms))
+    pipe.ltrim(_latency_key(), 0, LATENCY_SAMPLES - 1)
+    pipe.execute()
+
+
+def increment(counter, amount=1):
+    """Increment a single push counter."""
+    get_redis_conn().hincrby(_counters_key(), counter, amount)
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+@frappe.whitelist()
+def get_push_metrics():
+    """
+    Get push delivery counters and latency of the recent batches.
+    Returns:
+        dict: counters, outbox/receipt backlog and batch latency percentiles (ms)
+    """
+    frappe.only_for("System Manager")
+
+    from .outbox import outbox_key, receipts_key, retry_key
+
+    conn = get_redis_conn()
+    counters = {
+        frappe.safe_decode(key): int(value)
+        for key, value in (conn.hgetall(_counters_key()) or {}).items()
+    }
+    latencies = sorted(int(value) for value in conn.lrange(_latency_key(), 0, -1))
+
+    return {
+        "counters": counters,
+        "outbox_pending": conn.llen(outbox_key()),
+        "retry_pending": conn.zcard(retry_key()),
+        "receipts_pending": conn.hlen(receipts_key()),
+        "batch_latency_ms": {
+            "samples": len(latencies),
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
@@ -0,0 +1,353 @@
+"""
+Expo push delivery through a Redis outbox.
+
+Callers queue messages with `queue_push` / `queue_push_to_users` and return
+right away. `drain_push_outbox` runs as a single background job, sends the
+queued messages of all callers in 100 message requests over one persistent
+HTTP session and stores the ticket ids. `poll_push_receipts` later checks the
+receipts. Tokens Expo reports as DeviceNotRegistered are removed from
+Push Token List.
+
+A batch that fails as a whole (Expo unreachable or a server error) is parked
+in a retry sorted set with an exponential backoff and the drain run stops, so
+an outage is not hit again straight away. Each drain first moves the retries
+that are due back onto the outbox.
+"""
+
+import json
+import random
+import time
+
+import frappe
+from frappe.utils.background_jobs import get_redis_conn
+
+from . import metrics
+
+BATCH_SIZE = 100
+RECEIPT_BATCH_SIZE = 1000
+MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 30
+MAX_RETRIES_MOVED = 1000
+# drain job stops after this many batches, the scheduler picks up the rest
+MAX_BATCHES_PER_RUN = 50
+# receipts are normally ready after a few seconds; unresolved ids are dropped after a day
+RECEIPT_MIN_AGE_SECONDS = 60
+RECEIPT_MAX_AGE_SECONDS = 86400
+EXPO_RECEIPTS_URL = "https://exp.host/--/api/v2/push/getReceipts"
+
+_push_client = None
+
+# moves due retries onto the outbox in one step, so no worker sees them twice
+MOVE_DUE_RETRIES_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+    redis.call('RPUSH', KEYS[2], unpack(due))
+end
+return #due
+"""
+
+
+def outbox_key():
+    return f"{frappe.local.site}:push_outbox"
+
+
+def receipts_key():
+    return f"{frappe.local.site}:push_receipts"
+
+
+def retry_key():
+    return f"{frappe.local.site}:push_outbox:retry"
+
+
+def get_push_client():
+    """Get the process wide PushClient so its HTTP session stays open."""
+    global _push_client
+
+    from exponent_server_sdk import PushClient
+
+    if _push_client is None:
+        _push_client = PushClient()
+    return _push_client
+
+
+def get_push_tokens(users):
+    """
+    Load the Expo push tokens of the users in one query.
+    Returns:
+        dict: token -> user
+    """
+    if not users:
+        return {}
+
+    rows = frappe.db.sql(
+        """
+        SELECT nt.user, ptl.token
+        FROM `tabArcPOS Notification Token` nt
+        INNER JOIN `tabPush Token List` ptl
+            ON ptl.parent = nt.name AND ptl.parenttype = 'ArcPOS Notification Token'
+        WHERE nt.user IN %(users)s
+        AND IFNULL(ptl.token, '') != ''
+        """,
+        {"users": list(users)},
+        as_dict=True,
+    )
+    return {row.token: row.user for row in rows}
+
+
+def prune_push_tokens(tokens):
+    """Delete tokens that Expo reported as no longer registered."""
+    tokens = list(set(tokens or []))
+    if not tokens:
+        return
+
+    frappe.db.delete(
+        "Push Token List",
+        {"token": ["in", tokens], "parenttype": "ArcPOS Notification Token"},
+    )
+    frappe.db.commit()
+    metrics.increment("tokens_pruned", len(tokens))
+
+
+def _is_expo_token(token):
+    try:
+        from exponent_server_sdk import PushClient
+    except ImportError:
+        return False
+    return PushClient.is_exponent_push_token(token)
+
+
+def queue_push(token_to_user, title, body, data=None, sound="default", priority="high", badge=None, source=None):
+    """
+    Queue one push message per token.
+
+    Args:
+        token_to_user: dict of Expo token -> user (user is used for logging only)
+        title: Notification title
+        body: Notification body
+        data: Data payload of the push
+        sound: Push sound
+        priority: Push priority
+        badge: Optional badge count
+        source: Name of the caller, stored for troubleshooting
+
+    Returns:
+        int: Number of messages queued
+    """
+    messages = []
+    for token, user in token_to_user.items():
+        if not _is_expo_token(token):
+            frappe.log_error(f"Invalid Expo token for user {user}: {token}", "Invalid Expo Token")
+            continue
+        messages.append(
+            json.dumps(
+                {
+                    "to": token,
+                    "user": user,
+                    "title": title,
+                    "body": body,
+                    "data": data or {},
+                    "sound": sound,
+                    "priority": priority,
+                    "badge": badge,
+                    "source": source,
+                    "attempt": 0,
+                },
+                default=str,
+            )
+        )
+
+    if not messages:
+        return 0
+
+    get_redis_conn().rpush(outbox_key(), *messages)
+    _enqueue_drain()
+    return len(messages)
+
+
+def queue_push_to_users(users, title, body, data=None, source=None, **kwargs):
+    """Queue a push message for every registered device of the users."""
+    return queue_push(get_push_tokens(users), title, body, data=data, source=source, **kwargs)
+
+
+def _enqueue_drain():
+    """Start the drain job unless one is already queued."""
+    frappe.enqueue(
+        drain_push_outbox,
+        queue="short",
+        job_id="push_outbox_drain",
+        deduplicate=True,
+    )
+
+
+def _pop_batch(conn):
+    """Atomically take up to BATCH_SIZE messages from the outbox."""
+    pipe = conn.pipeline()
+    pipe.lrange(outbox_key(), 0, BATCH_SIZE - 1)
+    pipe.ltrim(outbox_key(), BATCH_SIZE, -1)
+    raw_messages, _ = pipe.execute()
+    return [json.loads(raw) for raw in raw_messages]
+
+
+def drain_push_outbox():
+    """
+    Send queued push messages in batches until the outbox is empty.
+    Runs as a background job and every minute from the scheduler.
+    """
+    try:
+        get_push_client()
+    except ImportError:
+        frappe.log_error(
+            "Expo Server SDK not installed. Install with: pip install exponent-server-sdk",
+            "Push Notification - SDK Missing"
+        )
+        return
+
+    conn = get_redis_conn()
+    conn.eval(MOVE_DUE_RETRIES_SCRIPT, 2, retry_key(), outbox_key(), time.time(), MAX_RETRIES_MOVED)
+    for _ in range(MAX_BATCHES_PER_RUN):
+        batch = _pop_batch(conn)
+        if not batch:
+            break
+        if not _send_batch(conn, batch):
+            # Expo is failing, the rest waits for the next run
+            break
+
+
+def _send_batch(conn, batch):
+    """
+    Publish one batch and store its tickets for receipt polling.
+    Returns:
+        bool: False when the whole batch failed and was parked for a retry
+    """
+    from exponent_server_sdk import (
+        DeviceNotRegisteredError,
+        PushMessage,
+        PushServerError,
+        PushTicketError,
+    )
+
+    push_messages = [
+        PushMessage(
+            to=message["to"],
+            title=message["title"],
+            body=message["body"],
+            data=message["data"],
+            sound=message["sound"],
+            priority=message["priority"],
+            badge=message.get("badge"),
+        )
+        for message in batch
+    ]
+
+    start = time.monotonic()
+    try:
+        tickets = get_push_client().publish_multiple(push_messages)
+    except Exception as exc:
+        latency_ms = (time.monotonic() - start) * 1000
+        metrics.record_batch(latency_ms, len(batch), failed=len(batch), server_error=True)
+        _requeue(conn, batch)
+        error_type = "Push server error" if isinstance(exc, PushServerError) else "Error sending push notifications"
+        frappe.log_error(f"{error_type}: {str(exc)}", "Expo Push Notification Error")
+        return False
+    latency_ms = (time.monotonic() - start) * 1000
+
+    ok, failed, unregistered_tokens = 0, 0, []
+    now = time.time()
+    pending_receipts = {}
+    for ticket, message in zip(tickets, batch):
+        try:
+            ticket.validate_response()
+            ok += 1
+            if ticket.id:
+                pending_receipts[ticket.id] = json.dumps(
+                    {"token": message["to"], "user": message.get("user"), "sent_at": now}
+                )
+        except DeviceNotRegisteredError:
+            unregistered_tokens.append(message["to"])
+        except PushTicketError as exc:
+            failed += 1
+            frappe.log_error(
+                f"Push ticket error for {message.get('user')}: {exc.message}",
+                "Push Notification Error"
+            )
+
+    if pending_receipts:
+        conn.hset(receipts_key(), mapping=pending_receipts)
+
+    metrics.record_batch(
+        latency_ms, len(batch), ok=ok, failed=failed, unregistered=len(unregistered_tokens)
+    )
+    prune_push_tokens(unregistered_tokens)
+    return True
+
+
+def _requeue(conn, batch):
+    """Park a failed batch in the retry set with backoff, dropping exhausted messages."""
+    retry = {}
+    now = time.time()
+    for message in batch:
+        message["attempt"] = message.get("attempt", 0) + 1
+        if message["attempt"] < MAX_ATTEMPTS:
+            # 30s, 60s, ... with jitter so parked batches do not return together
+            delay = RETRY_BASE_SECONDS * 2 ** (message["attempt"] - 1)
+            message["retry_nonce"] = frappe.generate_hash(length=8)
+            retry[json.dumps(message, default=str)] = now + delay * random.uniform(1, 1.5)
+    if retry:
+        conn.zadd(retry_key(), retry)
+    dropped = len(batch) - len(retry)
+    if dropped:
+        metrics.increment("dropped", dropped)
+
+
+def poll_push_receipts():
+    """
+    Check the Expo receipts of sent messages and prune unregistered tokens.
+    Runs from the scheduler.
+    """
+    try:
+        session = get_push_client().session
+    except ImportError:
+        return
+
+    conn = get_redis_conn()
+    now = time.time()
+
+    ready, expired = {}, []
+    for receipt_id, raw in (conn.hgetall(receipts_key()) or {}).items():
+        receipt_id = frappe.safe_decode(receipt_id)
+        info = json.loads(raw)
+        age = now - info.get("sent_at", now)
+        if age > RECEIPT_MAX_AGE_SECONDS:
+            expired.append(receipt_id)
+        elif age >= RECEIPT_MIN_AGE_SECONDS:
+            ready[receipt_id] = info
+
+    if expired:
+        conn.hdel(receipts_key(), *expired)
+
+    receipt_ids = list(ready)
+    for i in range(0, len(receipt_ids), RECEIPT_BATCH_SIZE):
+        chunk = receipt_ids[i:i + RECEIPT_BATCH_SIZE]
+        try:
+            response = session.post(EXPO_RECEIPTS_URL, json={"ids": chunk}, timeout=30)
+            response.raise_for_status()
+            receipts = response.json().get("data") or {}
+        except Exception as exc:
+            frappe.log_error(f"Error checking push receipts: {str(exc)}", "Expo Push Receipt Error")
+            continue
+
+        unregistered_tokens, errors = [], 0
+        for receipt_id, receipt in receipts.items():
+            if receipt.get("status") == "error":
+                errors += 1
+                details = receipt.get("details") or {}
+                if details.get("error") == "DeviceNotRegistered":
+                    unregistered_tokens.append(ready[receipt_id]["token"])
+
+        # receipts not returned yet stay pending for the next run
+        if receipts:
+            conn.hdel(receipts_key(), *receipts.keys())
+        metrics.increment("receipts_ok", len(receipts) - errors)
+        metrics.increment("receipts_error", errors)
+        prune_push_tokens(unregistered_tokens)
@@ -1,5 +1,7 @@
 import frappe
 
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_settings
+
 
 def get_receivable_account(company):
     """
@@ -22,7 +24,7 @@ def get_mode_of_payment_account(mode_of_payment: str, company=None):
     """
 
     if not company:
-        company = frappe.db.get_single_value("ArcPOS Settings", "company")
+        company = arcpos_settings().company
 
     # default cash and bank account
     cash_account = frappe.db.get_value("Company", company, "default_cash_account")
@@ -0,0 +1,17 @@
+from .sales_rollup import (
+    update_sales_rollup,
+    rebuild_sales_rollup,
+    enqueue_sales_rollup_rebuild,
+    get_daily_sales,
+    get_top_sellers,
+    get_top_seller_by_periods,
+)
+
+__all__ = [
+    "update_sales_rollup",
+    "rebuild_sales_rollup",
+    "enqueue_sales_rollup_rebuild",
+    "get_daily_sales",
+    "get_top_sellers",
+    "get_top_seller_by_periods",
+]
@@ -0,0 +1,348 @@
+"""
+Pre-aggregated sales per item x day/hour x service type x outlet.
+
+Rows of `Sales Rollup` are updated in the submit / cancel transaction of Sales
+Invoices and POS Invoices with a single upsert, so dashboard and top-N queries
+read a few rows per day instead of scanning every invoice line.
+`rebuild_sales_rollup` backfills or repairs a date range from the invoices.
+
+Consolidated Sales Invoices (POS closing) are skipped, their POS Invoices are
+already counted.
+"""
+
+import hashlib
+
+import frappe
+from frappe.utils import add_days, flt, get_last_day, get_time, getdate, nowdate
+
+ROLLUP_SOURCES = ("Sales Invoice", "POS Invoice")
+ROLLUP_DIMENSIONS = ("item_code", "item_group")
+
+_UPSERT_FIELDS = [
+    "name",
+    "creation",
+    "modified",
+    "owner",
+    "modified_by",
+    "posting_date",
+    "posting_hour",
+    "source_doctype",
+    "item_code",
+    "item_name",
+    "item_group",
+    "service_type",
+    "outlet",
+    "qty",
+    "amount",
+    "grand_total",
+    "line_count",
+]
+
+
+def rollup_name(posting_date, posting_hour, source_doctype, item_code, service_type, outlet):
+    """
+    Deterministic name of a rollup row; the SQL rebuild computes the same
+    value with MD5(CONCAT_WS('|', ...)).
+    """
+    key = "|".join(
+        "" if value is None else str(value)
+        for value in (posting_date, posting_hour, source_doctype, item_code, service_type, outlet)
+    )
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def is_rollup_source(doc):
+    return doc.doctype in ROLLUP_SOURCES and not doc.get("is_consolidated")
+
+
+def build_rollup_rows(doc, sign=1):
+    """
+    Aggregate the lines of an invoice into rollup rows.
+    Args:
+        doc: Submitted Sales Invoice or POS Invoice
+        sign: 1 on submit, -1 on cancel
+    Returns:
+        list: Rollup row dicts keyed by their name
+    """
+    posting_date = str(getdate(doc.posting_date))
+    posting_hour = get_time(doc.posting_time or "00:00:00").hour
+    service_type = doc.get("custom_service_type") or ""
+    outlet = doc.get("territory") or ""
+
+    items = doc.get("items") or []
+    total = sum(flt(item.amount) for item in items)
+    # the grand total (taxes, charges, discounts) is split over the lines by amount
+    grand_total_ratio = flt(doc.grand_total) / total if total else 0
+
+    rows = {}
+    for item in items:
+        name = rollup_name(
+            posting_date, posting_hour, doc.doctype, item.item_code, service_type, outlet
+        )
+        row = rows.get(name)
+        if not row:
+            row = rows[name] = frappe._dict(
+                name=name,
+                posting_date=posting_date,
+                posting_hour=posting_hour,
+                source_doctype=doc.doctype,
+                item_code=item.item_code,
+                item_name=item.item_name,
+                item_group=item.item_group,
+                service_type=service_type,
+                outlet=outlet,
+                qty=0,
+                amount=0,
+                grand_total=0,
+                line_count=0,
+            )
+        row.qty += sign * flt(item.qty)
+        row.amount += sign * flt(item.amount)
+        row.grand_total += sign * flt(item.amount) * grand_total_ratio
+        row.line_count += sign
+
+    return list(rows.values())
+
+
+def update_sales_rollup(doc, sign=1):
+    """Add (or on cancel subtract) a submitted invoice to the rollup."""
+    if not is_rollup_source(doc):
+        return
+
+    rows = build_rollup_rows(doc, sign)
+    if not rows:
+        return
+
+    now = frappe.utils.now()
+    user = frappe.session.user or "Administrator"
+    values = []
+    for row in rows:
+        values.extend(
+            [
+                row.name,
+                now,
+                now,
+                user,
+                user,
+                row.posting_date,
+                row.posting_hour,
+                row.source_doctype,
+                row.item_code,
+                row.item_name,
+                row.item_group,
+                row.service_type,
+                row.outlet,
+                row.qty,
+                row.amount,
+                row.grand_total,
+                row.line_count,
+            ]
+        )
+
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(_UPSERT_FIELDS)) + ")"] * len(rows))
+    columns = ", ".join(f"`{field}`" for field in _UPSERT_FIELDS)
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tabSales Rollup` ({columns})
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            qty = qty + VALUES(qty),
+            amount = amount + VALUES(amount),
+            grand_total = grand_total + VALUES(grand_total),
+            line_count = line_count + VALUES(line_count),
+            item_name = VALUES(item_name),
+            item_group = VALUES(item_group),
+            modified = VALUES(modified),
+            modified_by = VALUES(modified_by)
+        """,
+        tuple(values),
+    )
+
+
+def rebuild_sales_rollup(from_date=None, to_date=None):
+    """
+    Rebuild the rollup rows of a date range from the submitted invoices.
+    Runs month by month to keep the transactions small.
+
+    Usage:
+        bench --site <site> execute excel_restaurant_pos.shared.sales_rollup.rebuild_sales_rollup \
+            --kwargs "{'from_date': '2025-01-01'}"
+
+    Args:
+        from_date: First posting date; defaults to the oldest invoice
+        to_date: Last posting date; defaults to today
+    """
+    to_date = getdate(to_date or nowdate())
+    from_date = getdate(from_date or _get_oldest_posting_date() or to_date)
+
+    month_start = from_date
+    while month_start <= to_date:
+        month_end = min(get_last_day(month_start), to_date)
+
+        frappe.db.delete(
+            "Sales Rollup", {"posting_date": ["between", [month_start, month_end]]}
+        )
+        for source in ROLLUP_SOURCES:
+            _rebuild_source(source, month_start, month_end)
+        frappe.db.commit()
+
+        month_start = add_days(month_end, 1)
+
+
+def _get_oldest_posting_date():
+    dates = [
+        frappe.db.get_value(source, {"docstatus": 1}, "min(posting_date)")
+        for source in ROLLUP_SOURCES
+    ]
+    dates = [getdate(date) for date in dates if date]
+    return min(dates) if dates else None
+
+
+def _rebuild_source(source, from_date, to_date):
+    """Aggregate the lines of one invoice doctype for a date range in SQL."""
+    consolidated_filter = "AND IFNULL(inv.is_consolidated, 0) = 0" if source == "Sales Invoice" else ""
+    service_type = "IFNULL(inv.custom_service_type, '')" if source == "Sales Invoice" else "''"
+    columns = ", ".join(f"`{field}`" for field in _UPSERT_FIELDS)
+
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tabSales Rollup` ({columns})
+        SELECT
+            MD5(CONCAT_WS('|', inv.posting_date, IFNULL(HOUR(inv.posting_time), 0), %(source)s,
+                IFNULL(line.item_code, ''), {service_type}, IFNULL(inv.territory, ''))),
+            NOW(6), NOW(6), %(user)s, %(user)s,
+            inv.posting_date,
+            IFNULL(HOUR(inv.posting_time), 0),
+            %(source)s,
+            line.item_code,
+            MAX(line.item_name),
+            MAX(line.item_group),
+            {service_type},
+            IFNULL(inv.territory, ''),
+            SUM(line.qty),
+            SUM(line.amount),
+            SUM(IF(totals.total = 0, 0, line.amount / totals.total * inv.grand_total)),
+            COUNT(*)
+        FROM `tab{source} Item` line
+        INNER JOIN `tab{source}` inv ON inv.name = line.parent
+        INNER JOIN (
+            SELECT parent, SUM(amount) AS total
+            FROM `tab{source} Item`
+            WHERE parenttype = %(source)s
+            GROUP BY parent
+        ) totals ON totals.parent = inv.name
+        WHERE inv.docstatus = 1
+        AND line.parenttype = %(source)s
+        AND inv.posting_date BETWEEN %(from_date)s AND %(to_date)s
+        {consolidated_filter}
+        GROUP BY inv.posting_date, IFNULL(HOUR(inv.posting_time), 0), line.item_code,
+            {service_type}, IFNULL(inv.territory, '')
+        ON DUPLICATE KEY UPDATE
+            qty = VALUES(qty),
+            amount = VALUES(amount),
+            grand_total = VALUES(grand_total),
+            line_count = VALUES(line_count)
+        """,
+        {"source": source, "user": frappe.session.user, "from_date": from_date, "to_date": to_date},
+    )
+
+
+@frappe.whitelist()
+def enqueue_sales_rollup_rebuild(from_date=None, to_date=None):
+    """Start a rollup rebuild in the background."""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        rebuild_sales_rollup,
+        queue="long",
+        timeout=3600,
+        job_id="sales_rollup_rebuild",
+        deduplicate=True,
+        from_date=from_date,
+        to_date=to_date,
+    )
+    return {"queued": True}
+
+
+def get_daily_sales(from_date, to_date):
+    """
+    Get the sales grand total per posting date.
+    Returns:
+        dict: posting date -> total sales
+    """
+    rows = frappe.db.sql(
+        """
+        SELECT posting_date, SUM(grand_total) AS total_sales
+        FROM `tabSales Rollup`
+        WHERE posting_date BETWEEN %s AND %s
+        GROUP BY posting_date
+        """,
+        (from_date, to_date),
+        as_dict=True,
+    )
+    return {getdate(row.posting_date): flt(row.total_sales) for row in rows}
+
+
+def get_top_sellers(dimension, from_date, limit=5):
+    """
+    Get the top items or item groups by sales amount since a date.
+    Args:
+        dimension: "item_code" or "item_group"
+        from_date: First posting date
+        limit: Number of rows
+    Returns:
+        list: dicts with the dimension, total_sales (and item_name for items)
+    """
+    if dimension not in ROLLUP_DIMENSIONS:
+        frappe.throw(f"Invalid rollup dimension: {dimension}")
+
+    item_name = ", MAX(item_name) AS item_name" if dimension == "item_code" else ""
+    return frappe.db.sql(
+        f"""
+        SELECT {dimension}, SUM(amount) AS total_sales{item_name}
+        FROM `tabSales Rollup`
+        WHERE posting_date >= %s
+        AND IFNULL({dimension}, '') != ''
+        GROUP BY {dimension}
+        ORDER BY total_sales DESC
+        LIMIT %s
+        """,
+        (from_date, int(limit)),
+        as_dict=True,
+    )
+
+
+def get_top_seller_by_periods(dimension, period_start_dates):
+    """
+    Get the top item or item group of several periods with one query.
+    Args:
+        dimension: "item_code" or "item_group"
+        period_start_dates: dict of period -> first posting date
+    Returns:
+        dict: period -> top value (None when there were no sales)
+    """
+    if dimension not in ROLLUP_DIMENSIONS:
+        frappe.throw(f"Invalid rollup dimension: {dimension}")
+    if not period_start_dates:
+        return {}
+
+    periods = list(period_start_dates)
+    sums = ", ".join(
+        f"SUM(IF(posting_date >= %s, amount, 0)) AS `{period}`" for period in periods
+    )
+    rows = frappe.db.sql(
+        f"""
+        SELECT {dimension} AS value, {sums}
+        FROM `tabSales Rollup`
+        WHERE posting_date >= %s
+        AND IFNULL({dimension}, '') != ''
+        GROUP BY {dimension}
+        """,
+        (*period_start_dates.values(), min(period_start_dates.values())),
+        as_dict=True,
+    )
+
+    result = {}
+    for period in periods:
+        best = max(rows, key=lambda row: flt(row[period]), default=None)
+        result[period] = best.value if best and flt(best[period]) > 0 else None
+    return result
@@ -1,5 +1,5 @@
 # Utils module for Excel Restaurant POS
-from .rate_limit import rate_limit_guest
+from .rate_limit import rate_limit_guest, add_rate_limit_headers
 from .iso_to_frappe_datetime import iso_to_frappe_datetime
 from .convert_to_flt_string import convert_to_flt_string
 from .convert_to_decimal_string import convert_to_decimal_string
@@ -7,6 +7,7 @@ from .is_new import is_new_doc
 
 __all__ = [
     "rate_limit_guest",
+    "add_rate_limit_headers",
     "iso_to_frappe_datetime",
     "convert_to_flt_string",
     "convert_to_decimal_string",
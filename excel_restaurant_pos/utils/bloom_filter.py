@@ -0,0 +1,43 @@
+"""
+Minimal in-memory bloom filter.
+
+Answers "definitely not present" or "maybe present" for string keys with a
+bounded false positive rate. Used to skip exact lookups for keys that were
+never added, e.g. blacklisted token hashes.
+"""
+
+import hashlib
+import math
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        Args:
+            capacity: Expected number of keys
+            error_rate: Target false positive rate at that capacity
+        """
+        capacity = max(int(capacity), 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # double hashing: two 64 bit halves of one digest give all k positions
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
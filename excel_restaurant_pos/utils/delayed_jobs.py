@@ -0,0 +1,167 @@
+"""
+Delayed background jobs backed by a Redis sorted set.
+
+Jobs are stored with their due time as score and moved to the RQ queue by
+`dispatch_due_jobs`, which runs every minute from the scheduler. Nothing holds
+a worker while waiting, unlike sleeping inside the job.
+
+A due job whose job_id is still queued or running in RQ is not dropped: the
+deduplicated enqueue is skipped and the job is scheduled again BUSY_RETRY_SECONDS
+later, so a schedule made while the previous run executes still runs after it.
+"""
+
+import json
+import time
+
+import frappe
+from frappe.utils.background_jobs import get_redis_conn
+
+BUSY_RETRY_SECONDS = 30
+
+# ZADD NX and the payload write in one step, a job is never due without payload
+SCHEDULE_SCRIPT = """
+local added = redis.call('ZADD', KEYS[1], 'NX', ARGV[1], ARGV[2])
+if added == 1 then
+    redis.call('HSET', KEYS[2], ARGV[2], ARGV[3])
+end
+return added
+"""
+
+# removes a due job and returns its payload, only one dispatcher gets it
+CLAIM_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return false
+end
+local payload = redis.call('HGET', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+return payload
+"""
+
+
+def _queue_key():
+    return f"{frappe.local.site}:delayed_jobs:queue"
+
+
+def _payload_key():
+    return f"{frappe.local.site}:delayed_jobs:payload"
+
+
+def _method_path(method):
+    """Dotted path of a job method, accepts a function or a path string."""
+    if isinstance(method, str):
+        return method
+    return f"{method.__module__}.{method.__qualname__}"
+
+
+def schedule_job(method, delay_seconds, job_id, queue="short", timeout=300, **kwargs):
+    """
+    Schedule a background job to be enqueued after a delay.
+
+    Args:
+        method: Function or dotted path to run
+        delay_seconds: Seconds to wait before the job is enqueued
+        job_id: Unique job id; while a job with this id is pending, new
+            schedules for it are ignored
+        queue: RQ queue to enqueue into once due
+        timeout: Job timeout once enqueued
+        **kwargs: Job keyword arguments (must be JSON serialisable)
+
+    Returns:
+        bool: True if the job was scheduled, False if it was already pending
+    """
+    conn = get_redis_conn()
+    due_at = time.time() + max(int(delay_seconds or 0), 0)
+    payload = json.dumps(
+        {
+            "method": _method_path(method),
+            "queue": queue,
+            "timeout": timeout,
+            "kwargs": kwargs,
+        },
+        default=str,
+    )
+
+    return _schedule(conn, job_id, due_at, payload)
+
+
+def _schedule(conn, job_id, due_at, payload):
+    # NX keeps the first schedule of a job id, same as an already queued job
+    added = conn.eval(SCHEDULE_SCRIPT, 2, _queue_key(), _payload_key(), due_at, job_id, payload)
+    return bool(added)
+
+
+def cancel_job(job_id):
+    """Remove a pending delayed job."""
+    conn = get_redis_conn()
+    conn.eval(CLAIM_SCRIPT, 2, _queue_key(), _payload_key(), job_id)
+
+
+def dispatch_due_jobs(limit=500):
+    """
+    Enqueue every delayed job whose due time has passed.
+    Called from the scheduler every minute.
+    """
+    conn = get_redis_conn()
+    due_job_ids = conn.zrangebyscore(_queue_key(), "-inf", time.time(), start=0, num=limit)
+
+    dispatched = 0
+    for job_id in due_job_ids:
+        raw = conn.eval(CLAIM_SCRIPT, 2, _queue_key(), _payload_key(), job_id)
+        if not raw:
+            continue
+
+        job_id = frappe.safe_decode(job_id)
+        payload = json.loads(raw)
+        try:
+            job = frappe.enqueue(
+                payload["method"],
+                queue=payload.get("queue") or "short",
+                timeout=payload.get("timeout") or 300,
+                job_id=job_id,
+                deduplicate=True,
+                **payload.get("kwargs", {}),
+            )
+            # tests run jobs inline and get the method's return value
+            if job is None and not frappe.flags.in_test:
+                # deduplicated: the previous run is still queued or running
+                _schedule(conn, job_id, time.time() + BUSY_RETRY_SECONDS, raw)
+                continue
+            dispatched += 1
+        except Exception as e:
+            frappe.log_error(
+                f"Failed to enqueue delayed job {job_id}: {str(e)}\nPayload: {payload}",
+                "Delayed Job Dispatch Error",
+            )
+
+    return dispatched
+
+
+@frappe.whitelist()
+def get_delayed_job_backlog():
+    """
+    Get the pending delayed jobs for monitoring.
+    Returns:
+        dict: pending and overdue counts, next/oldest due time and counts per method
+    """
+    frappe.only_for("System Manager")
+
+    conn = get_redis_conn()
+    now = time.time()
+    pending = conn.zcard(_queue_key())
+    overdue = conn.zcount(_queue_key(), "-inf", now)
+
+    first = conn.zrange(_queue_key(), 0, 0, withscores=True)
+    last = conn.zrange(_queue_key(), -1, -1, withscores=True)
+
+    by_method = {}
+    for raw in conn.hvals(_payload_key()):
+        method = json.loads(raw).get("method")
+        by_method[method] = by_method.get(method, 0) + 1
+
+    return {
+        "pending": pending,
+        "overdue": overdue,
+        "oldest_due_in_seconds": round(first[0][1] - now) if first else None,
+        "latest_due_in_seconds": round(last[0][1] - now) if last else None,
+        "by_method": by_method,
+    }
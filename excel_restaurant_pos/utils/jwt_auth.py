@@ -4,6 +4,29 @@ import jwt
 from datetime import datetime, timedelta
 from functools import wraps
 import hashlib
+import time
+
+from excel_restaurant_pos.utils.bloom_filter import BloomFilter
+
+# Blacklisted token hashes are kept in a Redis sorted set (scored by token
+# expiry) and mirrored into a bloom filter per worker, rebuilt when the set
+# version changes (checked at most every BLACKLIST_REFRESH_SECONDS). Tokens
+# not in the filter need no lookup at all.
+BLACKLIST_KEY = "jwt_blacklist:hashes"
+BLACKLIST_VERSION_KEY = "jwt_blacklist:version"
+BLACKLIST_REFRESH_SECONDS = 5
+
+# Revocation timestamps and revoked sessions are cached per worker this long
+REVOCATION_CACHE_SECONDS = 5
+REVOCATION_CACHE_SIZE = 10000
+
+# Active and revoked sessions are kept for the longest token lifetime
+SESSION_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# site -> {"filter", "version", "checked_at"}
+_blacklist_filters = {}
+# (site, key) -> (expires_at, value)
+_revocation_cache = {}
 
 
 def get_jwt_secret():
@@ -14,13 +37,19 @@ def get_jwt_secret():
     return secret
 
 
-def generate_access_token(user, expires_in_hours=24):
+def new_session_id():
+    """Random identifier shared by the access and refresh token of one login"""
+    return frappe.generate_hash(length=16)
+
+
+def generate_access_token(user, expires_in_hours=24, session_id=None):
     """
     Generate JWT access token for user
 
     Args:
         user: User email/username
         expires_in_hours: Token expiry time in hours (default 24)
+        session_id: Session the token belongs to (default: a new session)
 
     Returns:
         JWT token string
@@ -29,6 +58,7 @@ def generate_access_token(user, expires_in_hours=24):
         "user": user,
         "exp": datetime.utcnow() + timedelta(hours=expires_in_hours),
         "iat": datetime.utcnow(),
+        "sid": session_id or new_session_id(),
         "type": "access"
     }
 
@@ -36,13 +66,14 @@ def generate_access_token(user, expires_in_hours=24):
     return token
 
 
-def generate_refresh_token(user, expires_in_days=30):
+def generate_refresh_token(user, expires_in_days=30, session_id=None):
     """
     Generate JWT refresh token for user
 
     Args:
         user: User email/username
         expires_in_days: Token expiry time in days (default 30)
+        session_id: Session the token belongs to, pass the one of the access token
 
     Returns:
         JWT refresh token string
@@ -51,6 +82,7 @@ def generate_refresh_token(user, expires_in_days=30):
         "user": user,
         "exp": datetime.utcnow() + timedelta(days=expires_in_days),
         "iat": datetime.utcnow(),
+        "sid": session_id or new_session_id(),
         "type": "refresh"
     }
 
@@ -71,6 +103,32 @@ def get_token_hash(token):
     return hashlib.sha256(token.encode()).hexdigest()
 
 
+def _bump_blacklist_version():
+    frappe.cache().set_value(BLACKLIST_VERSION_KEY, frappe.generate_hash(length=12))
+    _blacklist_filters.pop(frappe.local.site, None)
+
+
+def _get_blacklist_filter():
+    """Get the bloom filter of blacklisted token hashes of the current site."""
+    site = frappe.local.site
+    state = _blacklist_filters.get(site)
+    now = time.monotonic()
+    if state and now - state["checked_at"] < BLACKLIST_REFRESH_SECONDS:
+        return state["filter"]
+
+    cache = frappe.cache()
+    version = cache.get_value(BLACKLIST_VERSION_KEY)
+    if state and state["version"] == version:
+        state["checked_at"] = now
+        return state["filter"]
+
+    members = cache.zrange(cache.make_key(BLACKLIST_KEY), 0, -1)
+    bloom = BloomFilter(capacity=max(len(members) * 2, 1024))
+    bloom.update(frappe.safe_decode(member) for member in members)
+    _blacklist_filters[site] = {"filter": bloom, "version": version, "checked_at": now}
+    return bloom
+
+
 def is_token_blacklisted(token):
     """
     Check if token is in blacklist
@@ -82,18 +140,49 @@ def is_token_blacklisted(token):
         bool: True if token is blacklisted
     """
     try:
-        # Check if Token Blacklist table exists in database
-        if not frappe.db.table_exists("Token Blacklist"):
+        token_hash = get_token_hash(token)
+        if token_hash not in _get_blacklist_filter():
             return False
 
-        token_hash = get_token_hash(token)
-        return frappe.db.exists("Token Blacklist", {"token_hash": token_hash})
+        # maybe blacklisted, confirm against the exact set
+        cache = frappe.cache()
+        return cache.zscore(cache.make_key(BLACKLIST_KEY), token_hash) is not None
     except Exception as e:
-        # If table doesn't exist or any other error, return False
         frappe.logger().debug(f"Token blacklist check skipped: {str(e)}")
         return False
 
 
+def _get_revocation_value(cache_key, loader=None):
+    """
+    Read a revocation value through the short per-worker cache.
+
+    Args:
+        cache_key: Redis cache key, or a tuple starting with one
+        loader: Reads the value from Redis (default: get_value of cache_key)
+    """
+    key = (frappe.local.site, cache_key)
+    now = time.monotonic()
+    cached = _revocation_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    if len(_revocation_cache) > REVOCATION_CACHE_SIZE:
+        for stale in [k for k, (expires_at, _v) in _revocation_cache.items() if expires_at <= now]:
+            _revocation_cache.pop(stale, None)
+
+    value = loader() if loader else frappe.cache().get_value(cache_key)
+    _revocation_cache[key] = (now + REVOCATION_CACHE_SECONDS, value)
+    return value
+
+
+def _clear_revocation_value(cache_key):
+    """Drop the worker cache entries of a Redis key (all tuple keys included)."""
+    site = frappe.local.site
+    for key in list(_revocation_cache):
+        if key[0] == site and (key[1] == cache_key or (isinstance(key[1], tuple) and key[1][0] == cache_key)):
+            _revocation_cache.pop(key, None)
+
+
 def verify_token(token, token_type="access"):
     """
     Verify and decode JWT token
@@ -109,24 +198,25 @@ def verify_token(token, token_type="access"):
         frappe.AuthenticationError: If token is invalid or expired
     """
     try:
+        # Signature and expiry first, forged and expired tokens cost no lookups
+        payload = jwt.decode(token, get_jwt_secret(), algorithms=["HS256"])
+
+        # Verify token type
+        if payload.get("type") != token_type:
+            frappe.throw(_("Invalid token type"), frappe.AuthenticationError)
+
         # Check if token is blacklisted
         if is_token_blacklisted(token):
             frappe.throw(_("Token has been revoked"), frappe.AuthenticationError)
 
         # Check if token was revoked (for single session enforcement)
-        if is_token_revoked(token):
+        if is_token_revoked(token, payload):
             frappe.throw(_("Token has been revoked due to new login"), frappe.AuthenticationError)
 
         # Check if this specific session was revoked (for simultaneous sessions limit)
-        if is_session_revoked(token):
+        if is_session_revoked(token, payload):
             frappe.throw(_("Session has been revoked due to exceeding simultaneous session limit"), frappe.AuthenticationError)
 
-        payload = jwt.decode(token, get_jwt_secret(), algorithms=["HS256"])
-
-        # Verify token type
-        if payload.get("type") != token_type:
-            frappe.throw(_("Invalid token type"), frappe.AuthenticationError)
-
         return payload
 
     except jwt.ExpiredSignatureError:
@@ -194,10 +284,12 @@ def blacklist_token(token, user, token_type="refresh"):
     """
     Add token to blacklist
 
+    The hash is stored in a Redis sorted set scored by the token expiry.
+
     Args:
         token: JWT token string
-        user: User email
-        token_type: Token type ('access' or 'refresh')
+        user: User email (not stored)
+        token_type: Token type ('access' or 'refresh', not stored)
 
     Returns:
         bool: True if successfully blacklisted
@@ -205,25 +297,10 @@ def blacklist_token(token, user, token_type="refresh"):
     try:
         # Decode token to get expiry
         payload = jwt.decode(token, get_jwt_secret(), algorithms=["HS256"])
-        expires_at = datetime.fromtimestamp(payload.get("exp"))
-
-        token_hash = get_token_hash(token)
 
-        # Check if already blacklisted
-        if frappe.db.exists("Token Blacklist", {"token_hash": token_hash}):
-            return True
-
-        # Add to blacklist
-        blacklist_doc = frappe.get_doc({
-            "doctype": "Token Blacklist",
-            "token_hash": token_hash,
-            "user": user,
-            "token_type": token_type,
-            "expires_at": expires_at,
-            "revoked_at": datetime.now()
-        })
-        blacklist_doc.insert(ignore_permissions=True)
-        frappe.db.commit()
+        cache = frappe.cache()
+        cache.zadd(cache.make_key(BLACKLIST_KEY), {get_token_hash(token): payload.get("exp")})
+        _bump_blacklist_version()
 
         return True
 
@@ -239,14 +316,11 @@ def cleanup_expired_blacklist():
     """
     try:
         # Delete tokens that expired more than 7 days ago
-        cutoff_date = datetime.now() - timedelta(days=7)
-
-        frappe.db.sql("""
-            DELETE FROM `tabToken Blacklist`
-            WHERE expires_at < %s
-        """, (cutoff_date,))
+        cutoff = time.time() - 7 * 24 * 60 * 60
 
-        frappe.db.commit()
+        cache = frappe.cache()
+        if cache.zremrangebyscore(cache.make_key(BLACKLIST_KEY), "-inf", cutoff):
+            _bump_blacklist_version()
 
         return True
 
@@ -274,6 +348,7 @@ def revoke_all_user_tokens(user):
 
         # Store in cache with 30 days expiry (max refresh token lifetime)
         frappe.cache().set_value(cache_key, revocation_time, expires_in_sec=30 * 24 * 60 * 60)
+        _clear_revocation_value(cache_key)
 
         return True
 
@@ -282,19 +357,21 @@ def revoke_all_user_tokens(user):
         return False
 
 
-def is_token_revoked(token):
+def is_token_revoked(token, payload=None):
     """
     Check if token was issued before user's revocation timestamp
 
     Args:
         token: JWT token string
+        payload: Already decoded payload of the token
 
     Returns:
         bool: True if token is revoked
     """
     try:
         # Decode token without verification to get user and issued time
-        payload = jwt.decode(token, get_jwt_secret(), algorithms=["HS256"], options={"verify_signature": False})
+        if payload is None:
+            payload = jwt.decode(token, get_jwt_secret(), algorithms=["HS256"], options={"verify_signature": False})
         user = payload.get("user")
         issued_at = payload.get("iat")
 
@@ -303,7 +380,7 @@ def is_token_revoked(token):
 
         # Get user's revocation timestamp
         cache_key = f"jwt_revoke_before:{user}"
-        revoke_before = frappe.cache().get_value(cache_key)
+        revoke_before = _get_revocation_value(cache_key)
 
         if not revoke_before:
             return False
@@ -316,9 +393,90 @@ def is_token_revoked(token):
         return False
 
 
+def get_session_id(payload):
+    """
+    Get the session identifier of a decoded token
+
+    The access and refresh token of a login carry the same random `sid`, so
+    revoking the session rejects both, and two logins within the same second
+    are separate sessions. Tokens issued before `sid` was added fall back to
+    `iat`, which their pair shares as well.
+
+    Args:
+        payload: Decoded token payload
+
+    Returns:
+        str | int: Session identifier, None if the token has neither claim
+    """
+    return payload.get("sid") or payload.get("iat")
+
+
 def get_active_sessions_key(user):
-    """Get Redis key for user's active sessions list"""
-    return f"jwt_active_sessions:{user}"
+    """Get Redis key for user's active sessions sorted set"""
+    return f"jwt_sessions:active:{user}"
+
+
+def get_revoked_sessions_key(user):
+    """Get Redis key for user's revoked sessions sorted set"""
+    return f"jwt_sessions:revoked:{user}"
+
+
+# KEYS: active, revoked. ARGV: session id, max sessions, revoked for, now, key ttl.
+# Adds the session scored by its login time and moves the oldest ones over the
+# limit to the revoked set, scored by the time they stop being revoked.
+ADD_SESSION_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[4])
+redis.call('ZADD', KEYS[1], ARGV[4], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+local excess = redis.call('ZCARD', KEYS[1]) - tonumber(ARGV[2])
+if excess <= 0 then
+    return {}
+end
+local evicted = redis.call('ZRANGE', KEYS[1], 0, excess - 1)
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, excess - 1)
+for _, session in ipairs(evicted) do
+    redis.call('ZADD', KEYS[2], ARGV[3] + ARGV[4], session)
+end
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+return evicted
+"""
+
+# KEYS: active, revoked. ARGV: revoked for, now, key ttl, session id...
+# Each revoked session stays revoked for `revoked for` seconds.
+REVOKE_SESSIONS_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[2])
+for i = 4, #ARGV do
+    redis.call('ZREM', KEYS[1], ARGV[i])
+    redis.call('ZADD', KEYS[2], ARGV[1] + ARGV[2], ARGV[i])
+end
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return #ARGV - 3
+"""
+
+# site -> {script name: redis Script}
+_session_scripts = {}
+
+
+def _run_session_script(name, user, args):
+    """Run one of the session scripts on the user's active and revoked sets."""
+    cache = frappe.cache()
+    scripts = _session_scripts.get(frappe.local.site)
+    if scripts is None:
+        scripts = _session_scripts[frappe.local.site] = {
+            "add": cache.register_script(ADD_SESSION_SCRIPT),
+            "revoke": cache.register_script(REVOKE_SESSIONS_SCRIPT),
+        }
+
+    keys = [
+        cache.make_key(get_active_sessions_key(user)),
+        cache.make_key(get_revoked_sessions_key(user)),
+    ]
+    return scripts[name](keys=keys, args=args)
+
+
+def _session_id(member):
+    member = frappe.safe_decode(member)
+    return int(member) if member.isdigit() else member
 
 
 def add_user_session(user, token_identifier, max_sessions=None):
@@ -326,9 +484,12 @@ def add_user_session(user, token_identifier, max_sessions=None):
     Add a new session for the user and maintain session limit
     Uses FIFO - if limit exceeded, oldest session is revoked
 
+    The add and the eviction run as one Lua script, so concurrent logins
+    of the same user cannot overwrite each other's sessions.
+
     Args:
         user: User email
-        token_identifier: Unique identifier for this token (iat timestamp)
+        token_identifier: Unique identifier for this token (see get_session_id)
         max_sessions: Maximum number of simultaneous sessions (0 = unlimited)
 
     Returns:
@@ -339,47 +500,26 @@ def add_user_session(user, token_identifier, max_sessions=None):
         if max_sessions is None:
             max_sessions = int(frappe.db.get_value("User", user, "simultaneous_sessions") or 0)
 
-        frappe.logger().info(f"add_user_session called for user: {user}, max_sessions: {max_sessions}, token_iat: {token_identifier}")
-
-        cache_key = get_active_sessions_key(user)
-
-        # Get current active sessions (list of token identifiers)
-        active_sessions = frappe.cache().get_value(cache_key) or []
-
-        frappe.logger().info(f"Current active sessions for {user}: {len(active_sessions)} sessions - {active_sessions}")
-
         # If max_sessions is 0, allow unlimited sessions (don't track)
         if max_sessions == 0:
             frappe.logger().info(f"User {user} has unlimited sessions (max_sessions=0), not tracking")
             return []
 
-        revoked_sessions = []
-
-        # If we've reached the limit, remove oldest sessions
-        while len(active_sessions) >= max_sessions:
-            oldest = active_sessions.pop(0)  # Remove oldest (FIFO)
-            revoked_sessions.append(oldest)
-            frappe.logger().info(f"Revoking old session for {user}: {oldest}")
-
-        # Add new session
-        active_sessions.append(token_identifier)
+        evicted = _run_session_script(
+            "add",
+            user,
+            [token_identifier, max_sessions, SESSION_TTL_SECONDS, time.time(), SESSION_TTL_SECONDS],
+        )
+        revoked_sessions = [_session_id(member) for member in evicted]
 
-        # Store updated list
-        frappe.cache().set_value(cache_key, active_sessions, expires_in_sec=30 * 24 * 60 * 60)
-
-        frappe.logger().info(f"Updated active sessions for {user}: {len(active_sessions)} sessions - {active_sessions}")
-
-        # If we revoked any sessions, update the revocation timestamp for those specific tokens
         if revoked_sessions:
-            revoke_specific_sessions(user, revoked_sessions)
-            frappe.logger().info(f"Revoked {len(revoked_sessions)} session(s) for {user}")
+            _clear_revocation_value(get_revoked_sessions_key(user))
+            frappe.logger().info(f"Revoked {len(revoked_sessions)} session(s) for {user}: {revoked_sessions}")
 
         return revoked_sessions
 
     except Exception as e:
         frappe.log_error(f"Failed to add user session: {str(e)}", "Session Tracking Error")
-        import traceback
-        frappe.logger().error(f"Session tracking error: {traceback.format_exc()}")
         return []
 
 
@@ -387,53 +527,58 @@ def revoke_specific_sessions(user, token_identifiers):
     """
     Revoke specific sessions by their token identifiers
 
+    Each revoked session is kept for SESSION_TTL_SECONDS, after which none
+    of its tokens can be valid any more.
+
     Args:
         user: User email
-        token_identifiers: List of token identifiers (iat timestamps) to revoke
+        token_identifiers: List of token identifiers (see get_session_id) to revoke
     """
     try:
         if not token_identifiers:
             return
 
-        # Store revoked session identifiers
-        revoked_key = f"jwt_revoked_sessions:{user}"
-        revoked_sessions = frappe.cache().get_value(revoked_key) or []
-
-        for token_id in token_identifiers:
-            if token_id not in revoked_sessions:
-                revoked_sessions.append(token_id)
-
-        # Store for 30 days
-        frappe.cache().set_value(revoked_key, revoked_sessions, expires_in_sec=30 * 24 * 60 * 60)
+        _run_session_script(
+            "revoke",
+            user,
+            [SESSION_TTL_SECONDS, int(time.time()), SESSION_TTL_SECONDS, *token_identifiers],
+        )
+        _clear_revocation_value(get_revoked_sessions_key(user))
 
     except Exception as e:
         frappe.log_error(f"Failed to revoke specific sessions: {str(e)}", "Session Revocation Error")
 
 
-def is_session_revoked(token):
+def is_session_revoked(token, payload=None):
     """
     Check if a specific session (token) has been revoked
 
     Args:
         token: JWT token string
+        payload: Already decoded payload of the token
 
     Returns:
         bool: True if session is revoked
     """
     try:
         # Decode token to get user and token identifier
-        payload = jwt.decode(token, get_jwt_secret(), algorithms=["HS256"], options={"verify_signature": False})
+        if payload is None:
+            payload = jwt.decode(token, get_jwt_secret(), algorithms=["HS256"], options={"verify_signature": False})
         user = payload.get("user")
-        issued_at = payload.get("iat")
+        session_id = get_session_id(payload)
 
-        if not user or not issued_at:
+        if not user or not session_id:
             return False
 
-        # Check if this specific session is in the revoked list
-        revoked_key = f"jwt_revoked_sessions:{user}"
-        revoked_sessions = frappe.cache().get_value(revoked_key) or []
+        # One ZSCORE on the user's revoked set, the score is the member's expiry
+        cache = frappe.cache()
+        revoked_key = cache.make_key(get_revoked_sessions_key(user))
+        revoked_until = _get_revocation_value(
+            (get_revoked_sessions_key(user), session_id),
+            lambda: cache.zscore(revoked_key, session_id),
+        )
 
-        return issued_at in revoked_sessions
+        return revoked_until is not None and revoked_until > time.time()
 
     except Exception as e:
         frappe.log_error(f"Error checking session revocation: {str(e)}", "Session Revocation Check Error")
@@ -446,15 +591,11 @@ def remove_user_session(user, token_identifier):
 
     Args:
         user: User email
-        token_identifier: Token identifier to remove (iat timestamp)
+        token_identifier: Token identifier to remove (see get_session_id)
     """
     try:
-        cache_key = get_active_sessions_key(user)
-        active_sessions = frappe.cache().get_value(cache_key) or []
-
-        if token_identifier in active_sessions:
-            active_sessions.remove(token_identifier)
-            frappe.cache().set_value(cache_key, active_sessions, expires_in_sec=30 * 24 * 60 * 60)
+        cache = frappe.cache()
+        cache.zrem(cache.make_key(get_active_sessions_key(user)), token_identifier)
 
     except Exception as e:
         frappe.log_error(f"Failed to remove user session: {str(e)}", "Session Removal Error")
@@ -0,0 +1,123 @@
+"""
+Benchmark of bearer token authentication.
+
+Run with:
+    bench --site <site> execute excel_restaurant_pos.utils.jwt_benchmark.benchmark_jwt_auth \
+        --kwargs "{'requests_per_second': 1000, 'duration': 10}"
+
+Replays the work `auth.validate` does for a bearer token request at a fixed
+rate against the site, with a populated blacklist, and reports the achieved
+rate, latency percentiles and database queries per request for the previous
+verification path and the current one. Needs `jwt_secret_key` in the site
+config; the benchmark blacklist entries are removed afterwards.
+"""
+
+import time
+
+import frappe
+import jwt
+
+from excel_restaurant_pos.auth import authenticate_token
+from excel_restaurant_pos.utils import jwt_auth
+from excel_restaurant_pos.utils.query_counter import QueryCounter
+
+BENCH_HASH_PREFIX = "bench"
+
+
+def _legacy_authenticate(token):
+    """The previous path: blacklist table lookups before decoding, three decodes."""
+    if frappe.db.table_exists("Token Blacklist"):
+        frappe.db.exists("Token Blacklist", {"token_hash": jwt_auth.get_token_hash(token)})
+
+    secret = jwt_auth.get_jwt_secret()
+    unverified = jwt.decode(token, secret, algorithms=["HS256"], options={"verify_signature": False})
+    frappe.cache().get_value(f"jwt_revoke_before:{unverified['user']}")
+    unverified = jwt.decode(token, secret, algorithms=["HS256"], options={"verify_signature": False})
+    frappe.cache().get_value(f"jwt_revoked_sessions:{unverified['user']}")
+
+    payload = jwt.decode(token, secret, algorithms=["HS256"])
+    user = payload["user"]
+    frappe.db.exists("User", user)
+    return frappe.get_cached_doc("User", user)
+
+
+def _run(label, authenticate, tokens, requests_per_second, duration):
+    interval = 1.0 / requests_per_second
+    total = int(requests_per_second * duration)
+    latencies = []
+
+    with QueryCounter() as queries:
+        started = time.perf_counter()
+        for i in range(total):
+            # pace the requests, a slow path falls behind instead of bursting
+            due = started + i * interval
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            start = time.perf_counter()
+            authenticate(tokens[i % len(tokens)])
+            latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "requests": total,
+        "achieved_rps": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+        "db_queries_per_request": round(queries.count / total, 3),
+    }
+    print(
+        f"{label:<8} {result['achieved_rps']:>8} req/s  p50 {result['p50_ms']} ms  "
+        f"p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  "
+        f"db queries/request {result['db_queries_per_request']}"
+    )
+    return result
+
+
+def benchmark_jwt_auth(requests_per_second=1000, duration=10, users=20, blacklisted=10000, user=None):
+    """
+    Compare the previous and current bearer token verification.
+
+    Args:
+        requests_per_second: Target request rate
+        duration: Seconds per variant
+        users: Distinct tokens in the traffic
+        blacklisted: Revoked token hashes present in the blacklist
+        user: User the tokens are issued for (default Administrator)
+    """
+    requests_per_second, duration = int(requests_per_second), float(duration)
+    user = user or "Administrator"
+    tokens = []
+    for i in range(int(users)):
+        # distinct tokens of one user, iat differs by a second each
+        payload = {
+            "user": user,
+            "exp": int(time.time()) + 3600,
+            "iat": int(time.time()) - i,
+            "sid": frappe.generate_hash(length=16),
+            "type": "access",
+        }
+        tokens.append(jwt.encode(payload, jwt_auth.get_jwt_secret(), algorithm="HS256"))
+
+    cache = frappe.cache()
+    blacklist_key = cache.make_key(jwt_auth.BLACKLIST_KEY)
+    bench_members = {f"{BENCH_HASH_PREFIX}{i}": time.time() + 3600 for i in range(int(blacklisted))}
+    cache.zadd(blacklist_key, bench_members)
+    jwt_auth._bump_blacklist_version()
+
+    try:
+        # warm up the document cache and the worker caches
+        for token in tokens:
+            authenticate_token(token)
+
+        print(f"{requests_per_second} req/s for {duration:g} s, {len(tokens)} tokens, {blacklisted} blacklisted")
+        return {
+            "legacy": _run("legacy", _legacy_authenticate, tokens, requests_per_second, duration),
+            "current": _run("current", authenticate_token, tokens, requests_per_second, duration),
+        }
+    finally:
+        cache.zrem(blacklist_key, *bench_members)
+        jwt_auth._bump_blacklist_version()
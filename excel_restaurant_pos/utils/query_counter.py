@@ -0,0 +1,31 @@
+"""Database query counting for the benchmarks."""
+
+import frappe
+
+
+class QueryCounter:
+    """
+    Count the queries sent through frappe.db while active.
+
+    Usage:
+        with QueryCounter() as queries:
+            ...
+        queries.count
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._sql = None
+
+    def __enter__(self):
+        self._sql = frappe.db.sql
+
+        def counted_sql(*args, **kwargs):
+            self.count += 1
+            return self._sql(*args, **kwargs)
+
+        frappe.db.sql = counted_sql
+        return self
+
+    def __exit__(self, *exc):
+        frappe.db.sql = self._sql
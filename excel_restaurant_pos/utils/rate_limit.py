@@ -1,29 +1,152 @@
+"""
+Sliding-window rate limiting of guest endpoints.
+
+Every endpoint has a built-in limit given at the call site, which can be
+overridden (or disabled) per endpoint in the Rate Limit Policies table of
+ArcPOS System Settings. Requests are counted per client IP by default, per
+user or for the whole endpoint when the policy says so.
+
+A bucket is a Redis sorted set of request timestamps. Trimming the window,
+counting and adding the request run in one Lua script, so concurrent requests
+cannot over- or under-count and the window slides instead of resetting.
+The policies come from the process cache of the settings, a check costs one
+Redis call and no database query.
+
+The outcome of the last check of a request is sent in the X-RateLimit-*
+response headers by the `add_rate_limit_headers` after_request hook.
+"""
+
+import time
+
 import frappe
 from frappe import _
 
+from excel_restaurant_pos.shared.arcpos_settings import arcpos_system_settings
+
+# KEYS: bucket. ARGV: now (ms), window (ms), limit, request id.
+# Returns allowed (0/1), requests in the window, ms until a slot frees up.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+local allowed = 0
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    count = count + 1
+    allowed = 1
+end
+redis.call('PEXPIRE', KEYS[1], window)
+local reset = window
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if oldest[2] then
+    reset = tonumber(oldest[2]) + window - now
+end
+return {allowed, count, reset}
+"""
+
+KEY_BY_OPTIONS = ("IP", "User", "Endpoint")
+
+# site -> redis Script
+_scripts = {}
+# site -> (settings modified, {endpoint: policy row})
+_policies = {}
+
+
+def _get_policy(endpoint):
+    """Get the enabled settings policy of an endpoint, if any."""
+    settings = arcpos_system_settings()
+    site = frappe.local.site
+    cached = _policies.get(site)
+    if not cached or cached[0] != settings.modified:
+        cached = (
+            settings.modified,
+            {row.endpoint: row for row in settings.rate_limit_policies if not row.disabled},
+        )
+        _policies[site] = cached
+
+    return cached[1].get(endpoint)
+
+
+def _get_identity(key_by):
+    if key_by == "Endpoint":
+        return "all"
 
-def rate_limit_guest(endpoint, limit=5, seconds=60):
+    if key_by == "User" and frappe.session.user != "Guest":
+        return f"user:{frappe.session.user}"
+
+    ip = getattr(frappe.local, "request_ip", None)
+    if not ip and getattr(frappe.local, "request", None):
+        ip = frappe.local.request.remote_addr
+    return f"ip:{ip or 'unknown'}"
+
+
+def _run_script(key, limit, seconds):
+    cache = frappe.cache()
+    script = _scripts.get(frappe.local.site)
+    if script is None:
+        script = _scripts[frappe.local.site] = cache.register_script(SLIDING_WINDOW_SCRIPT)
+
+    now_ms = int(time.time() * 1000)
+    request_id = f"{now_ms}-{frappe.generate_hash(length=8)}"
+    return script(keys=[cache.make_key(key)], args=[now_ms, seconds * 1000, limit, request_id])
+
+
+def rate_limit_guest(endpoint, limit=5, seconds=60, key_by="IP"):
     """
     Apply rate limiting for guest endpoints.
 
     Args:
         endpoint: The endpoint identifier
-        limit: Maximum number of requests allowed
-        seconds: Time window in seconds
+        limit: Maximum number of requests allowed (unless a policy overrides it)
+        seconds: Sliding time window in seconds (unless a policy overrides it)
+        key_by: "IP", "User" or "Endpoint" (unless a policy overrides it)
 
     Raises:
-        frappe.ValidationError: If rate limit is exceeded
+        frappe.TooManyRequestsError: If rate limit is exceeded
     """
-    key = f"guest:{endpoint}"
-    cache = frappe.cache()
+    settings = arcpos_system_settings()
+    if settings.disable_rate_limiting:
+        return
+
+    policy = _get_policy(endpoint)
+    if policy:
+        limit, seconds = policy.limit, policy.window or seconds
+        key_by = policy.key_by or key_by
+
+    key_by = key_by if key_by in KEY_BY_OPTIONS else "IP"
+    key = f"rate_limit:{endpoint}:{_get_identity(key_by)}"
 
-    # Get current count
-    current_count = cache.get_value(key) or 0
+    try:
+        allowed, count, reset_ms = _run_script(key, int(limit), int(seconds))
+    except Exception as e:
+        # an unavailable Redis must not take the endpoints down with it
+        frappe.logger().warning(f"Rate limit check of {endpoint} skipped: {str(e)}")
+        return
 
-    if current_count >= limit:
+    reset = max(int(reset_ms + 999) // 1000, 1)
+    frappe.local.arcpos_rate_limit = {
+        "limit": int(limit),
+        "remaining": max(int(limit) - int(count), 0),
+        "reset": reset,
+        "allowed": bool(allowed),
+    }
+
+    if not allowed:
         frappe.throw(
-            _("Too many requests. Please try again later."), exc=frappe.ValidationError
+            _("Too many requests. Please try again later."), exc=frappe.TooManyRequestsError
         )
 
-    # Increment count and set expiry
-    cache.set_value(key, current_count + 1, expires_in_sec=seconds)
+
+def add_rate_limit_headers(response=None, request=None):
+    """after_request hook: send the rate limit state of the request."""
+    state = getattr(frappe.local, "arcpos_rate_limit", None)
+    if response is None or not state:
+        return
+
+    response.headers["X-RateLimit-Limit"] = str(state["limit"])
+    response.headers["X-RateLimit-Remaining"] = str(state["remaining"])
+    response.headers["X-RateLimit-Reset"] = str(state["reset"])
+    if not state["allowed"]:
+        response.headers["Retry-After"] = str(state["reset"])
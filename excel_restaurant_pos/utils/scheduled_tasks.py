@@ -1,10 +1,22 @@
-from excel_restaurant_pos.api.payments.helper.check_receipt import check_receipt
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from redis.exceptions import LockError
+
+from excel_restaurant_pos.api.payments.helper.check_receipt import (
+    POOL_SIZE as RECEIPT_POOL_SIZE,
+    post_receipt_request,
+)
+from excel_restaurant_pos.api.payments.helper.get_payment_config import get_payment_config
 import frappe
 from frappe.utils import now_datetime
+from frappe.utils.background_jobs import get_redis_conn
 from datetime import timedelta
 from excel_restaurant_pos.doc_event.sales_invoice.handlers.create_payment_entry import (
     create_payment_entry,
 )
+from excel_restaurant_pos.shared.push_notification import queue_push_to_users
+from excel_restaurant_pos.shared.arcpos_settings import get_settings_doc
 
 
 def delete_marked_invoices():
@@ -39,130 +51,260 @@ def delete_marked_invoices():
         )
 
 
-def _delete_sales_invoice(invoice_name):
-    try:
-        frappe.delete_doc("Sales Invoice", invoice_name, force=True)
-        frappe.db.commit()
-    except Exception as e:
-        frappe.log_error(
-            message=f"Failed to delete Sales Invoice {invoice_name}: {str(e)}",
-            title="Scheduled Invoice Deletion Error",
-        )
-    return True
+STALE_ORDER_MINUTES = 20
+# bounded so a backlog after a gateway outage still fits the scheduler job timeout
+STALE_ORDERS_PER_RUN = 200
+RECEIPT_CHECK_TIMEOUT = (5, 15)
+# only these answers say the ticket is gone; 401/403/408/429 and the rest are retried
+TICKET_GONE_STATUSES = frozenset({404, 410})
+STALE_ORDERS_LOCK_KEY = "delete_stale_website_orders"
+STALE_ORDERS_LOCK_TIMEOUT = STALE_ORDER_MINUTES * 60
+# invoices whose receipt could not be checked are skipped for a while, so they
+# do not fill every run while newer stale drafts wait
+UNCHECKED_ORDERS_KEY = "stale_website_orders:unchecked"
+UNCHECKED_ORDERS_TTL = 60 * 60
+BATCH_SIZE = 50
 
 
-def delete_stale_website_orders():
+def _unchecked_orders_key():
+    return f"{frappe.local.site}:{UNCHECKED_ORDERS_KEY}"
+
+
+def _get_unchecked_orders():
+    return [frappe.safe_decode(name) for name in get_redis_conn().smembers(_unchecked_orders_key())]
+
+
+def _mark_unchecked_orders(invoice_names):
+    # one TTL for the whole set, it is refreshed while checks keep failing
+    pipe = get_redis_conn().pipeline()
+    pipe.sadd(_unchecked_orders_key(), *invoice_names)
+    pipe.expire(_unchecked_orders_key(), UNCHECKED_ORDERS_TTL)
+    pipe.execute()
+
+
+def _get_stale_website_orders(cutoff_time):
     """
-    Delete stale website orders that have been in draft status for more than 20 minutes.
-    Runs every 20 minutes.
+    Stale website drafts with the ticket of their latest Payment Ticket, in one query.
+    Drafts whose receipt check failed recently are left out.
+    Returns:
+        list: rows with name, grand_total and ticket (None without Payment Ticket)
+    """
+    unchecked = _get_unchecked_orders()
+    return frappe.db.sql(
+        """
+        SELECT si.name, si.grand_total, pt.ticket
+        FROM `tabSales Invoice` si
+        LEFT JOIN `tabPayment Ticket` pt ON pt.name = (
+            SELECT latest.name
+            FROM `tabPayment Ticket` latest
+            WHERE latest.invoice_no = si.name
+            ORDER BY latest.creation DESC
+            LIMIT 1
+        )
+        WHERE si.docstatus = 0
+            AND si.custom_order_from = 'Website'
+            AND si.creation < %(cutoff_time)s
+            AND si.name NOT IN %(unchecked)s
+        ORDER BY si.creation
+        LIMIT %(limit)s
+        """,
+        {
+            "cutoff_time": cutoff_time,
+            # NOT IN () is invalid SQL, "" matches no invoice
+            "unchecked": unchecked or [""],
+            "limit": STALE_ORDERS_PER_RUN,
+        },
+        as_dict=True,
+    )
 
-    Condition: custom_order_from = "Website" AND docstatus = 0 (Draft) AND creation > 20 minutes ago
+
+def _fetch_receipt(ticket, payment_config):
     """
-    cutoff_time = now_datetime() - timedelta(minutes=20)
+    Worker thread: get the receipt of a ticket, only HTTP, no frappe calls.
+    Returns:
+        tuple: (receipt, error). The receipt is {} when the gateway reports the
+        ticket as unknown or expired, which is treated as unpaid, and None when
+        the check should be retried (transport error, auth or rate limit
+        rejection, any other status or a malformed reply).
+    """
+    try:
+        response = post_receipt_request(ticket, payment_config, timeout=RECEIPT_CHECK_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        return None, str(e)
 
-    invoices = frappe.get_all(
-        "Sales Invoice",
-        filters={
-            "docstatus": 0,
-            "custom_order_from": "Website",
-            "creation": ["<", cutoff_time],
-        },
-        pluck="name",
+    if response.status_code in TICKET_GONE_STATUSES:
+        # expired or unknown ticket, asking again gives the same answer
+        return {}, f"Payment gateway returned status {response.status_code}"
+    if response.status_code != 200:
+        return None, f"Payment gateway returned status {response.status_code}"
+
+    try:
+        data = response.json()
+    except ValueError as e:
+        return None, f"Invalid JSON response: {str(e)}"
+
+    receipt = data.get("response") if isinstance(data, dict) else None
+    if not isinstance(receipt, dict):
+        return None, f"Unexpected response: {str(data)[:200]}"
+    return receipt, None
+
+
+def _check_receipts(orders):
+    """
+    Check the receipts of the orders concurrently over the shared gateway session.
+    Returns:
+        dict: invoice name -> receipt, None when the gateway could not be asked
+    """
+    payment_config = get_payment_config()
+    receipts = {}
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=RECEIPT_POOL_SIZE) as pool:
+        futures = {
+            pool.submit(_fetch_receipt, order.ticket, payment_config): order.name
+            for order in orders
+        }
+        for future in as_completed(futures):
+            invoice_name = futures[future]
+            try:
+                receipts[invoice_name], error = future.result()
+            except Exception as e:
+                # one bad reply must not abort the run
+                receipts[invoice_name], error = None, str(e)
+            if error:
+                errors[invoice_name] = error
+
+    # logged from this thread, the workers have no site context
+    for invoice_name, error in errors.items():
+        frappe.log_error(
+            message=f"Receipt check failed for invoice {invoice_name}: {error}",
+            title="Scheduled Website Order Deletion Error",
+        )
+    return receipts
+
+
+def _is_paid(invoice_name, receipt):
+    # payment is successful, the receipt approved and for this invoice
+    details = receipt.get("receipt")
+    request = receipt.get("request")
+    return (
+        receipt.get("success", "false") == "true"
+        and isinstance(details, dict)
+        and details.get("result", "") == "a"
+        and isinstance(request, dict)
+        and request.get("order_no") == invoice_name
     )
 
-    for invoice_name in invoices:
-        # if payment is done create payment entry manually
-        try:
-            invoice = frappe.get_doc("Sales Invoice", invoice_name)
-        except Exception as e:
-            frappe.log_error(
-                message=f"Failed to get Sales Invoice {invoice_name}: {str(e)}",
-                title="Scheduled Website Order Deletion Error",
-            )
-            continue
 
-        # get payment ticket (get first record matching invoice_no)
-        payment_ticket = None
-        try:
-            payment_ticket_names = frappe.get_all(
-                "Payment Ticket",
-                filters={"invoice_no": invoice_name},
-                limit=1,
-                pluck="name",
-            )
-            if payment_ticket_names:
-                payment_ticket = frappe.get_doc(
-                    "Payment Ticket", payment_ticket_names[0]
+def _delete_sales_invoices(invoice_names):
+    """Delete draft invoices, committing once per BATCH_SIZE invoices."""
+    deleted = 0
+    for start in range(0, len(invoice_names), BATCH_SIZE):
+        for invoice_name in invoice_names[start:start + BATCH_SIZE]:
+            frappe.db.savepoint("stale_website_order")
+            try:
+                frappe.delete_doc("Sales Invoice", invoice_name, force=True)
+                deleted += 1
+            except Exception as e:
+                frappe.db.rollback(save_point="stale_website_order")
+                frappe.log_error(
+                    message=f"Failed to delete Sales Invoice {invoice_name}: {str(e)}",
+                    title="Scheduled Invoice Deletion Error",
                 )
-        except Exception as e:
-            frappe.log_error(
-                message=f"Failed to get Payment Ticket for invoice {invoice_name}: {str(e)}",
-                title="Scheduled Website Order Deletion Error",
-            )
+        frappe.db.commit()
+    return deleted
 
-        if not payment_ticket:
-            _delete_sales_invoice(invoice_name)
-            continue
 
-        # check receipt status info
-        receipt_status = check_receipt(payment_ticket.ticket)
+def _submit_paid_orders(orders):
+    """Submit paid invoices and create their payment entries, committing per batch."""
+    # get mode of payment configured for website (get first record)
+    mode_of_payment_names = frappe.get_all(
+        "Mode of Payment", filters={"custom_default_website": 1}, limit=1, pluck="mode_of_payment"
+    )
+    mode_of_payment = mode_of_payment_names[0] if mode_of_payment_names else None
+    if not mode_of_payment:
+        frappe.log_error("No Mode Of payment", "No mode of payment configured for website")
+
+    submitted = 0
+    for start in range(0, len(orders), BATCH_SIZE):
+        for order in orders[start:start + BATCH_SIZE]:
+            frappe.db.savepoint("stale_website_order")
+            try:
+                invoice = frappe.get_doc("Sales Invoice", order.name)
+                invoice.docstatus = 1
+                invoice.save(ignore_permissions=True)
+
+                payments = [{"mode_of_payment": mode_of_payment or "Cash", "amount": invoice.grand_total}]
+                create_payment_entry(sales_invoice=invoice.name, payments=payments)
+                submitted += 1
+            except Exception as e:
+                frappe.db.rollback(save_point="stale_website_order")
+                frappe.log_error(
+                    message=f"Failed to submit paid website order {order.name}: {str(e)}",
+                    title="Scheduled Website Order Deletion Error",
+                )
+        frappe.db.commit()
+    return submitted
 
-        # define required values for validation
-        receipt_result = receipt_status.get("receipt", {}).get("result", "")
-        success_result = receipt_status.get("success", "false")
 
-        # check payment is successful and the receipt is approved
-        if success_result != "true" or receipt_result != "a":
-            _delete_sales_invoice(invoice_name)
-            continue
+def delete_stale_website_orders():
+    """
+    Delete stale website orders that have been in draft status for more than 20 minutes.
+    Orders whose payment receipt is approved are submitted with a payment entry instead.
+    Runs every 20 minutes.
 
-        # validate order number
-        order_number = receipt_status.get("request", {}).get("order_no")
-        if order_number != invoice.name:
-            _delete_sales_invoice(invoice_name)
-            continue
+    Condition: custom_order_from = "Website" AND docstatus = 0 (Draft) AND creation > 20 minutes ago
+    """
+    cache = frappe.cache()
+    lock = cache.lock(cache.make_key(STALE_ORDERS_LOCK_KEY), timeout=STALE_ORDERS_LOCK_TIMEOUT)
+    # an overlapping run would check and submit the same invoices twice
+    if not lock.acquire(blocking=False):
+        frappe.logger().info("Stale website order cleanup is already running, skipping")
+        return
 
-        # submit sales invoice
+    try:
+        _delete_stale_website_orders()
+    finally:
         try:
-            invoice.docstatus = 1
-            invoice.save(ignore_permissions=True)
+            lock.release()
+        except LockError:
+            # expired while running, another run may hold it now
+            pass
 
-            # get mode of payment configured for website (get first record)
-            filters = {"custom_default_website": 1}
-            mode_of_payment_names = frappe.get_all(
-                "Mode of Payment", filters=filters, limit=1, pluck="mode_of_payment"
-            )
-            mode_of_payment = (
-                mode_of_payment_names[0] if len(mode_of_payment_names) > 0 else None
-            )
 
-            # if mode of payment is no configured
-            if not mode_of_payment:
-                msg = "No mode of payment configured for website"
-                frappe.log_error("No Mode Of payment", msg)
+def _delete_stale_website_orders():
+    cutoff_time = now_datetime() - timedelta(minutes=STALE_ORDER_MINUTES)
+    orders = _get_stale_website_orders(cutoff_time)
+    if not orders:
+        return
 
-            # create payment entry manually
-            payments = [
-                {
-                    "mode_of_payment": mode_of_payment or "Cash",
-                    "amount": invoice.grand_total,
-                }
-            ]
+    with_ticket = [order for order in orders if order.ticket]
+    receipts = _check_receipts(with_ticket) if with_ticket else {}
 
-            # enqueue payment entry creation
-            args = {"sales_invoice": invoice.name, "payments": payments}
-            create_payment_entry(**args)
+    to_delete = [order.name for order in orders if not order.ticket]
+    paid, unchecked = [], []
+    for order in with_ticket:
+        receipt = receipts.get(order.name)
+        if receipt is None:
+            # gateway unavailable, checked again once the skip expires
+            unchecked.append(order.name)
+            continue
+        if _is_paid(order.name, receipt):
+            paid.append(order)
+        else:
+            to_delete.append(order.name)
 
-        except Exception as e:
-            frappe.log_error(
-                message=f"Failed to delete stale website order {invoice_name}: {str(e)}",
-                title="Scheduled Website Order Deletion Error",
-            )
+    if unchecked:
+        _mark_unchecked_orders(unchecked)
 
-    if invoices:
-        frappe.logger().info(
-            f"Deleted {len(invoices)} stale website orders older than 20 minutes"
-        )
+    deleted = _delete_sales_invoices(to_delete)
+    submitted = _submit_paid_orders(paid) if paid else 0
+
+    frappe.logger().info(
+        f"Stale website orders older than {STALE_ORDER_MINUTES} minutes: "
+        f"{deleted} deleted, {submitted} paid and submitted, "
+        f"{len(unchecked)} receipt checks failed"
+    )
 
 
 def check_scheduled_order_notifications():
@@ -294,24 +436,11 @@ def send_scheduled_order_notification_to_staff(invoice):
     Returns:
         bool: True if notification was sent successfully
     """
-    try:
-        from exponent_server_sdk import (
-            DeviceNotRegisteredError,
-            PushClient,
-            PushMessage,
-            PushServerError,
-            PushTicketError,
-        )
-        has_expo = True
-    except ImportError:
-        has_expo = False
-        frappe.logger().warning("Expo Server SDK not installed, skipping push notifications")
-
     # Get the full document
     doc = frappe.get_doc("Sales Invoice", invoice.name)
 
     # Get ArcPOS Settings for email template
-    settings = frappe.get_single("ArcPOS Settings")
+    settings = get_settings_doc("ArcPOS Settings")
 
     # Define target roles for staff notifications
     target_roles = ["Restaurant Chef", "Restaurant Manager"]
@@ -458,73 +587,29 @@ def send_scheduled_order_notification_to_staff(invoice):
                         "Scheduled Order Notification - System Error"
                     )
 
-            # Send push notifications if Expo is available
-            if has_expo:
-                try:
-                    # Get Expo tokens for users
-                    token_docs = frappe.get_all(
-                        "ArcPOS Notification Token",
-                        filters={"user": ["in", user_emails]},
-                        fields=["name", "user"]
-                    )
-
-                    if token_docs:
-                        push_messages = []
-                        for token_doc_name in [t.name for t in token_docs]:
-                            token_doc = frappe.get_doc("ArcPOS Notification Token", token_doc_name)
-
-                            # Get tokens from child table
-                            if token_doc.token_list:
-                                for token_row in token_doc.token_list:
-                                    if token_row.token and PushClient.is_exponent_push_token(token_row.token):
-                                        push_messages.append(
-                                            PushMessage(
-                                                to=token_row.token,
-                                                title=title,
-                                                body=body,
-                                                data={
-                                                    "document_type": "Sales Invoice",
-                                                    "document_name": doc.name,
-                                                    "notification_type": "scheduled_30min_reminder",
-                                                    "order_status": doc.custom_order_status or "",
-                                                    "service_type": doc.custom_service_type or "",
-                                                    "delivery_time": str(doc.custom_delivery_time)
-                                                },
-                                                sound="default",
-                                                priority="high"
-                                            )
-                                        )
-
-                        # Send push notifications in chunks
-                        if push_messages:
-                            push_client = PushClient()
-                            chunk_size = 100
-                            for i in range(0, len(push_messages), chunk_size):
-                                chunk = push_messages[i:i + chunk_size]
-                                try:
-                                    responses = push_client.publish_multiple(chunk)
-                                    for response in responses:
-                                        try:
-                                            response.validate_response()
-                                        except DeviceNotRegisteredError:
-                                            pass  # Token expired, ignore
-                                        except (PushTicketError, PushServerError) as exc:
-                                            frappe.logger().warning(
-                                                f"Push notification error: {exc.message}"
-                                            )
-                                except Exception as e:
-                                    frappe.log_error(
-                                        f"Error sending push notification chunk: {str(e)}",
-                                        "Scheduled Order Notification - Push Error"
-                                    )
-
-                            frappe.logger().info(f"Push notifications sent to role: {role}")
+            # Queue push notifications for the push worker
+            try:
+                queue_push_to_users(
+                    user_emails,
+                    title,
+                    body,
+                    data={
+                        "document_type": "Sales Invoice",
+                        "document_name": doc.name,
+                        "notification_type": "scheduled_30min_reminder",
+                        "order_status": doc.custom_order_status or "",
+                        "service_type": doc.custom_service_type or "",
+                        "delivery_time": str(doc.custom_delivery_time)
+                    },
+                    source="Scheduled Order Reminder",
+                )
+                frappe.logger().info(f"Push notifications queued for role: {role}")
 
-                except Exception as e:
-                    frappe.log_error(
-                        f"Error processing push notifications for role {role}: {str(e)}",
-                        "Scheduled Order Notification - Push Error"
-                    )
+            except Exception as e:
+                frappe.log_error(
+                    f"Error processing push notifications for role {role}: {str(e)}",
+                    "Scheduled Order Notification - Push Error"
+                )
 
         except Exception as e:
             frappe.log_error(
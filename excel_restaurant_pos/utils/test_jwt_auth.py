@@ -0,0 +1,63 @@
+import frappe
+import jwt
+from frappe.tests.utils import FrappeTestCase
+
+from excel_restaurant_pos.utils import jwt_auth
+
+TEST_USER = "jwt-session-test@example.com"
+
+
+class TestJWTSessions(FrappeTestCase):
+    """Revoking a session rejects the refresh token of the login too."""
+
+    def setUp(self):
+        self.previous_secret = frappe.local.conf.get("jwt_secret_key")
+        if not self.previous_secret:
+            frappe.local.conf["jwt_secret_key"] = frappe.generate_hash(length=32)
+
+    def tearDown(self):
+        cache = frappe.cache()
+        cache.delete_value(jwt_auth.get_active_sessions_key(TEST_USER))
+        cache.delete_value(jwt_auth.get_revoked_sessions_key(TEST_USER))
+        jwt_auth._clear_revocation_value(jwt_auth.get_revoked_sessions_key(TEST_USER))
+        if not self.previous_secret:
+            frappe.local.conf.pop("jwt_secret_key", None)
+
+    def _login(self):
+        session_id = jwt_auth.new_session_id()
+        access_token = jwt_auth.generate_access_token(TEST_USER, session_id=session_id)
+        refresh_token = jwt_auth.generate_refresh_token(TEST_USER, session_id=session_id)
+        return session_id, access_token, refresh_token
+
+    def test_tokens_of_a_login_share_the_session(self):
+        session_id, access_token, refresh_token = self._login()
+
+        for token in (access_token, refresh_token):
+            payload = jwt.decode(token, options={"verify_signature": False})
+            self.assertEqual(jwt_auth.get_session_id(payload), session_id)
+
+    def test_revoked_session_rejects_refresh_token(self):
+        session_id, access_token, refresh_token = self._login()
+        jwt_auth.add_user_session(TEST_USER, session_id, max_sessions=2)
+        self.assertEqual(jwt_auth.verify_token(refresh_token, "refresh")["user"], TEST_USER)
+
+        # logout
+        jwt_auth.remove_user_session(TEST_USER, session_id)
+        jwt_auth.revoke_specific_sessions(TEST_USER, [session_id])
+
+        with self.assertRaises(frappe.AuthenticationError):
+            jwt_auth.verify_token(refresh_token, "refresh")
+        with self.assertRaises(frappe.AuthenticationError):
+            jwt_auth.verify_token(access_token, "access")
+
+    def test_evicted_session_rejects_refresh_token(self):
+        old_session, _old_access, old_refresh = self._login()
+        jwt_auth.add_user_session(TEST_USER, old_session, max_sessions=1)
+
+        new_session, _new_access, new_refresh = self._login()
+        evicted = jwt_auth.add_user_session(TEST_USER, new_session, max_sessions=1)
+        self.assertEqual([str(session) for session in evicted], [old_session])
+
+        with self.assertRaises(frappe.AuthenticationError):
+            jwt_auth.verify_token(old_refresh, "refresh")
+        self.assertEqual(jwt_auth.verify_token(new_refresh, "refresh")["user"], TEST_USER)